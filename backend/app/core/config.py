@@ -118,6 +118,7 @@ class Settings(BaseSettings):
     LOG_SAMPLING_RATE: float = 0.3  # 同会话 INFO 级别日志采样率（0.0-1.0）
     LOG_SLOW_THRESHOLD_MS: int = 3000  # 慢调用阈值（ms），超过则输出完整 payload
     LOG_AGENT_FILE_ENABLED: bool = True  # 是否启用 agent.log 分流文件
+    LOG_FILE_QUEUE_SIZE: int = 10000  # 文件日志后台写入队列容量，满时丢弃并计数
 
     # ========== 响应清洗配置 ==========
     RESPONSE_SANITIZATION_ENABLED: bool = (
@@ -136,6 +137,8 @@ class Settings(BaseSettings):
     # ========== Agent 缓存配置 ==========
     # 缓存 TTL（秒），超过后触发版本校验，0 表示禁用 TTL（仅依赖手动失效）
     AGENT_CACHE_TTL_SECONDS: float = 60.0
+    # 缓存的 Agent 实例上限（LRU 淘汰），0 表示不限制
+    AGENT_CACHE_MAX_SIZE: int = 32
 
     # ========== Agent 工具执行配置 ==========
     # 工具串行执行：当模型一次返回多个 tool_calls 时，是否强制按顺序执行（而非并行）
@@ -249,6 +252,19 @@ class Settings(BaseSettings):
     # False: 使用旧实现（legacy）
     USE_AGENT_SDK: bool = True
 
+    # ========== 聊天流续传配置 ==========
+    # 生成在后台运行，事件写入按消息的环形缓冲，客户端断线后可凭 Last-Event-ID 续传
+    CHAT_STREAM_BUFFER_SIZE: int = 4096  # 每条消息缓冲的事件数上限
+    CHAT_STREAM_TTL_SECONDS: float = 300.0  # 生成结束后缓冲保留时间（秒）
+
+    # ========== 回合耗时追踪配置 ==========
+    # 每轮对话的耗时拆解为 span 树（见 core/tracing.py），摘要写入 assistant 消息的 extra_metadata.trace
+    TRACE_ENABLED: bool = True
+    TRACE_EXPORTER: str = "file"  # file: 本地 OTLP JSON 文件；otel: OpenTelemetry API；none: 不导出
+    TRACE_FILE: str = "./logs/traces.jsonl"  # file 导出器的输出路径
+    TRACE_FILE_ROTATION: str = "10 MB"  # file 导出器的轮转大小
+    TRACE_FILE_RETENTION: str = "7 days"  # file 导出器轮转文件的保留时间
+
     # ========== Supervisor 多 Agent 编排配置 ==========
     # 全局开关（关闭后所有 Supervisor Agent 回退到单 Agent 模式）
     SUPERVISOR_ENABLED: bool = False
@@ -267,8 +283,12 @@ class Settings(BaseSettings):
     # 可选值: rapid_ocr, mineru_ocr, mineru_official, paddlex_ocr
     OCR_DEFAULT_PROVIDER: str = "rapid_ocr"
 
+    # 识别结果缓存（按文件内容 sha256 + 处理器 + 参数）
+    OCR_CACHE_MAX_MB: int = 64  # OCR 结果缓存上限（按识别文本字节数，MB），<= 0 时不缓存
+
     # RapidOCR 本地模型配置
     OCR_MODEL_DIR: str | None = None  # 模型目录，需包含 SWHL/RapidOCR/PP-OCRv4/
+    OCR_PDF_WORKERS: int = 2  # PDF 逐页识别的进程数（每个进程各加载一份模型），<= 1 时在当前线程顺序识别
 
     # MinerU HTTP API 配置（自建服务）
     MINERU_API_URL: str | None = None  # 自建 MinerU 服务地址
@@ -333,6 +353,39 @@ class Settings(BaseSettings):
     CRAWLER_DEFAULT_MAX_DEPTH: int = 3  # 默认最大爬取深度
     CRAWLER_DEFAULT_MAX_PAGES: int = 500  # 默认最大页面数
 
+    # 并发爬取
+    CRAWLER_CONCURRENCY: int = 4  # 单个爬取任务的并发 worker 数（共享浏览器上下文池）
+    CRAWLER_HOST_BURST: int = 1  # 每个 host 令牌桶容量（速率 = 1 / crawl_delay）
+    CRAWLER_FRONTIER_CHECKPOINT_PAGES: int = 20  # 每处理多少页持久化一次 frontier（中断续爬）
+
+    # 多站点调度（进程内全局上限，站点间按权重公平分配）
+    CRAWLER_MAX_CONCURRENT_SITES: int = 2  # 同时爬取的站点数，其余排队（next_crawl_at 已过期的站点优先）
+    CRAWLER_MAX_BROWSERS: int = 1  # 浏览器进程上限，站点共享浏览器（各自独立上下文）
+    CRAWLER_MAX_PAGES_IN_FLIGHT: int = 8  # 所有站点同时抓取/处理中的页面数上限，<= 0 不限制
+    CRAWLER_MAX_LLM_CALLS: int = 4  # 所有站点同时进行的 LLM 提取调用上限，<= 0 不限制
+    CRAWLER_OVERDUE_WEIGHT: float = 2.0  # 过期站点（next_crawl_at 已过）分得的页面/LLM 份额倍数
+
+    # 分层抓取（HTTP 优先，按需升级到浏览器）
+    CRAWLER_HTTP_FIRST: bool = True  # 是否优先用 HTTP 客户端抓取（SPA 站点仅试探）
+    CRAWLER_HTTP_TIMEOUT: float = 15.0  # HTTP 抓取超时（秒）
+    CRAWLER_SSR_MIN_TEXT_LENGTH: int = 200  # 判定为服务端渲染所需的最少可见文本长度
+
+    # HTML 解析（进程池，避免阻塞事件循环）
+    CRAWLER_PARSE_WORKERS: int = 2  # 解析进程数，<= 0 时在线程中解析
+    CRAWLER_HTML_PARSER: str = "auto"  # auto / lxml / html.parser（auto：安装了 lxml 则使用）
+
+    # 模板学习（LLM 解析若干页后推断选择器，同一 URL 模式的后续页面不再调用 LLM）
+    CRAWLER_TEMPLATE_LEARNING: bool = True  # 是否启用模板学习（仅 LLM 提取模式的站点）
+    CRAWLER_TEMPLATE_SAMPLES: int = 3  # 每个 URL 模式推断选择器所需的 LLM 样本数
+
+    # 增量重爬（条件请求 + sitemap lastmod）
+    CRAWLER_SITEMAP_ENABLED: bool = True  # 是否读取 sitemap 播种 frontier，并跳过 lastmod 未更新的页面
+
+    # 页面存储（按内容哈希去重，zstd 压缩 + 站点字典；未安装 zstandard 时用 zlib）
+    CRAWLER_HTML_STORE_CLEANED: bool = False  # 只保存清理后的正文片段（体积更小；重新解析与 304 页面的链接扩展只能基于片段）
+    CRAWLER_HTML_DICT_SAMPLES: int = 50  # 站点无字典时，收集多少页训练压缩字典（<= 0 不训练）
+    CRAWLER_HTML_DICT_SIZE: int = 64 * 1024  # 压缩字典大小（字节）
+
     # 调度配置
     CRAWLER_SCHEDULE_CHECK_INTERVAL: int = 5  # 调度检查间隔（分钟）
     CRAWLER_RUN_ON_START: bool = False  # 调度器启动时是否立即执行一次
@@ -371,12 +424,14 @@ class Settings(BaseSettings):
     MINIO_BUCKET_NAME: str = "chat-images"  # 默认 bucket 名称
     MINIO_USE_SSL: bool = False  # 是否使用 SSL
     MINIO_PUBLIC_URL: str = "http://localhost:9000"  # 公开访问 URL
+    MINIO_PART_SIZE_MB: int = 8  # 上传分片大小（MB，最小 5），超过时走分片上传
 
     # 图片上传限制
     IMAGE_MAX_SIZE_MB: int = 10  # 最大图片大小（MB）
     IMAGE_MAX_COUNT_PER_MESSAGE: int = 5  # 每条消息最多图片数
     IMAGE_ALLOWED_TYPES: str = "image/jpeg,image/png,image/webp,image/gif"  # 允许的图片类型
     IMAGE_THUMBNAIL_SIZE: int = 300  # 缩略图最大尺寸（像素）
+    IMAGE_PROCESS_WORKERS: int = 2  # 图片解码/缩略图线程数（不占用事件循环）
 
     # ========== 客服支持配置 ==========
     # 企业微信通知配置
@@ -393,6 +448,23 @@ class Settings(BaseSettings):
     SUPPORT_CONSOLE_URL: str = ""  # 客服控制台 URL（用于通知中的链接）
     SUPPORT_SLA_SECONDS: int = 120  # SLA 等待时间（秒），超过后发送提醒
 
+    # ========== WebSocket 配置 ==========
+    # 跨进程广播总线（多 worker / 多实例部署时把会话消息转发到持有连接的节点）
+    # 可选值: memory（单进程，默认）| postgres（LISTEN/NOTIFY，需 DATABASE_BACKEND=postgres）| broker（本地中转）
+    WS_BUS_BACKEND: str = "memory"
+    WS_BUS_BROKER_URL: str = "tcp://127.0.0.1:8765"  # broker 地址：tcp://host:port 或 unix:///path/to.sock
+    # 每个连接的发送队列（由独立写任务发送，慢客户端不阻塞其他连接）
+    WS_SEND_QUEUE_SIZE: int = 256  # 队列上限（条）
+    WS_SEND_TIMEOUT: float = 10.0  # 单条消息写入超时（秒），超时视为慢客户端并关闭连接
+    # 队列满时的处理：close（关闭连接，客户端重连后补发未送达消息）| drop_oldest（丢弃最旧消息）
+    WS_SEND_OVERFLOW_POLICY: str = "close"
+    # 节点定期向其他节点重发各会话的连接数（秒），超过 3 个间隔未收到的节点视为已下线
+    WS_MEMBERS_ANNOUNCE_INTERVAL: float = 15.0
+    # 在线状态以内存为准，变更合并后按间隔批量写库
+    PRESENCE_FLUSH_INTERVAL: float = 2.0  # 持久化间隔（秒）
+    # 事件日志送达游标在内存中推进，合并后按间隔批量写库
+    EVENT_CURSOR_FLUSH_INTERVAL: float = 1.0  # 持久化间隔（秒）
+
     @property
     def crawler_sites(self) -> list[dict[str, Any]]:
         """
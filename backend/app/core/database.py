@@ -15,16 +15,23 @@ import time
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
+from sqlalchemy import Column, Connection, Dialect, MetaData, inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.db.provider import get_database_provider
 from app.core.logging import get_logger
+from app.core.metrics import DB_COMMIT, DB_SESSION_ACQUIRE
 
 logger = get_logger("database")
 
 # SQLite 写入串行化锁（仅在需要强制串行化写入时使用）
 _write_lock = asyncio.Lock()
 
+# 已有表上后来加入的列：create_all 不修改已存在的表，启动时按需补齐（含所在索引）
+_ADDED_COLUMNS: dict[str, tuple[str, ...]] = {
+    "conversations": ("unread_user_count", "last_user_message_at"),
+}
+
 
 def get_engine():
     """获取数据库引擎（兼容旧代码）"""
@@ -42,12 +49,16 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     start = time.perf_counter()
     logger.debug("get_db: 开始创建 session")
     async with session_factory() as session:
-        logger.debug(f"get_db: session 已创建，耗时 {(time.perf_counter() - start) * 1000:.2f}ms")
         try:
+            # 显式获取连接以记录获取耗时（首个查询本来也要获取连接）
+            with DB_SESSION_ACQUIRE.time():
+                await session.connection()
+            logger.debug(f"get_db: session 已创建，耗时 {(time.perf_counter() - start) * 1000:.2f}ms")
             yield session
             commit_start = time.perf_counter()
             logger.debug("get_db: 开始 commit")
-            await session.commit()
+            with DB_COMMIT.time():
+                await session.commit()
             logger.debug(f"get_db: commit 完成，耗时 {(time.perf_counter() - commit_start) * 1000:.2f}ms")
         except asyncio.CancelledError:
             logger.debug("get_db: 请求被取消，开始 rollback")
@@ -77,8 +88,11 @@ async def get_db_context() -> AsyncGenerator[AsyncSession, None]:
     session_factory = get_database_provider().session_factory
     async with session_factory() as session:
         try:
+            with DB_SESSION_ACQUIRE.time():
+                await session.connection()
             yield session
-            await session.commit()
+            with DB_COMMIT.time():
+                await session.commit()
         except asyncio.CancelledError:
             try:
                 await session.rollback()
@@ -122,7 +136,48 @@ async def init_db() -> None:
     settings.ensure_data_dir()
     provider = get_database_provider()
     await provider.init_db(Base)
+    async with provider.engine.begin() as conn:
+        added = await conn.run_sync(add_missing_columns, Base.metadata)
+    if added:
+        logger.info("已补齐数据表新增列", columns=added)
     logger.info(
         "数据库表初始化完成",
         backend=provider.backend_name,
     )
+
+
+def add_column_ddl(column: Column, dialect: Dialect) -> str:
+    """生成 ALTER TABLE ... ADD COLUMN 语句（SQLite 与 PostgreSQL 通用）"""
+    preparer = dialect.identifier_preparer
+    ddl = (
+        f"ALTER TABLE {preparer.format_table(column.table)} "
+        f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=dialect)}"
+    )
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    return ddl
+
+
+def add_missing_columns(conn: Connection, metadata: MetaData) -> list[str]:
+    """为已存在的表补齐 _ADDED_COLUMNS 中缺少的列
+
+    Returns:
+        补齐的列（table.column）
+    """
+    inspector = inspect(conn)
+    added: list[str] = []
+    for table_name, column_names in _ADDED_COLUMNS.items():
+        if not inspector.has_table(table_name):
+            continue
+        table = metadata.tables[table_name]
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        missing = [name for name in column_names if name not in existing]
+        for name in missing:
+            conn.execute(text(add_column_ddl(table.c[name], conn.dialect)))
+            added.append(f"{table_name}.{name}")
+        for index in table.indexes:
+            if any(column.name in missing for column in index.columns):
+                index.create(conn, checkfirst=True)
+    return added
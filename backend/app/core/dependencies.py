@@ -22,6 +22,7 @@ if TYPE_CHECKING:
     from app.repositories.message import MessageRepository
     from app.services.conversation import ConversationService
     from app.services.support.handoff import HandoffService
+    from app.services.websocket.event_log import EventLogService
 
 
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
@@ -59,6 +60,7 @@ class ServiceContainer:
     _handoff: "HandoffService | None" = None
     _message_repo: "MessageRepository | None" = None
     _conversation_repo: "ConversationRepository | None" = None
+    _event_log: "EventLogService | None" = None
     
     @property
     def conversation(self) -> "ConversationService":
@@ -91,6 +93,14 @@ class ServiceContainer:
             from app.repositories.conversation import ConversationRepository
             self._conversation_repo = ConversationRepository(self.db)
         return self._conversation_repo
+    
+    @property
+    def event_log(self) -> "EventLogService":
+        """会话事件日志"""
+        if self._event_log is None:
+            from app.services.websocket.event_log import EventLogService
+            self._event_log = EventLogService(self.db)
+        return self._event_log
 
 
 @asynccontextmanager
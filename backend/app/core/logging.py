@@ -11,11 +11,27 @@
     logger.info("消息")
     logger.debug("调试信息", extra={"user_id": "123"})
     logger.error("错误", exc_info=True)
+
+性能约定:
+- 级别检查在任何 extra 处理之前完成，未启用的级别（如生产环境的 DEBUG）只有一次比较的开销
+- 构造代价高的字段用 lazy() 包装，仅在日志实际输出时求值：
+      logger.debug("状态", state=lazy(lambda: state.model_dump()))
+- 文件日志由后台线程写入（BackgroundFileSink）：调用方只把 record 放入有界队列，
+  JSON 序列化、写盘、轮转与 gzip 压缩都不在事件循环线程上执行；队列满时丢弃并计数
 """
 
 import asyncio
+import atexit
+import gzip
+import queue
+import re
+import shutil
 import sys
+import threading
+import time
 import traceback
+from collections.abc import Callable
+from datetime import datetime
 from enum import Enum
 from pathlib import Path
 from typing import Any
@@ -46,10 +62,30 @@ class LogMode(str, Enum):
     JSON = "json"  # JSON 模式（生产环境）
 
 
+# loguru 标准级别序号（与 loguru_logger.level(name).no 一致）
+_LEVEL_NO = {"debug": 10, "info": 20, "warning": 30, "error": 40, "critical": 50}
+
 # Rich 控制台
 console = Console(force_terminal=True, color_system="auto")
 
 
+class LazyValue:
+    """延迟求值的日志字段（见 lazy）"""
+
+    __slots__ = ("func",)
+
+    def __init__(self, func: Callable[[], Any]) -> None:
+        self.func = func
+
+
+def lazy(func: Callable[[], Any]) -> LazyValue:
+    """包装构造代价高的日志字段，仅在该条日志实际输出时调用 func()
+
+    只有显式包装的可调用对象会被求值，直接传入的函数等对象仍按原样记录。
+    """
+    return LazyValue(func)
+
+
 def _safe_for_logging(value: Any, *, _level: int = 0) -> Any:
     """将任意对象转换为可序列化/可 picklable 的结构，避免 loguru enqueue/serialize 报错。"""
     if value is None or isinstance(value, (str, int, float, bool)):
@@ -259,6 +295,131 @@ def format_json(record: dict) -> str:
     return json.dumps(log_entry, ensure_ascii=False, default=str) + "\n"
 
 
+_SIZE_UNITS = {"b": 1, "kb": 1024, "mb": 1024**2, "gb": 1024**3}
+_DURATION_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400, "week": 604800}
+
+
+def _parse_size(text: str) -> int:
+    """解析轮转大小，如 "10 MB" """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmg]?b)\s*", text.lower())
+    if not match:
+        raise ValueError(f"无法解析的日志轮转大小: {text}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+def _parse_duration(text: str) -> float:
+    """解析保留时长，如 "7 days" """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*(second|minute|hour|day|week)s?\s*", text.lower())
+    if not match:
+        raise ValueError(f"无法解析的日志保留时长: {text}")
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+class BackgroundFileSink:
+    """后台线程写入的 JSON 日志文件 sink
+
+    - 调用线程只把 loguru record 放入有界队列（put_nowait），队列满时丢弃并计数
+    - 写线程负责 format_json 序列化、写盘、按大小轮转、gzip 压缩与按时间清理
+    - 队列取空时 flush 一次，批量写入
+    - 丢弃的条数在下一次写入时以一条 WARNING 记录落盘
+    - write_line 写入已格式化的行（如回合追踪的 OTLP JSON），共用轮转与清理
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        rotation: str = "10 MB",
+        retention: str = "7 days",
+        queue_size: int = 10000,
+    ) -> None:
+        self.path = Path(path)
+        self.rotation_bytes = _parse_size(rotation)
+        self.retention_seconds = _parse_duration(retention)
+        self.dropped = 0
+        self.written = 0
+        self._reported_dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max(queue_size, 1))
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name=f"log-writer:{self.path.name}", daemon=True)
+        self._thread.start()
+
+    def write(self, message) -> None:
+        """loguru 调用入口（不阻塞）"""
+        try:
+            self._queue.put_nowait(message.record)
+        except queue.Full:
+            self.dropped += 1
+
+    def write_line(self, line: str) -> None:
+        """写入已格式化的一行（不阻塞，队列满时丢弃并计数）"""
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self) -> None:
+        """写完队列中剩余的日志后停止（loguru remove 时调用）"""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout=5)
+
+    def get_stats(self) -> dict[str, int]:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is self._STOP:
+                break
+            try:
+                self._write(record if isinstance(record, str) else format_json(record))
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception as e:  # 写日志失败不能影响业务，输出到 stderr 后继续
+                sys.stderr.write(f"[logging] 写入 {self.path} 失败: {e}\n")
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, line: str) -> None:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")  # noqa: SIM115
+        if self.dropped > self._reported_dropped:
+            lost = self.dropped - self._reported_dropped
+            self._reported_dropped = self.dropped
+            self._file.write(
+                f'{{"level": "WARNING", "timestamp": "{datetime.now().astimezone().isoformat()}", '
+                f'"module": "logging", "message": "日志写入队列已满，丢弃 {lost} 条"}}\n'
+            )
+        self._file.write(line)
+        self.written += 1
+        if self._file.tell() >= self.rotation_bytes:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        """轮转：重命名当前文件、gzip 压缩、清理过期文件（均在写线程）"""
+        self._file.close()
+        self._file = None
+        stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S_%f")
+        rotated = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}")
+        self.path.rename(rotated)
+        with open(rotated, "rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        rotated.unlink()
+
+        cutoff = time.time() - self.retention_seconds
+        for old in self.path.parent.glob(f"{self.path.stem}.*{self.path.suffix}.gz"):
+            try:
+                if old.stat().st_mtime < cutoff:
+                    old.unlink()
+            except OSError:
+                pass
+
+
 class Logger:
     """统一日志接口"""
 
@@ -266,6 +427,10 @@ class Logger:
         self._configured = False
         self._mode = LogMode.DETAILED
         self._level = LogLevel.DEBUG
+        self._level_no = _LEVEL_NO["debug"]
+        self.file_sinks: list[BackgroundFileSink] = []
+        # 进程退出前写完文件 sink 队列中的日志（写线程为 daemon）
+        atexit.register(self._stop_file_sinks)
 
     def configure(
         self,
@@ -296,9 +461,11 @@ class Logger:
 
         self._mode = mode
         self._level = level
+        self._level_no = _LEVEL_NO[level.value.lower()]
 
-        # 移除默认处理器
+        # 移除默认处理器（文件 sink 在 remove 时写完队列并停止写线程）
         loguru_logger.remove()
+        self.file_sinks = []
 
         # 选择格式化器
         if mode == LogMode.SIMPLE:
@@ -332,20 +499,13 @@ class Logger:
 
         rotation = getattr(settings, "LOG_FILE_ROTATION", "10 MB")
         retention = getattr(settings, "LOG_FILE_RETENTION", "7 days")
+        queue_size = getattr(settings, "LOG_FILE_QUEUE_SIZE", 10000)
 
-        # 文件日志始终使用 JSON 格式（方便解析），无论控制台模式如何
-        loguru_logger.add(
-            str(log_path),
-            format="{message}",
-            level=level.value,
-            rotation=rotation,
-            retention=retention,
-            compression="gz",  # 压缩旧日志
-            # serialize=True 时 loguru 会通过队列传递 record 对象，要求可 picklable；
-            # 这里禁用 enqueue，避免在包含复杂对象时触发 pickling 报错。
-            enqueue=False,
-            serialize=True,  # 自动序列化为 JSON
-        )
+        # 文件日志始终使用 JSON 格式（format_json，方便解析），无论控制台模式如何；
+        # 由后台线程序列化与写盘，不阻塞事件循环
+        app_sink = BackgroundFileSink(log_path, rotation=rotation, retention=retention, queue_size=queue_size)
+        loguru_logger.add(app_sink, format="{message}", level=level.value)
+        self.file_sinks.append(app_sink)
         log_file_configured = True
 
         # Agent 日志分流：仅记录 module 以 agent./middleware. 开头的日志
@@ -358,17 +518,11 @@ class Logger:
                 module = record.get("extra", {}).get("module", "")
                 return module.startswith(("agent", "middleware"))
 
-            loguru_logger.add(
-                str(agent_log_path),
-                format="{message}",
-                level=level.value,
-                rotation=rotation,
-                retention=retention,
-                compression="gz",
-                enqueue=False,
-                serialize=True,
-                filter=_agent_filter,
+            agent_sink = BackgroundFileSink(
+                agent_log_path, rotation=rotation, retention=retention, queue_size=queue_size
             )
+            loguru_logger.add(agent_sink, format="{message}", level=level.value, filter=_agent_filter)
+            self.file_sinks.append(agent_sink)
 
         # 标记为已配置（必须在记录日志之前设置，避免递归）
         self._configured = True
@@ -416,6 +570,19 @@ class Logger:
         if not self._configured:
             self.configure()
 
+    def is_enabled_for(self, level: str) -> bool:
+        """该级别的日志是否会输出（调用方可据此跳过昂贵的准备工作）"""
+        self._ensure_configured()
+        return _LEVEL_NO[level.lower()] >= self._level_no
+
+    def _stop_file_sinks(self) -> None:
+        for sink in self.file_sinks:
+            sink.stop()
+
+    def get_sink_stats(self) -> dict[str, dict[str, int]]:
+        """文件 sink 的队列统计（queued / written / dropped）"""
+        return {sink.path.name: sink.get_stats() for sink in self.file_sinks}
+
     def _log(
         self,
         level: str,
@@ -429,10 +596,16 @@ class Logger:
         """内部日志方法"""
         self._ensure_configured()
 
+        # 级别未启用时直接返回，不做任何 extra 处理
+        if _LEVEL_NO[level] < self._level_no:
+            return
+
         # 合并上下文
         context = {"module": module}
         # 关键：任何 extra 都先转成可序列化/可 picklable，避免 enqueue/serialize 报错
         for k, v in extra.items():
+            if isinstance(v, LazyValue):
+                v = v.func()
             context[str(k)] = _safe_for_logging(v)
 
         # 记录日志：使用 loguru 的 opt(depth=...) 获取稳定、准确的 callsite
@@ -531,7 +704,8 @@ class BoundLogger:
         return BoundLogger(self._parent, ctx)
 
     def debug(self, message: str, **extra: Any) -> None:
-        self._parent.debug(message, _depth=1, **{**self._context, **extra})
+        if self._parent.is_enabled_for("debug"):
+            self._parent.debug(message, _depth=1, **{**self._context, **extra})
 
     def verbose(self, message: str, **extra: Any) -> None:
         """根据 LOG_VERBOSE_AGENT 配置决定日志级别
@@ -540,15 +714,18 @@ class BoundLogger:
         适用于工具执行、LLM 调用等高频但在调试时需要可见的日志。
         """
         if settings.LOG_VERBOSE_AGENT:
-            self._parent.info(message, _depth=1, **{**self._context, **extra})
-        else:
+            if self._parent.is_enabled_for("info"):
+                self._parent.info(message, _depth=1, **{**self._context, **extra})
+        elif self._parent.is_enabled_for("debug"):
             self._parent.debug(message, _depth=1, **{**self._context, **extra})
 
     def info(self, message: str, **extra: Any) -> None:
-        self._parent.info(message, _depth=1, **{**self._context, **extra})
+        if self._parent.is_enabled_for("info"):
+            self._parent.info(message, _depth=1, **{**self._context, **extra})
 
     def warning(self, message: str, **extra: Any) -> None:
-        self._parent.warning(message, _depth=1, **{**self._context, **extra})
+        if self._parent.is_enabled_for("warning"):
+            self._parent.warning(message, _depth=1, **{**self._context, **extra})
 
     def error(self, message: str, exc_info: bool = False, **extra: Any) -> None:
         self._parent.error(message, exc_info=exc_info, _depth=1, **{**self._context, **extra})
@@ -0,0 +1,304 @@
+"""运行时指标（Prometheus 文本格式，见 GET /metrics）
+
+设计要点：
+- 写路径不加锁：计数器/直方图的每个标签组合是一个预先创建的 child，
+  inc/observe 只是对 child 上数值的原地累加（直方图多一次 bisect），
+  调用方可以在 token 路径上使用。写入都发生在事件循环线程上，GIL 下不会丢失更新；
+  线程池中的零星写入最多丢失个别增量，对监控数据可以接受
+- 取值开销放在抓取时：队列深度、连接数、Agent 缓存命中等已有统计在 /metrics 被请求时
+  由 collector 读取，热路径上不做任何额外工作
+- 标签组合应是有限集合（模型名、工具名、依赖名），不要把 ID 作为标签
+
+用法：
+    from app.core.metrics import TOOL_DURATION
+
+    with TOOL_DURATION.labels("search_products").time():
+        ...
+"""
+
+import time
+import weakref
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+# 延迟类默认分桶（秒）：覆盖毫秒级 DB 操作到数十秒的 LLM 调用
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (名称后缀, 标签, 数值)；collector 返回 (name, type, help, samples)
+Sample = tuple[str, dict[str, str], float]
+MetricFamily = tuple[str, str, str, list[Sample]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一格为 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """记录代码块耗时（秒，异常时同样记录）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class _Metric(ABC):
+    """指标基类：按标签值组合持有 child"""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+
+    @abstractmethod
+    def _new_child(self) -> Any:
+        """创建一个标签组合的 child"""
+
+    def labels(self, *values: str) -> Any:
+        """按标签值（与 labelnames 顺序一致）取 child，首次使用时创建"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} 需要标签 {self.labelnames}，收到 {values}")
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _label_dict(self, values: tuple[str, ...]) -> dict[str, str]:
+        return dict(zip(self.labelnames, values, strict=True))
+
+    @abstractmethod
+    def collect(self) -> MetricFamily:
+        """输出该指标的全部样本"""
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def collect(self) -> MetricFamily:
+        samples = [("", self._label_dict(k), c.value) for k, c in list(self._children.items())]
+        return self.name, self.type, self.documentation, samples
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def collect(self) -> MetricFamily:
+        samples = [("", self._label_dict(k), c.value) for k, c in list(self._children.items())]
+        return self.name, self.type, self.documentation, samples
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def collect(self) -> MetricFamily:
+        samples: list[Sample] = []
+        for key, child in list(self._children.items()):
+            labels = self._label_dict(key)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), list(child.counts), strict=True):
+                cumulative += count
+                samples.append(("_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append(("_sum", labels, child.sum))
+            samples.append(("_count", labels, child.count))
+        return self.name, self.type, self.documentation, samples
+
+
+class QueueDepthTracker:
+    """登记持有队列的对象（需有 queue_depth 属性），抓取时汇总
+
+    只保存弱引用，对象销毁后自动移除；登记后热路径上没有任何开销。
+    """
+
+    def __init__(self) -> None:
+        self._owners: weakref.WeakSet = weakref.WeakSet()
+
+    def track(self, owner: Any) -> None:
+        self._owners.add(owner)
+
+    def snapshot(self) -> tuple[int, int, int]:
+        """(对象数, 总深度, 最大深度)"""
+        depths = [owner.queue_depth for owner in list(self._owners)]
+        return len(depths), sum(depths), max(depths, default=0)
+
+
+class MetricsRegistry:
+    """指标登记表：直接登记的指标 + 抓取时调用的 collector"""
+
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], Iterable[MetricFamily]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """登记抓取时调用的 collector（同一函数只登记一次）"""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def collect(self) -> list[MetricFamily]:
+        families = [metric.collect() for metric in self._metrics]
+        for collector in self._collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        lines: list[str] = []
+        for name, metric_type, documentation, samples in self.collect():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# ==================== 指标定义 ====================
+
+CHAT_STREAM_EVENTS = registry.counter(
+    "chat_stream_events_total", "聊天流写入缓冲的事件数", ["type"]
+)
+LLM_TTFT = registry.histogram(
+    "llm_ttft_seconds", "LLM 调用首 token 耗时（流式）", ["model"]
+)
+LLM_DURATION = registry.histogram(
+    "llm_call_duration_seconds", "LLM 调用总耗时", ["model"]
+)
+TOOL_DURATION = registry.histogram(
+    "agent_tool_duration_seconds", "Agent 工具调用耗时", ["tool"]
+)
+DEPENDENCY_DURATION = registry.histogram(
+    "dependency_call_duration_seconds", "外部依赖调用耗时（embedding / rerank / qdrant）", ["dependency", "operation"]
+)
+DB_SESSION_ACQUIRE = registry.histogram(
+    "db_session_acquire_seconds", "数据库会话获取连接耗时"
+)
+DB_COMMIT = registry.histogram(
+    "db_commit_seconds", "数据库会话提交耗时"
+)
+MEMORY_WRITE_LAG = registry.histogram(
+    "memory_write_queue_lag_seconds", "记忆写入任务从提交到开始执行的等待时间"
+)
+MEMORY_WRITE_PENDING = registry.gauge(
+    "memory_write_pending", "等待或正在执行的记忆写入任务数"
+)
+
+# 聊天流编排器的领域事件队列（编排器实例在创建时登记）
+orchestrator_queues = QueueDepthTracker()
@@ -6,6 +6,7 @@ from pydantic import BaseModel, Field
 
 from app.core.config import get_settings
 from app.core.logging import get_logger
+from app.core.metrics import DEPENDENCY_DURATION
 
 logger = get_logger("rerank")
 settings = get_settings()
@@ -128,11 +129,12 @@ class RerankClient:
         )
 
         async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                self.rerank_url,
-                json=payload,
-                headers=headers,
-            )
+            with DEPENDENCY_DURATION.labels("rerank", "rerank").time():
+                response = await client.post(
+                    self.rerank_url,
+                    json=payload,
+                    headers=headers,
+                )
 
             if response.status_code != 200:
                 error_msg = f"Rerank API 请求失败: {response.status_code}"
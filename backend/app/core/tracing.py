@@ -0,0 +1,354 @@
+"""回合耗时追踪
+
+把一轮对话（用户消息 → assistant 消息落库）的耗时拆成 span 树：
+
+    chat.turn
+    ├── db.save_user_message
+    └── agent.run
+        ├── agent.build
+        ├── memory.context
+        │   ├── memory.profile / memory.facts / memory.graph
+        ├── llm.call            (model, ttft_ms, output_tokens, tokens_per_s)
+        ├── tool.<name>
+        │   ├── retrieval.vector_search / retrieval.keyword_filter / retrieval.rerank
+        └── db.save_assistant_message
+
+传递方式：
+- TurnTrace 通过 ChatContext.trace 显式传给中间件（runtime.context.trace）
+- 同时登记到 contextvar，检索、记忆等深层代码用 trace_span() 即可挂到当前 span 下，
+  没有进行中的回合时 trace_span() 不做任何事
+- asyncio 任务创建时复制 contextvar，并发执行的工具各自挂在自己的 span 下
+
+回合结束时：
+- summary() 写入 assistant 消息的 extra_metadata["trace"]
+- 按 TRACE_EXPORTER 导出：file 写本地 OTLP JSON（每行一个回合，代替 OTLP collector；
+  经 BackgroundFileSink 后台写入，按 TRACE_FILE_ROTATION 轮转、TRACE_FILE_RETENTION 清理），
+  otel 通过 OpenTelemetry API 重放（需自行安装并配置 opentelemetry-sdk）
+"""
+
+import asyncio
+import atexit
+import json
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+from app.core.logging import BackgroundFileSink, get_logger
+
+logger = get_logger("tracing")
+
+_current_trace: ContextVar["TurnTrace | None"] = ContextVar("current_trace", default=None)
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """一个计时区间"""
+
+    __slots__ = (
+        "name", "span_id", "parent_id", "start_ns", "_start", "_end", "attributes", "error", "first_token_ns"
+    )
+
+    def __init__(self, name: str, parent_id: str | None = None, **attributes: Any) -> None:
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter_ns()
+        self._end: int | None = None
+        self.attributes: dict[str, Any] = attributes
+        self.error: str | None = None
+        # 仅 llm.call：收到第一个流式 token 的时刻（perf_counter_ns）
+        self.first_token_ns: int | None = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        if self._end is None:
+            self._end = time.perf_counter_ns()
+
+    @property
+    def ended(self) -> bool:
+        return self._end is not None
+
+    @property
+    def elapsed_ms(self) -> float:
+        """开始至今（已结束则为总耗时）的毫秒数"""
+        end = self._end if self._end is not None else time.perf_counter_ns()
+        return (end - self._start) / 1e6
+
+    @property
+    def end_ns(self) -> int:
+        return self.start_ns + int(self.elapsed_ms * 1e6)
+
+
+class TurnTrace:
+    """一轮对话的 span 树"""
+
+    def __init__(self, conversation_id: str, message_id: str | None = None) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.conversation_id = conversation_id
+        self.message_id = message_id
+        self.root = Span("chat.turn")
+        self.spans: list[Span] = [self.root]
+        # 进行中的 LLM 调用：{ 流标识 -> llm.call span }，并发的调用各自记录首 token
+        self._llm_spans: dict[str | None, Span] = {}
+
+    def start_span(self, name: str, parent: Span | None = None, **attributes: Any) -> Span:
+        """开始 span；未指定 parent 时挂在当前 span（属于本回合）或根 span 下"""
+        if parent is None:
+            current = _current_span.get()
+            parent = current if current is not None and current in self.spans else self.root
+        span = Span(name, parent.span_id, **attributes)
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """计时上下文，期间新开的 span 挂在它下面；异常时记录错误类型并继续抛出"""
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.end()
+            _current_span.reset(token)
+
+    @contextmanager
+    def llm_call(self, stream_key: str | None = None, **attributes: Any) -> Iterator[Span]:
+        """LLM 调用 span：记录首 token 耗时（ttft_ms）与输出速率（tokens_per_s）
+
+        调用方在拿到用量后 span.set(output_tokens=...)。
+
+        Args:
+            stream_key: 流式输出中区分本次调用的标识（图节点的 langgraph_checkpoint_ns），
+                与 mark_first_token 传入的一致
+        """
+        with self.span("llm.call", **attributes) as span:
+            self._llm_spans[stream_key] = span
+            try:
+                yield span
+            finally:
+                if self._llm_spans.get(stream_key) is span:
+                    del self._llm_spans[stream_key]
+                if span.first_token_ns is not None:
+                    span.set(ttft_ms=round((span.first_token_ns - span._start) / 1e6, 1))
+                span.end()
+                output_tokens = span.attributes.get("output_tokens")
+                if output_tokens:
+                    generate_ms = span.elapsed_ms - span.attributes.get("ttft_ms", 0)
+                    if generate_ms > 0:
+                        span.set(tokens_per_s=round(output_tokens / generate_ms * 1000, 1))
+
+    def mark_first_token(self, stream_key: str | None = None) -> None:
+        """流式输出收到内容时调用；只记录对应 LLM 调用的第一个 token
+
+        找不到 stream_key 对应的调用时，仅在只有一个进行中的调用时记到它上面。
+        """
+        span = self._llm_spans.get(stream_key)
+        if span is None and len(self._llm_spans) == 1:
+            span = next(iter(self._llm_spans.values()))
+        if span is not None and span.first_token_ns is None:
+            span.first_token_ns = time.perf_counter_ns()
+
+    def activate(self) -> Token:
+        """登记为当前回合（之后创建的 asyncio 任务会继承）"""
+        _current_span.set(self.root)
+        return _current_trace.set(self)
+
+    def summary(self) -> dict[str, Any]:
+        """回合摘要（写入 Message.extra_metadata["trace"]）
+
+        spans 按开始顺序排列，depth 表示树中的层级；未结束的 span 以当前耗时计。
+        """
+        depth: dict[str | None, int] = {None: -1}
+        spans = []
+        for span in self.spans:
+            depth[span.span_id] = depth.get(span.parent_id, 0) + 1
+            item: dict[str, Any] = {
+                "name": span.name,
+                "depth": depth[span.span_id],
+                "start_ms": round((span._start - self.root._start) / 1e6, 1),
+                "duration_ms": round(span.elapsed_ms, 1),
+                **span.attributes,
+            }
+            if span.error:
+                item["error"] = span.error
+            spans.append(item)
+        return {"trace_id": self.trace_id, "total_ms": round(self.root.elapsed_ms, 1), "spans": spans}
+
+    async def finish(self) -> None:
+        """结束根 span 并导出（导出失败只记日志）"""
+        self.root.end()
+        for span in self.spans:
+            span.end()
+        try:
+            await asyncio.to_thread(get_exporter().export, self)
+        except Exception as e:
+            logger.warning("回合追踪导出失败", trace_id=self.trace_id, error=str(e))
+
+
+def current_trace() -> TurnTrace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_span(name: str, trace: TurnTrace | None = None, **attributes: Any) -> Iterator[Span | None]:
+    """在当前（或指定）回合中计时；没有进行中的回合时产出 None"""
+    trace = trace or _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, **attributes) as span:
+        yield span
+
+
+def start_turn_trace(conversation_id: str) -> TurnTrace | None:
+    """新建回合追踪（TRACE_ENABLED 关闭时返回 None）"""
+    if not settings.TRACE_ENABLED:
+        return None
+    return TurnTrace(conversation_id)
+
+
+# ==================== 导出 ====================
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _span_attributes(trace: TurnTrace, span: Span) -> dict[str, Any]:
+    attributes = dict(span.attributes)
+    if span is trace.root:
+        attributes["conversation_id"] = trace.conversation_id
+        if trace.message_id:
+            attributes["message_id"] = trace.message_id
+    return attributes
+
+
+class FileSpanExporter:
+    """本地文件导出器：每个回合一行 OTLP JSON（ExportTraceServiceRequest 结构）
+
+    与文件日志共用 BackgroundFileSink：后台线程写盘，按大小轮转、gzip 压缩并按时间清理。
+    """
+
+    def __init__(self, path: str | Path, *, rotation: str = "10 MB", retention: str = "7 days") -> None:
+        self.path = Path(path)
+        self._sink = BackgroundFileSink(self.path, rotation=rotation, retention=retention)
+        # 进程退出前写完队列中的回合（写线程为 daemon）
+        atexit.register(self.stop)
+
+    def to_otlp(self, trace: TurnTrace) -> dict[str, Any]:
+        spans = []
+        for span in trace.spans:
+            item: dict[str, Any] = {
+                "traceId": trace.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [
+                    {"key": k, "value": _otlp_value(v)}
+                    for k, v in _span_attributes(trace, span).items()
+                    if v is not None
+                ],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_id:
+                item["parentSpanId"] = span.parent_id
+            spans.append(item)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [{"key": "service.name", "value": {"stringValue": "embedeaseai-agent"}}]
+                    },
+                    "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": spans}],
+                }
+            ]
+        }
+
+    def export(self, trace: TurnTrace) -> None:
+        self._sink.write_line(json.dumps(self.to_otlp(trace), ensure_ascii=False) + "\n")
+
+    def stop(self) -> None:
+        """写完队列中剩余的回合后停止写线程"""
+        self._sink.stop()
+
+
+class OpenTelemetryExporter:
+    """通过 OpenTelemetry API 重放 span（保留原始起止时间与父子关系）
+
+    只依赖 opentelemetry-api；实际发往哪里由应用配置的 TracerProvider 决定，
+    未配置 SDK 时 API 为空实现。
+    """
+
+    def __init__(self) -> None:
+        from opentelemetry import trace as otel_trace
+
+        self._otel_trace = otel_trace
+        self._tracer = otel_trace.get_tracer("app.core.tracing")
+
+    def export(self, trace: TurnTrace) -> None:
+        started: dict[str, Any] = {}
+        for span in trace.spans:
+            parent = started.get(span.parent_id) if span.parent_id else None
+            context = self._otel_trace.set_span_in_context(parent) if parent is not None else None
+            attributes = {
+                k: v if isinstance(v, (bool, int, float, str)) else str(v)
+                for k, v in _span_attributes(trace, span).items()
+                if v is not None
+            }
+            started[span.span_id] = self._tracer.start_span(
+                span.name, context=context, start_time=span.start_ns, attributes=attributes
+            )
+        for span in trace.spans:
+            otel_span = started[span.span_id]
+            if span.error:
+                otel_span.set_status(self._otel_trace.Status(self._otel_trace.StatusCode.ERROR, span.error))
+            otel_span.end(end_time=span.end_ns)
+
+
+class NoopSpanExporter:
+    def export(self, trace: TurnTrace) -> None:
+        pass
+
+
+_exporter: FileSpanExporter | OpenTelemetryExporter | NoopSpanExporter | None = None
+
+
+def get_exporter() -> FileSpanExporter | OpenTelemetryExporter | NoopSpanExporter:
+    """按 TRACE_EXPORTER 创建导出器（单例）"""
+    global _exporter
+    if _exporter is None:
+        kind = settings.TRACE_EXPORTER.lower()
+        if kind == "otel":
+            try:
+                _exporter = OpenTelemetryExporter()
+            except ImportError:
+                logger.warning("opentelemetry-api 未安装，回合追踪不导出")
+                _exporter = NoopSpanExporter()
+        elif kind == "file":
+            _exporter = FileSpanExporter(
+                settings.TRACE_FILE,
+                rotation=settings.TRACE_FILE_ROTATION,
+                retention=settings.TRACE_FILE_RETENTION,
+            )
+        else:
+            _exporter = NoopSpanExporter()
+    return _exporter
@@ -1,5 +1,7 @@
 """FastAPI 应用入口"""
 
+import asyncio
+import time
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
@@ -15,6 +17,7 @@ from app.core.logging import logger
 from app.core.models_dev import get_model_profile
 from app.routers import admin, chat, conversations, crawler, support, users, ws
 from app.routers import health as health_router
+from app.routers import metrics as metrics_router
 from app.routers import ocr as ocr_router
 from app.routers import prompts as prompts_router
 from app.routers import quick_setup as quick_setup_router
@@ -31,12 +34,15 @@ from app.routers.agents import (
 from app.routers.agents import router as agents_router
 from app.scheduler import task_registry, task_scheduler
 from app.scheduler.routers import router as scheduler_router
-from app.scheduler.tasks import CrawlSiteTask
+from app.scheduler.tasks import CrawlSiteTask, StatsRollupTask
 from app.services.agent.bootstrap import bootstrap_default_agents
 from app.services.agent.core.service import agent_service
 from app.services.crawler import crawler_config_service
 from app.services.crawler.site_initializer import init_config_sites
+from app.services.websocket.event_log import delivery_cursors
 from app.services.websocket.heartbeat import heartbeat_manager
+from app.services.websocket.manager import ws_manager
+from app.services.websocket.presence import presence_service
 
 
 def _init_model_profiles() -> None:
@@ -85,19 +91,24 @@ def _init_model_profiles() -> None:
     )
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    """应用生命周期管理"""
-    # 启动时配置日志（确保最先执行）
-    logger.configure()
+async def _backfill_unread_counters() -> None:
+    """回填历史会话的未读计数（计数列加入前的数据库中为 0）"""
+    from app.core.database import get_db_context
+    from app.services.support.heat_score import HeatScoreService
 
-    logger.info("启动应用...", module="app")
-    settings.ensure_data_dir()
+    try:
+        async with get_db_context() as session:
+            backfilled = await HeatScoreService(session).backfill_unread_counters()
+        if backfilled:
+            logger.info("已回填会话未读计数", module="app", count=backfilled)
+    except Exception as e:
+        logger.warning("回填会话未读计数失败", module="app", error=str(e))
 
-    # 初始化模型配置（拉取 models.dev）
-    _init_model_profiles()
 
+async def _setup_app_db() -> None:
+    """主数据库：建表 + 回填未读计数 + 写入默认 Agent"""
     await init_db()
+    await _backfill_unread_counters()
 
     # 初始化默认 Agent（从配置文件写入数据库）
     try:
@@ -112,49 +123,74 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     except Exception as e:
         logger.warning("默认 Agent 初始化失败", module="app", error=str(e))
 
+
+async def _setup_crawler_db() -> None:
+    """爬虫数据库：建表 + 回收中断的爬取任务"""
     # 始终初始化爬虫数据库（表结构），以便后续可以动态启用
     await init_crawler_db()
     logger.info("爬虫数据库已初始化", module="app")
 
+    # 回收上次进程退出时中断的爬取任务（其 frontier 已持久化，下次爬取从断点继续）
+    async with get_crawler_db() as crawler_session:
+        from app.repositories.crawler import CrawlTaskRepository
+        interrupted = await CrawlTaskRepository(crawler_session).fail_running_tasks(
+            "服务重启导致任务中断，下次爬取将从断点继续"
+        )
+        if interrupted:
+            logger.info("已回收中断的爬取任务", module="app", count=interrupted)
+
+
+async def _start_realtime() -> None:
+    """WebSocket 广播总线、心跳检测与在线状态持久化"""
+    # 启动 WebSocket 广播总线（多 worker / 多实例间转发会话消息）
+    from app.services.websocket.bus import create_bus
+    await ws_manager.start(create_bus())
+
+    # 启动 WebSocket 心跳检测
+    await heartbeat_manager.start()
+
+    # 启动在线状态与送达游标批量持久化
+    await presence_service.start()
+    await delivery_cursors.start()
+
+
+async def _register_crawler_tasks() -> None:
+    """爬虫启用时初始化站点配置并注册调度任务（需两个数据库均已初始化）"""
     # 从数据库获取爬虫启用状态（首次启动时从 .env 初始化）
     from app.core.database import get_db_context
     async with get_db_context() as app_session:
         crawler_enabled = await crawler_config_service.is_enabled_with_init(app_session)
 
-    # 如果爬虫启用，初始化站点配置和调度任务
-    if crawler_enabled:
-        async with get_crawler_db() as crawler_session:
-            imported_site_ids = await init_config_sites(crawler_session)
-
-            # 为每个配置站点注册调度任务
-            if imported_site_ids:
-                from app.repositories.crawler import CrawlSiteRepository
-                site_repo = CrawlSiteRepository(crawler_session)
-
-                for site_id in imported_site_ids:
-                    site = await site_repo.get_by_id(site_id)
-                    if site and site.cron_expression:
-                        task = CrawlSiteTask(
-                            site_id=site_id,
-                            cron_expression=site.cron_expression,
-                            run_on_start=settings.CRAWLER_RUN_ON_START,
-                        )
-                        task_registry.register(task)
-                        logger.info("注册配置站点任务", site_id=site_id, cron=site.cron_expression)
-            else:
-                # 如果没有配置站点，注册默认任务（兼容旧逻辑）
-                task_registry.register(CrawlSiteTask())
-        
-        logger.info("爬虫模块已启用", module="app")
+    if not crawler_enabled:
+        return
 
-    # 启动调度器（即使没有任务也启动，方便后续动态注册）
-    await task_scheduler.start()
-    logger.info("任务调度器已启动", module="app", task_count=len(task_registry))
+    async with get_crawler_db() as crawler_session:
+        imported_site_ids = await init_config_sites(crawler_session)
+
+        # 为每个配置站点注册调度任务
+        if imported_site_ids:
+            from app.repositories.crawler import CrawlSiteRepository
+            site_repo = CrawlSiteRepository(crawler_session)
+
+            for site_id in imported_site_ids:
+                site = await site_repo.get_by_id(site_id)
+                if site and site.cron_expression:
+                    task = CrawlSiteTask(
+                        site_id=site_id,
+                        cron_expression=site.cron_expression,
+                        run_on_start=settings.CRAWLER_RUN_ON_START,
+                    )
+                    task_registry.register(task)
+                    logger.info("注册配置站点任务", site_id=site_id, cron=site.cron_expression)
+        else:
+            # 如果没有配置站点，注册默认任务（兼容旧逻辑）
+            task_registry.register(CrawlSiteTask())
+
+    logger.info("爬虫模块已启用", module="app")
 
-    # 启动 WebSocket 心跳检测
-    await heartbeat_manager.start()
 
-    # 运行依赖健康检查
+async def _run_startup_checks() -> None:
+    """运行依赖健康检查（后台执行，结果写入 dependency_registry）"""
     try:
         import app.core.health_checks  # noqa: F401 注册所有检查函数
         from app.core.health_checks import run_startup_checks
@@ -169,20 +205,88 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     except Exception as e:
         logger.warning("健康检查运行失败", module="app", error=str(e))
 
-    logger.info("应用启动完成", module="app", host=settings.API_HOST, port=settings.API_PORT)
+
+async def _init_model_profiles_background() -> None:
+    """在线程中初始化模型配置（models.dev 请求为同步 httpx）"""
+    try:
+        await asyncio.to_thread(_init_model_profiles)
+    except Exception as e:
+        # 拉取失败不影响服务：创建模型时会再次读取（并回退到 .env 配置）
+        logger.warning("模型配置初始化失败", module="app", error=str(e))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    """应用生命周期管理
+
+    启动顺序：
+    1. 后台：拉取 models.dev 模型配置（网络请求，不阻塞就绪）
+    2. 并发：主数据库 / 爬虫数据库 / WebSocket 总线（互不依赖）
+    3. 注册爬虫与统计任务并启动调度器（依赖两个数据库）
+    4. 后台：依赖健康检查（结果由 /health 查询）
+    """
+    # 启动时配置日志（确保最先执行）
+    logger.configure()
+
+    logger.info("启动应用...", module="app")
+    started_at = time.perf_counter()
+    settings.ensure_data_dir()
+
+    background_tasks = [
+        asyncio.create_task(_init_model_profiles_background(), name="startup.model_profiles"),
+    ]
+
+    await asyncio.gather(_setup_app_db(), _setup_crawler_db(), _start_realtime())
+
+    await _register_crawler_tasks()
+
+    # 仪表盘统计汇总任务
+    task_registry.register(StatsRollupTask())
+
+    # 启动调度器（即使没有任务也启动，方便后续动态注册）
+    await task_scheduler.start()
+    logger.info("任务调度器已启动", module="app", task_count=len(task_registry))
+
+    background_tasks.append(asyncio.create_task(_run_startup_checks(), name="startup.health_checks"))
+
+    logger.info(
+        "应用启动完成",
+        module="app",
+        host=settings.API_HOST,
+        port=settings.API_PORT,
+        startup_ms=round((time.perf_counter() - started_at) * 1000, 1),
+    )
 
     yield
 
     logger.info("正在关闭应用...", module="app")
 
+    # 启动后台任务：短暂等待完成（避免中断进行中的数据库检查），超时则取消
+    _, pending = await asyncio.wait(background_tasks, timeout=5)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
     # 0. 关闭 WebSocket 心跳检测
     await heartbeat_manager.stop()
     logger.debug("WebSocket 心跳检测已关闭", module="app")
+    await ws_manager.stop()
+    # 写入剩余的在线状态变更与送达游标（需在数据库关闭前）
+    await presence_service.stop()
+    await delivery_cursors.stop()
 
     # 1. 关闭任务调度器
     await task_scheduler.stop()
     logger.debug("任务调度器已关闭", module="app")
 
+    # 1.1 取消排队/运行中的爬取（保存断点，需在数据库关闭前），关闭共享浏览器
+    from app.services.crawler.crawl_scheduler import shutdown_crawl_coordinator
+    await shutdown_crawl_coordinator()
+
+    # 1.2 中止后台运行的聊天生成（需在 Agent 服务关闭前）
+    from app.services.streaming.resumable import stream_registry
+    await stream_registry.close()
+
     # 1. 关闭 Agent 服务（checkpointer 连接）
     await agent_service.close()
 
@@ -223,6 +327,14 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         except Exception as e:
             logger.warning("关闭爬虫数据库 Provider 时出错", module="app", error=str(e))
 
+    # 3.2 关闭 HTML 解析进程池（未启动时为空操作）
+    from app.services.crawler.parse_pool import shutdown_parse_pool
+    shutdown_parse_pool()
+
+    # 3.3 关闭 OCR 处理器的进程池（未启动时为空操作）
+    from app.services.ocr.factory import OcrProcessorFactory
+    OcrProcessorFactory.shutdown()
+
     # 4. 关闭 OpenAI 客户端（仅清理已初始化的资源）
     try:
         from app.core.llm import get_chat_model, get_embeddings
@@ -321,6 +433,7 @@ app.include_router(users.router)
 app.include_router(ws.router)
 app.include_router(scheduler_router)
 app.include_router(health_router.router)
+app.include_router(metrics_router.router)
 app.include_router(system_router.router)
 app.include_router(system_config_router.router)
 app.include_router(skills_router.router)
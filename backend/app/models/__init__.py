@@ -12,7 +12,17 @@ from app.models.agent import (
 from app.models.app_metadata import AppMetadata
 from app.models.base import Base
 from app.models.conversation import Conversation, HandoffState
-from app.models.crawler import CrawlPage, CrawlSite, CrawlTask
+from app.models.conversation_event import ConversationEvent, DeliveryCursor
+from app.models.crawler import (
+    CrawlFrontierEntry,
+    CrawlHtmlDictionary,
+    CrawlPage,
+    CrawlPageBlob,
+    CrawlSite,
+    CrawlTask,
+    CrawlTemplate,
+)
+from app.models.daily_stats import DailyStats
 from app.models.message import Message
 from app.models.product import Product
 from app.models.prompt import Prompt, PromptCategory
@@ -27,9 +37,16 @@ __all__ = [
     "AppMetadata",
     "Base",
     "Conversation",
+    "ConversationEvent",
+    "CrawlFrontierEntry",
+    "CrawlHtmlDictionary",
     "CrawlPage",
+    "CrawlPageBlob",
     "CrawlSite",
     "CrawlTask",
+    "CrawlTemplate",
+    "DailyStats",
+    "DeliveryCursor",
     "FAQEntry",
     "HandoffState",
     "KnowledgeConfig",
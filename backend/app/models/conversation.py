@@ -4,7 +4,7 @@ from datetime import datetime
 from enum import StrEnum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, String, func
+from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
@@ -95,6 +95,19 @@ class Conversation(Base):
         nullable=True,
     )  # 当前在线的客服 ID
 
+    # ========== 反范式计数（由消息写入/已读路径在同一事务内维护） ==========
+    unread_user_count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )  # 用户发出且客服未读的消息数
+    last_user_message_at: Mapped[datetime | None] = mapped_column(
+        DateTime,
+        nullable=True,
+        index=True,
+    )  # 最后一条用户消息时间
+
     # ========== 开场白相关 ==========
     greeting_sent: Mapped[bool] = mapped_column(
         Boolean,
@@ -0,0 +1,58 @@
+"""会话事件日志模型"""
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class ConversationEvent(Base):
+    """会话事件日志（只追加）
+
+    人工模式下发给用户 / 客服的消息按 seq 顺序写入，WebSocket 与 SSE 订阅
+    都从这里补发离线期间的事件；seq 全局自增，同一会话内单调递增。
+    """
+
+    __tablename__ = "conversation_events"
+    __table_args__ = (Index("ix_conversation_events_conv_audience_seq", "conversation_id", "audience", "seq"),)
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    conversation_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("conversations.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    audience: Mapped[str] = mapped_column(String(20), nullable=False)  # 接收方角色 user / agent
+    action: Mapped[str] = mapped_column(String(50), nullable=False)  # WSAction，如 server.message
+    payload: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=func.now(),
+        nullable=False,
+    )
+
+
+class DeliveryCursor(Base):
+    """事件送达游标：每个会话、每个接收方角色一行，记录已送达的最大 seq
+
+    送达确认只推进游标，不再逐条更新消息的 is_delivered。
+    """
+
+    __tablename__ = "conversation_delivery_cursors"
+
+    conversation_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("conversations.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    audience: Mapped[str] = mapped_column(String(20), primary_key=True)
+    delivered_seq: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
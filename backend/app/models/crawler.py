@@ -4,6 +4,10 @@
 1. CrawlSite - 站点配置表：存储目标网站的爬取规则
 2. CrawlPage - 原始页面表：存储爬取的原始 HTML 内容
 3. CrawlTask - 爬取任务表：记录每次爬取任务的执行状态和日志
+4. CrawlFrontierEntry - 爬取队列表：持久化进行中爬取的 frontier，用于中断续爬
+5. CrawlTemplate - 页面模板表：按 URL 模式学习的字段选择器，替代逐页 LLM 解析
+6. CrawlPageBlob - 页面内容表：按内容哈希寻址的压缩 HTML，同站点相同内容只存一份
+7. CrawlHtmlDictionary - 压缩字典表：按站点训练的 zstd 字典
 
 注意：爬虫模型使用独立的 CrawlerBase，存储在 crawler.db 中，
 与主应用数据库 (app.db) 分离，避免死锁和阻塞用户查询。
@@ -18,8 +22,10 @@ from sqlalchemy import (
     Float,
     ForeignKey,
     Integer,
+    LargeBinary,
     String,
     Text,
+    UniqueConstraint,
     func,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
@@ -62,6 +68,21 @@ class CrawlPageStatus(str, Enum):
     SKIPPED_DUPLICATE = "skipped_duplicate"  # 跳过（内容未变化）
 
 
+class CrawlFrontierStatus(str, Enum):
+    """Frontier 条目状态"""
+
+    QUEUED = "queued"  # 待爬取
+    DONE = "done"  # 已处理
+
+
+class CrawlTemplateStatus(str, Enum):
+    """页面模板状态"""
+
+    LEARNING = "learning"  # 收集 LLM 样本中
+    ACTIVE = "active"  # 选择器已验证，使用选择器解析
+    DISABLED = "disabled"  # 多次学习失败，固定使用 LLM
+
+
 class CrawlSite(CrawlerBase):
     """站点配置表
 
@@ -180,6 +201,25 @@ class CrawlTask(CrawlerBase):
     products_created: Mapped[int] = mapped_column(Integer, default=0, comment="新增商品数")
     products_updated: Mapped[int] = mapped_column(Integer, default=0, comment="更新商品数")
     products_skipped: Mapped[int] = mapped_column(Integer, default=0, comment="跳过的重复商品数")
+    pages_not_modified: Mapped[int] = mapped_column(
+        Integer, default=0, comment="未变化页面数（304 或 sitemap lastmod 未更新）"
+    )
+
+    # 模板学习统计
+    llm_parse_count: Mapped[int] = mapped_column(Integer, default=0, comment="LLM 解析次数")
+    template_parse_count: Mapped[int] = mapped_column(
+        Integer, default=0, comment="学习到的模板直接解析成功次数"
+    )
+    template_fallbacks: Mapped[int] = mapped_column(
+        Integer, default=0, comment="模板解析失败回退 LLM 次数"
+    )
+
+    # 分层抓取统计
+    http_fetch_count: Mapped[int] = mapped_column(Integer, default=0, comment="HTTP 抓取次数")
+    http_fetch_ms: Mapped[int] = mapped_column(Integer, default=0, comment="HTTP 抓取累计耗时（毫秒）")
+    browser_fetch_count: Mapped[int] = mapped_column(Integer, default=0, comment="浏览器抓取次数")
+    browser_fetch_ms: Mapped[int] = mapped_column(Integer, default=0, comment="浏览器抓取累计耗时（毫秒）")
+    fetch_escalations: Mapped[int] = mapped_column(Integer, default=0, comment="HTTP 升级到浏览器的次数")
 
     # 执行时间
     started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -203,7 +243,7 @@ class CrawlTask(CrawlerBase):
 class CrawlPage(CrawlerBase):
     """原始页面表
 
-    存储爬取的原始 HTML 内容，用于：
+    记录页面的爬取与解析状态，HTML 内容压缩后存于 crawl_page_blobs（按 blob_hash 关联），用于：
     - 调试和回溯
     - 重新解析（当提取规则更新时）
     - 数据审计
@@ -227,12 +267,25 @@ class CrawlPage(CrawlerBase):
     depth: Mapped[int] = mapped_column(Integer, default=0, comment="爬取深度")
 
     # 原始内容
-    html_content: Mapped[str | None] = mapped_column(Text, nullable=True, comment="原始 HTML")
+    # html_content 仅保留旧数据（新页面写入 crawl_page_blobs），延迟加载且禁止隐式加载：
+    # 列表查询不会读取大字段，读取内容统一走 html_store.load_html
+    html_content: Mapped[str | None] = mapped_column(
+        Text, nullable=True, deferred=True, deferred_raiseload=True, comment="原始 HTML（旧数据）"
+    )
+    blob_hash: Mapped[str | None] = mapped_column(
+        String(64), nullable=True, index=True, comment="存储内容哈希（关联 crawl_page_blobs）"
+    )
     content_hash: Mapped[str | None] = mapped_column(
         String(64), nullable=True, comment="内容哈希（用于检测变化）"
     )
     version: Mapped[int] = mapped_column(Integer, default=1, comment="页面版本号（内容变化时递增）")
 
+    # HTTP 校验器（仅 HTTP 层取得内容时记录，用于条件请求）
+    etag: Mapped[str | None] = mapped_column(String(255), nullable=True, comment="响应 ETag")
+    last_modified: Mapped[str | None] = mapped_column(
+        String(64), nullable=True, comment="响应 Last-Modified"
+    )
+
     # 解析状态
     status: Mapped[str] = mapped_column(
         String(20), default=CrawlPageStatus.PENDING.value, comment="页面状态"
@@ -265,3 +318,115 @@ class CrawlPage(CrawlerBase):
     # 关系
     site: Mapped["CrawlSite"] = relationship("CrawlSite", back_populates="pages")
     task: Mapped["CrawlTask | None"] = relationship("CrawlTask", back_populates="pages")
+
+
+class CrawlFrontierEntry(CrawlerBase):
+    """爬取队列表
+
+    持久化站点进行中爬取的 frontier（待爬/已处理 URL）：
+    - 爬取过程中周期性 checkpoint
+    - 任务中断（服务重启、异常）后，下次爬取从这里恢复，而不是从 start_url 重新开始
+    - 爬取正常完成后清空
+    """
+
+    __tablename__ = "crawl_frontier"
+    __table_args__ = (
+        UniqueConstraint("site_id", "url_hash", name="uq_crawl_frontier_site_url"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    site_id: Mapped[str] = mapped_column(
+        String(50), ForeignKey("crawl_sites.id"), nullable=False, index=True
+    )
+    task_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("crawl_tasks.id"), nullable=True, comment="最后写入的任务 ID"
+    )
+    url: Mapped[str] = mapped_column(String(1000), nullable=False, comment="页面 URL")
+    url_hash: Mapped[str] = mapped_column(String(64), nullable=False, comment="URL 哈希")
+    depth: Mapped[int] = mapped_column(Integer, default=0, comment="爬取深度")
+    priority: Mapped[float] = mapped_column(Float, default=0.0, comment="优先级（越小越先）")
+    status: Mapped[str] = mapped_column(
+        String(20), default=CrawlFrontierStatus.QUEUED.value, comment="条目状态"
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+
+class CrawlTemplate(CrawlerBase):
+    """页面模板表
+
+    同一站点同一 URL 模式的页面共享模板：LLM 解析前若干页后推断字段选择器，
+    用 LLM 输出验证通过后该模式改用选择器解析，选择器失效时回退 LLM 并重新学习。
+    """
+
+    __tablename__ = "crawl_templates"
+    __table_args__ = (
+        UniqueConstraint("site_id", "url_pattern", name="uq_crawl_template_site_pattern"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    site_id: Mapped[str] = mapped_column(
+        String(50), ForeignKey("crawl_sites.id"), nullable=False, index=True
+    )
+    url_pattern: Mapped[str] = mapped_column(String(500), nullable=False, comment="URL 模式，如 /product/*")
+    status: Mapped[str] = mapped_column(
+        String(20), default=CrawlTemplateStatus.LEARNING.value, comment="模板状态"
+    )
+    selectors: Mapped[str | None] = mapped_column(
+        Text, nullable=True, comment="字段选择器（FieldExtractionConfig JSON）"
+    )
+    learn_attempts: Mapped[int] = mapped_column(Integer, default=0, comment="学习次数")
+    hit_count: Mapped[int] = mapped_column(Integer, default=0, comment="选择器解析成功次数")
+    miss_count: Mapped[int] = mapped_column(
+        Integer, default=0, comment="选择器未命中而 LLM 判定为商品页的次数"
+    )
+    llm_parse_count: Mapped[int] = mapped_column(Integer, default=0, comment="LLM 解析次数")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+
+class CrawlHtmlDictionary(CrawlerBase):
+    """压缩字典表
+
+    同一站点页面共享大量模板 HTML，用前若干页训练的 zstd 字典压缩，
+    压缩率远高于逐页独立压缩。字典写入后不再修改。
+    """
+
+    __tablename__ = "crawl_html_dicts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    site_id: Mapped[str] = mapped_column(
+        String(50), ForeignKey("crawl_sites.id"), nullable=False, index=True
+    )
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False, comment="字典内容")
+    sample_count: Mapped[int] = mapped_column(Integer, default=0, comment="训练样本数")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=func.now(), nullable=False
+    )
+
+
+class CrawlPageBlob(CrawlerBase):
+    """页面内容表
+
+    按 (site_id, content_hash) 寻址：同一站点内容相同的页面（镜像 URL、带参数的重复页）
+    只存一份；不再被任何页面引用的内容在爬取完成后清理。
+    """
+
+    __tablename__ = "crawl_page_blobs"
+
+    site_id: Mapped[str] = mapped_column(
+        String(50), ForeignKey("crawl_sites.id"), primary_key=True
+    )
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True, comment="内容 sha256")
+    codec: Mapped[str] = mapped_column(String(16), nullable=False, comment="压缩编码：zstd / zlib")
+    dict_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("crawl_html_dicts.id"), nullable=True, comment="压缩字典 ID"
+    )
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False, comment="压缩后的内容")
+    raw_size: Mapped[int] = mapped_column(Integer, default=0, comment="原始大小（字节）")
+    stored_size: Mapped[int] = mapped_column(Integer, default=0, comment="压缩后大小（字节）")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=func.now(), nullable=False
+    )
@@ -0,0 +1,29 @@
+"""每日统计汇总模型"""
+
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, Integer, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class DailyStats(Base):
+    """每日统计汇总表（按天分区的聚合结果）
+
+    由 StatsRollupTask 周期性写入，只包含已结束的自然日；
+    仪表盘总数 = 汇总行之和 + 水位线之后的实时增量。
+    """
+
+    __tablename__ = "daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    conversations: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # 当日新建会话数
+    messages: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # 当日新增消息数
+    users: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # 当日新增用户数
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
@@ -35,6 +35,7 @@ class Message(Base):
         DateTime,
         default=func.now(),
         nullable=False,
+        index=True,
     )
 
     # ========== 送达和已读状态 ==========
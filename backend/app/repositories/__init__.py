@@ -2,9 +2,11 @@
 
 from app.repositories.conversation import ConversationRepository
 from app.repositories.crawler import (
+    CrawlFrontierRepository,
     CrawlPageRepository,
     CrawlSiteRepository,
     CrawlTaskRepository,
+    CrawlTemplateRepository,
 )
 from app.repositories.message import MessageRepository
 from app.repositories.product import ProductRepository
@@ -12,9 +14,11 @@ from app.repositories.user import UserRepository
 
 __all__ = [
     "ConversationRepository",
+    "CrawlFrontierRepository",
     "CrawlPageRepository",
     "CrawlSiteRepository",
     "CrawlTaskRepository",
+    "CrawlTemplateRepository",
     "MessageRepository",
     "ProductRepository",
     "UserRepository",
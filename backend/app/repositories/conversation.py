@@ -1,8 +1,9 @@
 """会话 Repository"""
 
 from datetime import datetime
+from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import and_, bindparam, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -27,6 +28,54 @@ class ConversationRepository(BaseRepository[Conversation]):
         )
         return list(result.scalars().all())
 
+    async def list_page(
+        self,
+        user_id: str,
+        limit: int,
+        after: tuple[datetime, str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """按 (updated_at, id) 倒序键集分页获取用户会话（只查列，返回行字典）
+
+        Args:
+            user_id: 用户 ID
+            limit: 返回条数
+            after: 上一页最后一条的 (updated_at, id)，首页为空
+        """
+        query = select(
+            Conversation.id,
+            Conversation.user_id,
+            Conversation.title,
+            Conversation.created_at,
+            Conversation.updated_at,
+            Conversation.handoff_state,
+        ).where(Conversation.user_id == user_id)
+        if after is not None:
+            updated_at, conversation_id = after
+            query = query.where(
+                or_(
+                    Conversation.updated_at < updated_at,
+                    and_(Conversation.updated_at == updated_at, Conversation.id < conversation_id),
+                )
+            )
+        query = query.order_by(Conversation.updated_at.desc(), Conversation.id.desc()).limit(limit)
+        result = await self.session.execute(query)
+        return [dict(row._mapping) for row in result.all()]
+
+    async def get_row(self, conversation_id: str) -> dict[str, Any] | None:
+        """获取会话基本字段（不加载消息，不构造 ORM 对象）"""
+        result = await self.session.execute(
+            select(
+                Conversation.id,
+                Conversation.user_id,
+                Conversation.title,
+                Conversation.created_at,
+                Conversation.updated_at,
+                Conversation.handoff_state,
+            ).where(Conversation.id == conversation_id)
+        )
+        row = result.first()
+        return dict(row._mapping) if row else None
+
     async def get_with_messages(self, conversation_id: str) -> Conversation | None:
         """获取会话及其消息"""
         result = await self.session.execute(
@@ -107,6 +156,48 @@ class ConversationRepository(BaseRepository[Conversation]):
             await self.update(conversation)
         return conversation
 
+    async def apply_presence_changes(self, changes: list[dict]) -> None:
+        """批量写入在线状态（在线状态服务合并后的变更，单个事务内执行）
+
+        Args:
+            changes: [{"conversation_id", "role": "user"|"agent", "online", "last_online_at", "agent_id"}]
+                会话不存在时忽略
+        """
+        table = Conversation.__table__
+        user_rows = [
+            {"b_id": c["conversation_id"], "b_online": c["online"], "b_at": c["last_online_at"]}
+            for c in changes
+            if c["role"] == "user"
+        ]
+        agent_rows = [
+            {
+                "b_id": c["conversation_id"],
+                "b_online": c["online"],
+                "b_at": c["last_online_at"],
+                "b_agent": c.get("agent_id") if c["online"] else None,
+            }
+            for c in changes
+            if c["role"] == "agent"
+        ]
+        if user_rows:
+            await self.session.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(user_online=bindparam("b_online"), user_last_online_at=bindparam("b_at")),
+                user_rows,
+            )
+        if agent_rows:
+            await self.session.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(
+                    agent_online=bindparam("b_online"),
+                    agent_last_online_at=bindparam("b_at"),
+                    current_agent_id=bindparam("b_agent"),
+                ),
+                agent_rows,
+            )
+
     async def get_online_status(
         self,
         conversation_id: str,
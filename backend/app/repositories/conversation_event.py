@@ -0,0 +1,86 @@
+"""会话事件日志 Repository"""
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.conversation_event import ConversationEvent, DeliveryCursor
+from app.repositories.base import BaseRepository
+
+
+class ConversationEventRepository(BaseRepository[ConversationEvent]):
+    """会话事件日志数据访问"""
+
+    model = ConversationEvent
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session)
+
+    async def append(
+        self,
+        conversation_id: str,
+        audience: str,
+        action: str,
+        payload: dict[str, Any],
+    ) -> ConversationEvent:
+        """追加事件（flush 后即可拿到 seq）"""
+        event = ConversationEvent(
+            conversation_id=conversation_id,
+            audience=audience,
+            action=action,
+            payload=payload,
+            created_at=datetime.now(),
+        )
+        self.session.add(event)
+        await self.session.flush()
+        return event
+
+    async def list_after(
+        self,
+        conversation_id: str,
+        audience: str,
+        after_seq: int,
+        limit: int = 500,
+    ) -> list[ConversationEvent]:
+        """获取 seq 大于 after_seq 的事件（按 seq 正序）"""
+        result = await self.session.execute(
+            select(ConversationEvent)
+            .where(
+                ConversationEvent.conversation_id == conversation_id,
+                ConversationEvent.audience == audience,
+                ConversationEvent.seq > after_seq,
+            )
+            .order_by(ConversationEvent.seq)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_cursor(self, conversation_id: str, audience: str) -> int:
+        """已送达的最大 seq（没有记录时为 0）"""
+        seq = await self.session.scalar(
+            select(DeliveryCursor.delivered_seq).where(
+                DeliveryCursor.conversation_id == conversation_id,
+                DeliveryCursor.audience == audience,
+            )
+        )
+        return seq or 0
+
+    async def advance_cursor(self, conversation_id: str, audience: str, seq: int) -> None:
+        """推进送达游标（单条 upsert，只前进不后退）"""
+        insert = pg_insert if self.session.get_bind().dialect.name == "postgresql" else sqlite_insert
+        stmt = insert(DeliveryCursor).values(
+            conversation_id=conversation_id,
+            audience=audience,
+            delivered_seq=seq,
+            updated_at=datetime.now(),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DeliveryCursor.conversation_id, DeliveryCursor.audience],
+            set_={"delivered_seq": stmt.excluded.delivered_seq, "updated_at": stmt.excluded.updated_at},
+            where=DeliveryCursor.delivered_seq < stmt.excluded.delivered_seq,
+        )
+        await self.session.execute(stmt)
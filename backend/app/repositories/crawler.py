@@ -4,15 +4,23 @@ import hashlib
 from datetime import datetime
 
 from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.crawler import (
+    CrawlFrontierEntry,
+    CrawlFrontierStatus,
+    CrawlHtmlDictionary,
     CrawlPage,
+    CrawlPageBlob,
     CrawlPageStatus,
     CrawlSite,
     CrawlSiteStatus,
     CrawlTask,
     CrawlTaskStatus,
+    CrawlTemplate,
+    CrawlTemplateStatus,
 )
 from app.repositories.base import BaseRepository
 
@@ -182,6 +190,7 @@ class CrawlTaskRepository(BaseRepository[CrawlTask]):
         products_created: int = 0,
         products_updated: int = 0,
         products_skipped: int = 0,
+        pages_not_modified: int = 0,
     ) -> None:
         """增量更新任务统计"""
         await self.session.execute(
@@ -196,10 +205,36 @@ class CrawlTaskRepository(BaseRepository[CrawlTask]):
                 products_created=CrawlTask.products_created + products_created,
                 products_updated=CrawlTask.products_updated + products_updated,
                 products_skipped=CrawlTask.products_skipped + products_skipped,
+                pages_not_modified=CrawlTask.pages_not_modified + pages_not_modified,
             )
         )
         await self.session.flush()
 
+    async def set_run_stats(self, task_id: int, stats: dict[str, int]) -> None:
+        """写入运行统计（分层抓取、模板解析等计数，整体覆盖）"""
+        await self.session.execute(
+            update(CrawlTask).where(CrawlTask.id == task_id).values(**stats)
+        )
+        await self.session.flush()
+
+    async def fail_running_tasks(self, error_message: str) -> int:
+        """将所有运行中的任务标记为失败（服务重启后回收中断的任务）
+
+        Returns:
+            标记的任务数
+        """
+        result = await self.session.execute(
+            update(CrawlTask)
+            .where(CrawlTask.status == CrawlTaskStatus.RUNNING.value)
+            .values(
+                status=CrawlTaskStatus.FAILED.value,
+                finished_at=datetime.now(),
+                error_message=error_message,
+            )
+        )
+        await self.session.flush()
+        return result.rowcount or 0
+
     async def count_by_status(self) -> dict[str, int]:
         """按状态统计任务数量"""
         result = await self.session.execute(
@@ -208,6 +243,26 @@ class CrawlTaskRepository(BaseRepository[CrawlTask]):
         return {row[0]: row[1] for row in result.all()}
 
 
+def _blob_insert(blob: CrawlPageBlob, dialect_name: str):
+    """页面内容插入语句（主键冲突时忽略），按方言选择 PostgreSQL / SQLite 的 upsert"""
+    insert = pg_insert if dialect_name == "postgresql" else sqlite_insert
+    return (
+        insert(CrawlPageBlob)
+        .values(
+            site_id=blob.site_id,
+            content_hash=blob.content_hash,
+            codec=blob.codec,
+            dict_id=blob.dict_id,
+            data=blob.data,
+            raw_size=blob.raw_size,
+            stored_size=len(blob.data),
+        )
+        .on_conflict_do_nothing(
+            index_elements=[CrawlPageBlob.site_id, CrawlPageBlob.content_hash]
+        )
+    )
+
+
 class CrawlPageRepository(BaseRepository[CrawlPage]):
     """爬取页面数据访问"""
 
@@ -242,6 +297,9 @@ class CrawlPageRepository(BaseRepository[CrawlPage]):
         url: str,
         depth: int,
         html_content: str | None = None,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        blob: CrawlPageBlob | None = None,
     ) -> tuple[CrawlPage, bool, bool]:
         """创建或更新页面记录（增量模式）
         
@@ -249,6 +307,12 @@ class CrawlPageRepository(BaseRepository[CrawlPage]):
         - 若页面不存在：创建新记录
         - 若页面存在且内容未变：标记 SKIPPED_DUPLICATE，跳过解析
         - 若页面存在且内容已变：version += 1，更新内容，重新解析
+
+        etag / last_modified 为本次响应的 HTTP 校验器，始终覆盖旧值
+        （浏览器渲染的页面传 None，下次不发送条件请求）
+
+        blob 为压缩后的页面内容：传入时内容写入 crawl_page_blobs（同站点相同内容只存一份），
+        html_content 仅用于计算 content_hash；未传入时按旧方式写入 html_content 列
         
         Returns:
             tuple: (page, is_new, content_changed)
@@ -264,6 +328,13 @@ class CrawlPageRepository(BaseRepository[CrawlPage]):
         # 查找现有页面
         existing_page = await self.get_by_url_hash(site_id, url_hash)
 
+        content_values: dict = {"html_content": html_content, "blob_hash": None}
+        if blob is not None and (
+            existing_page is None or existing_page.content_hash != new_content_hash
+        ):
+            await self.save_blob(blob)
+            content_values = {"html_content": None, "blob_hash": blob.content_hash}
+
         if existing_page is None:
             # 新页面：创建记录
             page = CrawlPage(
@@ -272,9 +343,11 @@ class CrawlPageRepository(BaseRepository[CrawlPage]):
                 url=url,
                 url_hash=url_hash,
                 depth=depth,
-                html_content=html_content,
                 content_hash=new_content_hash,
+                etag=etag,
+                last_modified=last_modified,
                 version=1,
+                **content_values,
                 status=CrawlPageStatus.PENDING.value,
             )
             page = await self.create(page)
@@ -289,6 +362,8 @@ class CrawlPageRepository(BaseRepository[CrawlPage]):
                 .values(
                     task_id=task_id,  # 更新关联的任务 ID
                     status=CrawlPageStatus.SKIPPED_DUPLICATE.value,
+                    etag=etag,
+                    last_modified=last_modified,
                     crawled_at=datetime.now(),
                 )
             )
@@ -304,20 +379,68 @@ class CrawlPageRepository(BaseRepository[CrawlPage]):
             .where(CrawlPage.id == existing_page.id)
             .values(
                 task_id=task_id,
-                html_content=html_content,
                 content_hash=new_content_hash,
+                etag=etag,
+                last_modified=last_modified,
                 version=new_version,
                 status=CrawlPageStatus.PENDING.value,  # 重新解析
                 crawled_at=datetime.now(),
                 parsed_at=None,  # 清除旧的解析时间
                 parsed_data=None,  # 清除旧的解析结果
                 parse_error=None,
+                **content_values,
             )
         )
         await self.session.flush()
         await self.session.refresh(existing_page)
         return existing_page, False, True
 
+    async def get_validators(
+        self, site_id: str
+    ) -> dict[str, tuple[datetime, str | None, str | None]]:
+        """获取站点所有页面的抓取时间与 HTTP 校验器（不加载 HTML）
+
+        Returns:
+            url -> (crawled_at, etag, last_modified)
+        """
+        result = await self.session.execute(
+            select(
+                CrawlPage.url,
+                CrawlPage.crawled_at,
+                CrawlPage.etag,
+                CrawlPage.last_modified,
+            ).where(CrawlPage.site_id == site_id)
+        )
+        return {
+            url: (crawled_at, etag, last_modified)
+            for url, crawled_at, etag, last_modified in result.all()
+        }
+
+    async def mark_not_modified(
+        self, site_id: str, task_id: int | None, url: str
+    ) -> CrawlPage | None:
+        """标记页面自上次爬取后未变化（未重新下载内容）
+
+        Returns:
+            页面对象，不存在时返回 None
+        """
+        url_hash = hashlib.sha256(url.encode()).hexdigest()
+        page = await self.get_by_url_hash(site_id, url_hash)
+        if page is None:
+            return None
+        await self.session.execute(
+            update(CrawlPage)
+            .where(CrawlPage.id == page.id)
+            .values(
+                task_id=task_id,
+                status=CrawlPageStatus.SKIPPED_DUPLICATE.value,
+                crawled_at=datetime.now(),
+            )
+        )
+        await self.session.flush()
+        await self.session.refresh(page)
+        return page
+
     async def create_page(
         self,
         site_id: str,
@@ -354,10 +477,90 @@ class CrawlPageRepository(BaseRepository[CrawlPage]):
         return result.rowcount or 0
 
     async def delete_pages_by_site(self, site_id: str) -> int:
-        """删除站点的所有页面，返回删除数量"""
+        """删除站点的所有页面（连同页面内容），返回删除数量"""
         result = await self.session.execute(
             delete(CrawlPage).where(CrawlPage.site_id == site_id)
         )
+        await self.session.execute(
+            delete(CrawlPageBlob).where(CrawlPageBlob.site_id == site_id)
+        )
+        await self.session.flush()
+        return result.rowcount or 0
+
+    async def save_blob(self, blob: CrawlPageBlob) -> None:
+        """保存页面内容（同站点相同内容已存在时忽略）"""
+        await self.session.execute(
+            _blob_insert(blob, self.session.get_bind().dialect.name)
+        )
+
+    async def get_blob(self, site_id: str, content_hash: str) -> CrawlPageBlob | None:
+        """获取页面内容"""
+        return await self.session.get(CrawlPageBlob, (site_id, content_hash))
+
+    async def get_legacy_html(self, page_id: int) -> str | None:
+        """读取旧数据的 html_content 列（该列延迟加载，需显式查询）"""
+        return await self.session.scalar(
+            select(CrawlPage.html_content).where(CrawlPage.id == page_id)
+        )
+
+    async def delete_orphan_blobs(self, site_id: str) -> int:
+        """删除站点中不再被任何页面引用的内容，返回删除数量"""
+        referenced = select(CrawlPage.blob_hash).where(
+            CrawlPage.site_id == site_id, CrawlPage.blob_hash.is_not(None)
+        )
+        result = await self.session.execute(
+            delete(CrawlPageBlob).where(
+                CrawlPageBlob.site_id == site_id,
+                CrawlPageBlob.content_hash.not_in(referenced),
+            )
+        )
+        await self.session.flush()
+        return result.rowcount or 0
+
+    async def storage_stats(self, site_id: str) -> tuple[int, int, int]:
+        """统计站点页面内容存储
+
+        Returns:
+            (内容条数, 原始总字节数, 压缩后总字节数)
+        """
+        result = await self.session.execute(
+            select(
+                func.count(),
+                func.coalesce(func.sum(CrawlPageBlob.raw_size), 0),
+                func.coalesce(func.sum(CrawlPageBlob.stored_size), 0),
+            ).where(CrawlPageBlob.site_id == site_id)
+        )
+        count, raw_size, stored_size = result.one()
+        return count, raw_size, stored_size
+
+    async def get_dictionary(self, dict_id: int) -> CrawlHtmlDictionary | None:
+        """获取压缩字典"""
+        return await self.session.get(CrawlHtmlDictionary, dict_id)
+
+    async def get_latest_dictionary(self, site_id: str) -> CrawlHtmlDictionary | None:
+        """获取站点最新的压缩字典"""
+        result = await self.session.execute(
+            select(CrawlHtmlDictionary)
+            .where(CrawlHtmlDictionary.site_id == site_id)
+            .order_by(CrawlHtmlDictionary.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def create_dictionary(
+        self, site_id: str, data: bytes, sample_count: int
+    ) -> CrawlHtmlDictionary:
+        """保存站点压缩字典"""
+        dictionary = CrawlHtmlDictionary(site_id=site_id, data=data, sample_count=sample_count)
+        self.session.add(dictionary)
+        await self.session.flush()
+        return dictionary
+
+    async def delete_dictionaries(self, site_id: str) -> int:
+        """删除站点的压缩字典（须在页面内容删除之后调用）"""
+        result = await self.session.execute(
+            delete(CrawlHtmlDictionary).where(CrawlHtmlDictionary.site_id == site_id)
+        )
         await self.session.flush()
         return result.rowcount or 0
 
@@ -369,7 +572,7 @@ class CrawlPageRepository(BaseRepository[CrawlPage]):
         await self.session.execute(
             update(CrawlPage)
             .where(CrawlPage.id == page_id)
-            .values(html_content=html_content, content_hash=content_hash)
+            .values(html_content=html_content, content_hash=content_hash, blob_hash=None)
         )
         await self.session.flush()
 
@@ -439,3 +642,153 @@ class CrawlPageRepository(BaseRepository[CrawlPage]):
         """统计总页面数"""
         result = await self.session.execute(select(func.count(CrawlPage.id)))
         return result.scalar() or 0
+
+
+class CrawlFrontierRepository(BaseRepository[CrawlFrontierEntry]):
+    """爬取队列数据访问"""
+
+    model = CrawlFrontierEntry
+
+    # 单条 IN 语句的最大参数数量
+    _CHUNK_SIZE = 500
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session)
+
+    async def load(
+        self, site_id: str
+    ) -> tuple[list[tuple[str, int, float]], list[str]]:
+        """加载站点的持久化 frontier
+
+        Returns:
+            (待爬条目 [(url, depth, priority)], 已处理 URL 列表)
+        """
+        result = await self.session.execute(
+            select(
+                CrawlFrontierEntry.url,
+                CrawlFrontierEntry.depth,
+                CrawlFrontierEntry.priority,
+                CrawlFrontierEntry.status,
+            ).where(CrawlFrontierEntry.site_id == site_id)
+        )
+        queued: list[tuple[str, int, float]] = []
+        done: list[str] = []
+        for url, depth, priority, status in result.all():
+            if status == CrawlFrontierStatus.DONE.value:
+                done.append(url)
+            else:
+                queued.append((url, depth, priority))
+        return queued, done
+
+    async def save_changes(
+        self,
+        site_id: str,
+        task_id: int | None,
+        queued: list[tuple[str, int, float]],
+        done: list[str],
+    ) -> None:
+        """写入 frontier 增量变更（新入队条目 + 新完成 URL）"""
+        if queued:
+            self.session.add_all(
+                CrawlFrontierEntry(
+                    site_id=site_id,
+                    task_id=task_id,
+                    url=url,
+                    url_hash=hashlib.sha256(url.encode()).hexdigest(),
+                    depth=depth,
+                    priority=priority,
+                    status=CrawlFrontierStatus.QUEUED.value,
+                )
+                for url, depth, priority in queued
+            )
+            await self.session.flush()
+
+        done_hashes = [hashlib.sha256(url.encode()).hexdigest() for url in done]
+        for i in range(0, len(done_hashes), self._CHUNK_SIZE):
+            await self.session.execute(
+                update(CrawlFrontierEntry)
+                .where(
+                    CrawlFrontierEntry.site_id == site_id,
+                    CrawlFrontierEntry.url_hash.in_(done_hashes[i : i + self._CHUNK_SIZE]),
+                )
+                .values(status=CrawlFrontierStatus.DONE.value, task_id=task_id)
+            )
+        if done_hashes:
+            await self.session.flush()
+
+    async def clear_site(self, site_id: str) -> int:
+        """清空站点的 frontier，返回删除数量"""
+        result = await self.session.execute(
+            delete(CrawlFrontierEntry).where(CrawlFrontierEntry.site_id == site_id)
+        )
+        await self.session.flush()
+        return result.rowcount or 0
+
+
+class CrawlTemplateRepository(BaseRepository[CrawlTemplate]):
+    """页面模板数据访问"""
+
+    model = CrawlTemplate
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session)
+
+    async def list_by_site(self, site_id: str) -> list[CrawlTemplate]:
+        """获取站点的全部模板"""
+        result = await self.session.execute(
+            select(CrawlTemplate).where(CrawlTemplate.site_id == site_id)
+        )
+        return list(result.scalars().all())
+
+    async def save(self, site_id: str, templates: list[dict]) -> None:
+        """按 url_pattern 写入模板状态（存在则覆盖，不存在则创建）
+
+        Args:
+            site_id: 站点 ID
+            templates: 模板字段字典列表（需包含 url_pattern）
+        """
+        if not templates:
+            return
+        existing = {t.url_pattern: t for t in await self.list_by_site(site_id)}
+        for values in templates:
+            template = existing.get(values["url_pattern"])
+            if template is None:
+                self.session.add(CrawlTemplate(site_id=site_id, **values))
+            else:
+                for key, value in values.items():
+                    setattr(template, key, value)
+        await self.session.flush()
+
+    async def clear_site(self, site_id: str) -> int:
+        """删除站点的全部模板"""
+        result = await self.session.execute(
+            delete(CrawlTemplate).where(CrawlTemplate.site_id == site_id)
+        )
+        await self.session.flush()
+        return result.rowcount or 0
+
+    async def site_stats(self) -> list[dict]:
+        """按站点汇总模板解析命中情况"""
+        result = await self.session.execute(
+            select(
+                CrawlTemplate.site_id,
+                func.count(CrawlTemplate.id).filter(
+                    CrawlTemplate.status == CrawlTemplateStatus.ACTIVE.value
+                ),
+                func.sum(CrawlTemplate.hit_count),
+                func.sum(CrawlTemplate.llm_parse_count),
+            ).group_by(CrawlTemplate.site_id)
+        )
+        stats = []
+        for site_id, active, hits, llm in result.all():
+            hits, llm = hits or 0, llm or 0
+            stats.append(
+                {
+                    "site_id": site_id,
+                    "active_templates": active or 0,
+                    "template_parse_count": hits,
+                    "llm_parse_count": llm,
+                    "hit_rate": round(hits / (hits + llm), 4) if hits + llm else 0.0,
+                }
+            )
+        return stats
@@ -3,13 +3,34 @@
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import and_, select
+from sqlalchemy import and_, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.models.conversation import Conversation
 from app.models.message import Message
 from app.repositories.base import BaseRepository
 
+# 消息列表接口返回的列（不含送达/撤回等内部字段）
+_MESSAGE_COLUMNS = (
+    Message.id,
+    Message.role,
+    Message.content,
+    Message.products,
+    Message.message_type,
+    Message.extra_metadata,
+    Message.token_count,
+    Message.created_at,
+)
+
+
+def _before(created_at: datetime, message_id: str):
+    """(created_at, id) 严格早于给定消息"""
+    return or_(
+        Message.created_at < created_at,
+        and_(Message.created_at == created_at, Message.id < message_id),
+    )
+
 
 class MessageRepository(BaseRepository[Message]):
     """消息数据访问"""
@@ -57,17 +78,17 @@ class MessageRepository(BaseRepository[Message]):
         """
         query = select(Message).where(Message.conversation_id == conversation_id)
 
-        # 如果有游标，获取游标消息的创建时间作为分页基准
+        # 如果有游标，以游标消息的 (created_at, id) 作为分页基准（同一时间的消息不会被跳过）
         if cursor:
             cursor_msg = await self.get_by_id(cursor)
             if cursor_msg:
-                query = query.where(Message.created_at < cursor_msg.created_at)
+                query = query.where(_before(cursor_msg.created_at, cursor_msg.id))
 
         if include_tool_calls:
             query = query.options(selectinload(Message.tool_calls))
 
         # 按时间倒序（最新消息在前），多取一条判断是否还有更多
-        query = query.order_by(Message.created_at.desc()).limit(limit + 1)
+        query = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
         result = await self.session.execute(query)
         messages = list(result.scalars().unique().all())
 
@@ -84,6 +105,72 @@ class MessageRepository(BaseRepository[Message]):
 
         return messages, next_cursor, has_more
 
+    async def get_latest_rows(
+        self,
+        conversation_id: str,
+        limit: int,
+    ) -> tuple[list[dict[str, Any]], str | None, bool]:
+        """获取会话最新的 limit 条消息（只查列，返回行字典，按时间正序）
+
+        Returns:
+            (消息行, 更早消息的游标, 是否还有更早的消息)；游标与 get_paginated 的 cursor 通用
+        """
+        query = (
+            select(*_MESSAGE_COLUMNS)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(limit + 1)
+        )
+        result = await self.session.execute(query)
+        rows = [dict(row._mapping) for row in result.all()]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        rows.reverse()
+        next_cursor = rows[0]["id"] if rows and has_more else None
+        return rows, next_cursor, has_more
+
+    async def get_conversation_summaries(
+        self,
+        conversation_ids: list[str],
+        preview_length: int = 100,
+    ) -> dict[str, dict[str, Any]]:
+        """批量统计会话的消息数与最后一条消息（单条窗口函数查询）
+
+        Returns:
+            {conversation_id: {"message_count", "last_message_role", "last_message_preview", "last_message_at"}}
+            没有消息的会话不在结果中；已撤回消息不返回预览内容
+        """
+        if not conversation_ids:
+            return {}
+        ranked = (
+            select(
+                Message.conversation_id,
+                Message.role,
+                Message.created_at,
+                Message.is_withdrawn,
+                func.substr(Message.content, 1, preview_length).label("preview"),
+                func.count().over(partition_by=Message.conversation_id).label("message_count"),
+                func.row_number()
+                .over(
+                    partition_by=Message.conversation_id,
+                    order_by=(Message.created_at.desc(), Message.id.desc()),
+                )
+                .label("rn"),
+            )
+            .where(Message.conversation_id.in_(conversation_ids))
+            .subquery()
+        )
+        result = await self.session.execute(select(ranked).where(ranked.c.rn == 1))
+        return {
+            row.conversation_id: {
+                "message_count": row.message_count,
+                "last_message_role": row.role,
+                "last_message_preview": None if row.is_withdrawn else row.preview,
+                "last_message_at": row.created_at,
+            }
+            for row in result.all()
+        }
+
     async def create_message(
         self,
         message_id: str,
@@ -123,54 +210,35 @@ class MessageRepository(BaseRepository[Message]):
             token_count=token_count,
             latency_ms=latency_ms,
         )
-        return await self.create(message)
+        message = await self.create(message)
+        if role == "user":
+            await self._bump_user_counters(conversation_id, 1, last_user_message_at=message.created_at)
+        return message
 
-    async def get_undelivered_messages(
+    async def _bump_user_counters(
         self,
         conversation_id: str,
-        target_role: str,
-    ) -> list[Message]:
-        """获取未送达给目标角色的消息
-        
+        delta: int,
+        *,
+        last_user_message_at: datetime | None = None,
+    ) -> None:
+        """维护会话上的反范式计数（与消息写入在同一事务内）
+
         Args:
             conversation_id: 会话 ID
-            target_role: 目标角色 ("user" 获取发给用户的未送达消息, "agent" 获取发给客服的未送达消息)
+            delta: 未读用户消息数增量（可为负）
+            last_user_message_at: 最后一条用户消息时间（新消息时传入）
         """
-        # 发给用户的消息: role in (assistant, human_agent, system)
-        # 发给客服的消息: role = user
-        if target_role == "user":
-            role_filter = Message.role.in_(["assistant", "human_agent", "system"])
-        else:
-            role_filter = Message.role == "user"
-
-        result = await self.session.execute(
-            select(Message)
-            .where(
-                and_(
-                    Message.conversation_id == conversation_id,
-                    Message.is_delivered.is_(False),
-                    role_filter,
-                )
-            )
-            .order_by(Message.created_at)
+        values: dict[str, Any] = {
+            "unread_user_count": Conversation.unread_user_count + delta,
+            # 计数变化不算会话活跃，避免 onupdate 刷新 updated_at
+            "updated_at": Conversation.updated_at,
+        }
+        if last_user_message_at is not None:
+            values["last_user_message_at"] = last_user_message_at
+        await self.session.execute(
+            update(Conversation).where(Conversation.id == conversation_id).values(**values)
         )
-        return list(result.scalars().all())
-
-    async def mark_as_delivered(
-        self,
-        message_ids: list[str],
-    ) -> int:
-        """标记消息为已送达"""
-        now = datetime.now()
-        count = 0
-        for msg_id in message_ids:
-            message = await self.get_by_id(msg_id)
-            if message and not message.is_delivered:
-                message.is_delivered = True
-                message.delivered_at = now
-                await self.update(message)
-                count += 1
-        return count
 
     async def mark_as_read(
         self,
@@ -184,6 +252,7 @@ class MessageRepository(BaseRepository[Message]):
         """
         now = datetime.now()
         count = 0
+        user_read: dict[str, int] = {}
         for msg_id in message_ids:
             message = await self.get_by_id(msg_id)
             if message and message.read_at is None:
@@ -191,6 +260,10 @@ class MessageRepository(BaseRepository[Message]):
                 message.read_by = read_by
                 await self.update(message)
                 count += 1
+                if message.role == "user":
+                    user_read[message.conversation_id] = user_read.get(message.conversation_id, 0) + 1
+        for conversation_id, read_count in user_read.items():
+            await self._bump_user_counters(conversation_id, -read_count)
         return count, now
 
     async def get_unread_count(
@@ -323,10 +396,16 @@ class MessageRepository(BaseRepository[Message]):
             删除的消息数量
         """
         count = 0
+        unread_deleted: dict[str, int] = {}
         for msg_id in message_ids:
             message = await self.get_by_id(msg_id)
             if message:
+                if message.role == "user" and message.read_at is None:
+                    conv_id = message.conversation_id
+                    unread_deleted[conv_id] = unread_deleted.get(conv_id, 0) + 1
                 await self.session.delete(message)
                 count += 1
         await self.session.flush()
+        for conversation_id, unread_count in unread_deleted.items():
+            await self._bump_user_counters(conversation_id, -unread_count)
         return count
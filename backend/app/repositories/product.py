@@ -57,6 +57,7 @@ class ProductRepository(BaseRepository[Product]):
         specs: str | None = None,
         extra_metadata: str | None = None,
         source_site_id: str | None = None,
+        partial: bool = False,
     ) -> Product:
         """创建或更新商品
 
@@ -74,6 +75,8 @@ class ProductRepository(BaseRepository[Product]):
             specs: 规格（JSON 字符串）
             extra_metadata: 扩展信息（JSON 字符串）
             source_site_id: 来源站点 ID
+            partial: 数据只含部分字段（如模板选择器解析），为 True 时
+                summary / description / price / category 为空则保留原值
         """
         product = await self.get_by_id(product_id)
         if product is None:
@@ -95,11 +98,16 @@ class ProductRepository(BaseRepository[Product]):
             return await self.create(product)
         else:
             product.name = name
-            product.summary = summary
-            product.description = description
-            product.price = price
-            product.category = category
             product.url = url
+            core_fields = {
+                "summary": summary,
+                "description": description,
+                "price": price,
+                "category": category,
+            }
+            for field, value in core_fields.items():
+                if value is not None or not partial:
+                    setattr(product, field, value)
             # 扩展字段：仅在有值时更新
             if tags is not None:
                 product.tags = tags
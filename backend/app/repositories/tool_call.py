@@ -26,6 +26,32 @@ class ToolCallRepository(BaseRepository[ToolCall]):
         )
         return list(result.scalars().all())
 
+    async def get_rows_by_message_ids(self, message_ids: list[str]) -> dict[str, list[dict[str, Any]]]:
+        """批量获取多条消息的工具调用（只查列，按消息分组的行字典）"""
+        if not message_ids:
+            return {}
+        result = await self.session.execute(
+            select(
+                ToolCall.message_id,
+                ToolCall.id,
+                ToolCall.tool_call_id,
+                ToolCall.tool_name,
+                ToolCall.tool_input,
+                ToolCall.tool_output,
+                ToolCall.status,
+                ToolCall.error_message,
+                ToolCall.duration_ms,
+                ToolCall.created_at,
+            )
+            .where(ToolCall.message_id.in_(message_ids))
+            .order_by(ToolCall.created_at, ToolCall.id)
+        )
+        grouped: dict[str, list[dict[str, Any]]] = {}
+        for row in result.all():
+            data = dict(row._mapping)
+            grouped.setdefault(data.pop("message_id"), []).append(data)
+        return grouped
+
     async def get_by_tool_call_id(self, tool_call_id: str) -> ToolCall | None:
         """根据 LangGraph tool_call_id 获取工具调用"""
         result = await self.session.execute(
@@ -4,6 +4,7 @@ from datetime import datetime
 from typing import Annotated, Any
 
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy import func, select
 from sqlalchemy.exc import OperationalError
@@ -14,14 +15,14 @@ from app.core.crawler_database import get_crawler_db_dep
 from app.core.database import get_db
 from app.core.errors import raise_service_unavailable
 from app.core.logging import get_logger
+from app.services import dashboard_stats, export
 from app.services.crawler import crawler_config_service
-from app.models.conversation import Conversation, HandoffState
-from app.models.crawler import CrawlPage, CrawlSite, CrawlTask, CrawlTaskStatus
+from app.models.conversation import Conversation
+from app.models.crawler import CrawlPage, CrawlSite, CrawlTask
 from app.models.message import Message
 from app.models.product import Product
 from app.models.user import User
 from app.schemas.admin import (
-    AgentStatsInfo,
     ConversationListItem,
     CrawlPageListItem,
     CrawlTaskListItem,
@@ -271,96 +272,12 @@ async def get_dashboard_stats(
     session: Annotated[AsyncSession, Depends(get_db)],
     crawler_session: Annotated[AsyncSession, Depends(get_crawler_db_dep)],
 ):
-    """获取仪表盘统计数据"""
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-
-    # 基础统计（主数据库 app.db）
-    total_products = await session.scalar(select(func.count(Product.id)))
-    total_conversations = await session.scalar(select(func.count(Conversation.id)))
-    total_users = await session.scalar(select(func.count(User.id)))
-    total_messages = await session.scalar(select(func.count(Message.id)))
-
-    # 爬虫统计（爬虫数据库 crawler.db）
-    total_crawl_sites = 0
-    total_crawl_tasks = 0
-    crawl_success_rate = 0.0
-
-    if await crawler_config_service.is_enabled(session):
-        total_crawl_sites = await crawler_session.scalar(select(func.count(CrawlSite.id)))
-        total_crawl_tasks = await crawler_session.scalar(select(func.count(CrawlTask.id)))
-
-        # 计算爬取成功率
-        completed_tasks = await crawler_session.scalar(
-            select(func.count(CrawlTask.id)).where(
-                CrawlTask.status == CrawlTaskStatus.COMPLETED.value
-            )
-        )
-        failed_tasks = await crawler_session.scalar(
-            select(func.count(CrawlTask.id)).where(
-                CrawlTask.status == CrawlTaskStatus.FAILED.value
-            )
-        )
-        total_finished = (completed_tasks or 0) + (failed_tasks or 0)
-        crawl_success_rate = (
-            (completed_tasks or 0) / total_finished * 100 if total_finished > 0 else 0
-        )
-
-    # 今日统计（主数据库）
-    today_conversations = await session.scalar(
-        select(func.count(Conversation.id)).where(Conversation.created_at >= today)
-    )
-    today_messages = await session.scalar(
-        select(func.count(Message.id)).where(Message.created_at >= today)
-    )
-
-    # 会话状态分布（主数据库）
-    ai_conversations = await session.scalar(
-        select(func.count(Conversation.id)).where(
-            Conversation.handoff_state == HandoffState.AI.value
-        )
-    )
-    pending_conversations = await session.scalar(
-        select(func.count(Conversation.id)).where(
-            Conversation.handoff_state == HandoffState.PENDING.value
-        )
-    )
-    human_conversations = await session.scalar(
-        select(func.count(Conversation.id)).where(
-            Conversation.handoff_state == HandoffState.HUMAN.value
-        )
-    )
-
-    # Agent 统计
-    total_agents = await session.scalar(select(func.count(Agent.id)))
-    enabled_agents = await session.scalar(
-        select(func.count(Agent.id)).where(Agent.status == "enabled")
-    )
-
-    # 获取默认 Agent 信息
-    default_agent = await session.scalar(
-        select(Agent).where(Agent.is_default == True)  # noqa: E712
-    )
-    agent_stats = AgentStatsInfo(
-        total_agents=total_agents or 0,
-        enabled_agents=enabled_agents or 0,
-        default_agent_id=default_agent.id if default_agent else None,
-        default_agent_name=default_agent.name if default_agent else None,
-    )
-
-    return DashboardStats(
-        total_products=total_products or 0,
-        total_conversations=total_conversations or 0,
-        total_users=total_users or 0,
-        total_messages=total_messages or 0,
-        total_crawl_sites=total_crawl_sites or 0,
-        total_crawl_tasks=total_crawl_tasks or 0,
-        crawl_success_rate=round(crawl_success_rate, 1),
-        today_conversations=today_conversations or 0,
-        today_messages=today_messages or 0,
-        ai_conversations=ai_conversations or 0,
-        pending_conversations=pending_conversations or 0,
-        human_conversations=human_conversations or 0,
-        agent_stats=agent_stats,
+    """获取仪表盘统计数据（基于每日汇总 + 实时增量）"""
+    crawler_enabled = await crawler_config_service.is_enabled(session)
+    return await dashboard_stats.get_dashboard_stats(
+        session,
+        crawler_session,
+        crawler_enabled=crawler_enabled,
     )
 
 
@@ -672,3 +589,59 @@ async def list_brands(
         .order_by(Product.brand)
     )
     return [row[0] for row in result.all()]
+
+
+# ========== 数据导出 API ==========
+
+
+def _ndjson_response(body, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        body,
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.get("/export/messages")
+async def export_messages(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    conversation_id: str | None = None,
+    after_id: str | None = None,
+    include_tool_calls: bool = True,
+    batch_size: int = Query(export.DEFAULT_BATCH_SIZE, ge=1, le=export.MAX_BATCH_SIZE),
+):
+    """流式导出消息（NDJSON，每行一条消息，附带工具调用）
+
+    - since/until：按 created_at 过滤，增量导出时把上次结尾行的 next_since 作为 since
+    - after_id：断点续传，从上次结尾行的 last_id 之后继续
+    """
+    body = export.stream_messages(
+        since=since,
+        until=until,
+        conversation_id=conversation_id,
+        after_id=after_id,
+        include_tool_calls=include_tool_calls,
+        batch_size=batch_size,
+    )
+    return _ndjson_response(body, "messages.ndjson")
+
+
+@router.get("/export/conversations")
+async def export_conversations(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    after_id: str | None = None,
+    batch_size: int = Query(export.DEFAULT_BATCH_SIZE, ge=1, le=export.MAX_BATCH_SIZE),
+):
+    """流式导出会话元数据（NDJSON，since/until 按 updated_at 过滤）"""
+    body = export.stream_conversations(
+        since=since,
+        until=until,
+        after_id=after_id,
+        batch_size=batch_size,
+    )
+    return _ndjson_response(body, "conversations.ndjson")
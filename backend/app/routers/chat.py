@@ -5,7 +5,7 @@ import uuid
 from collections.abc import AsyncGenerator
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -13,6 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db_context
 from app.core.dependencies import get_db_session
 from app.core.logging import get_logger
+from app.core.tracing import start_turn_trace, trace_span
 from app.models.agent import SuggestedQuestion
 from app.models.conversation import HandoffState
 from app.schemas.chat import ChatRequest
@@ -25,17 +26,23 @@ from app.services.chat_stream_adapter import (
     get_agent_service,
 )
 from app.services.conversation import ConversationService
-from langgraph_agent_kit import encode_sse
+from langgraph_agent_kit import StreamEvent, encode_sse
+from app.services.streaming.resumable import stream_registry
 from app.services.support.handoff import HandoffService
 
 router = APIRouter(prefix="/api/v1", tags=["chat"])
 logger = get_logger("chat")
 
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
 
 @router.post("/chat")
 async def chat(
     request_data: ChatRequest,
-    request: Request,
 ):
     """流式聊天接口
 
@@ -46,9 +53,11 @@ async def chat(
     - 流式响应不持有长连接，工具内部自行创建短事务
     - 避免整个 SSE 流生命周期（可能数十秒）占用数据库连接
 
-    支持客户端主动中断：
-    - 客户端可以通过关闭连接来中断对话生成
-    - 后端会检测断开并立即停止 Agent 执行
+    可续传（见 services/streaming/resumable.py）：
+    - 生成在后台任务中运行，客户端断开连接不会中止生成，消息照常落库
+    - 每个事件带 id 行（事件 seq），断线后通过 GET /chat/{assistant_message_id}/stream
+      携带 Last-Event-ID 续传
+    - 停止生成需调用 POST /chat/{assistant_message_id}/cancel
 
     事件类型:
     - meta.start: 开始 {"type": "meta.start", "payload": {"assistant_message_id": "...", "user_message_id": "..."}}
@@ -59,35 +68,39 @@ async def chat(
     - support.human_message: 人工消息 {"type": "support.human_message", "payload": {...}}
     - error: 错误 {"type": "error", "payload": {"message": "..."}}
     """
+    # 回合耗时追踪（见 core/tracing.py），人工模式下不导出
+    trace = start_turn_trace(request_data.conversation_id)
+
     # 使用独立短事务保存用户消息和检查状态
     # 避免整个 SSE 流持有数据库连接
-    async with get_db_context() as db:
-        conversation_service = ConversationService(db)
-        handoff_service = HandoffService(db)
-
-        # 检查会话的 handoff 状态
-        handoff_state = await handoff_service.get_handoff_state(request_data.conversation_id)
-        is_human_mode = handoff_state == HandoffState.HUMAN.value
-
-        # 准备图片元数据
-        extra_metadata = None
-        message_type = "text"
-        if request_data.has_images:
-            message_type = "text_with_images"
-            extra_metadata = {
-                "images": [img.model_dump() for img in request_data.images]  # type: ignore
-            }
-
-        # 保存用户消息
-        user_message = await conversation_service.add_message(
-            conversation_id=request_data.conversation_id,
-            role="user",
-            content=request_data.message,
-            message_type=message_type,
-            extra_metadata=extra_metadata,
-        )
-        # 提取需要的数据，在 session 关闭前获取
-        user_message_id = user_message.id
+    with trace_span("db.save_user_message", trace=trace):
+        async with get_db_context() as db:
+            conversation_service = ConversationService(db)
+            handoff_service = HandoffService(db)
+
+            # 检查会话的 handoff 状态
+            handoff_state = await handoff_service.get_handoff_state(request_data.conversation_id)
+            is_human_mode = handoff_state == HandoffState.HUMAN.value
+
+            # 准备图片元数据
+            extra_metadata = None
+            message_type = "text"
+            if request_data.has_images:
+                message_type = "text_with_images"
+                extra_metadata = {
+                    "images": [img.model_dump() for img in request_data.images]  # type: ignore
+                }
+
+            # 保存用户消息
+            user_message = await conversation_service.add_message(
+                conversation_id=request_data.conversation_id,
+                role="user",
+                content=request_data.message,
+                message_type=message_type,
+                extra_metadata=extra_metadata,
+            )
+            # 提取需要的数据，在 session 关闭前获取
+            user_message_id = user_message.id
         
     logger.info(
         "保存用户消息",
@@ -152,82 +165,86 @@ async def chat(
                 },
             })
 
-        return StreamingResponse(
-            human_mode_response(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no",
-            },
-        )
+        return StreamingResponse(human_mode_response(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+    assistant_message_id = str(uuid.uuid4())
+
+    async def generate() -> AsyncGenerator[StreamEvent, None]:
+        """运行编排器产生事件（在后台任务中执行，不随 HTTP 连接断开而中止）
 
-    async def event_generator() -> AsyncGenerator[str, None]:
-        """生成 SSE 事件流，支持中断检测
-        
         SQLite 防死锁优化：
         - 使用 NullPool，每个请求都是新连接，不会阻塞连接池
         - WAL 模式允许读写并发
         - 工具内部使用 get_db_context() 创建独立短事务
         - db=None 让工具不复用外层 session，避免嵌套事务
         """
-        assistant_message_id = str(uuid.uuid4())
-        
-        # 为保存 assistant 消息创建独立 session
-        # 注意：db=None 让工具自行创建短事务，避免嵌套
-        async with get_db_context() as stream_db:
-            stream_conversation_service = ConversationService(stream_db)
-            # 获取适配后的服务
-            agent_service = get_agent_service()
-            OrchestratorClass = get_chat_stream_orchestrator()
-            
-            orchestrator = OrchestratorClass(
-                conversation_service=stream_conversation_service,
-                agent_service=agent_service,
-                conversation_id=request_data.conversation_id,
-                user_id=request_data.user_id,
-                user_message=request_data.message,
-                user_message_id=user_message_id,
-                assistant_message_id=assistant_message_id,
-                agent_id=request_data.agent_id,
-                images=request_data.images,
-                db=None,  # 不传递 session，让工具自行创建短事务
-            )
-
-            try:
-                async for event in orchestrator.run():
-                    # 检测客户端是否断开连接
-                    if await request.is_disconnected():
-                        logger.info(
-                            "客户端断开连接，中止生成（不保存消息）",
-                            conversation_id=request_data.conversation_id,
-                            assistant_message_id=assistant_message_id,
-                        )
-                        break
-                    yield encode_sse(event)
-            except asyncio.CancelledError:
-                logger.info(
-                    "生成被取消（不保存消息）",
+        if trace is not None:
+            trace.message_id = assistant_message_id
+            # 登记为当前回合：Agent 任务及其中的检索、记忆等代码可直接记录 span
+            trace.activate()
+        try:
+            # 为保存 assistant 消息创建独立 session
+            # 注意：db=None 让工具自行创建短事务，避免嵌套
+            async with get_db_context() as stream_db:
+                stream_conversation_service = ConversationService(stream_db)
+                # 获取适配后的服务
+                agent_service = get_agent_service()
+                OrchestratorClass = get_chat_stream_orchestrator()
+
+                orchestrator = OrchestratorClass(
+                    conversation_service=stream_conversation_service,
+                    agent_service=agent_service,
                     conversation_id=request_data.conversation_id,
+                    user_id=request_data.user_id,
+                    user_message=request_data.message,
+                    user_message_id=user_message_id,
                     assistant_message_id=assistant_message_id,
+                    agent_id=request_data.agent_id,
+                    images=request_data.images,
+                    db=None,  # 不传递 session，让工具自行创建短事务
+                    trace=trace,
                 )
-                # 用户主动停止属于正常路径：不保存不完整的消息，直接返回
-                return
-            except Exception as e:
-                logger.error("生成过程出错", error=str(e), exc_info=True)
-                yield encode_sse({"type": "error", "payload": {"message": str(e)}})
+                async for event in orchestrator.run():
+                    yield event
+        finally:
+            if trace is not None:
+                await trace.finish()
 
+    buffer = stream_registry.start(assistant_message_id, request_data.conversation_id, generate())
+    return StreamingResponse(buffer.subscribe(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@router.get("/chat/{message_id}/stream")
+async def resume_chat_stream(
+    message_id: str,
+    last_event_id: int = Header(0, alias="Last-Event-ID"),
+):
+    """续传聊天流
+
+    客户端断线后凭最后收到的事件 seq（Last-Event-ID 请求头）重新订阅：
+    先回放之后的事件，再跟随实时事件直到生成结束。
+    生成结束超过 CHAT_STREAM_TTL_SECONDS 后缓冲失效，返回 404（消息已落库，可从历史记录读取）。
+    """
+    buffer = stream_registry.get(message_id)
+    if buffer is None:
+        raise HTTPException(status_code=404, detail="消息流不存在或已过期")
     return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
+        buffer.subscribe(last_event_id), media_type="text/event-stream", headers=_SSE_HEADERS
     )
 
 
+@router.post("/chat/{message_id}/cancel")
+async def cancel_chat_stream(message_id: str):
+    """中止生成（用户主动停止，不保存不完整的消息）
+
+    断开 SSE 连接不再中止生成，停止生成需调用此接口。
+    """
+    cancelled = stream_registry.cancel(message_id)
+    if cancelled:
+        logger.info("用户中止生成", assistant_message_id=message_id)
+    return {"cancelled": cancelled}
+
+
 # ========== Suggested Questions (Public) ==========
 
 
@@ -1,6 +1,9 @@
 """会话 API"""
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic_core import to_json
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.dependencies import get_db_session
@@ -9,6 +12,7 @@ from app.schemas.conversation import (
     ConversationResponse,
     ConversationWithMessages,
     MessageResponse,
+    PaginatedConversationsResponse,
     PaginatedMessagesResponse,
     ToolCallResponse,
 )
@@ -17,15 +21,31 @@ from app.services.conversation import ConversationService
 router = APIRouter(prefix="/api/v1/conversations", tags=["conversations"])
 
 
-@router.get("", response_model=list[ConversationResponse])
+def _json_response(payload: dict[str, Any]) -> Response:
+    """直接序列化行字典（跳过逐条构造 pydantic 模型，response_model 仅用于文档）"""
+    return Response(content=to_json(payload), media_type="application/json")
+
+
+@router.get("", response_model=PaginatedConversationsResponse)
 async def get_conversations(
     user_id: str,
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
     db: AsyncSession = Depends(get_db_session),
 ):
-    """获取用户的所有会话"""
+    """分页获取用户的会话（按更新时间倒序）
+
+    Args:
+        user_id: 用户 ID
+        cursor: 游标（上一页返回的 next_cursor），首次请求不传
+        limit: 每页数量，默认 20，最大 100
+    """
     service = ConversationService(db)
-    conversations = await service.get_user_conversations(user_id)
-    return conversations
+    try:
+        items, next_cursor, has_more = await service.list_conversation_page(user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _json_response({"items": items, "next_cursor": next_cursor, "has_more": has_more})
 
 
 @router.post("", response_model=ConversationResponse)
@@ -51,70 +71,24 @@ async def create_conversation(
 async def get_conversation(
     conversation_id: str,
     include_tool_calls: bool = False,
+    message_limit: int = Query(50, ge=1, le=100),
     db: AsyncSession = Depends(get_db_session),
 ):
-    """获取会话详情（包含消息）
-    
+    """获取会话详情（包含最新的消息）
+
+    只返回最新的 message_limit 条消息，更早的消息使用返回的 next_cursor
+    调用 GET /{conversation_id}/messages 加载。
+
     Args:
         conversation_id: 会话 ID
         include_tool_calls: 是否包含工具调用详情
+        message_limit: 返回的消息数，默认 50，最大 100
     """
     service = ConversationService(db)
-
-    if include_tool_calls:
-        # 获取带工具调用的消息
-        conversation = await service.conversation_repo.get_by_id(conversation_id)
-        if conversation is None:
-            raise HTTPException(status_code=404, detail="会话不存在")
-        msg_list = await service.get_messages_with_tool_calls(conversation_id)
-    else:
-        conversation = await service.get_conversation_with_messages(conversation_id)
-        if conversation is None:
-            raise HTTPException(status_code=404, detail="会话不存在")
-        msg_list = conversation.messages
-
-    # 转换消息格式
-    messages = []
-    for msg in msg_list:
-        tool_calls_resp = []
-        if include_tool_calls and hasattr(msg, "tool_calls") and msg.tool_calls:
-            tool_calls_resp = [
-                ToolCallResponse(
-                    id=tc.id,
-                    tool_call_id=tc.tool_call_id,
-                    tool_name=tc.tool_name,
-                    tool_input=tc.tool_input,
-                    tool_output=tc.tool_output,
-                    status=tc.status,
-                    error_message=tc.error_message,
-                    duration_ms=tc.duration_ms,
-                    created_at=tc.created_at,
-                )
-                for tc in msg.tool_calls
-            ]
-
-        messages.append(
-            MessageResponse(
-                id=msg.id,
-                role=msg.role,
-                content=msg.content,
-                products=msg.products,
-                message_type=getattr(msg, "message_type", "text"),
-                extra_metadata=getattr(msg, "extra_metadata", None),
-                token_count=getattr(msg, "token_count", None),
-                tool_calls=tool_calls_resp,
-                created_at=msg.created_at,
-            )
-        )
-
-    return ConversationWithMessages(
-        id=conversation.id,
-        user_id=conversation.user_id,
-        title=conversation.title,
-        created_at=conversation.created_at,
-        updated_at=conversation.updated_at,
-        messages=messages,
-    )
+    detail = await service.get_conversation_detail(conversation_id, message_limit, include_tool_calls)
+    if detail is None:
+        raise HTTPException(status_code=404, detail="会话不存在")
+    return _json_response(detail)
 
 
 @router.get("/{conversation_id}/messages", response_model=PaginatedMessagesResponse)
@@ -17,9 +17,11 @@ from app.core.errors import raise_service_unavailable
 from app.core.logging import get_logger
 from app.models.crawler import CrawlSite, CrawlTask
 from app.repositories.crawler import (
+    CrawlFrontierRepository,
     CrawlPageRepository,
     CrawlSiteRepository,
     CrawlTaskRepository,
+    CrawlTemplateRepository,
 )
 from app.schemas.crawler import (
     CrawlPageResponse,
@@ -33,8 +35,9 @@ from app.schemas.crawler import (
     CrawlTaskRetryResponse,
     ExtractionConfig,
     RetryMode,
+    SiteTemplateStats,
 )
-from app.services.crawler import CrawlerService, crawler_config_service
+from app.services.crawler import crawler_config_service
 from app.services.crawler.utils import generate_site_id, normalize_domain
 
 logger = get_logger("router.crawler")
@@ -50,6 +53,13 @@ async def check_crawler_enabled(session: AsyncSession):
         )
 
 
+def _get_crawler(session: AsyncSession):
+    """创建爬取服务（按需导入爬取引擎，应用启动时不加载）"""
+    from app.services.crawler.crawler_service import CrawlerService
+
+    return CrawlerService(session)
+
+
 async def require_crawler_enabled(
     app_session: Annotated[AsyncSession, Depends(get_db)],
 ) -> None:
@@ -281,6 +291,12 @@ async def delete_site(
             detail=f"无法删除系统配置站点: {site_id}，请修改配置文件",
         )
 
+    await CrawlFrontierRepository(session).clear_site(site_id)
+    await CrawlTemplateRepository(session).clear_site(site_id)
+    # 页面内容与压缩字典都关联站点，字典须在页面内容删除之后清理
+    page_repo = CrawlPageRepository(session)
+    await page_repo.delete_pages_by_site(site_id)
+    await page_repo.delete_dictionaries(site_id)
     await repo.delete(site)
     logger.info("删除站点配置", site_id=site_id)
     return {"message": f"站点 {site_id} 已删除"}
@@ -320,13 +336,17 @@ async def retry_site(
     deleted_pages = 0
     page_repo = CrawlPageRepository(session)
 
-    # 强制模式：清空所有页面
+    # 强制模式：清空所有页面及未完成的爬取进度
     if mode == RetryMode.FORCE:
         deleted_pages = await page_repo.delete_pages_by_site(site_id)
+        await CrawlFrontierRepository(session).clear_site(site_id)
 
-    crawler = CrawlerService(session)
+    crawler = _get_crawler(session)
     try:
         task_id = await crawler.crawl_site(site_id)
+    except ValueError as e:
+        # 站点未启用，或已在爬取 / 排队中
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     finally:
         await crawler.close()
 
@@ -371,9 +391,12 @@ async def create_task(
         )
 
     # 创建任务
-    crawler = CrawlerService(session)
+    crawler = _get_crawler(session)
     try:
         task_id = await crawler.crawl_site(task_data.site_id)
+    except ValueError as e:
+        # 站点未启用，或已在爬取 / 排队中
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     finally:
         await crawler.close()
 
@@ -484,13 +507,17 @@ async def retry_task(
     deleted_pages = 0
     page_repo = CrawlPageRepository(session)
 
-    # 强制模式：清空所有页面
+    # 强制模式：清空所有页面及未完成的爬取进度
     if mode == RetryMode.FORCE:
         deleted_pages = await page_repo.delete_pages_by_site(site_id)
+        await CrawlFrontierRepository(session).clear_site(site_id)
 
-    crawler = CrawlerService(session)
+    crawler = _get_crawler(session)
     try:
         new_task_id = await crawler.crawl_site(site_id)
+    except ValueError as e:
+        # 站点未启用，或已在爬取 / 排队中
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     finally:
         await crawler.close()
 
@@ -534,6 +561,7 @@ async def get_stats(
     site_stats = await site_repo.count_by_status()
     task_stats = await task_repo.count_by_status()
     total_pages = await page_repo.count_total()
+    template_stats = await CrawlTemplateRepository(session).site_stats()
 
     return CrawlStats(
         total_sites=sum(site_stats.values()),
@@ -542,6 +570,7 @@ async def get_stats(
         running_tasks=task_stats.get("running", 0),
         total_pages=total_pages,
         total_products=0,  # TODO: 从商品表统计
+        template_stats=[SiteTemplateStats(**item) for item in template_stats],
     )
 
 
@@ -591,6 +620,15 @@ def _task_to_response(task: CrawlTask) -> CrawlTaskResponse:
         products_found=task.products_found,
         products_created=task.products_created,
         products_updated=task.products_updated,
+        http_fetch_count=task.http_fetch_count or 0,
+        http_fetch_ms=task.http_fetch_ms or 0,
+        browser_fetch_count=task.browser_fetch_count or 0,
+        browser_fetch_ms=task.browser_fetch_ms or 0,
+        fetch_escalations=task.fetch_escalations or 0,
+        pages_not_modified=task.pages_not_modified or 0,
+        llm_parse_count=task.llm_parse_count or 0,
+        template_parse_count=task.template_parse_count or 0,
+        template_fallbacks=task.template_fallbacks or 0,
         started_at=task.started_at,
         finished_at=task.finished_at,
         error_message=task.error_message,
@@ -0,0 +1,73 @@
+"""运行时指标 API
+
+GET /metrics 以 Prometheus 文本格式输出 app.core.metrics 中的指标，
+并在抓取时读取已有统计：
+- 聊天流：运行中的生成任务、活跃 SSE 订阅
+- 编排器领域事件队列深度
+- WebSocket / SSE 连接数
+- Agent 缓存命中
+"""
+
+from collections.abc import Iterable
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import MetricFamily, orchestrator_queues, registry
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _collect_chat_streams() -> Iterable[MetricFamily]:
+    from app.services.streaming.resumable import stream_registry
+
+    stats = stream_registry.get_stats()
+    count, total, max_depth = orchestrator_queues.snapshot()
+    return [
+        ("chat_stream_generations_running", "gauge", "运行中的聊天生成任务数",
+         [("", {}, stats["running"])]),
+        ("chat_stream_subscribers", "gauge", "活跃的聊天 SSE 订阅数",
+         [("", {}, stats["subscribers"])]),
+        ("chat_stream_buffers", "gauge", "保留中的聊天流缓冲数",
+         [("", {}, stats["buffers"])]),
+        ("chat_orchestrator_queue_depth", "gauge", "编排器领域事件队列深度",
+         [("", {"stat": "total"}, total), ("", {"stat": "max"}, max_depth)]),
+        ("chat_orchestrators", "gauge", "存活的编排器实例数", [("", {}, count)]),
+    ]
+
+
+def _collect_connections() -> Iterable[MetricFamily]:
+    from app.services.websocket.manager import ws_manager
+
+    stats = ws_manager.get_stats()
+    return [
+        ("ws_connections", "gauge", "实时连接数（按角色）",
+         [("", {"role": role}, n) for role, n in stats["by_role"].items()]),
+        ("ws_connections_by_transport", "gauge", "实时连接数（按传输方式）",
+         [("", {"transport": t}, n) for t, n in stats["by_transport"].items()]),
+    ]
+
+
+def _collect_agent_cache() -> Iterable[MetricFamily]:
+    from app.services.agent.core.service import agent_service
+
+    stats = agent_service.get_cache_stats()
+    counters = ("hits", "misses", "coalesced", "builds", "build_failures", "rebuilds", "evictions")
+    return [
+        ("agent_cache_events_total", "counter", "Agent 缓存事件数",
+         [("", {"event": key}, stats[key]) for key in counters]),
+        ("agent_cache_size", "gauge", "已缓存的 Agent 数", [("", {}, stats["size"])]),
+    ]
+
+
+registry.register_collector(_collect_chat_streams)
+registry.register_collector(_collect_connections)
+registry.register_collector(_collect_agent_cache)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Prometheus 抓取端点"""
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -3,13 +3,23 @@
 提供 OCR 健康检查、文件处理等接口。
 """
 
-from typing import Any
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from collections.abc import AsyncGenerator
+from typing import Any, BinaryIO
 
 from fastapi import APIRouter, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
+from langgraph_agent_kit import encode_sse
 from pydantic import BaseModel, Field
 
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.services.ocr.base import ProgressCallback
+from app.services.ocr.cache import cache_key, ocr_result_cache
 
 router = APIRouter(prefix="/api/v1/admin/ocr", tags=["ocr"])
 logger = get_logger("routers.ocr")
@@ -65,6 +75,7 @@ class OcrProcessResponse(BaseModel):
     processor_type: str = ""
     file_name: str = ""
     processing_time_ms: int = 0
+    cached: bool = Field(False, description="是否命中结果缓存（相同内容已识别过）")
 
 
 # ========== API Endpoints ==========
@@ -146,13 +157,9 @@ async def get_ocr_config():
 async def process_file(
     file: UploadFile = File(...),
     processor_type: str | None = Query(None, description="处理器类型"),
+    stream: bool = Query(False, description="以 SSE 逐页推送进度（ocr.progress），最后推送结果（ocr.result）"),
 ):
     """处理上传的文件并返回 OCR 结果"""
-    import os
-    import tempfile
-    import time
-
-    from app.services.ocr.base import DocumentProcessorException
     from app.services.ocr.factory import OcrProcessorFactory
 
     if not settings.OCR_ENABLED:
@@ -171,62 +178,141 @@ async def process_file(
             detail=f"不支持的处理器类型: {processor_type}",
         )
 
-    # 保存上传文件到临时目录
+    tmp_path, content_hash = await _save_upload(file)
+    file_name = file.filename or ""
+
+    if stream:
+        # 临时文件由事件流结束时清理
+        return StreamingResponse(
+            _stream_ocr_events(processor_type, tmp_path, file_name, content_hash),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "Connection": "keep-alive",
+                "X-Accel-Buffering": "no",
+            },
+        )
+
+    try:
+        return await _run_ocr(processor_type, tmp_path, file_name, content_hash)
+    finally:
+        _remove_temp_file(tmp_path)
+
+
+async def _save_upload(file: UploadFile) -> tuple[str, str]:
+    """保存上传文件到临时目录，返回 (临时文件路径, 内容 sha256)"""
     file_ext = os.path.splitext(file.filename or "")[1].lower()
     if not file_ext:
         file_ext = ".bin"
 
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
+    with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
+        content_hash = await asyncio.to_thread(_copy_with_hash, file.file, tmp_file)
+        return tmp_file.name, content_hash
+
 
-        start_time = time.time()
+def _copy_with_hash(src: BinaryIO, dst: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+    """分块复制文件并计算 sha256（同步，不整体读入内存）"""
+    digest = hashlib.sha256()
+    while chunk := src.read(chunk_size):
+        digest.update(chunk)
+        dst.write(chunk)
+    return digest.hexdigest()
 
+
+def _remove_temp_file(tmp_path: str) -> None:
+    """清理临时文件"""
+    if os.path.exists(tmp_path):
         try:
-            text = await OcrProcessorFactory.aprocess_file(processor_type, tmp_path)
-            processing_time_ms = int((time.time() - start_time) * 1000)
-
-            logger.info(
-                "OCR 处理完成",
-                processor=processor_type,
-                file_name=file.filename,
-                text_length=len(text),
-                time_ms=processing_time_ms,
-            )
+            os.remove(tmp_path)
+        except Exception:
+            pass
+
+
+async def _run_ocr(
+    processor_type: str,
+    tmp_path: str,
+    file_name: str,
+    content_hash: str,
+    on_progress: ProgressCallback | None = None,
+) -> OcrProcessResponse:
+    """执行 OCR（相同内容命中缓存时直接返回），处理失败时返回 success=False 的响应"""
+    from app.services.ocr.base import DocumentProcessorException
+    from app.services.ocr.factory import OcrProcessorFactory
 
-            return OcrProcessResponse(
-                success=True,
-                text=text,
-                processor_type=processor_type,
-                file_name=file.filename or "",
-                processing_time_ms=processing_time_ms,
-            )
+    start_time = time.time()
 
-        except DocumentProcessorException as e:
-            processing_time_ms = int((time.time() - start_time) * 1000)
-            logger.warning(
-                "OCR 处理失败",
-                processor=processor_type,
-                file_name=file.filename,
-                error=str(e),
-            )
-            return OcrProcessResponse(
-                success=False,
-                error=str(e),
-                processor_type=processor_type,
-                file_name=file.filename or "",
-                processing_time_ms=processing_time_ms,
-            )
+    try:
+        text, cached = await ocr_result_cache.get_or_compute(
+            cache_key(content_hash, processor_type),
+            lambda: OcrProcessorFactory.aprocess_file(
+                processor_type, tmp_path, on_progress=on_progress
+            ),
+        )
+        processing_time_ms = int((time.time() - start_time) * 1000)
+
+        logger.info(
+            "OCR 处理完成",
+            processor=processor_type,
+            file_name=file_name,
+            text_length=len(text),
+            time_ms=processing_time_ms,
+            cached=cached,
+        )
+
+        return OcrProcessResponse(
+            success=True,
+            text=text,
+            processor_type=processor_type,
+            file_name=file_name,
+            processing_time_ms=processing_time_ms,
+            cached=cached,
+        )
+
+    except DocumentProcessorException as e:
+        processing_time_ms = int((time.time() - start_time) * 1000)
+        logger.warning(
+            "OCR 处理失败",
+            processor=processor_type,
+            file_name=file_name,
+            error=str(e),
+        )
+        return OcrProcessResponse(
+            success=False,
+            error=str(e),
+            processor_type=processor_type,
+            file_name=file_name,
+            processing_time_ms=processing_time_ms,
+        )
+
+
+async def _stream_ocr_events(
+    processor_type: str, tmp_path: str, file_name: str, content_hash: str
+) -> AsyncGenerator[str, None]:
+    """OCR 进度事件流：每完成一页推送 ocr.progress，结束时推送 ocr.result（命中缓存时只有 ocr.result）"""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[dict | None] = asyncio.Queue()
+
+    def on_progress(page: int, total_pages: int, text: str) -> None:
+        # 回调在工作线程中执行，切回事件循环入队
+        loop.call_soon_threadsafe(
+            queue.put_nowait,
+            {"page": page, "total_pages": total_pages, "text_length": len(text)},
+        )
+
+    job = asyncio.create_task(
+        _run_ocr(processor_type, tmp_path, file_name, content_hash, on_progress)
+    )
+    # 完成通知与进度回调同样经 call_soon 入队，排在所有进度事件之后
+    job.add_done_callback(lambda _: queue.put_nowait(None))
 
+    try:
+        while (progress := await queue.get()) is not None:
+            yield encode_sse({"type": "ocr.progress", "payload": progress})
+        yield encode_sse({"type": "ocr.result", "payload": job.result().model_dump()})
     finally:
-        # 清理临时文件
-        if "tmp_path" in locals() and os.path.exists(tmp_path):
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                pass
+        if not job.done():
+            job.cancel()
+        _remove_temp_file(tmp_path)
 
 
 @router.get("/providers")
@@ -31,8 +31,10 @@ from app.schemas.support import (
 from app.schemas.websocket import WSAction, WSRole
 from app.services.support.handoff import HandoffService
 from app.services.support.heat_score import get_conversations_with_heat, get_support_stats
+from app.services.websocket.event_log import EventLogService
 from app.services.websocket.handlers.base import build_server_message
 from app.services.websocket.manager import ws_manager
+from app.services.websocket.presence import presence_service
 
 router = APIRouter(prefix="/api/v1/support", tags=["support"])
 logger = get_logger("router.support")
@@ -181,26 +183,18 @@ async def send_human_message(
             error="发送失败：会话不存在或未在人工模式",
         )
 
-    # 通过 WebSocket 发送给用户
-    from datetime import datetime
-    ws_payload = {
+    # 写入事件日志并推送给用户（WebSocket / SSE 订阅，离线时上线后补发）
+    event_payload = {
         "message_id": message.id,
         "role": "human_agent",
         "content": message.content,
         "created_at": message.created_at.isoformat(),
         "operator": request.operator,
-        "is_delivered": True,
-        "delivered_at": datetime.now().isoformat(),
     }
     if images_data:
-        ws_payload["images"] = images_data
+        event_payload["images"] = images_data
 
-    ws_msg = build_server_message(
-        action=WSAction.SERVER_MESSAGE,
-        payload=ws_payload,
-        conversation_id=conversation_id,
-    )
-    await ws_manager.send_to_role(conversation_id, WSRole.USER, ws_msg)
+    await EventLogService(db).publish(conversation_id, WSRole.USER, WSAction.SERVER_MESSAGE, event_payload)
 
     return HumanMessageResponse(
         success=True,
@@ -245,7 +239,7 @@ async def list_conversations(
             title=c["title"],
             handoff_state=c["handoff_state"],
             handoff_operator=c["handoff_operator"],
-            user_online=c["user_online"],
+            user_online=presence_service.is_online(c["id"], "user", default=c["user_online"]),
             updated_at=c["updated_at"],
             created_at=c["created_at"],
             heat_score=c["heat_score"],
@@ -288,7 +282,6 @@ async def get_stats(
 @router.get("/connections/{conversation_id}")
 async def get_connections(conversation_id: str):
     """获取会话的 WebSocket 连接数统计"""
-    conns = ws_manager.get_connections_by_conversation(conversation_id)
-    user_count = sum(1 for c in conns if c.role.value == "user")
-    agent_count = sum(1 for c in conns if c.role.value == "agent")
-    return {"user": user_count, "agent": agent_count, "total": len(conns)}
+    # 含其他 worker / 实例上的连接
+    counts = ws_manager.get_connection_counts(conversation_id)
+    return {"user": counts["user"], "agent": counts["agent"], "total": counts["total"]}
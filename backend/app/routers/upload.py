@@ -75,9 +75,11 @@ async def upload_image(
             detail=f"不支持的图片类型: {content_type}，允许的类型: {settings.image_allowed_types_list}",
         )
 
-    # 读取文件内容
-    file_data = await file.read()
-    file_size = len(file_data)
+    # 文件已由框架写入临时文件（SpooledTemporaryFile），这里只取大小，不读入内存
+    file_size = file.size
+    if file_size is None:
+        file_size = file.file.seek(0, 2)
+        file.file.seek(0)
 
     # 验证文件大小
     if file_size > settings.image_max_size_bytes:
@@ -98,8 +100,9 @@ async def upload_image(
         user_id = "anonymous"
 
     try:
-        result = minio_service.upload_image(
-            file_data=file_data,
+        result = await minio_service.upload_image(
+            file.file,
+            file_size,
             user_id=user_id,
             filename=filename,
             content_type=content_type,
@@ -130,10 +133,10 @@ async def upload_image(
 
 @router.delete("/image/{image_id}")
 async def delete_image(image_id: str, user_id: str = "") -> dict:
-    """删除图片
+    """删除图片（一次上传）
     
     Args:
-        image_id: 图片 ID
+        image_id: 上传接口返回的图片 ID
         user_id: 用户 ID
     
     Returns:
@@ -146,16 +149,8 @@ async def delete_image(image_id: str, user_id: str = "") -> dict:
     if not user_id:
         user_id = "anonymous"
 
-    # 尝试删除各种可能的扩展名
-    deleted = False
-    for ext in ["jpg", "jpeg", "png", "webp", "gif"]:
-        object_name = f"{user_id}/{image_id}.{ext}"
-        if minio_service.delete_image(object_name):
-            deleted = True
-            # 同时尝试删除缩略图
-            thumb_name = f"{user_id}/{image_id}_thumb.{ext}"
-            minio_service.delete_image(thumb_name)
-            break
+    # 只移除本次上传的引用，同一图片的其他上传仍可访问
+    deleted = await minio_service.release_image(user_id, image_id)
 
     if not deleted:
         raise HTTPException(status_code=404, detail="图片不存在")
@@ -1,6 +1,7 @@
 """WebSocket 路由端点"""
 
-from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 
 from app.core.dependencies import get_services
 from app.core.logging import get_logger
@@ -8,14 +9,23 @@ from app.schemas.websocket import WSAction, WSRole
 
 # 确保 handlers 被注册
 from app.services.websocket import handlers  # noqa: F401
+from app.services.websocket.event_log import SSESocket, delivery_cursors, encode_sse
 from app.services.websocket.handlers.base import build_server_message
+from app.services.websocket.heartbeat import heartbeat_manager
 from app.services.websocket.manager import ws_manager
+from app.services.websocket.presence import presence_service
 from app.services.websocket.router import ws_router
 
 logger = get_logger("router.ws")
 
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
 
 async def _authenticate_user(token: str | None, conversation_id: str) -> tuple[bool, str, str]:
     """验证用户身份
@@ -99,23 +109,23 @@ async def ws_user_endpoint(
         role=WSRole.USER,
         identity=user_id,
     )
+    heartbeat_manager.track(conn)
 
     try:
+        # 4. 更新用户在线状态（内存，批量持久化）
+        presence_service.connected(conversation_id, WSRole.USER.value)
+
         async with get_services() as services:
-            # 4. 获取当前 handoff 状态和在线状态
+            # 5. 获取当前 handoff 状态和在线状态
             handoff_state = await services.handoff.get_handoff_state(conversation_id) or "ai"
-            online_status = await services.conversation_repo.get_online_status(conversation_id)
-
-            # 5. 更新用户在线状态到数据库
-            await services.conversation_repo.set_user_online(conversation_id, True)
+            online_status = presence_service.get_status(
+                conversation_id, await services.conversation_repo.get_online_status(conversation_id)
+            )
 
             # 6. 获取未读消息数
             unread_count = await services.message_repo.get_unread_count(conversation_id, "user")
 
-            # 7. 获取未送达消息并推送
-            undelivered = await services.message_repo.get_undelivered_messages(conversation_id, "user")
-
-        # 8. 发送连接成功消息
+        # 7. 发送连接成功消息
         peer_last_online = online_status.get("agent_last_online_at")
         connected_msg = build_server_message(
             action=WSAction.SYSTEM_CONNECTED,
@@ -132,33 +142,11 @@ async def ws_user_endpoint(
         )
         await conn.send(connected_msg)
 
-        # 9. 推送未送达消息
-        if undelivered:
-            delivered_ids = []
-            for msg in undelivered:
-                server_msg = build_server_message(
-                    action=WSAction.SERVER_MESSAGE,
-                    payload={
-                        "message_id": msg.id,
-                        "role": msg.role,
-                        "content": msg.content,
-                        "created_at": msg.created_at.isoformat(),
-                        "is_delivered": True,
-                        "delivered_at": msg.created_at.isoformat(),
-                        "read_at": msg.read_at.isoformat() if msg.read_at else None,
-                        "read_by": msg.read_by,
-                    },
-                    conversation_id=conversation_id,
-                )
-                await conn.send(server_msg)
-                delivered_ids.append(msg.id)
-
-            # 标记为已送达
-            if delivered_ids:
-                async with get_services() as svc:
-                    await svc.message_repo.mark_as_delivered(delivered_ids)
-
-        # 10. 通知客服端用户上线
+        # 8. 补发离线期间的事件（送达游标之后），并推进游标
+        async with get_services() as services:
+            replayed = await services.event_log.replay(conn)
+
+        # 9. 通知客服端用户上线
         from datetime import datetime
         now = datetime.now()
         online_msg = build_server_message(
@@ -178,10 +166,10 @@ async def ws_user_endpoint(
             conn_id=conn.id,
             user_id=user_id,
             conversation_id=conversation_id,
-            undelivered_count=len(undelivered) if undelivered else 0,
+            replayed_count=replayed,
         )
 
-        # 11. 消息循环
+        # 10. 消息循环
         while True:
             try:
                 # 检查连接是否仍然有效
@@ -203,9 +191,8 @@ async def ws_user_endpoint(
                 break
 
     finally:
-        # 12. 清理 - 更新数据库在线状态
-        async with get_services() as svc:
-            await svc.conversation_repo.set_user_online(conversation_id, False)
+        # 11. 清理 - 更新在线状态
+        presence_service.disconnected(conversation_id, WSRole.USER.value)
 
         await ws_manager.disconnect(conn.id)
 
@@ -271,23 +258,23 @@ async def ws_agent_endpoint(
         role=WSRole.AGENT,
         identity=agent_id,
     )
+    heartbeat_manager.track(conn)
 
     try:
+        # 4. 更新客服在线状态（内存，批量持久化）
+        presence_service.connected(conversation_id, WSRole.AGENT.value, agent_id)
+
         async with get_services() as services:
-            # 4. 获取当前 handoff 状态和在线状态
+            # 5. 获取当前 handoff 状态和在线状态
             handoff_state = await services.handoff.get_handoff_state(conversation_id) or "ai"
-            online_status = await services.conversation_repo.get_online_status(conversation_id)
-
-            # 5. 更新客服在线状态到数据库
-            await services.conversation_repo.set_agent_online(conversation_id, True, agent_id)
+            online_status = presence_service.get_status(
+                conversation_id, await services.conversation_repo.get_online_status(conversation_id)
+            )
 
             # 6. 获取未读消息数（发给客服的消息）
             unread_count = await services.message_repo.get_unread_count(conversation_id, "agent")
 
-            # 7. 获取未送达消息并推送
-            undelivered = await services.message_repo.get_undelivered_messages(conversation_id, "agent")
-
-        # 8. 发送连接成功消息
+        # 7. 发送连接成功消息
         peer_last_online = online_status.get("user_last_online_at")
         connected_msg = build_server_message(
             action=WSAction.SYSTEM_CONNECTED,
@@ -304,33 +291,11 @@ async def ws_agent_endpoint(
         )
         await conn.send(connected_msg)
 
-        # 9. 推送未送达消息
-        if undelivered:
-            delivered_ids = []
-            for msg in undelivered:
-                server_msg = build_server_message(
-                    action=WSAction.SERVER_MESSAGE,
-                    payload={
-                        "message_id": msg.id,
-                        "role": msg.role,
-                        "content": msg.content,
-                        "created_at": msg.created_at.isoformat(),
-                        "is_delivered": True,
-                        "delivered_at": msg.created_at.isoformat(),
-                        "read_at": msg.read_at.isoformat() if msg.read_at else None,
-                        "read_by": msg.read_by,
-                    },
-                    conversation_id=conversation_id,
-                )
-                await conn.send(server_msg)
-                delivered_ids.append(msg.id)
-
-            # 标记为已送达
-            if delivered_ids:
-                async with get_services() as svc:
-                    await svc.message_repo.mark_as_delivered(delivered_ids)
-
-        # 10. 通知用户端客服上线
+        # 8. 补发离线期间的事件（送达游标之后），并推进游标
+        async with get_services() as services:
+            replayed = await services.event_log.replay(conn)
+
+        # 9. 通知用户端客服上线
         from datetime import datetime
         now = datetime.now()
         online_msg = build_server_message(
@@ -349,10 +314,10 @@ async def ws_agent_endpoint(
             conn_id=conn.id,
             agent_id=agent_id,
             conversation_id=conversation_id,
-            undelivered_count=len(undelivered) if undelivered else 0,
+            replayed_count=replayed,
         )
 
-        # 11. 消息循环
+        # 10. 消息循环
         while True:
             try:
                 # 检查连接是否仍然有效
@@ -374,9 +339,8 @@ async def ws_agent_endpoint(
                 break
 
     finally:
-        # 12. 清理 - 更新数据库在线状态
-        async with get_services() as svc:
-            await svc.conversation_repo.set_agent_online(conversation_id, False, None)
+        # 11. 清理 - 更新在线状态
+        presence_service.disconnected(conversation_id, WSRole.AGENT.value)
 
         await ws_manager.disconnect(conn.id)
 
@@ -397,6 +361,71 @@ async def ws_agent_endpoint(
         logger.info("客服 WebSocket 断开", conn_id=conn.id, agent_id=agent_id)
 
 
+@router.get("/{role}/{conversation_id}/events")
+async def sse_events_endpoint(
+    role: WSRole,
+    conversation_id: str,
+    token: str = Query(..., description="认证 token"),
+    last_event_id: int | None = Header(None, alias="Last-Event-ID"),
+):
+    """SSE 订阅会话事件（无法使用 WebSocket 的客户端）
+
+    URL: GET /ws/{role}/{conversation_id}/events?token=xxx
+
+    与同角色的 WebSocket 连接收到相同的推送消息（data 为消息信封 JSON）。
+    事件日志中的消息带 id 行（seq）：首次订阅从送达游标之后补发，
+    断线重连时 EventSource 自动携带 Last-Event-ID，从该 seq 之后补发。
+    """
+    if role == WSRole.USER:
+        success, identity, error = await _authenticate_user(token, conversation_id)
+    else:
+        success, identity, error = await _authenticate_agent(token)
+    if not success:
+        raise HTTPException(status_code=401, detail=error)
+
+    socket = SSESocket()
+
+    async def stream():
+        # 在响应体开始后才注册连接：客户端在首字节前断开时生成器不会运行，
+        # 注册与 finally 中的注销总是成对执行
+        conn = await ws_manager.connect(
+            websocket=socket,  # type: ignore[arg-type]
+            conversation_id=conversation_id,
+            role=role,
+            identity=identity,
+            metadata={"transport": "sse"},
+        )
+        logger.info("SSE 订阅已连接", conn_id=conn.id, role=role.value, conversation_id=conversation_id)
+        try:
+            # 先注册连接再读取补发事件：期间新发布的事件进入连接队列，按 seq 去重
+            async with get_services() as services:
+                pending = await services.event_log.pending(conversation_id, role, after_seq=last_event_id)
+
+            last_seq = last_event_id or 0
+            for message in pending:
+                last_seq = message["payload"]["seq"]
+                yield encode_sse(message)
+            # 补发的帧已写出后再推进游标；之后的推送由连接的送达回调推进
+            if pending:
+                delivery_cursors.record(conversation_id, role.value, last_seq)
+
+            async for message in socket.messages():
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                seq = message.get("payload", {}).get("seq")
+                if seq is not None:
+                    if seq <= last_seq:
+                        continue
+                    last_seq = seq
+                yield encode_sse(message)
+        finally:
+            await ws_manager.disconnect(conn.id)
+            logger.info("SSE 订阅断开", conn_id=conn.id, role=role.value, conversation_id=conversation_id)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
 @router.get("/stats")
 async def get_ws_stats():
     """获取 WebSocket 连接统计
@@ -405,6 +434,8 @@ async def get_ws_stats():
         - total_connections: 总连接数
         - by_role: 按角色统计 {"user": n, "agent": m}
         - active_conversations: 有活跃连接的会话数
+        - queued_messages / max_queue_depth: 发送队列中的消息总数 / 单连接最大积压
+        - dropped_messages: 因队列满丢弃的消息数
     """
     return ws_manager.get_stats()
 
@@ -422,6 +453,8 @@ async def get_conversation_connections(conversation_id: str):
                 "identity": c.identity,
                 "created_at": c.created_at.isoformat(),
                 "is_alive": c.is_alive,
+                "queue_depth": c.queue_depth,
+                "dropped_count": c.dropped_count,
             }
             for c in conns
         ],
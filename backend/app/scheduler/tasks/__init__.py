@@ -2,10 +2,13 @@
 
 包含所有具体的定时任务实现：
 - CrawlSiteTask: 站点爬取任务
+- StatsRollupTask: 仪表盘统计汇总任务
 """
 
 from app.scheduler.tasks.crawl_site import CrawlSiteTask
+from app.scheduler.tasks.stats_rollup import StatsRollupTask
 
 __all__ = [
     "CrawlSiteTask",
+    "StatsRollupTask",
 ]
@@ -1,6 +1,8 @@
 """站点爬取任务
 
 封装 CrawlerService，作为定时任务执行。
+每个配置站点注册一个任务（任务名带站点 ID）；爬取提交给多站点协调器，
+多个站点同时触发时按全局资源上限并行，超出部分排队。
 """
 
 from app.core.config import settings
@@ -13,7 +15,6 @@ from app.scheduler.tasks.base import (
     TaskResult,
     TaskSchedule,
 )
-from app.services.crawler.crawler_service import CrawlerService
 
 logger = get_logger("scheduler.tasks.crawl_site")
 
@@ -43,6 +44,10 @@ class CrawlSiteTask(BaseTask):
             cron_expression: cron 表达式
         """
         self.site_id = site_id
+        if site_id:
+            # 多站点各自注册，任务名需唯一
+            self.name = f"crawl_site_{site_id}"
+            self.description = f"定时爬取站点内容: {site_id}"
         schedule_run_on_start = (
             run_on_start if run_on_start is not None else settings.CRAWLER_RUN_ON_START
         )
@@ -50,7 +55,7 @@ class CrawlSiteTask(BaseTask):
         self.schedule = TaskSchedule(
             schedule_type=ScheduleType.CRON,
             cron_expression=cron_expression,
-            allow_concurrent=False,  # 不允许并发爬取
+            allow_concurrent=False,  # 同一站点不重叠（跨站点并发由协调器控制）
             run_on_start=schedule_run_on_start,
         )
         self.enabled = settings.CRAWLER_ENABLED
@@ -81,10 +86,14 @@ class CrawlSiteTask(BaseTask):
             if not site:
                 return TaskResult.failed(f"站点不存在: {site_id}")
 
-            logger.info("开始爬取站点", site_id=site_id, site_name=site.name)
+            # 执行爬取（爬取引擎按需导入，未启用爬虫时不加载）
+            from app.services.crawler.crawler_service import CrawlerService
 
-            # 执行爬取
             crawler = CrawlerService(session)
+            if crawler.coordinator.is_scheduled(site_id):
+                return TaskResult.skipped(f"站点正在爬取或排队中: {site.name}")
+
+            logger.info("开始爬取站点", site_id=site_id, site_name=site.name)
             try:
                 task_id = await crawler.crawl_site(site_id)
                 logger.info("爬取任务已创建", site_id=site_id, task_id=task_id)
@@ -0,0 +1,44 @@
+"""统计汇总任务
+
+周期性把已结束自然日的会话/消息/用户计数写入 daily_stats，
+供 /admin/stats 直接读取汇总结果。
+"""
+
+from app.core.database import get_db_context
+from app.core.logging import get_logger
+from app.scheduler.tasks.base import (
+    BaseTask,
+    ScheduleType,
+    TaskResult,
+    TaskSchedule,
+)
+from app.services.dashboard_stats import rollup_daily_stats
+
+logger = get_logger("scheduler.tasks.stats_rollup")
+
+
+class StatsRollupTask(BaseTask):
+    """每日统计汇总任务
+
+    进程内首次执行做全量重算（回填历史并校正删除带来的偏差），
+    之后每次只增量重算水位线之后的天数。
+    """
+
+    name = "stats_rollup"
+    description = "汇总仪表盘每日统计"
+
+    def __init__(self, interval_seconds: int = 3600):
+        self.schedule = TaskSchedule(
+            schedule_type=ScheduleType.INTERVAL,
+            interval_seconds=interval_seconds,
+            allow_concurrent=False,
+            run_on_start=True,
+        )
+        self._full_done = False
+
+    async def run(self) -> TaskResult:
+        full = not self._full_done
+        async with get_db_context() as session:
+            days = await rollup_daily_stats(session, full=full)
+        self._full_done = True
+        return TaskResult.success("统计汇总完成", full=full, days=days)
@@ -27,6 +27,23 @@ class ConversationResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class ConversationSummary(ConversationResponse):
+    """会话列表项（含消息数与最后一条消息预览）"""
+
+    message_count: int = 0
+    last_message_role: str | None = None
+    last_message_preview: str | None = Field(None, description="最后一条消息前 100 字，已撤回时为空")
+    last_message_at: datetime | None = None
+
+
+class PaginatedConversationsResponse(BaseModel):
+    """分页会话列表响应"""
+
+    items: list[ConversationSummary] = Field(default_factory=list, description="会话列表（按更新时间倒序）")
+    next_cursor: str | None = Field(None, description="下一页游标")
+    has_more: bool = Field(False, description="是否还有更多会话")
+
+
 class ToolCallResponse(BaseModel):
     """工具调用响应"""
 
@@ -60,9 +77,11 @@ class MessageResponse(BaseModel):
 
 
 class ConversationWithMessages(ConversationResponse):
-    """带消息的会话响应"""
+    """带消息的会话响应（最新的若干条消息）"""
 
     messages: list[MessageResponse] = []
+    next_cursor: str | None = Field(None, description="更早消息的游标（用于消息分页接口）")
+    has_more: bool = Field(False, description="是否还有更早的消息")
 
 
 class PaginatedMessagesResponse(BaseModel):
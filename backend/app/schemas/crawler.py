@@ -187,6 +187,15 @@ class CrawlTaskResponse(BaseModel):
     products_found: int
     products_created: int
     products_updated: int
+    http_fetch_count: int = 0
+    http_fetch_ms: int = 0
+    browser_fetch_count: int = 0
+    browser_fetch_ms: int = 0
+    fetch_escalations: int = 0
+    pages_not_modified: int = 0
+    llm_parse_count: int = 0
+    template_parse_count: int = 0
+    template_fallbacks: int = 0
     started_at: datetime | None
     finished_at: datetime | None
     error_message: str | None
@@ -230,6 +239,16 @@ class ParsedProductData(BaseModel):
     extra_metadata: dict | None = Field(None, description="其他信息")
 
 
+class SiteTemplateStats(BaseModel):
+    """站点模板解析统计（累计）"""
+
+    site_id: str
+    active_templates: int = Field(0, description="已启用的模板数")
+    template_parse_count: int = Field(0, description="模板选择器解析次数")
+    llm_parse_count: int = Field(0, description="LLM 解析次数")
+    hit_rate: float = Field(0.0, description="模板命中率：模板解析次数 / 总解析次数")
+
+
 class CrawlStats(BaseModel):
     """爬取统计"""
 
@@ -239,3 +258,4 @@ class CrawlStats(BaseModel):
     running_tasks: int = Field(0, description="运行中任务数")
     total_pages: int = Field(0, description="页面总数")
     total_products: int = Field(0, description="商品总数")
+    template_stats: list[SiteTemplateStats] = Field(default_factory=list, description="各站点模板解析命中情况")
@@ -214,6 +214,7 @@ class ServerMessagePayload(BaseModel):
     delivered_at: str | None = None  # 送达时间
     read_at: str | None = None  # 已读时间
     read_by: str | None = None  # 阅读者
+    seq: int | None = None  # 事件日志序号（重连 / SSE 续订时按 seq 去重）
 
 
 class ServerTypingPayload(BaseModel):
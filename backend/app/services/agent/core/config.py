@@ -5,6 +5,7 @@
 
 import hashlib
 import uuid
+from datetime import datetime
 from typing import Any
 
 from sqlalchemy import select
@@ -214,16 +215,33 @@ class AgentConfigLoader:
         agent: Agent,
     ) -> str:
         """计算配置版本哈希"""
-        parts = [
+        knowledge_config = agent.knowledge_config
+        return compute_config_version(
             agent.id,
-            str(agent.updated_at.timestamp()),
-        ]
-        if agent.knowledge_config:
-            parts.append(agent.knowledge_config.data_version or "")
-            parts.append(str(agent.knowledge_config.updated_at.timestamp()))
+            agent.updated_at,
+            knowledge_data_version=knowledge_config.data_version if knowledge_config else None,
+            knowledge_updated_at=knowledge_config.updated_at if knowledge_config else None,
+        )
+
+
+def compute_config_version(
+    agent_id: str,
+    updated_at: datetime,
+    *,
+    knowledge_data_version: str | None = None,
+    knowledge_updated_at: datetime | None = None,
+) -> str:
+    """计算配置版本哈希
+
+    AgentConfigLoader 与 AgentService 的轻量版本查询共用，保证两边结果可比较。
+    """
+    parts = [agent_id, str(updated_at.timestamp())]
+    if knowledge_updated_at is not None:
+        parts.append(knowledge_data_version or "")
+        parts.append(str(knowledge_updated_at.timestamp()))
 
-        content = "|".join(parts)
-        return hashlib.md5(content.encode()).hexdigest()[:16]
+    content = "|".join(parts)
+    return hashlib.md5(content.encode()).hexdigest()[:16]
 
 
 async def get_or_create_default_agent(session: AsyncSession) -> str:
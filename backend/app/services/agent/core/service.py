@@ -16,6 +16,7 @@
 
 import asyncio
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Any
 
@@ -28,16 +29,24 @@ from app.core.config import settings
 from app.core.database import get_db_context
 from app.core.llm import get_chat_model
 from app.core.logging import get_logger
-from app.models.agent import Agent
+from app.core.tracing import trace_span
+from app.models.agent import Agent, KnowledgeConfig
 from app.schemas.agent import AgentConfig
 from app.schemas.events import StreamEventType
-from app.services.agent.core.config import AgentConfigLoader, get_or_create_default_agent
+from app.services.agent.core.config import (
+    AgentConfigLoader,
+    compute_config_version,
+    get_or_create_default_agent,
+)
 from app.services.agent.core.factory import build_agent
 from app.services.agent.streams import BusinessResponseHandler
 from langgraph_agent_kit import ChatContext
 
 logger = get_logger("agent.service")
 
+# Agent 缓存统计项
+_CACHE_STAT_KEYS = ("hits", "misses", "coalesced", "builds", "build_failures", "rebuilds", "evictions")
+
 
 @dataclass
 class CachedConfig:
@@ -48,15 +57,33 @@ class CachedConfig:
     version: str  # 配置版本（用于校验）
 
 
+@dataclass
+class CachedAgent:
+    """带元数据的缓存 Agent 实例"""
+
+    agent: CompiledStateGraph
+    version: str  # 构建时的配置版本
+    checked_at: float  # 上次版本校验时间戳
+
+
 class AgentService:
     """Agent 服务 - 管理多 Agent 的生命周期
 
-    缓存键：(agent_id, mode)
+    缓存键：agent_id
+
+    Agent 缓存策略：
+    - 单飞构建：同一 agent_id 并发未命中时只构建一次，其余请求等待同一个构建任务
+    - LRU 上限：超过 AGENT_CACHE_MAX_SIZE 时淘汰最久未使用的实例
+    - 后台重建：命中时若超过 TTL 则后台校验版本，版本变化时在后台重建，
+      新实例就绪前继续使用旧实例
     """
 
     _instance: "AgentService | None" = None
-    _agents: dict[tuple[str, str], CompiledStateGraph]  # (agent_id, mode) -> agent
-    _agent_configs: dict[tuple[str, str], CachedConfig]  # (agent_id, mode) -> cached config
+    _agents: OrderedDict[str, CachedAgent]  # agent_id -> cached agent（LRU 顺序）
+    _agent_configs: OrderedDict[str, CachedConfig]  # agent_id -> cached config（LRU 顺序）
+    _building: dict[str, asyncio.Task[CompiledStateGraph]]  # agent_id -> 进行中的构建任务
+    _refreshing: set[asyncio.Task[None]]  # 后台版本校验/重建任务
+    _cache_stats: dict[str, int]
     _checkpointer: BaseCheckpointSaver | None = None
     _default_agent_id: str | None = None
     _init_lock: asyncio.Lock | None = None
@@ -65,8 +92,11 @@ class AgentService:
         """单例模式"""
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance._agents = {}
-            cls._instance._agent_configs = {}
+            cls._instance._agents = OrderedDict()
+            cls._instance._agent_configs = OrderedDict()
+            cls._instance._building = {}
+            cls._instance._refreshing = set()
+            cls._instance._cache_stats = dict.fromkeys(_CACHE_STAT_KEYS, 0)
             cls._instance._init_lock = asyncio.Lock()
         return cls._instance
 
@@ -84,14 +114,18 @@ class AgentService:
         """关闭连接"""
         from app.core.db.checkpointer import close_checkpointer
 
+        for task in list(self._refreshing):
+            task.cancel()
+
         try:
             await close_checkpointer()
         except Exception:
             pass
         finally:
             self._checkpointer = None
-            self._agents = {}
-            self._agent_configs = {}
+            self._agents = OrderedDict()
+            self._agent_configs = OrderedDict()
+            self._building = {}
 
     async def get_default_agent_id(self) -> str:
         """获取默认 Agent ID"""
@@ -131,6 +165,7 @@ class AgentService:
         # 检查缓存
         if cache_key in self._agent_configs:
             cached = self._agent_configs[cache_key]
+            self._agent_configs.move_to_end(cache_key)
 
             # TTL 为 0 或未过期，直接返回
             if ttl <= 0 or (now - cached.cached_at < ttl):
@@ -147,7 +182,7 @@ class AgentService:
                 )
                 return cached.config
 
-            # 版本已变，清除缓存
+            # 版本已变，清除配置缓存（Agent 实例由后台重建替换）
             logger.info(
                 "配置版本已变更，清除缓存",
                 agent_id=agent_id,
@@ -155,7 +190,6 @@ class AgentService:
                 new_version=current_version,
             )
             self._agent_configs.pop(cache_key, None)
-            self._agents.pop(cache_key, None)
 
         # 从数据库加载
         async with get_db_context() as session:
@@ -171,6 +205,7 @@ class AgentService:
             cached_at=now,
             version=config.config_version,
         )
+        self._evict_lru(self._agent_configs)
         return config
 
     async def _get_config_version(self, agent_id: str) -> str:
@@ -180,15 +215,28 @@ class AgentService:
             agent_id: Agent ID
 
         Returns:
-            版本字符串（基于 updated_at 时间戳）
+            版本字符串（与 AgentConfig.config_version 同一算法）
         """
         async with get_db_context() as session:
-            stmt = select(Agent.updated_at).where(Agent.id == agent_id)
+            stmt = (
+                select(
+                    Agent.updated_at,
+                    KnowledgeConfig.data_version,
+                    KnowledgeConfig.updated_at,
+                )
+                .outerjoin(KnowledgeConfig, Agent.knowledge_config_id == KnowledgeConfig.id)
+                .where(Agent.id == agent_id)
+            )
             result = await session.execute(stmt)
             row = result.first()
             if not row or row[0] is None:
                 return ""
-            return str(row[0].timestamp())
+            return compute_config_version(
+                agent_id,
+                row[0],
+                knowledge_data_version=row[1],
+                knowledge_updated_at=row[2],
+            )
 
     async def get_agent(
         self,
@@ -207,48 +255,173 @@ class AgentService:
         if agent_id is None:
             agent_id = await self.get_default_agent_id()
 
-        cache_key = agent_id
+        cached = self._agents.get(agent_id)
+        if cached is not None:
+            self._agents.move_to_end(agent_id)
+            self._cache_stats["hits"] += 1
+            self._schedule_refresh(agent_id, cached, use_structured_output)
+            return cached.agent
 
-        if cache_key not in self._agents:
-            # 加载配置
-            config = await self.get_agent_config(agent_id)
+        self._cache_stats["misses"] += 1
+        return await self._build_single_flight(agent_id, use_structured_output)
 
-            # 获取 checkpointer
-            checkpointer = await self._get_checkpointer()
+    async def _build_single_flight(
+        self,
+        agent_id: str,
+        use_structured_output: bool,
+    ) -> CompiledStateGraph:
+        """单飞构建：同一 agent_id 只有一个进行中的构建任务
 
-            # 构建 Agent（使用数据库 session 获取 LLM 配置）
-            async with get_db_context() as session:
-                agent = await build_agent(
-                    config=config,
-                    checkpointer=checkpointer,
-                    use_structured_output=use_structured_output,
-                    session=session,
-                )
+        构建在独立 task 中执行并用 shield 等待，
+        发起请求被取消（如客户端断开）不会中断其他等待者共享的构建。
+        """
+        task = self._building.get(agent_id)
+        if task is None:
+            task = asyncio.create_task(self._build_and_store(agent_id, use_structured_output))
+            self._building[agent_id] = task
+            task.add_done_callback(lambda t: self._on_build_done(agent_id, t))
+        else:
+            self._cache_stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _build_and_store(
+        self,
+        agent_id: str,
+        use_structured_output: bool,
+    ) -> CompiledStateGraph:
+        """构建 Agent 并写入缓存"""
+        started = time.perf_counter()
+
+        # 加载配置
+        config = await self.get_agent_config(agent_id)
+
+        # 获取 checkpointer
+        checkpointer = await self._get_checkpointer()
+
+        # 构建 Agent（使用数据库 session 获取 LLM 配置）
+        async with get_db_context() as session:
+            agent = await build_agent(
+                config=config,
+                checkpointer=checkpointer,
+                use_structured_output=use_structured_output,
+                session=session,
+            )
+        self._cache_stats["builds"] += 1
+
+        # 构建期间被 invalidate 时不写缓存，只把结果交给已在等待的请求
+        if self._building.get(agent_id) is asyncio.current_task():
+            self._agents[agent_id] = CachedAgent(
+                agent=agent,
+                version=config.config_version,
+                checked_at=time.time(),
+            )
+            self._agents.move_to_end(agent_id)
+            self._evict_lru(self._agents, count_stats=True)
+
+        logger.info(
+            "创建 Agent 实例",
+            agent_id=agent_id,
+            agent_type=config.type,
+            config_version=config.config_version,
+            duration_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+        return agent
+
+    def _on_build_done(self, agent_id: str, task: asyncio.Task[CompiledStateGraph]) -> None:
+        """构建任务结束：移除单飞登记，记录失败"""
+        if self._building.get(agent_id) is task:
+            del self._building[agent_id]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self._cache_stats["build_failures"] += 1
+
+    def _schedule_refresh(
+        self,
+        agent_id: str,
+        cached: CachedAgent,
+        use_structured_output: bool,
+    ) -> None:
+        """命中缓存时按 TTL 调度后台版本校验（不阻塞当前请求）"""
+        ttl = settings.AGENT_CACHE_TTL_SECONDS
+        now = time.time()
+        if ttl <= 0 or now - cached.checked_at < ttl or agent_id in self._building:
+            return
+
+        # 先推进校验时间，避免 TTL 到期后每个请求都调度一次
+        cached.checked_at = now
+        task = asyncio.create_task(self._refresh_agent(agent_id, cached.version, use_structured_output))
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def _refresh_agent(
+        self,
+        agent_id: str,
+        cached_version: str,
+        use_structured_output: bool,
+    ) -> None:
+        """后台校验配置版本，变化时重建并原子替换缓存实例"""
+        try:
+            current_version = await self._get_config_version(agent_id)
+            if current_version == cached_version:
+                return
 
-            self._agents[cache_key] = agent
             logger.info(
-                "创建 Agent 实例",
+                "配置版本已变更，后台重建 Agent",
                 agent_id=agent_id,
-                agent_type=config.type,
+                old_version=cached_version,
+                new_version=current_version,
             )
+            self._cache_stats["rebuilds"] += 1
+            # 丢弃旧配置，确保重建读取最新配置
+            self._agent_configs.pop(agent_id, None)
+            await self._build_single_flight(agent_id, use_structured_output)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 重建失败时保留旧实例继续服务，下个 TTL 周期再试
+            logger.warning("后台重建 Agent 失败，继续使用旧实例", agent_id=agent_id, error=str(e))
 
-        return self._agents[cache_key]
+    def _evict_lru(self, cache: OrderedDict[str, Any], *, count_stats: bool = False) -> None:
+        """按 AGENT_CACHE_MAX_SIZE 淘汰最久未使用的缓存项"""
+        max_size = settings.AGENT_CACHE_MAX_SIZE
+        if max_size <= 0:
+            return
+        while len(cache) > max_size:
+            evicted_id, _ = cache.popitem(last=False)
+            if count_stats:
+                self._cache_stats["evictions"] += 1
+                logger.info("Agent 缓存淘汰", agent_id=evicted_id, size=len(cache), max_size=max_size)
+
+    def get_cache_stats(self) -> dict[str, Any]:
+        """获取 Agent 缓存统计"""
+        return {
+            "size": len(self._agents),
+            "config_size": len(self._agent_configs),
+            "max_size": settings.AGENT_CACHE_MAX_SIZE,
+            "building": len(self._building),
+            **self._cache_stats,
+        }
 
     def invalidate_agent(self, agent_id: str) -> None:
         """使 Agent 缓存失效
 
+        进行中的构建不会被取消，但其结果不再写入缓存。
+
         Args:
             agent_id: Agent ID
         """
         self._agents.pop(agent_id, None)
         self._agent_configs.pop(agent_id, None)
+        self._building.pop(agent_id, None)
         logger.info("Agent 缓存已失效", agent_id=agent_id)
 
     def invalidate_all(self) -> None:
         """清空所有 Agent 缓存"""
         count = len(self._agents)
-        self._agents = {}
-        self._agent_configs = {}
+        self._agents = OrderedDict()
+        self._agent_configs = OrderedDict()
+        self._building = {}
         logger.info("所有 Agent 缓存已清空", count=count)
 
     async def chat_emit(
@@ -273,12 +446,15 @@ class AgentService:
         if emitter is None or not hasattr(emitter, "aemit"):
             raise RuntimeError("chat_emit 需要 context.emitter.aemit()")
 
+        trace = getattr(context, "trace", None)
+
         try:
-            # 获取 Agent
-            agent = await self.get_agent(agent_id=agent_id)
+            # 获取 Agent（命中缓存时只有查找开销）
+            with trace_span("agent.build", trace=trace, agent_id=agent_id):
+                agent = await self.get_agent(agent_id=agent_id)
 
-            # 获取模型实例
-            model = get_chat_model()
+                # 获取模型实例
+                model = get_chat_model()
         except Exception as e:
             # Agent 构建失败，通知前端
             error_msg = "智能助手初始化失败，可能是依赖服务（如 Qdrant）不可用，请稍后再试"
@@ -286,7 +462,6 @@ class AgentService:
                 "Agent 构建失败",
                 error=str(e),
                 agent_id=agent_id,
-                mode=mode,
                 conversation_id=conversation_id,
             )
             try:
@@ -314,27 +489,38 @@ class AgentService:
         agent_config: dict[str, Any] = {"configurable": {"thread_id": conversation_id}}
 
         try:
-            async for item in agent.astream(
-                agent_input,
-                config=agent_config,
-                context=context,
-                stream_mode="messages",
-            ):
-                msg = item[0] if isinstance(item, (tuple, list)) and item else item
-                await handler.handle_message(msg)
+            # 同时订阅 values 流：每个 step 结束后的内存态 state 直接随流返回，
+            # 从中读取 todos，避免结束时再 aget_state 反序列化整个 checkpoint（含全部历史消息）
+            todos: list[dict[str, Any]] | None = None
+            # agent.run 下挂记忆、LLM、工具等 span（图节点任务继承当前 span）
+            with trace_span("agent.run", trace=trace):
+                async for mode, data in agent.astream(
+                    agent_input,
+                    config=agent_config,
+                    context=context,
+                    stream_mode=["messages", "values"],
+                ):
+                    if mode == "values":
+                        if isinstance(data, dict) and "todos" in data:
+                            todos = data.get("todos")
+                        continue
+                    msg = data[0] if isinstance(data, (tuple, list)) and data else data
+                    if trace is not None:
+                        # messages 流为 (chunk, metadata)，按产生该 chunk 的图节点区分并发的 LLM 调用
+                        metadata = data[1] if isinstance(data, (tuple, list)) and len(data) > 1 else None
+                        trace.mark_first_token(
+                            metadata.get("langgraph_checkpoint_ns") if isinstance(metadata, dict) else None
+                        )
+                    await handler.handle_message(msg)
 
             await handler.finalize()
 
             # 发送最终的 todos
-            try:
-                final_state = await agent.aget_state(
-                    config={"configurable": {"thread_id": conversation_id}}
-                )
-                todos = final_state.values.get("todos")
-                if todos:
+            if todos:
+                try:
                     await emitter.aemit(StreamEventType.ASSISTANT_TODOS.value, {"todos": todos})
-            except Exception as e:
-                logger.warning("发送最终 todos 失败", error=str(e))
+                except Exception as e:
+                    logger.warning("发送最终 todos 失败", error=str(e))
 
         except Exception as e:
             logger.exception("chat_emit 失败", error=str(e), conversation_id=conversation_id)
@@ -5,6 +5,10 @@
 注意：LLM 调用级别的 SSE 事件（`llm.call.start` / `llm.call.end`）由
 `app.services.agent.middleware.llm_call_sse.SSEMiddleware` 负责发送；本中间件只做 logger
 记录，不发送任何 SSE 事件。
+
+回合耗时追踪（ChatContext.trace）也在这里记录：每次 LLM 调用一个 llm.call span
+（首 token 耗时、输出 token 数与速率），每次工具调用一个 tool.<name> span；
+同时按模型 / 工具名记录 /metrics 的耗时直方图。
 """
 
 import time
@@ -13,10 +17,14 @@ from collections.abc import Awaitable, Callable
 from typing import Any
 
 from langchain.agents.middleware.types import AgentMiddleware, ModelRequest, ModelResponse
-from langchain_core.messages import BaseMessage, get_buffer_string
+from langchain_core.messages import AIMessage, BaseMessage, get_buffer_string
+from langgraph.config import get_config
+from langgraph.prebuilt.tool_node import ToolCallRequest
 
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.core.metrics import LLM_DURATION, LLM_TTFT, TOOL_DURATION
+from app.core.tracing import trace_span
 
 logger = get_logger("middleware.llm")
 
@@ -259,6 +267,29 @@ def _get_model_identity(model: Any) -> dict[str, Any]:
     }
 
 
+def _get_trace(request: ModelRequest | ToolCallRequest) -> Any:
+    """从 runtime.context (ChatContext) 取回合追踪对象"""
+    runtime = getattr(request, "runtime", None)
+    chat_context = getattr(runtime, "context", None) if runtime is not None else None
+    return getattr(chat_context, "trace", None)
+
+
+def _stream_key() -> str | None:
+    """当前图节点的 checkpoint_ns（与 messages 流 metadata 的 langgraph_checkpoint_ns 一致）"""
+    try:
+        return get_config().get("metadata", {}).get("langgraph_checkpoint_ns")
+    except RuntimeError:
+        return None
+
+
+def _output_tokens(response: ModelResponse) -> int | None:
+    """响应中最后一条 AIMessage 的输出 token 数"""
+    for msg in reversed(response.result):
+        if isinstance(msg, AIMessage) and msg.usage_metadata:
+            return msg.usage_metadata.get("output_tokens")
+    return None
+
+
 class LoggingMiddleware(AgentMiddleware):
     """日志中间件
 
@@ -270,6 +301,7 @@ class LoggingMiddleware(AgentMiddleware):
     - 输出消息
     - 结构化响应
     - 调用耗时
+    - 回合追踪中的 LLM / 工具 span
 
     LLM 调用级别 SSE 事件发送不在这里处理，参见 `SSEMiddleware`。
     """
@@ -278,6 +310,42 @@ class LoggingMiddleware(AgentMiddleware):
         self,
         request: ModelRequest,
         handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        """记录 LLM 调用的输入输出、llm.call span 与耗时指标"""
+        identity = _get_model_identity(request.model)
+        model = str(identity["model_name"] or identity["model"] or identity["type"])
+        trace = _get_trace(request)
+
+        with LLM_DURATION.labels(model).time():
+            if trace is None:
+                return await self._log_model_call(request, handler)
+
+            with trace.llm_call(stream_key=_stream_key(), model=model) as span:
+                response = await self._log_model_call(request, handler)
+                span.set(output_tokens=_output_tokens(response))
+        # 首 token 耗时依赖流式输出时的标记，只在有回合追踪时可得
+        if "ttft_ms" in span.attributes:
+            LLM_TTFT.labels(model).observe(span.attributes["ttft_ms"] / 1000)
+        return response
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[Any]],
+    ) -> Any:
+        """工具调用 span（检索、重排等子步骤挂在其下）与耗时指标"""
+        tool_call = request.tool_call or {}
+        tool_name = tool_call.get("name", "unknown")
+        with (
+            TOOL_DURATION.labels(tool_name).time(),
+            trace_span(f"tool.{tool_name}", trace=_get_trace(request), tool_call_id=tool_call.get("id")),
+        ):
+            return await handler(request)
+
+    async def _log_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
     ) -> ModelResponse:
         """记录 LLM 调用的输入输出"""
         start_time = time.time()
@@ -7,7 +7,9 @@ from langchain_core.vectorstores import VectorStoreRetriever
 
 from app.core.config import get_settings
 from app.core.logging import get_logger
+from app.core.metrics import DEPENDENCY_DURATION
 from app.core.rerank import rerank_documents
+from app.core.tracing import trace_span
 from app.services.agent.retrieval.product import get_retriever
 
 logger = get_logger("enhanced_retriever")
@@ -263,11 +265,16 @@ async def enhanced_search(
     # 1. 向量相似度检索（检索更多结果以供后续过滤）
     # 优先使用异步版本（支持数据库配置）
     from app.services.agent.retrieval.product import get_retriever_async
-    retriever = await get_retriever_async(k=k * 2)
-    if retriever is None:
-        logger.warning("检索器不可用")
-        return []
-    docs = retriever.invoke(query)
+    with trace_span("retrieval.vector_search", k=k * 2) as span:
+        retriever = await get_retriever_async(k=k * 2)
+        if retriever is None:
+            logger.warning("检索器不可用")
+            return []
+        # 向量检索含查询向量化（embedding）与 Qdrant 查询
+        with DEPENDENCY_DURATION.labels("qdrant", "similarity_search").time():
+            docs = retriever.invoke(query)
+        if span is not None:
+            span.set(doc_count=len(docs))
 
     if not docs:
         logger.warning("向量检索无结果")
@@ -280,7 +287,8 @@ async def enhanced_search(
 
     # 3. 关键词过滤
     if enable_keyword_filter and keywords:
-        docs = filter_by_keywords(docs, keywords, min_match=1)
+        with trace_span("retrieval.keyword_filter"):
+            docs = filter_by_keywords(docs, keywords, min_match=1)
 
     if not docs:
         logger.warning("关键词过滤后无结果")
@@ -288,7 +296,8 @@ async def enhanced_search(
 
     # 4. 重排序
     if enable_rerank:
-        docs = await rerank_by_relevance(docs, query, keywords)
+        with trace_span("retrieval.rerank", doc_count=len(docs)):
+            docs = await rerank_by_relevance(docs, query, keywords)
 
     # 5. 返回前 k 个结果
     result = docs[:k]
@@ -1,20 +1,24 @@
-"""向量检索服务"""
+"""向量检索服务
 
-from functools import lru_cache
-from typing import TYPE_CHECKING
+qdrant_client / langchain_qdrant 导入耗时较长（约 1s），在首次创建客户端时才导入，
+不计入应用启动时间。
+"""
 
-from langchain_core.vectorstores import VectorStoreRetriever
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
+from __future__ import annotations
 
-if TYPE_CHECKING:
-    pass
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
 from app.core.config import settings
 from app.core.health import DependencyStatus, dependency_registry
 from app.core.llm import get_embeddings
 from app.core.logging import get_logger
 
+if TYPE_CHECKING:
+    from langchain_core.vectorstores import VectorStoreRetriever
+    from langchain_qdrant import QdrantVectorStore
+    from qdrant_client import QdrantClient
+
 logger = get_logger("retriever")
 
 
@@ -33,6 +37,8 @@ def get_qdrant_client() -> QdrantClient | None:
                 "port": settings.QDRANT_PORT,
             },
         )
+        from qdrant_client import QdrantClient
+
         client = QdrantClient(
             host=settings.QDRANT_HOST,
             port=settings.QDRANT_PORT,
@@ -104,6 +110,8 @@ async def get_vector_store_async() -> QdrantVectorStore | None:
                 "embedding_dimension": settings.EMBEDDING_DIMENSION,
             },
         )
+        from langchain_qdrant import QdrantVectorStore
+
         store = QdrantVectorStore(
             client=client,
             collection_name=settings.QDRANT_COLLECTION,
@@ -146,6 +154,8 @@ def get_vector_store() -> QdrantVectorStore | None:
                 "embedding_dimension": settings.EMBEDDING_DIMENSION,
             },
         )
+        from langchain_qdrant import QdrantVectorStore
+
         store = QdrantVectorStore(
             client=client,
             collection_name=settings.QDRANT_COLLECTION,
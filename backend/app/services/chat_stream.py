@@ -16,6 +16,8 @@ from langgraph_agent_kit import (
 )
 
 from app.core.logging import get_logger
+from app.core.metrics import orchestrator_queues
+from app.core.tracing import trace_span
 from app.services.conversation import ConversationService
 
 logger = get_logger("chat_stream")
@@ -43,6 +45,7 @@ class ChatStreamOrchestrator:
         agent_id: str | None = None,
         images: list[Any] | None = None,
         db: Any = None,  # 数据库会话（传递给 ChatContext，供工具使用）
+        trace: Any = None,  # 回合耗时追踪（传递给 ChatContext）
     ) -> None:
         self._conversation_service = conversation_service
         self._agent_service = agent_service
@@ -54,6 +57,7 @@ class ChatStreamOrchestrator:
         self._agent_id = agent_id
         self._images = images
         self._db = db
+        self._trace = trace
 
         self._seq = 0
         self._full_content = ""
@@ -64,6 +68,14 @@ class ChatStreamOrchestrator:
         self._tool_calls: dict[str, dict[str, Any]] = {}  # tool_call_id -> tool_call_data
         self._tool_call_start_times: dict[str, float] = {}  # tool_call_id -> start_time
 
+        self._domain_queue: asyncio.Queue[dict[str, Any]] | None = None
+        orchestrator_queues.track(self)
+
+    @property
+    def queue_depth(self) -> int:
+        """领域事件队列深度（/metrics 抓取时读取）"""
+        return self._domain_queue.qsize() if self._domain_queue is not None else 0
+
     def _next_seq(self) -> int:
         self._seq += 1
         return self._seq
@@ -85,6 +97,7 @@ class ChatStreamOrchestrator:
             loop = asyncio.get_running_loop()
             # 逐字推理会产生大量事件；队列容量适当加大，避免频繁 backpressure/丢弃
             domain_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=10000)
+            self._domain_queue = domain_queue
             emitter = QueueDomainEmitter(queue=domain_queue, loop=loop)
 
             chat_context = ChatContext(
@@ -93,6 +106,7 @@ class ChatStreamOrchestrator:
                 assistant_message_id=self._assistant_message_id,
                 emitter=emitter,
                 db=self._db,
+                trace=self._trace,
             )
 
             # Agent 只负责把 domain events 写入 emitter；Orchestrator 是唯一对外 SSE 出口
@@ -195,16 +209,21 @@ class ChatStreamOrchestrator:
 
             latency_ms = chat_context.response_latency_ms
 
-            await self._conversation_service.add_message(
-                conversation_id=self._conversation_id,
-                role="assistant",
-                content=self._full_content,
-                products=products_json,
-                message_id=self._assistant_message_id,
-                extra_metadata=extra_metadata if extra_metadata else None,
-                tool_calls_data=tool_calls_data,
-                latency_ms=latency_ms,
-            )
+            # 回合耗时摘要（落库 span 本身只出现在导出的追踪中）
+            if self._trace is not None:
+                extra_metadata["trace"] = self._trace.summary()
+
+            with trace_span("db.save_assistant_message", trace=self._trace):
+                await self._conversation_service.add_message(
+                    conversation_id=self._conversation_id,
+                    role="assistant",
+                    content=self._full_content,
+                    products=products_json,
+                    message_id=self._assistant_message_id,
+                    extra_metadata=extra_metadata if extra_metadata else None,
+                    tool_calls_data=tool_calls_data,
+                    latency_ms=latency_ms,
+                )
             logger.debug(
                 "已保存完整 assistant message",
                 message_id=self._assistant_message_id,
@@ -20,6 +20,8 @@ from langgraph_agent_kit import (
 from langgraph_agent_kit.core.context import ChatContext
 
 from app.core.logging import get_logger
+from app.core.metrics import orchestrator_queues
+from app.core.tracing import trace_span
 from app.services.conversation import ConversationService
 
 logger = get_logger("chat_stream_sdk")
@@ -72,16 +74,22 @@ async def _save_assistant_message(
 
     latency_ms = info.context.response_latency_ms
 
-    await conversation_service.add_message(
-        conversation_id=info.conversation_id,
-        role="assistant",
-        content=agg.full_content,
-        products=products_json,
-        message_id=info.assistant_message_id,
-        extra_metadata=extra_metadata if extra_metadata else None,
-        tool_calls_data=tool_calls_data,
-        latency_ms=latency_ms,
-    )
+    # 回合耗时摘要（落库 span 本身只出现在导出的追踪中）
+    trace = info.context.trace
+    if trace is not None:
+        extra_metadata["trace"] = trace.summary()
+
+    with trace_span("db.save_assistant_message", trace=trace):
+        await conversation_service.add_message(
+            conversation_id=info.conversation_id,
+            role="assistant",
+            content=agg.full_content,
+            products=products_json,
+            message_id=info.assistant_message_id,
+            extra_metadata=extra_metadata if extra_metadata else None,
+            tool_calls_data=tool_calls_data,
+            latency_ms=latency_ms,
+        )
     logger.debug(
         "已保存完整 assistant message (SDK v0.2)",
         message_id=info.assistant_message_id,
@@ -118,6 +126,7 @@ class ChatStreamOrchestratorSDK:
         agent_id: str | None = None,
         images: list[Any] | None = None,
         db: Any = None,
+        trace: Any = None,
     ) -> None:
         self._conversation_id = conversation_id
         self._user_id = user_id
@@ -125,6 +134,7 @@ class ChatStreamOrchestratorSDK:
         self._user_message_id = user_message_id
         self._assistant_message_id = assistant_message_id
         self._db = db
+        self._trace = trace
 
         # 构建 Orchestrator
         runner = EmbedEaseAgentRunner(agent_service, agent_id=agent_id)
@@ -146,6 +156,12 @@ class ChatStreamOrchestratorSDK:
                 on_error=on_error,
             ),
         )
+        orchestrator_queues.track(self)
+
+    @property
+    def queue_depth(self) -> int:
+        """领域事件队列深度（/metrics 抓取时读取）"""
+        return self._orchestrator.queue_depth
 
     async def run(self) -> AsyncGenerator[StreamEvent, None]:
         """运行编排流程（与旧版本 API 兼容）"""
@@ -156,5 +172,6 @@ class ChatStreamOrchestratorSDK:
             assistant_message_id=self._assistant_message_id,
             user_message_id=self._user_message_id,
             db=self._db,
+            trace=self._trace,
         ):
             yield event
@@ -1,5 +1,6 @@
 """会话服务"""
 
+import base64
 import re
 import uuid
 from datetime import datetime
@@ -21,6 +22,33 @@ from app.repositories.user import UserRepository
 
 logger = get_logger("conversation_service")
 
+_EMPTY_SUMMARY: dict[str, Any] = {
+    "message_count": 0,
+    "last_message_role": None,
+    "last_message_preview": None,
+    "last_message_at": None,
+}
+
+
+def encode_conversation_cursor(row: dict[str, Any]) -> str:
+    """会话列表游标：最后一条的 (updated_at, id)，URL 安全编码"""
+    raw = f"{row['updated_at'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_conversation_cursor(cursor: str) -> tuple[datetime, str]:
+    """解析会话列表游标
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        updated_at, conversation_id = raw.split("|", 1)
+        return datetime.fromisoformat(updated_at), conversation_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"无效的游标: {cursor}") from e
+
 
 class ConversationService:
     """会话服务"""
@@ -36,6 +64,67 @@ class ConversationService:
         """获取用户的所有会话"""
         return await self.conversation_repo.get_by_user_id(user_id)
 
+    async def list_conversation_page(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: str | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None, bool]:
+        """键集分页获取用户会话摘要（按更新时间倒序）
+
+        Args:
+            user_id: 用户 ID
+            limit: 每页数量
+            cursor: 上一页返回的 next_cursor
+
+        Returns:
+            (会话摘要行, 下一页游标, 是否还有更多)
+
+        Raises:
+            ValueError: 游标无效
+        """
+        after = decode_conversation_cursor(cursor) if cursor else None
+        rows = await self.conversation_repo.list_page(user_id, limit + 1, after)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        summaries = await self.message_repo.get_conversation_summaries([row["id"] for row in rows])
+        for row in rows:
+            row.update(summaries.get(row["id"], _EMPTY_SUMMARY))
+
+        next_cursor = encode_conversation_cursor(rows[-1]) if rows and has_more else None
+        return rows, next_cursor, has_more
+
+    async def get_conversation_detail(
+        self,
+        conversation_id: str,
+        message_limit: int,
+        include_tool_calls: bool = False,
+    ) -> dict[str, Any] | None:
+        """获取会话详情与最新的 message_limit 条消息（行字典，不构造 ORM 对象）
+
+        更早的消息通过返回的 next_cursor 调用消息分页接口获取。
+        """
+        conversation = await self.conversation_repo.get_row(conversation_id)
+        if conversation is None:
+            return None
+
+        messages, next_cursor, has_more = await self.message_repo.get_latest_rows(
+            conversation_id, message_limit
+        )
+        tool_calls = (
+            await self.tool_call_repo.get_rows_by_message_ids([m["id"] for m in messages])
+            if include_tool_calls
+            else {}
+        )
+        for message in messages:
+            message["tool_calls"] = tool_calls.get(message["id"], [])
+
+        conversation["messages"] = messages
+        conversation["next_cursor"] = next_cursor
+        conversation["has_more"] = has_more
+        return conversation
+
     async def get_conversation_with_messages(self, conversation_id: str) -> Conversation | None:
         """获取会话及其消息"""
         return await self.conversation_repo.get_with_messages(conversation_id)
@@ -4,11 +4,18 @@
 - CrawlerService: 核心爬取服务
 - PageParser: 页面解析器（支持 CSS 选择器和 LLM 解析）
 - CrawlerConfigService: 爬虫配置服务（动态启用/禁用）
+
+CrawlerService / PageParser 依赖较重（HTML 解析、LLM），按需导入，
+只读取爬虫开关的模块（应用启动、系统设置）不会加载它们。
 """
 
+from typing import TYPE_CHECKING
+
 from app.services.crawler.config_service import CrawlerConfigService, crawler_config_service
-from app.services.crawler.crawler_service import CrawlerService
-from app.services.crawler.page_parser import PageParser
+
+if TYPE_CHECKING:
+    from app.services.crawler.crawler_service import CrawlerService
+    from app.services.crawler.page_parser import PageParser
 
 __all__ = [
     "CrawlerConfigService",
@@ -16,3 +23,15 @@ __all__ = [
     "PageParser",
     "crawler_config_service",
 ]
+
+
+def __getattr__(name: str):
+    if name == "CrawlerService":
+        from app.services.crawler.crawler_service import CrawlerService
+
+        return CrawlerService
+    if name == "PageParser":
+        from app.services.crawler.page_parser import PageParser
+
+        return PageParser
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
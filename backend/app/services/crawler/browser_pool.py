@@ -0,0 +1,78 @@
+"""浏览器上下文池
+
+爬取 worker 共享一组可复用的 BrowserContext：
+- 每个 worker 抓取时借出一个上下文，在其中打开/关闭 Page
+- 上下文在整个爬取任务内复用（cookie、HTTP 缓存、连接均可复用），
+  避免每个 URL 都建立全新的浏览器环境
+- 上下文按需创建，数量不超过池大小；浏览器本身也在首次借出时才启动
+  （HTTP 层即可完成抓取的任务不会启动浏览器）
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
+from app.core.logging import get_logger
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext
+
+logger = get_logger("crawler.browser_pool")
+
+
+class BrowserContextPool:
+    """浏览器上下文池"""
+
+    def __init__(
+        self,
+        browser_factory: Callable[[], Awaitable[Browser]],
+        size: int,
+        user_agent: str | None = None,
+    ):
+        """
+        Args:
+            browser_factory: 获取浏览器实例的函数（首次创建上下文时调用）
+            size: 最大上下文数量（通常等于并发 worker 数）
+            user_agent: 上下文使用的 User-Agent
+        """
+        self._browser_factory = browser_factory
+        self._size = max(1, size)
+        self._user_agent = user_agent
+        self._idle: asyncio.Queue[BrowserContext] = asyncio.Queue()
+        self._contexts: list[BrowserContext] = []
+        self._create_lock = asyncio.Lock()
+
+    async def _new_context(self) -> BrowserContext:
+        browser = await self._browser_factory()
+        context = await browser.new_context(user_agent=self._user_agent)
+        self._contexts.append(context)
+        logger.debug("创建浏览器上下文", pool_size=len(self._contexts))
+        return context
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[BrowserContext]:
+        """借出一个上下文，使用完毕自动归还"""
+        context: BrowserContext | None = None
+        if self._idle.empty():
+            async with self._create_lock:
+                if self._idle.empty() and len(self._contexts) < self._size:
+                    context = await self._new_context()
+        if context is None:
+            context = await self._idle.get()
+        try:
+            yield context
+        finally:
+            self._idle.put_nowait(context)
+
+    async def close(self) -> None:
+        """关闭所有上下文"""
+        for context in self._contexts:
+            try:
+                await context.close()
+            except Exception as e:
+                logger.warning("关闭浏览器上下文失败，忽略", error=str(e))
+        self._contexts = []
+        self._idle = asyncio.Queue()
@@ -0,0 +1,391 @@
+"""多站点爬取调度
+
+每个站点的爬取任务各自运行 worker；多个站点同时爬取时由进程内的协调器统一约束资源：
+- 站点并发：同时运行的站点数不超过 CRAWLER_MAX_CONCURRENT_SITES，其余排队，
+  next_crawl_at 已过期（越早越优先）的站点先出队
+- 浏览器：所有站点共享不超过 CRAWLER_MAX_BROWSERS 个浏览器进程，站点分配到负载最低的浏览器，
+  各自使用独立上下文；浏览器无站点使用时关闭
+- 页面与 LLM 调用：全局上限 CRAWLER_MAX_PAGES_IN_FLIGHT / CRAWLER_MAX_LLM_CALLS，
+  名额释放时分给「已占用数 / 权重」最小的站点（加权公平），过期站点权重为 CRAWLER_OVERDUE_WEIGHT
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+from collections import defaultdict, deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser
+
+logger = get_logger("crawler.scheduler")
+
+
+class FairLimiter:
+    """跨站点的加权公平信号量
+
+    名额空闲时直接授予；否则排队，名额释放时在有等待者的站点中选择
+    「已占用数 / 权重」最小者（相同时选最久未获得名额者），同一站点内先到先得。
+    capacity <= 0 时不限制。
+    """
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = capacity
+        self._in_use = 0
+        self._held: defaultdict[str, int] = defaultdict(int)
+        self._weights: dict[str, float] = {}
+        self._waiters: dict[str, deque[asyncio.Future[None]]] = {}
+        self._grant_seq = itertools.count(1)
+        self._last_grant: dict[str, int] = {}
+
+    def set_weight(self, site_id: str, weight: float) -> None:
+        """设置站点权重（份额倍数）"""
+        self._weights[site_id] = max(weight, 0.01)
+
+    def remove_site(self, site_id: str) -> None:
+        """站点爬取结束后清理权重与统计"""
+        self._weights.pop(site_id, None)
+        if not self._held.get(site_id) and site_id not in self._waiters:
+            self._held.pop(site_id, None)
+            self._last_grant.pop(site_id, None)
+
+    @asynccontextmanager
+    async def acquire(self, site_id: str) -> AsyncIterator[None]:
+        """为站点占用一个名额，退出时归还"""
+        if self.capacity <= 0:
+            yield
+            return
+
+        if self._in_use < self.capacity and not self._waiters:
+            self._grant(site_id)
+        else:
+            future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(site_id, deque()).append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # 已获得名额但等待方被取消：直接归还
+                    self._release(site_id)
+                else:
+                    self._discard_waiter(site_id, future)
+                raise
+
+        try:
+            yield
+        finally:
+            self._release(site_id)
+
+    def _grant(self, site_id: str) -> None:
+        self._in_use += 1
+        self._held[site_id] += 1
+        self._last_grant[site_id] = next(self._grant_seq)
+
+    def _release(self, site_id: str) -> None:
+        self._in_use -= 1
+        self._held[site_id] -= 1
+        self._wake()
+
+    def _discard_waiter(self, site_id: str, future: asyncio.Future[None]) -> None:
+        waiters = self._waiters.get(site_id)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(future)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._waiters[site_id]
+
+    def _share(self, site_id: str) -> tuple[float, int]:
+        return self._held[site_id] / self._weights.get(site_id, 1.0), self._last_grant.get(site_id, 0)
+
+    def _wake(self) -> None:
+        while self._in_use < self.capacity and self._waiters:
+            site_id = min(self._waiters, key=self._share)
+            waiters = self._waiters[site_id]
+            future = waiters.popleft()
+            if not waiters:
+                del self._waiters[site_id]
+            if future.done():  # 已取消，尚未从队列移除
+                continue
+            self._grant(site_id)
+            future.set_result(None)
+
+    def get_stats(self) -> dict:
+        """当前占用情况"""
+        return {
+            "capacity": self.capacity,
+            "in_use": self._in_use,
+            "waiting": sum(len(w) for w in self._waiters.values()),
+            "by_site": {site_id: held for site_id, held in self._held.items() if held},
+        }
+
+
+class SharedBrowsers:
+    """站点共享的浏览器进程（不超过 max_browsers 个）"""
+
+    def __init__(self, max_browsers: int):
+        self.max_browsers = max(1, max_browsers)
+        self._playwright = None
+        self._load: dict[Browser, int] = {}
+        self._assigned: dict[str, Browser] = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, site_id: str) -> Browser:
+        """为站点分配浏览器：未达上限时启动新浏览器，否则复用负载最低的浏览器"""
+        async with self._lock:
+            browser = self._assigned.get(site_id)
+            if browser is not None and browser.is_connected():
+                return browser
+            if browser is not None:
+                # 浏览器已崩溃：丢弃后重新分配
+                self._load.pop(browser, None)
+
+            for dead in [b for b in self._load if not b.is_connected()]:
+                del self._load[dead]
+
+            if len(self._load) < self.max_browsers:
+                browser = await self._launch()
+                self._load[browser] = 0
+            else:
+                browser = min(self._load, key=self._load.__getitem__)
+            self._load[browser] += 1
+            self._assigned[site_id] = browser
+            return browser
+
+    async def release(self, site_id: str) -> None:
+        """站点爬取结束：浏览器无其他站点使用时关闭"""
+        async with self._lock:
+            browser = self._assigned.pop(site_id, None)
+            if browser is None or browser not in self._load:
+                return
+            self._load[browser] -= 1
+            if self._load[browser] > 0:
+                return
+            del self._load[browser]
+            await self._close_browser(browser)
+            if not self._load:
+                await self._stop_playwright()
+
+    async def _launch(self) -> Browser:
+        if self._playwright is None:
+            # 首次启动浏览器时才导入 Playwright（HTTP 层即可完成的爬取不需要）
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+        browser = await self._playwright.chromium.launch(
+            headless=settings.CRAWLER_HEADLESS,
+            args=[
+                "--disable-blink-features=AutomationControlled",
+                "--disable-dev-shm-usage",
+                "--no-sandbox",
+            ],
+        )
+        logger.info("浏览器实例已启动", browsers=len(self._load) + 1, max_browsers=self.max_browsers)
+        return browser
+
+    @staticmethod
+    async def _close_browser(browser: Browser) -> None:
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.warning("关闭浏览器失败，忽略", error=str(e))
+        logger.info("浏览器实例已关闭")
+
+    async def _stop_playwright(self) -> None:
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.warning("停止 Playwright 失败，忽略", error=str(e))
+            finally:
+                self._playwright = None
+
+    async def close(self) -> None:
+        """关闭所有浏览器（应用退出时调用）"""
+        async with self._lock:
+            for browser in list(self._load):
+                await self._close_browser(browser)
+            self._load.clear()
+            self._assigned.clear()
+            await self._stop_playwright()
+
+    @property
+    def browser_count(self) -> int:
+        return len(self._load)
+
+
+class CrawlCoordinator:
+    """进程内多站点爬取协调器"""
+
+    def __init__(
+        self,
+        *,
+        max_sites: int | None = None,
+        max_browsers: int | None = None,
+        max_pages: int | None = None,
+        max_llm_calls: int | None = None,
+        overdue_weight: float | None = None,
+    ):
+        """
+        Args:
+            max_sites: 同时爬取的站点数，默认取 CRAWLER_MAX_CONCURRENT_SITES
+            max_browsers: 浏览器进程上限，默认取 CRAWLER_MAX_BROWSERS
+            max_pages: 全局进行中页面上限，默认取 CRAWLER_MAX_PAGES_IN_FLIGHT
+            max_llm_calls: 全局 LLM 调用上限，默认取 CRAWLER_MAX_LLM_CALLS
+            overdue_weight: 过期站点的份额倍数，默认取 CRAWLER_OVERDUE_WEIGHT
+        """
+        self.max_sites = max(
+            1, settings.CRAWLER_MAX_CONCURRENT_SITES if max_sites is None else max_sites
+        )
+        self.overdue_weight = (
+            settings.CRAWLER_OVERDUE_WEIGHT if overdue_weight is None else overdue_weight
+        )
+        self.browsers = SharedBrowsers(
+            settings.CRAWLER_MAX_BROWSERS if max_browsers is None else max_browsers
+        )
+        self.pages = FairLimiter(
+            "pages", settings.CRAWLER_MAX_PAGES_IN_FLIGHT if max_pages is None else max_pages
+        )
+        self.llm = FairLimiter(
+            "llm", settings.CRAWLER_MAX_LLM_CALLS if max_llm_calls is None else max_llm_calls
+        )
+        self._running: set[str] = set()
+        self._queue: list[tuple[tuple[bool, datetime], int, str, asyncio.Future[None]]] = []
+        self._queued: set[str] = set()
+        self._seq = itertools.count()
+        self._tasks: set[asyncio.Task] = set()
+
+    def is_scheduled(self, site_id: str) -> bool:
+        """站点是否正在爬取或排队"""
+        return site_id in self._running or site_id in self._queued
+
+    def submit(
+        self,
+        site_id: str,
+        next_crawl_at: datetime | None,
+        run: Callable[[], Awaitable[None]],
+    ) -> asyncio.Task:
+        """提交站点爬取，在后台排队执行
+
+        Args:
+            site_id: 站点 ID
+            next_crawl_at: 站点计划爬取时间（为空视为已过期：从未爬取过）
+            run: 执行爬取的协程函数
+
+        Raises:
+            ValueError: 站点已在爬取或排队
+        """
+        if self.is_scheduled(site_id):
+            raise ValueError(f"站点已在爬取队列中: {site_id}")
+        self._queued.add(site_id)
+        task = asyncio.create_task(self._run_site(site_id, next_crawl_at, run))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run_site(
+        self,
+        site_id: str,
+        next_crawl_at: datetime | None,
+        run: Callable[[], Awaitable[None]],
+    ) -> None:
+        overdue = next_crawl_at is None or next_crawl_at <= datetime.now()
+        try:
+            await self._wait_site_slot(site_id, overdue, next_crawl_at)
+        finally:
+            self._queued.discard(site_id)
+
+        weight = self.overdue_weight if overdue else 1.0
+        self.pages.set_weight(site_id, weight)
+        self.llm.set_weight(site_id, weight)
+        logger.info(
+            "站点开始爬取",
+            site_id=site_id,
+            overdue=overdue,
+            running=len(self._running),
+            queued=len(self._queue),
+        )
+        try:
+            await run()
+        finally:
+            self._running.discard(site_id)
+            self.pages.remove_site(site_id)
+            self.llm.remove_site(site_id)
+            self._wake_sites()
+
+    async def _wait_site_slot(
+        self, site_id: str, overdue: bool, next_crawl_at: datetime | None
+    ) -> None:
+        if len(self._running) < self.max_sites and not self._queue:
+            self._running.add(site_id)
+            return
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        # 过期站点优先，其次计划时间越早越优先，相同时先到先得
+        priority = (not overdue, next_crawl_at or datetime.min)
+        heapq.heappush(self._queue, (priority, next(self._seq), site_id, future))
+        logger.info("站点爬取排队", site_id=site_id, overdue=overdue, queued=len(self._queue))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._running.discard(site_id)
+                self._wake_sites()
+            raise
+
+    def _wake_sites(self) -> None:
+        while len(self._running) < self.max_sites and self._queue:
+            _, _, site_id, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            self._running.add(site_id)
+            future.set_result(None)
+
+    def get_stats(self) -> dict:
+        """当前调度状态"""
+        return {
+            "running_sites": sorted(self._running),
+            "queued_sites": [site_id for _, _, site_id, f in sorted(self._queue) if not f.done()],
+            "browsers": self.browsers.browser_count,
+            "pages": self.pages.get_stats(),
+            "llm": self.llm.get_stats(),
+        }
+
+    async def close(self) -> None:
+        """取消排队与运行中的爬取，关闭浏览器（应用退出时调用）"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.browsers.close()
+
+
+# 全局单例
+_coordinator: CrawlCoordinator | None = None
+
+
+def get_crawl_coordinator() -> CrawlCoordinator:
+    """获取爬取协调器单例"""
+    global _coordinator
+    if _coordinator is None:
+        _coordinator = CrawlCoordinator()
+    return _coordinator
+
+
+async def shutdown_crawl_coordinator() -> None:
+    """关闭爬取协调器（未创建时为空操作）"""
+    global _coordinator
+    if _coordinator is not None:
+        await _coordinator.close()
+        _coordinator = None
@@ -3,12 +3,18 @@
 提供网站爬取、页面解析和商品导入的完整流程
 """
 
+from __future__ import annotations
+
 import asyncio
 import hashlib
 import json
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
+from functools import partial
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
 
-from playwright.async_api import Browser, Page, async_playwright
+from croniter import croniter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
@@ -17,17 +23,55 @@ from app.core.database import get_db_context
 from app.core.logging import get_logger
 from app.models.crawler import CrawlPageStatus, CrawlSiteStatus, CrawlTaskStatus
 from app.repositories.crawler import (
+    CrawlFrontierRepository,
     CrawlPageRepository,
     CrawlSiteRepository,
     CrawlTaskRepository,
+    CrawlTemplateRepository,
 )
 from app.repositories.product import ProductRepository
-from app.schemas.crawler import ExtractionConfig, ParsedProductData
-from app.services.crawler.page_parser import PageParser
+from app.schemas.crawler import ExtractionConfig, ExtractionMode, ParsedProductData
+from app.services.crawler.browser_pool import BrowserContextPool
+from app.services.crawler.crawl_scheduler import get_crawl_coordinator
+from app.services.crawler.fetcher import HttpFetcher, TieredFetcher
+from app.services.crawler.frontier import CrawlFrontier
+from app.services.crawler.html_store import HtmlStore, load_html
+from app.services.crawler.page_parser import PageAnalysis, PageParser
+from app.services.crawler.politeness import HostPoliteness
+from app.services.crawler.sitemap import fetch_sitemap_entries
+from app.services.crawler.template_learner import TemplateLearner
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Page
 
 logger = get_logger("crawler.service")
 
 
+@dataclass
+class _CrawlRun:
+    """单次爬取任务的运行状态（worker 间共享）"""
+
+    site_id: str
+    task_id: int
+    max_pages: int
+    max_depth: int
+    link_pattern: str | None
+    extraction_config: ExtractionConfig | None
+    frontier: CrawlFrontier
+    politeness: HostPoliteness
+    fetcher: TieredFetcher
+    templates: TemplateLearner | None = None  # 模板学习器（未启用时为 None）
+    html_store: HtmlStore | None = None  # 页面内容编码器（压缩 + 站点字典）
+    # 已爬页面：url -> (crawled_at, etag, last_modified)
+    known_pages: dict[str, tuple[datetime, str | None, str | None]] = field(default_factory=dict)
+    sitemap_lastmod: dict[str, datetime | None] = field(default_factory=dict)  # url -> lastmod
+    pages_crawled: int = 0  # 已爬取页数（含断点恢复的历史进度）
+    in_flight: int = 0  # 进行中的页面数
+    pages_since_checkpoint: int = 0
+    cond: asyncio.Condition = field(default_factory=asyncio.Condition)
+    checkpoint_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
 class CrawlerService:
     """核心爬取服务
 
@@ -45,43 +89,24 @@ class CrawlerService:
         self.page_repo = CrawlPageRepository(session)
         self.product_repo = ProductRepository(session)
         self.parser = PageParser()
+        # 多站点共享的资源上限（浏览器、进行中页面、LLM 调用）
+        self.coordinator = get_crawl_coordinator()
 
-        # 浏览器实例（延迟初始化）
+        # 浏览器实例（延迟分配，多站点共享）
         self._browser: Browser | None = None
-        self._playwright = None
+        self._site_id: str | None = None
 
     async def _get_browser(self) -> Browser:
-        """获取浏览器实例（延迟初始化）"""
+        """获取本站点分配到的共享浏览器（延迟分配）"""
         if self._browser is None:
-            self._playwright = await async_playwright().start()
-            self._browser = await self._playwright.chromium.launch(
-                headless=settings.CRAWLER_HEADLESS,
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--disable-dev-shm-usage",
-                    "--no-sandbox",
-                ],
-            )
-            logger.info("浏览器实例已启动")
+            self._browser = await self.coordinator.browsers.acquire(self._site_id or "")
         return self._browser
 
     async def close(self):
-        """关闭浏览器实例"""
+        """归还浏览器（无其他站点使用时由协调器关闭）"""
         if self._browser:
-            try:
-                await self._browser.close()
-            except Exception as e:
-                logger.warning("关闭浏览器失败，忽略", error=str(e))
-            finally:
-                self._browser = None
-        if self._playwright:
-            try:
-                await self._playwright.stop()
-            except Exception as e:
-                logger.warning("停止 Playwright 失败，忽略", error=str(e))
-            finally:
-                self._playwright = None
-        logger.info("浏览器实例已关闭")
+            self._browser = None
+            await self.coordinator.browsers.release(self._site_id or "")
 
     async def crawl_site(self, site_id: str) -> int:
         """执行站点爬取任务
@@ -100,14 +125,19 @@ class CrawlerService:
         if site.status != CrawlSiteStatus.ACTIVE.value:
             raise ValueError(f"站点未启用: {site_id}")
 
+        if self.coordinator.is_scheduled(site_id):
+            raise ValueError(f"站点已在爬取队列中: {site_id}")
+
         # 创建任务
         task = await self.task_repo.create_task(site_id)
         task_id = task.id
         logger.info("创建爬取任务", site_id=site_id, task_id=task_id)
 
-        # 异步执行爬取（使用独立的数据库会话，避免 session 生命周期冲突）
+        # 交给协调器排队执行（使用独立的数据库会话，避免 session 生命周期冲突）
         # 注意：不能直接使用当前 self.session，因为调用方的 session 可能在后台任务执行前就已提交/关闭
-        asyncio.create_task(self._run_with_new_session(site_id, task_id))
+        self.coordinator.submit(
+            site_id, site.next_crawl_at, partial(self._run_with_new_session, site_id, task_id)
+        )
 
         return task_id
 
@@ -135,7 +165,16 @@ class CrawlerService:
                 await service.close()
 
     async def _execute_crawl(self, site_id: str, task_id: int) -> None:
-        """执行爬取任务（内部方法）"""
+        """执行爬取任务（内部方法）
+
+        多个 worker 并发从 frontier 取 URL，共享浏览器上下文池，
+        按 host 令牌桶限速；frontier 周期性持久化，中断后下次爬取从断点继续。
+        """
+        run: _CrawlRun | None = None
+        completed = False
+        self._site_id = site_id
+        # LLM 提取调用受全局上限约束，按站点公平分配
+        self.parser = PageParser(llm_gate=partial(self.coordinator.llm.acquire, site_id))
         try:
             # 更新任务状态为运行中
             await self.task_repo.update_task_status(task_id, CrawlTaskStatus.RUNNING)
@@ -145,6 +184,9 @@ class CrawlerService:
             if not site:
                 raise ValueError(f"站点不存在: {site_id}")
 
+            # 立即提交：爬取期间不持有本会话的写事务（SQLite 单写锁会阻塞 worker 的页面写入）
+            await self.session.commit()
+
             # 解析提取配置
             extraction_config = None
             if site.extraction_config:
@@ -154,102 +196,104 @@ class CrawlerService:
                 except Exception as e:
                     logger.warning("解析提取配置失败，使用 LLM 模式", error=str(e))
 
-            # 初始化爬取队列
-            visited_urls: set[str] = set()
-            enqueued_urls: set[str] = set()  # 已入队但未处理的 URL
-            queue: list[tuple[str, int]] = [(site.start_url, 0)]  # (url, depth)
-            enqueued_urls.add(site.start_url)  # 起始 URL 标记为已入队
-
-            pages_crawled = 0
-            max_pages = site.max_pages
-            max_depth = site.max_depth
-            crawl_delay = site.crawl_delay
+            # 初始化 frontier（存在中断的爬取时从断点恢复）
+            frontier = await self._load_frontier(site_id, site.start_url)
+            concurrency = max(1, settings.CRAWLER_CONCURRENCY)
 
-            logger.info(
-                "开始爬取",
-                site_id=site_id,
-                start_url=site.start_url,
-                max_pages=max_pages,
-                max_depth=max_depth,
-            )
-
-            # 获取浏览器
-            browser = await self._get_browser()
-
-            while queue and pages_crawled < max_pages:
-                url, depth = queue.pop(0)
-
-                # 从已入队集合中移除（即将处理）
-                enqueued_urls.discard(url)
+            pool = BrowserContextPool(self._get_browser, concurrency, settings.CRAWLER_USER_AGENT)
 
-                logger.info(
-                    "开始处理页面",
-                    url=url,
-                    depth=depth,
-                    queue_remaining=len(queue),
-                    pages_crawled=pages_crawled,
-                )
-
-                # 跳过已访问的 URL（本次任务内去重）
-                if url in visited_urls:
-                    logger.info("页面已处理，跳过", url=url, depth=depth)
-                    continue
-                visited_urls.add(url)
-
-                try:
-                    # 爬取页面
-                    html_content = await self._fetch_page(
-                        browser,
+            async def browser_fetch(url: str) -> str | None:
+                async with pool.acquire() as context:
+                    return await self._fetch_page(
+                        context,
                         url,
                         is_spa=site.is_spa,
                         wait_for_selector=site.wait_for_selector,
                         wait_timeout=site.wait_timeout,
                     )
 
-                    if not html_content:
-                        logger.warning("页面内容为空", url=url)
-                        continue
+            # HTTP 抓取器始终创建：即使正文走浏览器，条件请求与 sitemap 也经由 HTTP
+            fetcher = TieredFetcher(
+                HttpFetcher(concurrency=concurrency),
+                browser_fetch,
+                is_spa=site.is_spa,
+                wait_for_selector=site.wait_for_selector,
+                http_first=settings.CRAWLER_HTTP_FIRST,
+            )
 
-                    # 使用独立会话处理单个页面（立即提交事务）
-                    new_links = await self._process_page(
-                        site_id=site_id,
-                        task_id=task_id,
-                        url=url,
-                        depth=depth,
-                        html_content=html_content,
-                        max_depth=max_depth,
-                        link_pattern=site.link_pattern,
-                        extraction_config=extraction_config,
-                    )
+            run = _CrawlRun(
+                site_id=site_id,
+                task_id=task_id,
+                max_pages=site.max_pages,
+                max_depth=site.max_depth,
+                link_pattern=site.link_pattern,
+                extraction_config=extraction_config,
+                frontier=frontier,
+                politeness=HostPoliteness(site.crawl_delay, burst=settings.CRAWLER_HOST_BURST),
+                fetcher=fetcher,
+                templates=await self._load_templates(site_id, extraction_config),
+                html_store=await self._load_html_store(site_id),
+                pages_crawled=frontier.done_count,
+            )
 
-                    pages_crawled += 1
+            logger.info(
+                "开始爬取",
+                site_id=site_id,
+                start_url=site.start_url,
+                max_pages=run.max_pages,
+                max_depth=run.max_depth,
+                concurrency=concurrency,
+                resumed_done=frontier.done_count,
+                queued=len(frontier),
+            )
 
-                    # 将新链接加入队列
-                    for link in new_links:
-                        if link not in visited_urls and link not in enqueued_urls:
-                            queue.append((link, depth + 1))
-                            enqueued_urls.add(link)
+            try:
+                await self._prepare_incremental(run, site.start_url)
+                await asyncio.gather(*(self._crawl_worker(run) for _ in range(concurrency)))
+            finally:
+                await fetcher.close()
+                await pool.close()
 
-                    # 延迟
-                    if crawl_delay > 0:
-                        await asyncio.sleep(crawl_delay)
+            completed = True
 
-                except Exception as e:
-                    logger.error("爬取页面失败", url=url, error=str(e))
-                    continue
+            # 爬取完成，清空持久化的 frontier，保存学习到的模板，清理不再引用的页面内容
+            async with get_crawler_db() as crawler_session:
+                await CrawlFrontierRepository(crawler_session).clear_site(site_id)
+                if run.templates:
+                    await CrawlTemplateRepository(crawler_session).save(
+                        site_id, run.templates.drain_changes()
+                    )
+                page_repo = CrawlPageRepository(crawler_session)
+                orphan_blobs = await page_repo.delete_orphan_blobs(site_id)
+                blob_count, raw_size, stored_size = await page_repo.storage_stats(site_id)
+            logger.info(
+                "页面内容存储",
+                site_id=site_id,
+                blobs=blob_count,
+                raw_bytes=raw_size,
+                stored_bytes=stored_size,
+                orphans_removed=orphan_blobs,
+                dict_id=run.html_store.dict_id if run.html_store else None,
+            )
 
-            # 更新站点爬取时间
-            await self.site_repo.update_crawl_time(
-                site_id, datetime.now(), None  # next_crawl_at 由调度器计算
+            # 更新站点爬取时间（下次计划时间用于多站点排队时判断是否过期）
+            now = datetime.now()
+            next_crawl_at = (
+                croniter(site.cron_expression, now).get_next(datetime)
+                if site.cron_expression and croniter.is_valid(site.cron_expression)
+                else None
             )
+            await self.site_repo.update_crawl_time(site_id, now, next_crawl_at)
 
             # 更新任务状态为完成
+            await self.task_repo.set_run_stats(task_id, self._run_stats(run))
             await self.task_repo.update_task_status(task_id, CrawlTaskStatus.COMPLETED)
             logger.info(
                 "爬取任务完成",
                 site_id=site_id,
                 task_id=task_id,
-                pages_crawled=pages_crawled,
+                pages_crawled=run.pages_crawled,
+                **self._run_stats(run),
             )
 
         except Exception as e:
@@ -258,6 +302,259 @@ class CrawlerService:
                 task_id, CrawlTaskStatus.FAILED, error_message=str(e)
             )
 
+        finally:
+            # 未完成（失败或被取消）时保存进度，供下次续爬
+            if run is not None and not completed:
+                await self._checkpoint_frontier(run)
+
+    async def _load_frontier(self, site_id: str, start_url: str) -> CrawlFrontier:
+        """加载站点 frontier：存在未完成的持久化队列则恢复，否则从 start_url 开始"""
+        frontier = CrawlFrontier()
+        async with get_crawler_db() as crawler_session:
+            frontier_repo = CrawlFrontierRepository(crawler_session)
+            queued, done = await frontier_repo.load(site_id)
+            if queued:
+                frontier.restore(queued, done)
+                logger.info(
+                    "从断点恢复爬取",
+                    site_id=site_id,
+                    queued=len(queued),
+                    done=len(done),
+                )
+                return frontier
+            if done:
+                await frontier_repo.clear_site(site_id)
+
+        frontier.push(start_url, 0)
+        return frontier
+
+    async def _prepare_incremental(self, run: "_CrawlRun", start_url: str) -> None:
+        """准备增量重爬：加载已爬页面的校验器，读取 sitemap 播种 frontier
+
+        sitemap 中新增或 lastmod 晚于上次爬取的页面以最高优先级入队；
+        未变化的页面不主动入队，经链接发现时也会直接跳过抓取。
+        """
+        async with get_crawler_db() as crawler_session:
+            run.known_pages = await CrawlPageRepository(crawler_session).get_validators(run.site_id)
+
+        if not settings.CRAWLER_SITEMAP_ENABLED:
+            return
+        try:
+            entries = await fetch_sitemap_entries(run.fetcher.http, start_url)
+        except Exception as e:
+            logger.warning("读取 sitemap 失败，忽略", site_id=run.site_id, error=str(e))
+            return
+
+        base_domain = urlparse(start_url).netloc
+        run.sitemap_lastmod = {
+            url: lastmod
+            for url, lastmod in entries.items()
+            if self.parser.accept_link(url, base_domain, run.link_pattern)
+        }
+
+        changed = [
+            (url, lastmod)
+            for url, lastmod in run.sitemap_lastmod.items()
+            if not self._is_unchanged(run, url)
+        ]
+        # 最近修改的优先，且不超过页数上限
+        changed.sort(key=lambda item: item[1] or datetime.max, reverse=True)
+        seeded = 0
+        for url, _ in changed[: run.max_pages]:
+            if run.frontier.push(url, 1, priority=-1.0):
+                seeded += 1
+        logger.info(
+            "sitemap 播种完成",
+            site_id=run.site_id,
+            known_pages=len(run.known_pages),
+            sitemap_urls=len(run.sitemap_lastmod),
+            seeded=seeded,
+        )
+
+    @staticmethod
+    def _is_unchanged(run: "_CrawlRun", url: str) -> bool:
+        """sitemap lastmod 不晚于上次爬取时间的页面视为未变化"""
+        known = run.known_pages.get(url)
+        lastmod = run.sitemap_lastmod.get(url)
+        return known is not None and lastmod is not None and lastmod <= known[0]
+
+    async def _load_templates(
+        self, site_id: str, extraction_config: ExtractionConfig | None
+    ) -> TemplateLearner | None:
+        """加载站点的模板学习器（未启用学习或站点使用选择器模式时返回 None）"""
+        if not settings.CRAWLER_TEMPLATE_LEARNING:
+            return None
+        if extraction_config is not None and extraction_config.mode != ExtractionMode.LLM:
+            return None
+        async with get_crawler_db() as crawler_session:
+            templates = await CrawlTemplateRepository(crawler_session).list_by_site(site_id)
+        return TemplateLearner(site_id, extraction_config, templates)
+
+    async def _load_html_store(self, site_id: str) -> HtmlStore:
+        """创建站点的页面内容编码器（加载站点已有的压缩字典）"""
+        async with get_crawler_db() as crawler_session:
+            dictionary = await CrawlPageRepository(crawler_session).get_latest_dictionary(site_id)
+
+        async def save_dictionary(data: bytes, sample_count: int) -> int:
+            async with get_crawler_db() as crawler_session:
+                saved = await CrawlPageRepository(crawler_session).create_dictionary(
+                    site_id, data, sample_count
+                )
+                return saved.id
+
+        return HtmlStore(
+            site_id,
+            (dictionary.id, dictionary.data) if dictionary else None,
+            save_dictionary=save_dictionary,
+        )
+
+    @staticmethod
+    def _run_stats(run: "_CrawlRun") -> dict[str, int]:
+        """单次爬取的运行统计（分层抓取 + 模板解析）"""
+        stats = asdict(run.fetcher.stats)
+        if run.templates:
+            stats.update(asdict(run.templates.stats))
+        return stats
+
+    async def _checkpoint_frontier(self, run: "_CrawlRun") -> None:
+        """持久化 frontier 增量变更、运行统计与模板（串行执行，保证插入先于完成标记）"""
+        async with run.checkpoint_lock:
+            queued, done = run.frontier.drain_changes()
+            try:
+                async with get_crawler_db() as crawler_session:
+                    if queued or done:
+                        await CrawlFrontierRepository(crawler_session).save_changes(
+                            run.site_id, run.task_id, queued, done
+                        )
+                    await CrawlTaskRepository(crawler_session).set_run_stats(
+                        run.task_id, self._run_stats(run)
+                    )
+                    if run.templates:
+                        await CrawlTemplateRepository(crawler_session).save(
+                            run.site_id, run.templates.drain_changes()
+                        )
+            except Exception as e:
+                logger.warning("保存爬取进度失败，忽略", site_id=run.site_id, error=str(e))
+
+    async def _crawl_worker(self, run: "_CrawlRun") -> None:
+        """爬取 worker：循环从 frontier 取 URL 处理，直到队列耗尽或达到页数上限"""
+        while True:
+            async with run.cond:
+                # 队列暂空（或名额被进行中的页面占满）时，等待其他 worker 产出新链接/释放名额
+                while run.in_flight > 0 and (
+                    not run.frontier or run.pages_crawled + run.in_flight >= run.max_pages
+                ):
+                    await run.cond.wait()
+                if not run.frontier or run.pages_crawled + run.in_flight >= run.max_pages:
+                    run.cond.notify_all()
+                    return
+                url, depth = run.frontier.pop()
+                run.in_flight += 1
+
+            counted = False
+            try:
+                counted = await self._crawl_one(run, url, depth)
+            finally:
+                async with run.cond:
+                    run.in_flight -= 1
+                    if counted:
+                        run.pages_crawled += 1
+                    run.frontier.mark_done(url)
+                    run.pages_since_checkpoint += 1
+                    run.cond.notify_all()
+
+            if run.pages_since_checkpoint >= settings.CRAWLER_FRONTIER_CHECKPOINT_PAGES:
+                run.pages_since_checkpoint = 0
+                await self._checkpoint_frontier(run)
+
+    async def _crawl_one(self, run: "_CrawlRun", url: str, depth: int) -> bool:
+        """抓取并处理单个页面
+
+        Returns:
+            是否计入已爬取页数（抓取到内容即计入）
+        """
+        logger.info(
+            "开始处理页面",
+            url=url,
+            depth=depth,
+            queue_remaining=len(run.frontier),
+            pages_crawled=run.pages_crawled,
+        )
+        try:
+            # sitemap 表明自上次爬取后未变化：不发请求
+            if self._is_unchanged(run, url):
+                return await self._process_unchanged_page(run, url, depth)
+
+            # 按 host 限速（替代固定 sleep）
+            await run.politeness.wait(url)
+
+            # 抓取与处理占用全局页面名额（多站点公平分配）
+            async with self.coordinator.pages.acquire(run.site_id):
+                # 爬取页面（HTTP 优先，按需升级到浏览器；有校验器时发送条件请求）
+                _, etag, last_modified = run.known_pages.get(url, (None, None, None))
+                result = await run.fetcher.fetch(url, etag=etag, last_modified=last_modified)
+
+                if result.not_modified:
+                    return await self._process_unchanged_page(run, url, depth)
+
+                html_content = result.html
+                if not html_content:
+                    logger.warning("页面内容为空", url=url)
+                    return False
+
+                # 使用独立会话处理单个页面（立即提交事务）
+                new_links = await self._process_page(
+                    site_id=run.site_id,
+                    task_id=run.task_id,
+                    url=url,
+                    depth=depth,
+                    html_content=html_content,
+                    max_depth=run.max_depth,
+                    link_pattern=run.link_pattern,
+                    extraction_config=run.extraction_config,
+                    templates=run.templates,
+                    html_store=run.html_store,
+                    etag=result.etag,
+                    last_modified=result.last_modified,
+                )
+
+            # 将新链接加入 frontier（frontier 内部去重）
+            for link in new_links:
+                run.frontier.push(link, depth + 1)
+            return True
+
+        except Exception as e:
+            logger.error("爬取页面失败", url=url, error=str(e))
+            return False
+
+    async def _process_unchanged_page(self, run: "_CrawlRun", url: str, depth: int) -> bool:
+        """处理自上次爬取后未变化的页面（304 或 sitemap lastmod 未更新）
+
+        不重新解析；未达最大深度时从已存储的 HTML 中提取链接继续扩展
+        （只保存正文片段时，只能扩展片段内的链接）。
+
+        Returns:
+            是否计入已爬取页数
+        """
+        async with get_crawler_db() as crawler_session:
+            page_repo = CrawlPageRepository(crawler_session)
+            page = await page_repo.mark_not_modified(run.site_id, run.task_id, url)
+            if page is None:
+                return False
+            await CrawlTaskRepository(crawler_session).increment_task_stats(
+                run.task_id, pages_crawled=1, pages_skipped_duplicate=1, pages_not_modified=1
+            )
+            html_content = await load_html(page_repo, page) if depth < run.max_depth else None
+
+        logger.debug("页面未变化，跳过抓取与解析", url=url, depth=depth)
+        if html_content:
+            analysis = await self.parser.analyze(
+                html_content, url, link_pattern=run.link_pattern, extract_fields=False
+            )
+            for link in analysis.links:
+                run.frontier.push(link, depth + 1)
+        return True
+
     async def _process_page(
         self,
         site_id: str,
@@ -268,6 +565,10 @@ class CrawlerService:
         max_depth: int,
         link_pattern: str | None,
         extraction_config: ExtractionConfig | None,
+        templates: TemplateLearner | None = None,
+        html_store: HtmlStore | None = None,
+        etag: str | None = None,
+        last_modified: str | None = None,
     ) -> list[str]:
         """处理单个页面（爬虫数据用 crawler_db，Product 用 app.db 短事务）
         
@@ -280,10 +581,37 @@ class CrawlerService:
             max_depth: 最大深度
             link_pattern: 链接匹配模式
             extraction_config: 提取配置
+            templates: 模板学习器（为空时直接按 extraction_config 解析）
+            html_store: 页面内容编码器（为空时按配置压缩，不使用站点字典）
+            etag: 响应 ETag（仅 HTTP 层取得内容时有值）
+            last_modified: 响应 Last-Modified
             
         Returns:
             提取的新链接列表
         """
+        if html_store is None:
+            html_store = HtmlStore(site_id)
+
+        # 在解析进程池中一次性完成链接提取与字段提取（在打开写事务之前，避免解析期间持有写锁）
+        try:
+            analysis = await self.parser.analyze(
+                html_content,
+                url,
+                templates.config_for(url) if templates else extraction_config,
+                link_pattern=link_pattern,
+                extract_links=depth < max_depth,
+                keep_cleaned=html_store.cleaned_only,
+            )
+        except Exception as e:
+            logger.error("解析页面 HTML 失败", url=url, error=str(e))
+            analysis = None
+
+        # 压缩页面内容（同样在写事务之外）；只存正文片段时清理失败则保存原文
+        stored_html = html_content
+        if html_store.cleaned_only and analysis and analysis.cleaned_html is not None:
+            stored_html = analysis.cleaned_html
+        stored = await html_store.encode(stored_html)
+
         # 使用爬虫数据库会话处理页面数据
         async with get_crawler_db() as crawler_session:
             page_repo = CrawlPageRepository(crawler_session)
@@ -297,6 +625,9 @@ class CrawlerService:
                     url=url,
                     depth=depth,
                     html_content=html_content,
+                    etag=etag,
+                    last_modified=last_modified,
+                    blob=stored.to_blob(site_id),
                 )
 
                 if not content_changed:
@@ -333,14 +664,14 @@ class CrawlerService:
                         site_id=site_id,
                         task_id=task_id,
                         extraction_config=extraction_config,
+                        analysis=analysis,
+                        templates=templates,
                     )
 
                 # 提取链接（无论内容是否变化都要提取链接）
                 new_links: list[str] = []
                 if depth < max_depth:
-                    links = self.parser.extract_links(
-                        html_content, url, link_pattern
-                    )
+                    links = analysis.links if analysis else []
                     new_links = links
                     logger.info(
                         "提取链接完成",
@@ -367,7 +698,7 @@ class CrawlerService:
 
     async def _fetch_page(
         self,
-        browser: Browser,
+        context: BrowserContext,
         url: str,
         is_spa: bool = True,
         wait_for_selector: str | None = None,
@@ -376,7 +707,7 @@ class CrawlerService:
         """获取页面内容
 
         Args:
-            browser: 浏览器实例
+            context: 浏览器上下文（来自上下文池，User-Agent 在上下文上设置）
             url: 页面 URL
             is_spa: 是否为 SPA 网站
             wait_for_selector: 等待的 CSS 选择器
@@ -387,12 +718,7 @@ class CrawlerService:
         """
         page: Page | None = None
         try:
-            page = await browser.new_page()
-
-            # 设置 User-Agent
-            await page.set_extra_http_headers({
-                "User-Agent": settings.CRAWLER_USER_AGENT,
-            })
+            page = await context.new_page()
 
             # 访问页面
             await page.goto(url, wait_until="domcontentloaded", timeout=wait_timeout * 1000)
@@ -439,6 +765,8 @@ class CrawlerService:
         site_id: str,
         task_id: int,
         extraction_config: ExtractionConfig | None,
+        analysis: PageAnalysis | None = None,
+        templates: TemplateLearner | None = None,
     ) -> None:
         """解析页面并保存商品
         
@@ -455,13 +783,20 @@ class CrawlerService:
             site_id: 站点 ID
             task_id: 任务 ID
             extraction_config: 提取配置
+            analysis: 已完成的页面解析结果（为空时重新解析）
+            templates: 模板学习器（有则由其选择模板选择器或 LLM）
         """
         try:
             # 解析页面
             logger.debug("解析页面", url=url)
-            is_product, product_data, error = await self.parser.parse(
-                html_content, url, extraction_config
-            )
+            if templates is not None:
+                is_product, product_data, error = await templates.parse(
+                    self.parser, html_content, url, analysis=analysis
+                )
+            else:
+                is_product, product_data, error = await self.parser.parse(
+                    html_content, url, extraction_config, analysis=analysis
+                )
 
             if error:
                 logger.error("解析页面失败", url=url, error=error)
@@ -493,8 +828,13 @@ class CrawlerService:
             # 使用独立短事务写入商品到主数据库（app.db）
             # 快速写入后立即释放连接，避免和用户查询造成死锁
             logger.debug("保存商品到主数据库", url=url)
+            # 模板选择器只学到 HTML 中原样出现的字段，LLM 生成的摘要、描述等不覆盖
+            # （解析后模板仍启用说明可能走了选择器；回退 LLM 时数据完整，部分更新同样正确）
             is_new = await self._save_product_with_short_transaction(
-                product_id, product_data, site_id
+                product_id,
+                product_data,
+                site_id,
+                partial=templates is not None and templates.uses_template(url),
             )
 
             # 更新页面状态（crawler.db）
@@ -547,6 +887,7 @@ class CrawlerService:
         product_id: str,
         data: ParsedProductData,
         site_id: str,
+        partial: bool = False,
     ) -> bool:
         """使用独立短事务保存商品到主数据库（app.db）
         
@@ -562,6 +903,7 @@ class CrawlerService:
             product_id: 商品 ID
             data: 商品数据
             site_id: 来源站点 ID
+            partial: 数据来自模板选择器，空字段保留已有值
 
         Returns:
             是否为新商品
@@ -599,6 +941,7 @@ class CrawlerService:
                 specs=specs_json,
                 extra_metadata=extra_metadata_json,
                 source_site_id=site_id,
+                partial=partial,
             )
             # app_session 会在退出 async with 时自动 commit 并释放连接
 
@@ -632,7 +975,8 @@ class CrawlerService:
         processed = 0
 
         for page in pages:
-            if page.html_content:
+            html_content = await load_html(self.page_repo, page)
+            if html_content:
                 # 使用爬虫数据库会话处理每个待解析页面
                 async with get_crawler_db() as crawler_session:
                     page_repo = CrawlPageRepository(crawler_session)
@@ -643,7 +987,7 @@ class CrawlerService:
                         page_repo=page_repo,
                         task_repo=task_repo,
                         page_id=page.id,
-                        html_content=page.html_content,
+                        html_content=html_content,
                         url=page.url,
                         site_id=site_id,
                         task_id=page.task_id or 0,
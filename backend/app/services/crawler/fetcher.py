@@ -0,0 +1,274 @@
+"""分层页面抓取
+
+HTTP 优先、按需升级到浏览器：
+1. HTTP 层：共享连接池的 httpx.AsyncClient（安装 h2 时启用 HTTP/2），
+   服务端渲染页面几毫秒即可取回
+2. 浏览器层：Playwright 渲染，仅在 HTTP 失败或页面内容判定为客户端渲染时使用
+
+非 SPA 站点始终先走 HTTP；SPA 站点先试探若干页，全部需要升级时本次任务不再尝试 HTTP。
+"""
+
+import asyncio
+import importlib.util
+import re
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import httpx
+from bs4 import BeautifulSoup
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("crawler.fetcher")
+
+# 安装了 h2 时启用 HTTP/2
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# SPA 站点试探 HTTP 的页数：前 N 页全部需要升级时，后续直接走浏览器
+SPA_HTTP_PROBE_PAGES = 5
+
+_SCRIPT_STYLE_RE = re.compile(r"<(script|style|noscript|template)\b[^>]*>.*?</\1\s*>", re.I | re.S)
+_TAG_RE = re.compile(r"<[^>]+>")
+_WHITESPACE_RE = re.compile(r"\s+")
+_EMPTY_MOUNT_RE = re.compile(
+    r"<div[^>]+id=[\"'](?:root|app|__next|__nuxt)[\"'][^>]*>\s*</div>", re.I
+)
+
+
+def visible_text_length(html: str) -> int:
+    """粗略计算页面可见文本长度（正则剥离脚本与标签，不构建 DOM）"""
+    text = _SCRIPT_STYLE_RE.sub(" ", html)
+    text = _TAG_RE.sub(" ", text)
+    return len(_WHITESPACE_RE.sub(" ", text).strip())
+
+
+def looks_server_rendered(html: str, min_text_length: int | None = None) -> bool:
+    """启发式判断 HTML 是否已包含服务端渲染的正文
+
+    Args:
+        html: HTTP 取回的原始 HTML
+        min_text_length: 最少可见文本长度，默认取 CRAWLER_SSR_MIN_TEXT_LENGTH
+
+    Returns:
+        True 表示无需浏览器渲染
+    """
+    if min_text_length is None:
+        min_text_length = settings.CRAWLER_SSR_MIN_TEXT_LENGTH
+    text_length = visible_text_length(html)
+    if _EMPTY_MOUNT_RE.search(html) and text_length < min_text_length * 2:
+        # 空挂载点 + 少量文本：典型的客户端渲染外壳
+        return False
+    return text_length >= min_text_length
+
+
+@dataclass
+class FetchStats:
+    """分层抓取统计"""
+
+    http_fetch_count: int = 0  # HTTP 层抓取次数（含升级前的尝试与条件请求）
+    http_fetch_ms: int = 0  # HTTP 层累计耗时
+    browser_fetch_count: int = 0  # 浏览器层抓取次数
+    browser_fetch_ms: int = 0  # 浏览器层累计耗时
+    fetch_escalations: int = 0  # HTTP 结果不可用、升级到浏览器的次数
+
+
+@dataclass
+class HttpResponse:
+    """HTTP 抓取结果"""
+
+    status_code: int
+    html: str | None = None  # 仅 200 且为 HTML 时有值
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+@dataclass
+class FetchResult:
+    """分层抓取结果"""
+
+    html: str | None
+    not_modified: bool = False  # 条件请求命中 304，内容自上次抓取后未变化
+    etag: str | None = None  # 内容由 HTTP 层提供时的校验器，用于下次条件请求
+    last_modified: str | None = None
+
+
+class HttpFetcher:
+    """HTTP 抓取器（连接池复用）"""
+
+    def __init__(self, client: httpx.AsyncClient | None = None, concurrency: int = 4):
+        """
+        Args:
+            client: 自定义客户端（测试注入），默认按配置创建
+            concurrency: 并发 worker 数，用于确定连接池大小
+        """
+        self._client = client or httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            follow_redirects=True,
+            headers={"User-Agent": settings.CRAWLER_USER_AGENT},
+            timeout=settings.CRAWLER_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=max(concurrency * 2, 10),
+                max_keepalive_connections=max(concurrency, 5),
+            ),
+        )
+
+    async def fetch(
+        self,
+        url: str,
+        *,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> HttpResponse:
+        """GET 页面，传入校验器时发送条件请求
+
+        Returns:
+            HttpResponse；网络错误时 status_code 为 0
+        """
+        headers: dict[str, str] = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        try:
+            response = await self._client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            logger.debug("HTTP 抓取失败", url=url, error=str(e))
+            return HttpResponse(status_code=0)
+
+        result = HttpResponse(
+            status_code=response.status_code,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+        )
+        content_type = response.headers.get("content-type", "")
+        if response.status_code == 200 and "html" in content_type:
+            result.html = response.text
+        elif response.status_code != 304:
+            logger.debug(
+                "HTTP 响应不可用",
+                url=url,
+                status_code=response.status_code,
+                content_type=content_type,
+            )
+        return result
+
+    async def fetch_bytes(self, url: str) -> bytes | None:
+        """GET 任意资源（robots.txt、sitemap 等），非 200 返回 None"""
+        try:
+            response = await self._client.get(url)
+        except httpx.HTTPError as e:
+            logger.debug("HTTP 抓取失败", url=url, error=str(e))
+            return None
+        if response.status_code != 200:
+            return None
+        return response.content
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class TieredFetcher:
+    """HTTP 优先、按需升级浏览器的分层抓取器（单个爬取任务内共享）"""
+
+    def __init__(
+        self,
+        http_fetcher: HttpFetcher,
+        browser_fetch: Callable[[str], Awaitable[str | None]],
+        *,
+        is_spa: bool,
+        wait_for_selector: str | None = None,
+        http_first: bool = True,
+    ):
+        """
+        Args:
+            http_fetcher: HTTP 抓取器（条件请求始终经由 HTTP 层）
+            browser_fetch: 浏览器抓取函数
+            is_spa: 站点是否为 SPA（SPA 站点仅试探性使用 HTTP）
+            wait_for_selector: 页面就绪选择器，HTTP 结果需包含该元素才可用
+            http_first: 是否用 HTTP 层抓取正文，False 时 HTTP 仅用于条件请求
+        """
+        self._http = http_fetcher
+        self._browser_fetch = browser_fetch
+        self._is_spa = is_spa
+        self._wait_for_selector = wait_for_selector
+        self._http_first = http_first
+        self._http_hits = 0
+        self._http_misses = 0
+        self.stats = FetchStats()
+
+    @property
+    def http(self) -> HttpFetcher:
+        return self._http
+
+    @property
+    def http_enabled(self) -> bool:
+        if not self._http_first:
+            return False
+        if not self._is_spa or self._http_hits > 0:
+            return True
+        return self._http_misses < SPA_HTTP_PROBE_PAGES
+
+    async def fetch(
+        self,
+        url: str,
+        *,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> FetchResult:
+        """抓取页面
+
+        Args:
+            url: 页面 URL
+            etag: 上次由 HTTP 层取得内容时的 ETag
+            last_modified: 上次由 HTTP 层取得内容时的 Last-Modified
+
+        Returns:
+            FetchResult；not_modified 为 True 时 html 为空
+        """
+        conditional = bool(etag or last_modified)
+        if self.http_enabled or conditional:
+            started = time.perf_counter()
+            response = await self._http.fetch(url, etag=etag, last_modified=last_modified)
+            self.stats.http_fetch_count += 1
+            self.stats.http_fetch_ms += int((time.perf_counter() - started) * 1000)
+
+            if response.status_code == 304:
+                return FetchResult(html=None, not_modified=True, etag=etag, last_modified=last_modified)
+
+            if self.http_enabled:
+                if response.html and await self._is_usable(response.html):
+                    self._http_hits += 1
+                    return FetchResult(
+                        html=response.html,
+                        etag=response.etag,
+                        last_modified=response.last_modified,
+                    )
+                self._http_misses += 1
+                self.stats.fetch_escalations += 1
+                logger.debug("HTTP 结果不可用，升级到浏览器抓取", url=url)
+
+        # 浏览器渲染的内容不记录校验器：服务端 HTML 不变不代表渲染后的数据不变
+        started = time.perf_counter()
+        html = await self._browser_fetch(url)
+        self.stats.browser_fetch_count += 1
+        self.stats.browser_fetch_ms += int((time.perf_counter() - started) * 1000)
+        return FetchResult(html=html)
+
+    async def _is_usable(self, html: str) -> bool:
+        if not looks_server_rendered(html):
+            return False
+        if self._wait_for_selector:
+            return await asyncio.to_thread(_has_selector, html, self._wait_for_selector)
+        return True
+
+    async def close(self) -> None:
+        await self._http.close()
+
+
+def _has_selector(html: str, selector: str) -> bool:
+    try:
+        return BeautifulSoup(html, "html.parser").select_one(selector) is not None
+    except Exception:
+        return False
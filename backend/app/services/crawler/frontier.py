@@ -0,0 +1,97 @@
+"""爬取 Frontier（待爬 URL 优先队列）
+
+- 基于堆的优先队列，优先级数值越小越先爬取（默认按深度，即广度优先）
+- 单个爬取过程内去重：已入队或已完成的 URL 不会再次入队
+- 记录自上次 checkpoint 以来的新增/完成 URL，供持久化到 crawler.db，
+  任务中断后可从持久化状态恢复，而不是从 start_url 重新开始
+"""
+
+import heapq
+import itertools
+from collections.abc import Iterable
+
+
+class CrawlFrontier:
+    """爬取 Frontier"""
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, str, int]] = []  # (priority, seq, url, depth)
+        self._seq = itertools.count()
+        self._seen: set[str] = set()  # 已入队或已完成的 URL
+        self._new: dict[str, tuple[int, float]] = {}  # 自上次 checkpoint 新入队：url -> (depth, priority)
+        self._done: list[str] = []  # 自上次 checkpoint 新完成的 URL
+        self.done_count = 0  # 累计完成数（含恢复的历史进度）
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._seen
+
+    def push(self, url: str, depth: int, priority: float | None = None) -> bool:
+        """URL 入队
+
+        Args:
+            url: 页面 URL
+            depth: 爬取深度
+            priority: 优先级（越小越先），默认取 depth
+
+        Returns:
+            是否为新入队（已见过的 URL 返回 False）
+        """
+        if url in self._seen:
+            return False
+        if priority is None:
+            priority = float(depth)
+        self._seen.add(url)
+        heapq.heappush(self._heap, (priority, next(self._seq), url, depth))
+        self._new[url] = (depth, priority)
+        return True
+
+    def pop(self) -> tuple[str, int] | None:
+        """弹出优先级最高的 URL
+
+        Returns:
+            (url, depth)，队列为空时返回 None
+        """
+        if not self._heap:
+            return None
+        _, _, url, depth = heapq.heappop(self._heap)
+        return url, depth
+
+    def mark_done(self, url: str) -> None:
+        """标记 URL 已处理（成功或失败均视为完成，续爬时不再重试）"""
+        self._done.append(url)
+        self.done_count += 1
+
+    def restore(
+        self,
+        queued: Iterable[tuple[str, int, float]],
+        done: Iterable[str],
+    ) -> None:
+        """从持久化状态恢复（恢复的条目不计入待 checkpoint 的变更）
+
+        Args:
+            queued: 待爬条目 (url, depth, priority)
+            done: 已完成的 URL
+        """
+        for url in done:
+            self._seen.add(url)
+            self.done_count += 1
+        for url, depth, priority in queued:
+            if url in self._seen:
+                continue
+            self._seen.add(url)
+            heapq.heappush(self._heap, (priority, next(self._seq), url, depth))
+
+    def drain_changes(self) -> tuple[list[tuple[str, int, float]], list[str]]:
+        """取出并清空自上次 checkpoint 以来的变更
+
+        Returns:
+            (新入队条目 [(url, depth, priority)], 新完成 URL 列表)
+        """
+        new = [(url, depth, priority) for url, (depth, priority) in self._new.items()]
+        done = self._done
+        self._new = {}
+        self._done = []
+        return new, done
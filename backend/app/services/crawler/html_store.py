@@ -0,0 +1,236 @@
+"""页面 HTML 压缩存储
+
+原始 HTML 占爬虫库的绝大部分体积，且同一站点的页面模板高度相似：
+- 按内容哈希寻址（crawl_page_blobs），同一站点内容相同的页面只存一份
+- 使用 zstd 压缩（zstandard 为项目依赖）；站点累积足够样本后训练专属字典，
+  模板部分几乎不再占空间。精简环境中缺少 zstandard 时退化为 zlib
+- CRAWLER_HTML_STORE_CLEANED 开启时只保存清理后的正文片段（去掉脚本、样式、导航等）
+
+压缩与字典训练是 CPU 计算，均在线程中执行（zstd / zlib 释放 GIL）。
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import zlib
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.crawler import CrawlPage, CrawlPageBlob
+from app.repositories.crawler import CrawlPageRepository
+
+logger = get_logger("crawler.html_store")
+
+_ZSTD_AVAILABLE = importlib.util.find_spec("zstandard") is not None
+if _ZSTD_AVAILABLE:
+    import zstandard
+
+CODEC_ZSTD = "zstd"
+CODEC_ZLIB = "zlib"
+
+ZSTD_LEVEL = 6
+
+# 已加载的压缩字典（dict_id -> ZstdCompressionDict），字典写入后不再修改，可进程内共享
+_dictionaries: dict[int, "zstandard.ZstdCompressionDict"] = {}
+
+
+@dataclass
+class StoredHtml:
+    """编码后的页面内容（对应一条 crawl_page_blobs 记录）"""
+
+    content_hash: str  # 存储内容的 sha256
+    codec: str
+    data: bytes
+    raw_size: int
+    dict_id: int | None = None
+
+    def to_blob(self, site_id: str) -> CrawlPageBlob:
+        return CrawlPageBlob(
+            site_id=site_id,
+            content_hash=self.content_hash,
+            codec=self.codec,
+            dict_id=self.dict_id,
+            data=self.data,
+            raw_size=self.raw_size,
+        )
+
+
+def content_hash(text: str) -> str:
+    """计算内容哈希"""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def register_dictionary(dict_id: int, data: bytes) -> None:
+    """登记压缩字典，供后续压缩与解压使用"""
+    if _ZSTD_AVAILABLE and dict_id not in _dictionaries:
+        _dictionaries[dict_id] = zstandard.ZstdCompressionDict(data)
+
+
+def has_dictionary(dict_id: int) -> bool:
+    """字典是否已登记"""
+    return dict_id in _dictionaries
+
+
+def compress_html(text: str, dict_id: int | None = None) -> StoredHtml:
+    """压缩 HTML
+
+    Args:
+        text: 待存储的 HTML
+        dict_id: 使用的已登记字典，为空时不使用字典
+
+    Returns:
+        StoredHtml
+    """
+    raw = text.encode()
+    if not _ZSTD_AVAILABLE:
+        return StoredHtml(content_hash(text), CODEC_ZLIB, zlib.compress(raw, 6), len(raw))
+
+    dictionary = _dictionaries.get(dict_id) if dict_id is not None else None
+    # ZstdCompressor 非线程安全，每次新建
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary)
+    return StoredHtml(
+        content_hash(text),
+        CODEC_ZSTD,
+        compressor.compress(raw),
+        len(raw),
+        dict_id if dictionary is not None else None,
+    )
+
+
+def decompress_html(codec: str, data: bytes, dict_id: int | None = None) -> str:
+    """解压 HTML（使用字典时需先 register_dictionary）
+
+    Raises:
+        ValueError: 编码不支持或字典缺失
+    """
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data).decode()
+    if codec != CODEC_ZSTD or not _ZSTD_AVAILABLE:
+        raise ValueError(f"不支持的页面存储编码: {codec}")
+
+    dictionary = None
+    if dict_id is not None:
+        dictionary = _dictionaries.get(dict_id)
+        if dictionary is None:
+            raise ValueError(f"压缩字典未加载: {dict_id}")
+    return zstandard.ZstdDecompressor(dict_data=dictionary).decompress(data).decode()
+
+
+def train_dictionary(samples: list[bytes], dict_size: int) -> bytes | None:
+    """用样本训练 zstd 字典，未安装 zstandard 或样本不足时返回 None"""
+    if not _ZSTD_AVAILABLE:
+        return None
+    try:
+        return zstandard.train_dictionary(dict_size, samples).as_bytes()
+    except zstandard.ZstdError as e:
+        logger.warning("训练压缩字典失败", samples=len(samples), error=str(e))
+        return None
+
+
+async def load_html(page_repo: CrawlPageRepository, page: CrawlPage) -> str | None:
+    """读取页面 HTML（压缩内容或旧数据的 html_content 列）
+
+    内容缺失或无法解压时返回 None。
+    """
+    if not page.blob_hash:
+        return await page_repo.get_legacy_html(page.id)
+
+    blob = await page_repo.get_blob(page.site_id, page.blob_hash)
+    if blob is None:
+        logger.warning("页面内容缺失", url=page.url, blob_hash=page.blob_hash)
+        return None
+    if blob.dict_id is not None and not has_dictionary(blob.dict_id):
+        dictionary = await page_repo.get_dictionary(blob.dict_id)
+        if dictionary is not None:
+            register_dictionary(dictionary.id, dictionary.data)
+    try:
+        return await asyncio.to_thread(decompress_html, blob.codec, blob.data, blob.dict_id)
+    except Exception as e:
+        logger.warning("页面内容解压失败", url=page.url, codec=blob.codec, error=str(e))
+        return None
+
+
+class HtmlStore:
+    """单次爬取的页面编码器
+
+    - 站点已有字典时直接使用
+    - 没有字典时收集前 N 个页面作为样本，训练完成并持久化后，后续页面使用新字典
+      （训练前写入的页面保持无字典压缩，读取不受影响）
+    """
+
+    def __init__(
+        self,
+        site_id: str,
+        dictionary: tuple[int, bytes] | None = None,
+        *,
+        save_dictionary: Callable[[bytes, int], Awaitable[int]] | None = None,
+        cleaned_only: bool | None = None,
+        train_samples: int | None = None,
+        dict_size: int | None = None,
+    ):
+        """
+        Args:
+            site_id: 站点 ID
+            dictionary: 站点现有字典 (dict_id, data)
+            save_dictionary: 持久化新字典的回调 (data, sample_count) -> dict_id，为空时不训练
+            cleaned_only: 是否只保存清理后的正文片段，默认取 CRAWLER_HTML_STORE_CLEANED
+            train_samples: 训练字典所需样本数，默认取 CRAWLER_HTML_DICT_SAMPLES
+            dict_size: 字典大小（字节），默认取 CRAWLER_HTML_DICT_SIZE
+        """
+        self.site_id = site_id
+        self.cleaned_only = settings.CRAWLER_HTML_STORE_CLEANED if cleaned_only is None else cleaned_only
+        self.train_samples = settings.CRAWLER_HTML_DICT_SAMPLES if train_samples is None else train_samples
+        self.dict_size = settings.CRAWLER_HTML_DICT_SIZE if dict_size is None else dict_size
+        self._save_dictionary = save_dictionary
+        self._samples: list[bytes] = []
+        self._training = False
+
+        self.dict_id: int | None = None
+        if dictionary is not None:
+            self.dict_id = dictionary[0]
+            register_dictionary(*dictionary)
+
+    @property
+    def _should_train(self) -> bool:
+        return (
+            _ZSTD_AVAILABLE
+            and self.dict_id is None
+            and self._save_dictionary is not None
+            and self.train_samples > 0
+            and not self._training
+        )
+
+    async def encode(self, text: str) -> StoredHtml:
+        """压缩页面内容（线程中执行），必要时顺带训练站点字典"""
+        stored = await asyncio.to_thread(compress_html, text, self.dict_id)
+
+        if self._should_train:
+            self._samples.append(text.encode())
+            if len(self._samples) >= self.train_samples:
+                await self._train()
+        return stored
+
+    async def _train(self) -> None:
+        self._training = True
+        samples, self._samples = self._samples, []
+        try:
+            data = await asyncio.to_thread(train_dictionary, samples, self.dict_size)
+            if data is None:
+                return
+            # 先持久化再启用：引用字典的页面写入时字典必然已存在
+            dict_id = await self._save_dictionary(data, len(samples))
+            register_dictionary(dict_id, data)
+            self.dict_id = dict_id
+            logger.info(
+                "站点压缩字典已训练",
+                site_id=self.site_id,
+                dict_id=dict_id,
+                samples=len(samples),
+                size=len(data),
+            )
+        except Exception as e:
+            logger.warning("保存压缩字典失败，继续无字典压缩", site_id=self.site_id, error=str(e))
+        finally:
+            self._training = False
@@ -3,11 +3,21 @@
 支持两种解析模式：
 1. selector: CSS/XPath 选择器模式，适用于结构规律的网站
 2. llm: LLM 智能解析模式，适用于复杂或不规律的网站（默认）
+
+HTML 解析（BeautifulSoup）是 CPU 密集操作，统一经 analyze_html 在解析进程池中执行，
+每个页面只构建一次 DOM，链接提取与字段提取/HTML 清理共用；安装 lxml 时自动使用更快的解析器。
 """
 
+import fnmatch
+import importlib.util
 import json
 import re
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager, nullcontext
+from dataclasses import dataclass, field
+from functools import partial
 from typing import Any
+from urllib.parse import urljoin, urlparse
 
 from bs4 import BeautifulSoup
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -17,9 +27,12 @@ from pydantic import BaseModel, Field
 from app.core.config import settings
 from app.core.logging import get_logger
 from app.schemas.crawler import ExtractionConfig, ExtractionMode, ParsedProductData
+from app.services.crawler.parse_pool import run_parse
 
 logger = get_logger("crawler.parser")
 
+_LXML_AVAILABLE = importlib.util.find_spec("lxml") is not None
+
 
 class ProductExtractionOutput(BaseModel):
     """LLM 商品提取输出格式"""
@@ -69,17 +82,309 @@ DEFAULT_EXTRACTION_PROMPT = """你是一个专业的网页商品信息提取助
 """
 
 
+# ==================== 同步解析（在解析进程池中执行） ====================
+
+
+def resolve_html_backend(name: str | None = None) -> str:
+    """确定 BeautifulSoup 使用的解析器
+
+    Args:
+        name: auto / lxml / html.parser，默认取 CRAWLER_HTML_PARSER
+
+    Returns:
+        BeautifulSoup features 参数（auto 时安装了 lxml 则用 lxml）
+    """
+    name = name or settings.CRAWLER_HTML_PARSER
+    if name == "auto":
+        return "lxml" if _LXML_AVAILABLE else "html.parser"
+    if name == "lxml" and not _LXML_AVAILABLE:
+        logger.warning("未安装 lxml，回退到 html.parser")
+        return "html.parser"
+    return name
+
+
+@dataclass
+class PageAnalysis:
+    """单页解析结果（一次 DOM 构建，链接提取与字段提取共用）"""
+
+    links: list[str] = field(default_factory=list)
+    fields_extracted: bool = False  # 是否执行了字段提取/HTML 清理
+    mode: ExtractionMode | None = None  # 字段提取使用的模式
+    is_product_page: bool = False  # 选择器模式结果
+    product: ParsedProductData | None = None
+    error: str | None = None
+    cleaned_html: str | None = None  # LLM 模式（或 keep_cleaned）的清理后 HTML
+
+
+def analyze_html(
+    html: str,
+    url: str,
+    config: ExtractionConfig | None,
+    *,
+    link_pattern: str | None = None,
+    extract_links: bool = True,
+    extract_fields: bool = True,
+    keep_cleaned: bool = False,
+    backend: str = "html.parser",
+) -> PageAnalysis:
+    """解析单个页面：只构建一次 DOM，依次提取链接、字段（或清理 HTML）
+
+    纯同步 CPU 计算，结果可序列化，供解析进程池调用。
+
+    Args:
+        html: HTML 内容
+        url: 页面 URL（相对链接的基准）
+        config: 提取配置，None 或 LLM 模式时输出清理后的 HTML
+        link_pattern: 链接过滤模式
+        extract_links: 是否提取链接
+        extract_fields: 是否提取字段
+        keep_cleaned: 选择器模式下也输出清理后的 HTML（用于只存储正文片段）
+        backend: BeautifulSoup 解析器
+
+    Returns:
+        PageAnalysis
+    """
+    result = PageAnalysis()
+    soup = BeautifulSoup(html, backend)
+    if extract_links:
+        result.links = _extract_links_from_soup(soup, url, link_pattern)
+    if extract_fields:
+        result.fields_extracted = True
+        result.mode = _effective_mode(config)
+        if result.mode == ExtractionMode.LLM:
+            # 清理会修改 DOM，放在最后
+            result.cleaned_html = _clean_soup(soup)
+        else:
+            result.is_product_page, result.product, result.error = _select_product(soup, config)
+    if keep_cleaned and result.cleaned_html is None:
+        result.cleaned_html = _clean_soup(soup)
+    return result
+
+
+def _effective_mode(config: ExtractionConfig | None) -> ExtractionMode:
+    return ExtractionMode.LLM if config is None else config.mode
+
+
+def _select_product(
+    soup: BeautifulSoup, config: ExtractionConfig
+) -> tuple[bool, ParsedProductData | None, str | None]:
+    """按选择器配置提取商品字段"""
+    try:
+        fields = config.fields
+
+        if not fields:
+            logger.warning("选择器模式未配置字段，跳过页面")
+            return False, None, "未配置字段选择器"
+
+        logger.debug(
+            "开始使用选择器解析页面",
+            indicator_selector=config.product_page_indicator,
+            field_selectors=fields.model_dump(exclude_none=True),
+        )
+
+        # 检查是否为商品页
+        if config.product_page_indicator:
+            indicator = soup.select_one(config.product_page_indicator)
+            if not indicator:
+                logger.debug(
+                    "未命中商品页指示器，判定非商品页",
+                    indicator_selector=config.product_page_indicator,
+                )
+                return False, None, None
+
+        # 提取字段
+        data: dict[str, Any] = {}
+
+        # 提取文本字段
+        text_fields = ["name", "summary", "description", "category", "brand"]
+        for field_name in text_fields:
+            selector = getattr(fields, field_name, None)
+            if selector:
+                elem = soup.select_one(selector.replace("::text", ""))
+                if elem:
+                    data[field_name] = elem.get_text(strip=True)
+
+        # 提取价格
+        if fields.price:
+            price_elem = soup.select_one(fields.price.replace("::text", ""))
+            if price_elem:
+                price_text = price_elem.get_text(strip=True)
+                # 提取数字
+                price_match = re.search(r"[\d,]+\.?\d*", price_text)
+                if price_match:
+                    data["price"] = float(price_match.group().replace(",", ""))
+
+        # 提取标签
+        if fields.tags:
+            tag_elems = soup.select(fields.tags.replace("::text", ""))
+            if tag_elems:
+                data["tags"] = [t.get_text(strip=True) for t in tag_elems]
+
+        # 提取图片
+        if fields.image_urls:
+            img_elems = soup.select(fields.image_urls)
+            if img_elems:
+                data["image_urls"] = [
+                    img.get("src") or img.get("data-src")
+                    for img in img_elems
+                    if img.get("src") or img.get("data-src")
+                ]
+
+        # 提取规格
+        if fields.specs:
+            spec_elems = soup.select(fields.specs)
+            if spec_elems:
+                specs = {}
+                for elem in spec_elems:
+                    text = elem.get_text(strip=True)
+                    if ":" in text or "：" in text:
+                        parts = re.split(r"[:：]", text, 1)
+                        if len(parts) == 2:
+                            specs[parts[0].strip()] = parts[1].strip()
+                if specs:
+                    data["specs"] = specs
+
+        # 检查是否有必要字段
+        if not data.get("name"):
+            logger.debug(
+                "未提取到必需字段 name，判定为非商品页",
+                name_selector=fields.name,
+                extracted_fields=list(data.keys()),
+            )
+            return False, None, None
+
+        logger.debug(
+            "选择器解析成功",
+            extracted_fields=list(data.keys()),
+            has_price="price" in data,
+        )
+        return True, ParsedProductData(**data), None
+
+    except Exception as e:
+        logger.error("选择器解析失败", error=str(e))
+        return False, None, str(e)
+
+
+def _extract_links_from_soup(
+    soup: BeautifulSoup, base_url: str, link_pattern: str | None
+) -> list[str]:
+    """提取同域名、匹配过滤模式的链接（已去除锚点）"""
+    links = set()
+    base_domain = urlparse(base_url).netloc
+
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+
+        # 跳过锚点和 JavaScript
+        if href.startswith("#") or href.startswith("javascript:"):
+            continue
+
+        # 处理相对路径，移除锚点
+        full_url = urljoin(base_url, href).split("#")[0]
+
+        # 只保留同域名、匹配过滤模式的链接
+        if not accept_link(full_url, base_domain, link_pattern):
+            continue
+
+        links.add(full_url)
+
+    return list(links)
+
+
+def _clean_soup(soup: BeautifulSoup) -> str:
+    """清理 DOM，移除无关内容（原地修改 soup）"""
+    # 移除脚本和样式
+    for tag in soup(["script", "style", "noscript", "iframe", "svg"]):
+        tag.decompose()
+
+    # 移除注释
+    for comment in soup.find_all(string=lambda text: isinstance(text, str) and text.strip().startswith("<!--")):
+        comment.extract()
+
+    # 移除常见的无关元素
+    for selector in [
+        "header",
+        "footer",
+        "nav",
+        ".nav",
+        ".header",
+        ".footer",
+        ".sidebar",
+        ".ad",
+        ".advertisement",
+        "#cookie-banner",
+        ".cookie-notice",
+    ]:
+        for elem in soup.select(selector):
+            elem.decompose()
+
+    # 获取文本内容，保留一定的结构
+    # 只保留主要内容区域
+    main_content = soup.select_one("main, #main, .main, article, .product, .product-detail")
+    if main_content:
+        return str(main_content)
+
+    return str(soup)
+
+
+def accept_link(url: str, base_domain: str, link_pattern: str | None = None) -> bool:
+    """检查链接是否应加入爬取队列（同域名且匹配过滤模式）
+
+    Args:
+        url: 完整 URL
+        base_domain: 站点域名（netloc）
+        link_pattern: 链接过滤模式（正则或 glob）
+    """
+    parsed = urlparse(url)
+    if parsed.netloc != base_domain:
+        return False
+    if link_pattern and not _match_pattern(parsed.path, url, link_pattern):
+        return False
+    return True
+
+
+def _match_pattern(path: str, full_url: str, pattern: str) -> bool:
+    """检查路径或完整 URL 是否匹配模式（支持 glob 和正则）"""
+
+    def _match(target: str) -> bool:
+        if fnmatch.fnmatch(target, pattern):
+            return True
+        try:
+            if re.search(pattern, target):
+                return True
+        except re.error:
+            pass
+        return False
+
+    # 先尝试路径（兼容以前的配置），再尝试完整 URL
+    return _match(path) or _match(full_url)
+
+
+# ==================== 解析器 ====================
+
+
 class PageParser:
-    """页面解析器"""
+    """页面解析器
+
+    DOM 构建与选择器匹配在解析进程池中执行（run_parse），不阻塞事件循环；
+    同步方法保留给脚本与测试直接调用。
+    """
 
-    def __init__(self, llm=None):
+    def __init__(
+        self,
+        llm=None,
+        llm_gate: Callable[[], AbstractAsyncContextManager] | None = None,
+    ):
         """初始化解析器
 
         Args:
             llm: LangChain LLM 实例，如果为 None 则延迟初始化
+            llm_gate: 每次 LLM 调用前进入的上下文（如全局并发名额），为空时不限制
         """
         self._llm = llm
+        self._llm_gate = llm_gate or nullcontext
         self._parser = JsonOutputParser(pydantic_object=ProductExtractionOutput)
+        self.backend = resolve_html_backend()
 
     @property
     def llm(self):
@@ -98,10 +403,49 @@ class PageParser:
             )
         return self._llm
 
+    async def analyze(
+        self,
+        html: str,
+        url: str,
+        config: ExtractionConfig | None = None,
+        *,
+        link_pattern: str | None = None,
+        extract_links: bool = True,
+        extract_fields: bool = True,
+        keep_cleaned: bool = False,
+    ) -> PageAnalysis:
+        """在解析进程池中解析页面（单次 DOM 构建）
+
+        Args:
+            html: HTML 内容
+            url: 页面 URL
+            config: 提取配置
+            link_pattern: 链接过滤模式
+            extract_links: 是否提取链接
+            extract_fields: 是否提取字段
+            keep_cleaned: 是否总是输出清理后的 HTML
+
+        Returns:
+            PageAnalysis
+        """
+        return await run_parse(
+            partial(
+                analyze_html,
+                html,
+                url,
+                config,
+                link_pattern=link_pattern,
+                extract_links=extract_links,
+                extract_fields=extract_fields,
+                keep_cleaned=keep_cleaned,
+                backend=self.backend,
+            )
+        )
+
     def parse_with_selector(
         self, html: str, config: ExtractionConfig
     ) -> tuple[bool, ParsedProductData | None, str | None]:
-        """使用 CSS 选择器解析页面
+        """使用 CSS 选择器解析页面（同步）
 
         Args:
             html: HTML 内容
@@ -111,103 +455,19 @@ class PageParser:
             (is_product_page, parsed_data, error)
         """
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            fields = config.fields
-
-            if not fields:
-                logger.warning("选择器模式未配置字段，跳过页面")
-                return False, None, "未配置字段选择器"
-
-            logger.debug(
-                "开始使用选择器解析页面",
-                indicator_selector=config.product_page_indicator,
-                field_selectors=fields.model_dump(exclude_none=True),
-            )
-
-            # 检查是否为商品页
-            if config.product_page_indicator:
-                indicator = soup.select_one(config.product_page_indicator)
-                if not indicator:
-                    logger.debug(
-                        "未命中商品页指示器，判定非商品页",
-                        indicator_selector=config.product_page_indicator,
-                    )
-                    return False, None, None
-
-            # 提取字段
-            data: dict[str, Any] = {}
-
-            # 提取文本字段
-            text_fields = ["name", "summary", "description", "category", "brand"]
-            for field in text_fields:
-                selector = getattr(fields, field, None)
-                if selector:
-                    elem = soup.select_one(selector.replace("::text", ""))
-                    if elem:
-                        data[field] = elem.get_text(strip=True)
-
-            # 提取价格
-            if fields.price:
-                price_elem = soup.select_one(fields.price.replace("::text", ""))
-                if price_elem:
-                    price_text = price_elem.get_text(strip=True)
-                    # 提取数字
-                    price_match = re.search(r"[\d,]+\.?\d*", price_text)
-                    if price_match:
-                        data["price"] = float(price_match.group().replace(",", ""))
-
-            # 提取标签
-            if fields.tags:
-                tag_elems = soup.select(fields.tags.replace("::text", ""))
-                if tag_elems:
-                    data["tags"] = [t.get_text(strip=True) for t in tag_elems]
-
-            # 提取图片
-            if fields.image_urls:
-                img_elems = soup.select(fields.image_urls)
-                if img_elems:
-                    data["image_urls"] = [
-                        img.get("src") or img.get("data-src")
-                        for img in img_elems
-                        if img.get("src") or img.get("data-src")
-                    ]
-
-            # 提取规格
-            if fields.specs:
-                spec_elems = soup.select(fields.specs)
-                if spec_elems:
-                    specs = {}
-                    for elem in spec_elems:
-                        text = elem.get_text(strip=True)
-                        if ":" in text or "：" in text:
-                            parts = re.split(r"[:：]", text, 1)
-                            if len(parts) == 2:
-                                specs[parts[0].strip()] = parts[1].strip()
-                    if specs:
-                        data["specs"] = specs
-
-            # 检查是否有必要字段
-            if not data.get("name"):
-                logger.debug(
-                    "未提取到必需字段 name，判定为非商品页",
-                    name_selector=fields.name,
-                    extracted_fields=list(data.keys()),
-                )
-                return False, None, None
-
-            logger.debug(
-                "选择器解析成功",
-                extracted_fields=list(data.keys()),
-                has_price="price" in data,
-            )
-            return True, ParsedProductData(**data), None
-
+            soup = BeautifulSoup(html, self.backend)
         except Exception as e:
             logger.error("选择器解析失败", error=str(e))
             return False, None, str(e)
+        return _select_product(soup, config)
 
     async def parse_with_llm(
-        self, html: str, url: str, prompt: str | None = None
+        self,
+        html: str,
+        url: str,
+        prompt: str | None = None,
+        *,
+        cleaned_html: str | None = None,
     ) -> tuple[bool, ParsedProductData | None, str | None]:
         """使用 LLM 解析页面
 
@@ -215,13 +475,16 @@ class PageParser:
             html: HTML 内容
             url: 页面 URL
             prompt: 自定义提示词
+            cleaned_html: 已清理的 HTML（来自 analyze），为空时在进程池中清理
 
         Returns:
             (is_product_page, parsed_data, error)
         """
         try:
             # 清理 HTML，只保留主要内容
-            cleaned_html = self._clean_html(html)
+            if cleaned_html is None:
+                analysis = await self.analyze(html, url, None, extract_links=False)
+                cleaned_html = analysis.cleaned_html or ""
 
             # 截断过长的内容
             max_length = settings.CRAWLER_MAX_HTML_LENGTH
@@ -240,7 +503,8 @@ class PageParser:
                 HumanMessage(content=formatted_prompt),
             ]
 
-            response = await self.llm.ainvoke(messages)
+            async with self._llm_gate():
+                response = await self.llm.ainvoke(messages)
             content = response.content
 
             # 解析 JSON
@@ -273,7 +537,11 @@ class PageParser:
             return False, None, str(e)
 
     async def parse(
-        self, html: str, url: str, config: ExtractionConfig | None = None
+        self,
+        html: str,
+        url: str,
+        config: ExtractionConfig | None = None,
+        analysis: PageAnalysis | None = None,
     ) -> tuple[bool, ParsedProductData | None, str | None]:
         """解析页面
 
@@ -281,19 +549,31 @@ class PageParser:
             html: HTML 内容
             url: 页面 URL
             config: 提取配置，为 None 时使用 LLM 模式
+            analysis: 已有的解析结果（与链接提取共用同一次 DOM 构建），
+                为空或提取模式与 config 不一致时重新解析
 
         Returns:
             (is_product_page, parsed_data, error)
         """
-        if config is None or config.mode == ExtractionMode.LLM:
+        mode = _effective_mode(config)
+        if analysis is None or not analysis.fields_extracted or analysis.mode != mode:
+            try:
+                analysis = await self.analyze(html, url, config, extract_links=False)
+            except Exception as e:
+                logger.error("解析页面失败", url=url, error=str(e))
+                return False, None, str(e)
+
+        if mode == ExtractionMode.LLM:
             return await self.parse_with_llm(
-                html, url, config.prompt if config else None
+                html,
+                url,
+                config.prompt if config else None,
+                cleaned_html=analysis.cleaned_html or "",
             )
-        else:
-            return self.parse_with_selector(html, config)
+        return analysis.is_product_page, analysis.product, analysis.error
 
     def _clean_html(self, html: str) -> str:
-        """清理 HTML，移除无关内容
+        """清理 HTML，移除无关内容（同步）
 
         Args:
             html: 原始 HTML
@@ -301,45 +581,12 @@ class PageParser:
         Returns:
             清理后的 HTML
         """
-        soup = BeautifulSoup(html, "html.parser")
-
-        # 移除脚本和样式
-        for tag in soup(["script", "style", "noscript", "iframe", "svg"]):
-            tag.decompose()
-
-        # 移除注释
-        for comment in soup.find_all(string=lambda text: isinstance(text, str) and text.strip().startswith("<!--")):
-            comment.extract()
-
-        # 移除常见的无关元素
-        for selector in [
-            "header",
-            "footer",
-            "nav",
-            ".nav",
-            ".header",
-            ".footer",
-            ".sidebar",
-            ".ad",
-            ".advertisement",
-            "#cookie-banner",
-            ".cookie-notice",
-        ]:
-            for elem in soup.select(selector):
-                elem.decompose()
-
-        # 获取文本内容，保留一定的结构
-        # 只保留主要内容区域
-        main_content = soup.select_one("main, #main, .main, article, .product, .product-detail")
-        if main_content:
-            return str(main_content)
-
-        return str(soup)
+        return _clean_soup(BeautifulSoup(html, self.backend))
 
     def extract_links(
         self, html: str, base_url: str, link_pattern: str | None = None
     ) -> list[str]:
-        """从页面中提取链接
+        """从页面中提取链接（同步）
 
         Args:
             html: HTML 内容
@@ -349,71 +596,8 @@ class PageParser:
         Returns:
             链接列表
         """
-        from urllib.parse import urljoin, urlparse
-
-        soup = BeautifulSoup(html, "html.parser")
-        links = set()
-        base_domain = urlparse(base_url).netloc
-
-        for a in soup.find_all("a", href=True):
-            href = a["href"]
+        return _extract_links_from_soup(BeautifulSoup(html, self.backend), base_url, link_pattern)
 
-            # logger.debug(f"检查链接: {href}")
-
-            # 跳过锚点和 JavaScript
-            if href.startswith("#") or href.startswith("javascript:"):
-                # logger.debug("跳过锚点或 JavaScript")
-                continue
-
-            # 处理相对路径
-            full_url = urljoin(base_url, href)
-
-            # 只保留同域名的链接
-            parsed = urlparse(full_url)
-            if parsed.netloc != base_domain:
-                # logger.debug(f"跳过不同域名的链接: {parsed.netloc} != {base_domain}")
-                continue
-
-            # 移除锚点
-            full_url = full_url.split("#")[0]
-
-            # logger.debug(f"处理后的链接: {full_url}")
-
-            # 应用链接过滤
-            if link_pattern:
-                if not self._match_pattern(parsed.path, full_url, link_pattern):
-                    # logger.debug(
-                    #     f"跳过不匹配的链接: {parsed.path} | {full_url} not match {link_pattern}"
-                    # )
-                    continue
-
-            links.add(full_url)
-            # logger.debug(f"添加链接到列表: {full_url}")
-
-        return list(links)
-
-    def _match_pattern(self, path: str, full_url: str, pattern: str) -> bool:
-        """检查路径或完整 URL 是否匹配模式
-
-        Args:
-            path: URL 路径
-            full_url: 完整 URL
-            pattern: 匹配模式（支持 glob 和正则）
-
-        Returns:
-            是否匹配
-        """
-        import fnmatch
-
-        def _match(target: str) -> bool:
-            if fnmatch.fnmatch(target, pattern):
-                return True
-            try:
-                if re.search(pattern, target):
-                    return True
-            except re.error:
-                pass
-            return False
-
-        # 先尝试路径（兼容以前的配置），再尝试完整 URL
-        return _match(path) or _match(full_url)
+    def accept_link(self, url: str, base_domain: str, link_pattern: str | None = None) -> bool:
+        """检查链接是否应加入爬取队列（同域名且匹配过滤模式）"""
+        return accept_link(url, base_domain, link_pattern)
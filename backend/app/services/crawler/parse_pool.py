@@ -0,0 +1,70 @@
+"""HTML 解析进程池
+
+BeautifulSoup 构建 DOM 与选择器匹配是纯 CPU 计算，大页面单次 50~200ms；
+放在事件循环线程会阻塞同一循环上的聊天 SSE 流，放在线程池又受 GIL 限制。
+因此解析统一提交到独立的进程池：
+- 进程池按需创建（首次解析时），应用关闭时释放
+- CRAWLER_PARSE_WORKERS <= 0 时退化为线程执行（测试或受限环境）
+- 子进程异常退出（BrokenProcessPool）时重建进程池，本次改为线程执行
+"""
+
+import asyncio
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TypeVar
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("crawler.parse_pool")
+
+T = TypeVar("T")
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn：避免在持有事件循环/线程的进程中 fork
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.CRAWLER_PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info("HTML 解析进程池已启动", workers=settings.CRAWLER_PARSE_WORKERS)
+    return _executor
+
+
+async def run_parse(fn: Callable[[], T]) -> T:
+    """在解析进程池中执行解析函数
+
+    Args:
+        fn: 无参可调用对象（模块级函数的 functools.partial，参数与返回值需可序列化）
+
+    Returns:
+        fn 的返回值
+    """
+    global _executor
+    if settings.CRAWLER_PARSE_WORKERS <= 0:
+        return await asyncio.to_thread(fn)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_executor(), fn)
+    except BrokenProcessPool:
+        logger.warning("HTML 解析进程池异常，重建后重试（本次在线程中执行）")
+        broken, _executor = _executor, None
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+        return await asyncio.to_thread(fn)
+
+
+def shutdown_parse_pool() -> None:
+    """关闭解析进程池（应用退出时调用）"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        logger.debug("HTML 解析进程池已关闭")
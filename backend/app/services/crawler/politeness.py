@@ -0,0 +1,66 @@
+"""按 host 的礼貌限速
+
+用令牌桶替代每页固定 sleep：
+- 速率 = 1 / crawl_delay（每个 host 每秒请求数），容量 = burst
+- 等待只发生在真正需要的时候，抓取与解析的耗时可以和限速窗口重叠
+- 多个 worker 共享同一个 host 的令牌桶，整体请求速率仍受 crawl_delay 约束
+"""
+
+import asyncio
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """异步令牌桶"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """获取一个令牌，不足时等待"""
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class HostPoliteness:
+    """按 host 分桶的礼貌限速器"""
+
+    def __init__(self, delay: float, burst: int = 1):
+        """
+        Args:
+            delay: 同一 host 两次请求的平均间隔（秒），<= 0 表示不限速
+            burst: 每个 host 允许的突发请求数
+        """
+        self.delay = delay
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+
+    async def wait(self, url: str) -> None:
+        """请求 url 前调用，按其 host 限速"""
+        if self.delay <= 0:
+            return
+        host = urlparse(url).netloc.lower()
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(rate=1 / self.delay, capacity=self.burst)
+            self._buckets[host] = bucket
+        await bucket.acquire()
@@ -0,0 +1,131 @@
+"""Sitemap 发现与解析
+
+增量重爬时用 sitemap 的 lastmod 判断页面是否需要重新抓取：
+1. 从 robots.txt 的 Sitemap: 行发现 sitemap，未声明时回退到 /sitemap.xml
+2. 支持 urlset 与 sitemapindex（限制嵌套文件数），支持 gzip 压缩的 sitemap
+3. lastmod 统一转换为本地时间的 naive datetime（与 CrawlPage.crawled_at 一致）
+"""
+
+import asyncio
+import gzip
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from urllib.parse import urljoin, urlparse
+
+from app.core.logging import get_logger
+from app.services.crawler.fetcher import HttpFetcher
+
+logger = get_logger("crawler.sitemap")
+
+# 单个站点最多读取的 sitemap 文件数（sitemapindex 嵌套时防止无限展开）
+MAX_SITEMAP_FILES = 50
+
+
+def parse_lastmod(value: str | None) -> datetime | None:
+    """解析 W3C Datetime 格式的 lastmod
+
+    仅有日期时取当天结束时刻（当天内的任何爬取都不能证明内容未变）。
+
+    Returns:
+        本地时间的 naive datetime，无法解析时返回 None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        if len(value) == 10:
+            return datetime.fromisoformat(value) + timedelta(days=1)
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_sitemap(content: bytes) -> tuple[dict[str, datetime | None], list[str]]:
+    """解析 sitemap 文档
+
+    Args:
+        content: sitemap 原始内容（可为 gzip 压缩）
+
+    Returns:
+        (页面 url -> lastmod, 子 sitemap URL 列表)
+    """
+    if content[:2] == b"\x1f\x8b":
+        content = gzip.decompress(content)
+
+    urls: dict[str, datetime | None] = {}
+    children: list[str] = []
+    root = ET.fromstring(content)
+    kind = _local_name(root.tag)
+    for entry in root:
+        loc: str | None = None
+        lastmod: str | None = None
+        for child in entry:
+            name = _local_name(child.tag)
+            if name == "loc":
+                loc = (child.text or "").strip()
+            elif name == "lastmod":
+                lastmod = child.text
+        if not loc:
+            continue
+        if kind == "sitemapindex":
+            children.append(loc)
+        else:
+            urls[loc] = parse_lastmod(lastmod)
+    return urls, children
+
+
+async def discover_sitemaps(http: HttpFetcher, start_url: str) -> list[str]:
+    """从 robots.txt 发现 sitemap 地址，未声明时回退到 /sitemap.xml"""
+    parsed = urlparse(start_url)
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    sitemaps: list[str] = []
+    robots = await http.fetch_bytes(f"{origin}/robots.txt")
+    if robots:
+        for line in robots.decode("utf-8", errors="ignore").splitlines():
+            key, _, value = line.partition(":")
+            if key.strip().lower() == "sitemap" and value.strip():
+                sitemaps.append(urljoin(origin, value.strip()))
+    return sitemaps or [f"{origin}/sitemap.xml"]
+
+
+async def fetch_sitemap_entries(http: HttpFetcher, start_url: str) -> dict[str, datetime | None]:
+    """读取站点全部 sitemap 条目
+
+    Args:
+        http: HTTP 抓取器
+        start_url: 站点起始 URL
+
+    Returns:
+        页面 url -> lastmod（无 sitemap 或读取失败时为空）
+    """
+    pending = await discover_sitemaps(http, start_url)
+    visited: set[str] = set()
+    entries: dict[str, datetime | None] = {}
+
+    while pending and len(visited) < MAX_SITEMAP_FILES:
+        sitemap_url = pending.pop(0)
+        if sitemap_url in visited:
+            continue
+        visited.add(sitemap_url)
+
+        content = await http.fetch_bytes(sitemap_url)
+        if not content:
+            continue
+        try:
+            urls, children = await asyncio.to_thread(parse_sitemap, content)
+        except (ET.ParseError, OSError, EOFError) as e:
+            logger.warning("解析 sitemap 失败，忽略", url=sitemap_url, error=str(e))
+            continue
+        entries.update(urls)
+        pending.extend(children)
+
+    if entries:
+        logger.info("读取 sitemap 完成", start_url=start_url, files=len(visited), urls=len(entries))
+    return entries
@@ -0,0 +1,418 @@
+"""页面模板学习
+
+未配置选择器时，爬虫默认对每个页面调用一次 LLM 解析，这是爬取中最慢、最贵的环节。
+同一站点同一 URL 模式（如 /product/*）的页面通常共用一套模板，因此：
+1. 学习：某个 URL 模式的前 K 个商品页仍走 LLM，收集 (HTML, LLM 输出) 样本
+2. 推断：在样本 DOM 中定位与 LLM 输出文本一致的元素，生成候选 CSS 选择器，
+   取在全部样本上都能复现 LLM 输出的最短选择器（name 必须学到，其余字段尽力而为）
+3. 使用：该模式后续页面改用选择器解析；选择器未提取到商品时回退 LLM，
+   回退中 LLM 判定为商品页的次数累计过多时重新学习，多次学习失败后固定使用 LLM
+
+模板按 (site_id, url_pattern) 持久化在 crawl_templates 表，夜间重爬无需重新学习。
+"""
+
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import partial
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup, Tag
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.crawler import CrawlTemplate, CrawlTemplateStatus
+from app.schemas.crawler import (
+    ExtractionConfig,
+    ExtractionMode,
+    FieldExtractionConfig,
+    ParsedProductData,
+)
+from app.services.crawler.page_parser import PageAnalysis, PageParser
+from app.services.crawler.parse_pool import run_parse
+
+logger = get_logger("crawler.template")
+
+# 可学习的字段（LLM 改写较多的 summary/description 通常学不到，学不到的字段保持为空）
+TEMPLATE_TEXT_FIELDS = ("name", "brand", "category", "summary", "description")
+
+# 最多学习次数，超过后该模式固定使用 LLM
+MAX_LEARN_ATTEMPTS = 3
+
+# 选择器未命中但 LLM 判定为商品页的次数达到该值（且超过命中数的 10%）时重新学习
+MISS_RELEARN_THRESHOLD = 3
+
+_SKIP_TAGS = {"script", "style", "noscript", "template", "[document]"}
+_CSS_IDENT_RE = re.compile(r"^[A-Za-z_][\w-]*$")
+_PRICE_RE = re.compile(r"[\d,]+\.?\d*")
+_WHITESPACE_RE = re.compile(r"\s+")
+_DIGIT_RE = re.compile(r"\d")
+_SLUG_RE = re.compile(r"[-_.]")
+
+
+def url_pattern(url: str) -> str:
+    """将 URL 归一化为模板模式
+
+    含数字的路径段、超长路径段，以及多级路径中形如 slug 的末段替换为 *：
+    /product/123 -> /product/*，/products/wireless-headphones -> /products/*
+    """
+    segments = [s for s in urlparse(url).path.split("/") if s]
+    pattern: list[str] = []
+    for i, segment in enumerate(segments):
+        is_slug = i > 0 and i == len(segments) - 1 and _SLUG_RE.search(segment)
+        if _DIGIT_RE.search(segment) or len(segment) > 40 or is_slug:
+            pattern.append("*")
+        else:
+            pattern.append(segment)
+    return "/" + "/".join(pattern)
+
+
+# ==================== 选择器推断（同步，在解析进程池中执行） ====================
+
+
+def _compact(text: str) -> str:
+    return _WHITESPACE_RE.sub("", text)
+
+
+def _price_of(text: str) -> float | None:
+    match = _PRICE_RE.search(text)
+    if not match:
+        return None
+    try:
+        return float(match.group().replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _matches(field_name: str, elem: Tag | None, value) -> bool:
+    """元素按选择器模式提取出的值是否与 LLM 输出一致"""
+    if elem is None:
+        return False
+    text = elem.get_text(strip=True)
+    if field_name == "price":
+        price = _price_of(text)
+        return price is not None and abs(price - float(value)) < 0.005
+    return _compact(text) == _compact(str(value))
+
+
+def _local_selectors(elem: Tag) -> list[str]:
+    tag = elem.name
+    selectors = [tag]
+    classes = [c for c in elem.get("class") or [] if _CSS_IDENT_RE.match(c)]
+    selectors.extend(f"{tag}.{c}" for c in classes)
+    if len(classes) > 1:
+        selectors.append(tag + "".join(f".{c}" for c in classes))
+    elem_id = elem.get("id")
+    if elem_id and _CSS_IDENT_RE.match(elem_id) and not _DIGIT_RE.search(elem_id):
+        selectors.append(f"#{elem_id}")
+    itemprop = elem.get("itemprop")
+    if itemprop and _CSS_IDENT_RE.match(itemprop):
+        selectors.append(f'[itemprop="{itemprop}"]')
+    return selectors
+
+
+def _candidate_selectors(elem: Tag) -> list[str]:
+    """元素的候选选择器：自身特征 + 最近的有 id/class 祖先限定"""
+    local = _local_selectors(elem)
+    # 无 class 的兄弟元素靠位置区分
+    position = 1 + len(elem.find_previous_siblings(elem.name))
+    local.append(f"{elem.name}:nth-of-type({position})")
+
+    selectors = list(local)
+    parent = elem.parent
+    for _ in range(3):
+        if parent is None or parent.name in ("html", "body", "[document]"):
+            break
+        anchors = [s for s in _local_selectors(parent) if s != parent.name]
+        if anchors:
+            selectors.extend(f"{anchors[0]} {s}" for s in local)
+            break
+        parent = parent.parent
+    return selectors
+
+
+def _find_matching_elements(soup: BeautifulSoup, field_name: str, value) -> list[Tag]:
+    """从文本节点向上查找提取值与 value 一致的元素"""
+    if field_name == "price":
+        max_length = 40
+    else:
+        max_length = len(_compact(str(value))) * 2 + 20
+    found: dict[int, Tag] = {}  # 按对象身份去重（Tag 的 == 比较的是内容）
+    for string in soup.find_all(string=True):
+        elem = string.parent
+        for _ in range(4):
+            if elem is None or elem.name in _SKIP_TAGS:
+                break
+            if len(_compact(elem.get_text())) > max_length:
+                break
+            if id(elem) not in found and _matches(field_name, elem, value):
+                found[id(elem)] = elem
+            elem = elem.parent
+    return list(found.values())
+
+
+def infer_selectors(samples: list[tuple[str, dict]], backend: str = "html.parser") -> dict[str, str] | None:
+    """根据 (HTML, LLM 输出) 样本推断字段选择器
+
+    Args:
+        samples: [(html, LLM 输出的商品字段)]
+        backend: BeautifulSoup 解析器
+
+    Returns:
+        字段 -> 选择器；未能学到 name 时返回 None
+    """
+    soups = [BeautifulSoup(html, backend) for html, _ in samples]
+    selectors: dict[str, str] = {}
+    for field_name in (*TEMPLATE_TEXT_FIELDS, "price"):
+        values = [product.get(field_name) for _, product in samples]
+        if any(value in (None, "") for value in values):
+            continue
+
+        common: set[str] | None = None
+        for soup, value in zip(soups, values):
+            candidates = {
+                selector
+                for elem in _find_matching_elements(soup, field_name, value)
+                for selector in _candidate_selectors(elem)
+            }
+            common = candidates if common is None else common & candidates
+            if not common:
+                break
+        if not common:
+            continue
+
+        # 验证：选择器在每个样本上的首个匹配都必须复现 LLM 输出
+        for selector in sorted(common, key=lambda s: (len(s), s)):
+            if all(
+                _matches(field_name, soup.select_one(selector), value)
+                for soup, value in zip(soups, values)
+            ):
+                selectors[field_name] = selector
+                break
+
+    return selectors if "name" in selectors else None
+
+
+# ==================== 学习器 ====================
+
+
+@dataclass
+class TemplateStats:
+    """单次爬取的模板解析统计"""
+
+    llm_parse_count: int = 0  # LLM 解析次数
+    template_parse_count: int = 0  # 模板选择器解析成功次数
+    template_fallbacks: int = 0  # 模板未提取到商品、回退 LLM 的次数
+
+
+@dataclass
+class _TemplateState:
+    url_pattern: str
+    status: str = CrawlTemplateStatus.LEARNING.value
+    selectors: dict[str, str] | None = None
+    learn_attempts: int = 0
+    hit_count: int = 0
+    miss_count: int = 0
+    llm_parse_count: int = 0
+    samples: list[tuple[str, dict]] = field(default_factory=list, repr=False)
+    learning: bool = False  # 推断进行中
+    dirty: bool = False
+
+    def to_row(self) -> dict:
+        return {
+            "url_pattern": self.url_pattern,
+            "status": self.status,
+            "selectors": FieldExtractionConfig(**self.selectors).model_dump_json(exclude_none=True)
+            if self.selectors
+            else None,
+            "learn_attempts": self.learn_attempts,
+            "hit_count": self.hit_count,
+            "miss_count": self.miss_count,
+            "llm_parse_count": self.llm_parse_count,
+        }
+
+
+class TemplateLearner:
+    """单个站点的模板学习器（单次爬取内 worker 共享）"""
+
+    def __init__(
+        self,
+        site_id: str,
+        base_config: ExtractionConfig | None,
+        templates: Iterable[CrawlTemplate] = (),
+        *,
+        min_samples: int | None = None,
+    ):
+        """
+        Args:
+            site_id: 站点 ID
+            base_config: 站点提取配置（仅 LLM 模式参与学习）
+            templates: 已持久化的模板
+            min_samples: 推断选择器所需的样本数，默认取 CRAWLER_TEMPLATE_SAMPLES
+        """
+        self.site_id = site_id
+        self.base_config = base_config
+        self.min_samples = max(1, min_samples or settings.CRAWLER_TEMPLATE_SAMPLES)
+        self.stats = TemplateStats()
+        self._states: dict[str, _TemplateState] = {}
+        for template in templates:
+            self._states[template.url_pattern] = _TemplateState(
+                url_pattern=template.url_pattern,
+                status=template.status,
+                selectors=(
+                    FieldExtractionConfig.model_validate_json(template.selectors).model_dump(exclude_none=True)
+                    if template.selectors
+                    else None
+                ),
+                learn_attempts=template.learn_attempts,
+                hit_count=template.hit_count,
+                miss_count=template.miss_count,
+                llm_parse_count=template.llm_parse_count,
+            )
+
+    @property
+    def enabled(self) -> bool:
+        """显式配置了选择器模式的站点不参与学习"""
+        return self.base_config is None or self.base_config.mode == ExtractionMode.LLM
+
+    def _state(self, url: str) -> _TemplateState:
+        key = url_pattern(url)
+        state = self._states.get(key)
+        if state is None:
+            state = _TemplateState(url_pattern=key)
+            self._states[key] = state
+        return state
+
+    def config_for(self, url: str) -> ExtractionConfig | None:
+        """页面应使用的提取配置（模板已启用的模式返回选择器配置）"""
+        if not self.enabled:
+            return self.base_config
+        state = self._states.get(url_pattern(url))
+        if state is None or state.status != CrawlTemplateStatus.ACTIVE.value or not state.selectors:
+            return self.base_config
+        return ExtractionConfig(
+            mode=ExtractionMode.SELECTOR,
+            fields=FieldExtractionConfig(**state.selectors),
+        )
+
+    def uses_template(self, url: str) -> bool:
+        """页面是否由已启用模板的选择器解析（结果只含模板学到的字段）"""
+        return self.config_for(url) is not self.base_config
+
+    async def parse(
+        self,
+        parser: PageParser,
+        html: str,
+        url: str,
+        analysis: PageAnalysis | None = None,
+    ) -> tuple[bool, ParsedProductData | None, str | None]:
+        """解析页面：模板可用时用选择器，否则用 LLM 并收集样本
+
+        Returns:
+            (is_product_page, parsed_data, error)
+        """
+        if not self.enabled:
+            return await parser.parse(html, url, self.base_config, analysis=analysis)
+
+        state = self._state(url)
+        selector_config = self.config_for(url)
+        if selector_config is not self.base_config:
+            is_product, product, error = await parser.parse(html, url, selector_config, analysis=analysis)
+            if is_product and product:
+                state.hit_count += 1
+                state.dirty = True
+                self.stats.template_parse_count += 1
+                if not product.url:
+                    product.url = url
+                return is_product, product, error
+
+            self.stats.template_fallbacks += 1
+            result = await self._parse_with_llm(parser, state, html, url, None)
+            if result[0] and result[1]:
+                self._record_miss(state)
+            return result
+
+        result = await self._parse_with_llm(parser, state, html, url, analysis)
+        is_product, product, _ = result
+        if state.status == CrawlTemplateStatus.LEARNING.value and is_product and product:
+            state.samples.append((html, product.model_dump(exclude_none=True)))
+            if len(state.samples) >= self.min_samples and not state.learning:
+                await self._learn(state, parser.backend)
+        return result
+
+    async def _parse_with_llm(
+        self,
+        parser: PageParser,
+        state: _TemplateState,
+        html: str,
+        url: str,
+        analysis: PageAnalysis | None,
+    ) -> tuple[bool, ParsedProductData | None, str | None]:
+        self.stats.llm_parse_count += 1
+        state.llm_parse_count += 1
+        state.dirty = True
+        return await parser.parse(html, url, self.base_config, analysis=analysis)
+
+    def _record_miss(self, state: _TemplateState) -> None:
+        """选择器未命中而 LLM 提取到商品：累计过多时重新学习"""
+        state.miss_count += 1
+        state.dirty = True
+        if state.miss_count < MISS_RELEARN_THRESHOLD or state.miss_count * 10 <= state.hit_count:
+            return
+        state.selectors = None
+        state.miss_count = 0
+        state.status = (
+            CrawlTemplateStatus.DISABLED.value
+            if state.learn_attempts >= MAX_LEARN_ATTEMPTS
+            else CrawlTemplateStatus.LEARNING.value
+        )
+        logger.warning(
+            "模板选择器失效",
+            site_id=self.site_id,
+            url_pattern=state.url_pattern,
+            status=state.status,
+        )
+
+    async def _learn(self, state: _TemplateState, backend: str) -> None:
+        """用已收集的样本推断选择器"""
+        state.learning = True
+        samples, state.samples = state.samples, []
+        try:
+            selectors = await run_parse(partial(infer_selectors, samples, backend))
+        except Exception as e:
+            logger.warning("推断模板选择器失败", url_pattern=state.url_pattern, error=str(e))
+            selectors = None
+        finally:
+            state.learning = False
+
+        state.learn_attempts += 1
+        state.dirty = True
+        if selectors:
+            state.status = CrawlTemplateStatus.ACTIVE.value
+            state.selectors = selectors
+            state.miss_count = 0
+            logger.info(
+                "模板学习成功，后续页面改用选择器解析",
+                site_id=self.site_id,
+                url_pattern=state.url_pattern,
+                selectors=selectors,
+            )
+        elif state.learn_attempts >= MAX_LEARN_ATTEMPTS:
+            state.status = CrawlTemplateStatus.DISABLED.value
+            logger.info("模板学习多次失败，固定使用 LLM", site_id=self.site_id, url_pattern=state.url_pattern)
+        else:
+            logger.info(
+                "模板学习未通过验证，继续收集样本",
+                site_id=self.site_id,
+                url_pattern=state.url_pattern,
+                attempts=state.learn_attempts,
+            )
+
+    def drain_changes(self) -> list[dict]:
+        """取出自上次保存以来有变化的模板（CrawlTemplate 字段字典）"""
+        rows = []
+        for state in self._states.values():
+            if state.dirty:
+                rows.append(state.to_row())
+                state.dirty = False
+        return rows
@@ -0,0 +1,220 @@
+"""仪表盘统计服务
+
+大表（messages / conversations / users）的计数来自按天汇总的 DailyStats：
+- StatsRollupTask 周期性把已结束自然日的计数写入 daily_stats
+- 查询时：总数 = 汇总行之和 + 水位线之后的实时增量（走 created_at 索引的范围扫描）
+- 主库与爬虫库的统计各用一条查询，并发执行
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging import get_logger
+from app.models.agent import Agent
+from app.models.conversation import Conversation, HandoffState
+from app.models.crawler import CrawlSite, CrawlTask, CrawlTaskStatus
+from app.models.daily_stats import DailyStats
+from app.models.message import Message
+from app.models.product import Product
+from app.models.user import User
+from app.schemas.admin import AgentStatsInfo, DashboardStats
+
+logger = get_logger("dashboard_stats")
+
+# 参与按天汇总的表：DailyStats 字段名 -> 模型（均有 created_at 列）
+_ROLLUP_SOURCES: dict[str, Any] = {
+    "conversations": Conversation,
+    "messages": Message,
+    "users": User,
+}
+
+
+def _as_date(value: Any) -> date:
+    """统一 SQLite（字符串）与 Postgres（date）的 date() 返回值"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day)
+
+
+async def get_rollup_watermark(session: AsyncSession) -> date | None:
+    """获取已汇总的最后一天"""
+    return await session.scalar(select(func.max(DailyStats.day)))
+
+
+async def rollup_daily_stats(session: AsyncSession, *, full: bool = False) -> int:
+    """将已结束自然日的计数汇总进 daily_stats
+
+    增量模式重算水位线当天（兜底跨零点提交的晚到数据）到昨天；
+    全量模式重算全部历史（用于首次回填或校正删除带来的偏差）。
+
+    Args:
+        session: 主数据库会话
+        full: 是否全量重算
+
+    Returns:
+        写入的天数
+    """
+    today = datetime.now().date()
+    start: date | None = None if full else await get_rollup_watermark(session)
+
+    per_day: dict[date, dict[str, int]] = {}
+    for field_name, model in _ROLLUP_SOURCES.items():
+        day_col = func.date(model.created_at)
+        stmt = (
+            select(day_col.label("day"), func.count().label("count"))
+            .where(model.created_at < _day_start(today))
+            .group_by(day_col)
+        )
+        if start is not None:
+            stmt = stmt.where(model.created_at >= _day_start(start))
+        result = await session.execute(stmt)
+        for row in result.all():
+            if row.day is None:
+                continue
+            per_day.setdefault(_as_date(row.day), {})[field_name] = row.count
+
+    clear_stmt = delete(DailyStats)
+    if start is not None:
+        clear_stmt = clear_stmt.where(DailyStats.day >= start)
+    await session.execute(clear_stmt)
+
+    # 昨天没有数据也写一行，使水位线推进到昨天
+    if start is not None or per_day:
+        per_day.setdefault(today - timedelta(days=1), {})
+
+    session.add_all(
+        DailyStats(
+            day=day,
+            conversations=counts.get("conversations", 0),
+            messages=counts.get("messages", 0),
+            users=counts.get("users", 0),
+        )
+        for day, counts in per_day.items()
+    )
+    await session.flush()
+
+    logger.info(
+        "每日统计汇总完成",
+        full=full,
+        start=start.isoformat() if start else None,
+        days=len(per_day),
+    )
+    return len(per_day)
+
+
+async def _app_stats(session: AsyncSession) -> dict[str, Any]:
+    """主库统计（读取水位线后，单条聚合查询）"""
+    today = _day_start(datetime.now().date())
+    watermark = await get_rollup_watermark(session)
+    live_since = _day_start(watermark + timedelta(days=1)) if watermark else None
+
+    def rolled(column: Any) -> Any:
+        return select(func.coalesce(func.sum(column), 0)).scalar_subquery()
+
+    def live(model: Any) -> Any:
+        stmt = select(func.count()).select_from(model)
+        if live_since is not None:
+            stmt = stmt.where(model.created_at >= live_since)
+        return stmt.scalar_subquery()
+
+    def count_where(model: Any, *conditions: Any) -> Any:
+        return select(func.count()).select_from(model).where(*conditions).scalar_subquery()
+
+    stmt = select(
+        rolled(DailyStats.conversations).label("rolled_conversations"),
+        rolled(DailyStats.messages).label("rolled_messages"),
+        rolled(DailyStats.users).label("rolled_users"),
+        live(Conversation).label("live_conversations"),
+        live(Message).label("live_messages"),
+        live(User).label("live_users"),
+        count_where(Conversation, Conversation.created_at >= today).label("today_conversations"),
+        count_where(Message, Message.created_at >= today).label("today_messages"),
+        select(func.count()).select_from(Product).scalar_subquery().label("total_products"),
+        count_where(Conversation, Conversation.handoff_state == HandoffState.AI.value).label("ai"),
+        count_where(Conversation, Conversation.handoff_state == HandoffState.PENDING.value).label("pending"),
+        count_where(Conversation, Conversation.handoff_state == HandoffState.HUMAN.value).label("human"),
+        select(func.count()).select_from(Agent).scalar_subquery().label("total_agents"),
+        count_where(Agent, Agent.status == "enabled").label("enabled_agents"),
+        select(Agent.id).where(Agent.is_default == True).limit(1).scalar_subquery().label("default_agent_id"),  # noqa: E712
+        select(Agent.name).where(Agent.is_default == True).limit(1).scalar_subquery().label("default_agent_name"),  # noqa: E712
+    )
+    row = (await session.execute(stmt)).one()
+    return row._asdict()
+
+
+async def _crawler_stats(crawler_session: AsyncSession) -> dict[str, Any]:
+    """爬虫库统计（单条查询）"""
+
+    def count_tasks(status: str | None = None) -> Any:
+        stmt = select(func.count()).select_from(CrawlTask)
+        if status is not None:
+            stmt = stmt.where(CrawlTask.status == status)
+        return stmt.scalar_subquery()
+
+    stmt = select(
+        select(func.count()).select_from(CrawlSite).scalar_subquery().label("total_crawl_sites"),
+        count_tasks().label("total_crawl_tasks"),
+        count_tasks(CrawlTaskStatus.COMPLETED.value).label("completed_tasks"),
+        count_tasks(CrawlTaskStatus.FAILED.value).label("failed_tasks"),
+    )
+    row = (await crawler_session.execute(stmt)).one()
+    return row._asdict()
+
+
+async def get_dashboard_stats(
+    session: AsyncSession,
+    crawler_session: AsyncSession,
+    *,
+    crawler_enabled: bool,
+) -> DashboardStats:
+    """获取仪表盘统计
+
+    Args:
+        session: 主数据库会话
+        crawler_session: 爬虫数据库会话
+        crawler_enabled: 是否统计爬虫数据
+    """
+    if crawler_enabled:
+        app_row, crawler_row = await asyncio.gather(
+            _app_stats(session),
+            _crawler_stats(crawler_session),
+        )
+    else:
+        app_row, crawler_row = await _app_stats(session), None
+
+    crawl_success_rate = 0.0
+    if crawler_row:
+        total_finished = crawler_row["completed_tasks"] + crawler_row["failed_tasks"]
+        if total_finished > 0:
+            crawl_success_rate = crawler_row["completed_tasks"] / total_finished * 100
+
+    return DashboardStats(
+        total_products=app_row["total_products"],
+        total_conversations=app_row["rolled_conversations"] + app_row["live_conversations"],
+        total_users=app_row["rolled_users"] + app_row["live_users"],
+        total_messages=app_row["rolled_messages"] + app_row["live_messages"],
+        total_crawl_sites=crawler_row["total_crawl_sites"] if crawler_row else 0,
+        total_crawl_tasks=crawler_row["total_crawl_tasks"] if crawler_row else 0,
+        crawl_success_rate=round(crawl_success_rate, 1),
+        today_conversations=app_row["today_conversations"],
+        today_messages=app_row["today_messages"],
+        ai_conversations=app_row["ai"],
+        pending_conversations=app_row["pending"],
+        human_conversations=app_row["human"],
+        agent_stats=AgentStatsInfo(
+            total_agents=app_row["total_agents"],
+            enabled_agents=app_row["enabled_agents"],
+            default_agent_id=app_row["default_agent_id"],
+            default_agent_name=app_row["default_agent_name"],
+        ),
+    )
@@ -0,0 +1,221 @@
+"""会话/消息流式导出服务
+
+用于 QA 与训练数据拉取，按 NDJSON 逐行输出：
+- 按主键 keyset 分批读取（不用 OFFSET），每批使用独立短事务，
+  避免长时间持有读事务（SQLite WAL 下会阻塞 checkpoint）；
+  批次读完即关闭会话再产出，下游写响应慢时不占用数据库连接
+- 每批只保留 batch_size 行的字典数据（不构建 ORM 对象），内存有界
+- 工具调用按批次用一条 IN 查询取回，挂在所属消息下
+- since/until 按时间窗口过滤，用于增量导出；结尾行给出下次增量的起点
+"""
+
+import json
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db_context
+from app.core.logging import get_logger
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.tool_call import ToolCall
+
+logger = get_logger("export")
+
+SessionFactory = Callable[[], AbstractAsyncContextManager[AsyncSession]]
+# 在批次的会话内补充关联数据（如工具调用），就地修改记录
+BatchLoader = Callable[[AsyncSession, list[dict[str, Any]]], Awaitable[None]]
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+
+_MESSAGE_COLUMNS = (
+    Message.id,
+    Message.conversation_id,
+    Message.role,
+    Message.content,
+    Message.products,
+    Message.message_type,
+    Message.extra_metadata,
+    Message.token_count,
+    Message.latency_ms,
+    Message.is_withdrawn,
+    Message.is_edited,
+    Message.created_at,
+)
+
+_TOOL_CALL_COLUMNS = (
+    ToolCall.message_id,
+    ToolCall.tool_call_id,
+    ToolCall.tool_name,
+    ToolCall.tool_input,
+    ToolCall.tool_output,
+    ToolCall.status,
+    ToolCall.error_message,
+    ToolCall.duration_ms,
+    ToolCall.created_at,
+)
+
+_CONVERSATION_COLUMNS = (
+    Conversation.id,
+    Conversation.user_id,
+    Conversation.title,
+    Conversation.agent_id,
+    Conversation.handoff_state,
+    Conversation.handoff_operator,
+    Conversation.created_at,
+    Conversation.updated_at,
+)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _ndjson(record: dict[str, Any]) -> str:
+    return json.dumps(record, ensure_ascii=False, default=_json_default) + "\n"
+
+
+async def _keyset_batches(
+    stmt: Any,
+    key_column: Any,
+    *,
+    after_id: str | None,
+    batch_size: int,
+    session_factory: SessionFactory,
+    load_related: BatchLoader | None = None,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """按主键 keyset 分批读取，每批一个独立会话
+
+    行与关联数据在会话内读成字典，关闭会话后再产出。
+    """
+    last_id = after_id
+    while True:
+        batch_stmt = stmt.order_by(key_column).limit(batch_size)
+        if last_id is not None:
+            batch_stmt = batch_stmt.where(key_column > last_id)
+        async with session_factory() as session:
+            records = [row._asdict() for row in (await session.execute(batch_stmt)).all()]
+            if records and load_related is not None:
+                await load_related(session, records)
+        if not records:
+            return
+        yield records
+        last_id = records[-1]["id"]
+        if len(records) < batch_size:
+            return
+
+
+async def _load_tool_calls(session: AsyncSession, records: list[dict[str, Any]]) -> None:
+    """一条 IN 查询取回批次内消息的工具调用，挂在所属消息下"""
+    tool_calls: dict[str, list[dict[str, Any]]] = {}
+    tc_stmt = (
+        select(*_TOOL_CALL_COLUMNS)
+        .where(ToolCall.message_id.in_([record["id"] for record in records]))
+        .order_by(ToolCall.id)
+    )
+    for tc in (await session.execute(tc_stmt)).all():
+        tool_call = tc._asdict()
+        tool_calls.setdefault(tool_call.pop("message_id"), []).append(tool_call)
+    for record in records:
+        record["tool_calls"] = tool_calls.get(record["id"], [])
+
+
+def _time_window(stmt: Any, column: Any, since: datetime | None, until: datetime | None) -> Any:
+    if since is not None:
+        stmt = stmt.where(column >= since)
+    if until is not None:
+        stmt = stmt.where(column < until)
+    return stmt
+
+
+async def stream_messages(
+    *,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    conversation_id: str | None = None,
+    after_id: str | None = None,
+    include_tool_calls: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    session_factory: SessionFactory = get_db_context,
+) -> AsyncGenerator[str, None]:
+    """流式导出消息（NDJSON）
+
+    Args:
+        since: 仅导出 created_at >= since 的消息
+        until: 仅导出 created_at < until 的消息，默认取导出开始时间
+        conversation_id: 仅导出指定会话
+        after_id: 从该消息 ID 之后继续（断点续传，取自上次结尾行的 last_id）
+        include_tool_calls: 是否附带工具调用
+        batch_size: 每批行数
+        session_factory: 会话工厂（每批一个短事务）
+
+    Yields:
+        每行一条 {"type": "message", ...}，最后一行 {"type": "export_end", ...}
+    """
+    started_at = datetime.now()
+    until = until or started_at
+    stmt = _time_window(select(*_MESSAGE_COLUMNS), Message.created_at, since, until)
+    if conversation_id:
+        stmt = stmt.where(Message.conversation_id == conversation_id)
+
+    count = 0
+    last_id = after_id
+    async for records in _keyset_batches(
+        stmt,
+        Message.id,
+        after_id=after_id,
+        batch_size=batch_size,
+        session_factory=session_factory,
+        load_related=_load_tool_calls if include_tool_calls else None,
+    ):
+        for record in records:
+            yield _ndjson({"type": "message", **record})
+        count += len(records)
+        last_id = records[-1]["id"]
+
+    logger.info("消息导出完成", count=count, since=since, until=until, conversation_id=conversation_id)
+    yield _ndjson({"type": "export_end", "count": count, "last_id": last_id, "next_since": until})
+
+
+async def stream_conversations(
+    *,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    after_id: str | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    session_factory: SessionFactory = get_db_context,
+) -> AsyncGenerator[str, None]:
+    """流式导出会话元数据（NDJSON）
+
+    增量模式按 updated_at 过滤，导出窗口内有变化的会话。
+
+    Yields:
+        每行一条 {"type": "conversation", ...}，最后一行 {"type": "export_end", ...}
+    """
+    started_at = datetime.now()
+    until = until or started_at
+    stmt = _time_window(select(*_CONVERSATION_COLUMNS), Conversation.updated_at, since, until)
+
+    count = 0
+    last_id = after_id
+    async for records in _keyset_batches(
+        stmt,
+        Conversation.id,
+        after_id=after_id,
+        batch_size=batch_size,
+        session_factory=session_factory,
+    ):
+        for record in records:
+            yield _ndjson({"type": "conversation", **record})
+        count += len(records)
+        last_id = records[-1]["id"]
+
+    logger.info("会话导出完成", count=count, since=since, until=until)
+    yield _ndjson({"type": "export_end", "count": count, "last_id": last_id, "next_since": until})
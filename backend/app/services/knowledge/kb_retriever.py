@@ -6,6 +6,8 @@
 from typing import Any
 
 from app.core.logging import get_logger
+from app.core.metrics import DEPENDENCY_DURATION
+from app.core.tracing import trace_span
 
 logger = get_logger("knowledge.kb")
 
@@ -47,8 +49,10 @@ class KBRetriever:
 
         try:
             # 1. 获取查询向量
-            embedding_model = get_embedding_model()
-            query_vector = await embedding_model.aembed_query(query)
+            with trace_span("retrieval.embed_query"):
+                embedding_model = get_embedding_model()
+                with DEPENDENCY_DURATION.labels("embedding", "embed_query").time():
+                    query_vector = await embedding_model.aembed_query(query)
 
             # 2. 执行向量检索
             client = AsyncQdrantClient(
@@ -59,12 +63,16 @@ class KBRetriever:
             # 检索更多结果以便 rerank
             search_limit = self.top_k * 3 if self.rerank_enabled else self.top_k
 
-            results = await client.search(
-                collection_name=self.collection_name,
-                query_vector=query_vector,
-                limit=search_limit,
-                score_threshold=self.similarity_threshold,
-            )
+            with (
+                trace_span("retrieval.vector_search", collection=self.collection_name, k=search_limit),
+                DEPENDENCY_DURATION.labels("qdrant", "search").time(),
+            ):
+                results = await client.search(
+                    collection_name=self.collection_name,
+                    query_vector=query_vector,
+                    limit=search_limit,
+                    score_threshold=self.similarity_threshold,
+                )
 
             # 3. 格式化结果
             documents: list[dict[str, Any]] = []
@@ -83,7 +91,8 @@ class KBRetriever:
 
             # 4. 可选 Rerank
             if self.rerank_enabled and documents:
-                documents = await self._rerank(query, documents)
+                with trace_span("retrieval.rerank", doc_count=len(documents)):
+                    documents = await self._rerank(query, documents)
 
             # 5. 截取 top_k
             documents = documents[: self.top_k]
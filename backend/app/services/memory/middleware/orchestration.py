@@ -39,6 +39,8 @@ if TYPE_CHECKING:
 
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.core.metrics import MEMORY_WRITE_LAG, MEMORY_WRITE_PENDING
+from app.core.tracing import trace_span
 from app.schemas.events import StreamEventType
 
 logger = get_logger("middleware.memory_orchestration")
@@ -152,10 +154,6 @@ class MemoryOrchestrationMiddleware(AgentMiddleware):
         Returns:
             格式化的记忆上下文字符串
         """
-        import time as _time
-        start = _time.perf_counter()
-        logger.debug(f"_get_memory_context: 开始 user_id={user_id}")
-        
         if not settings.MEMORY_ENABLED:
             return ""
 
@@ -164,13 +162,11 @@ class MemoryOrchestrationMiddleware(AgentMiddleware):
         # 1. 用户画像（从 Store）
         if self.inject_profile and settings.MEMORY_STORE_ENABLED:
             try:
-                step_start = _time.perf_counter()
-                logger.debug("_get_memory_context: [1/3] 开始获取用户画像...")
-                from app.services.memory.store import get_user_profile_store
+                with trace_span("memory.profile"):
+                    from app.services.memory.store import get_user_profile_store
 
-                store = await get_user_profile_store()
-                profile = await store.get_user_profile(user_id)
-                logger.debug(f"_get_memory_context: [1/3] 用户画像获取完成，耗时 {(_time.perf_counter() - step_start) * 1000:.2f}ms")
+                    store = await get_user_profile_store()
+                    profile = await store.get_user_profile(user_id)
                 if profile:
                     profile_str = self._format_profile(profile)
                     if profile_str:
@@ -181,19 +177,15 @@ class MemoryOrchestrationMiddleware(AgentMiddleware):
         # 2. 相关事实（从 FactMemory）
         if self.inject_facts and settings.MEMORY_FACT_ENABLED:
             try:
-                step_start = _time.perf_counter()
-                logger.debug("_get_memory_context: [2/3] 开始获取事实记忆...")
-                from app.services.memory.fact_memory import get_fact_memory_service
+                with trace_span("memory.facts") as span:
+                    from app.services.memory.fact_memory import get_fact_memory_service
 
-                fact_service = await get_fact_memory_service()
-                logger.debug(f"_get_memory_context: [2/3] fact_service 获取完成，耗时 {(_time.perf_counter() - step_start) * 1000:.2f}ms")
-                
-                search_start = _time.perf_counter()
-                logger.debug("_get_memory_context: [2/3] 开始搜索事实...")
-                facts = await fact_service.search_facts(
-                    user_id, query, limit=self.max_facts
-                )
-                logger.debug(f"_get_memory_context: [2/3] 事实搜索完成，找到 {len(facts)} 条，耗时 {(_time.perf_counter() - search_start) * 1000:.2f}ms")
+                    fact_service = await get_fact_memory_service()
+                    facts = await fact_service.search_facts(
+                        user_id, query, limit=self.max_facts
+                    )
+                    if span is not None:
+                        span.set(fact_count=len(facts))
                 if facts:
                     facts_str = "\n".join([f"- {f.content}" for f in facts])
                     context_parts.append(f"## 用户历史记忆\n{facts_str}")
@@ -208,14 +200,15 @@ class MemoryOrchestrationMiddleware(AgentMiddleware):
         # 3. 相关图谱（从 GraphMemory）
         if self.inject_graph and settings.MEMORY_GRAPH_ENABLED:
             try:
-                from app.services.memory.graph_memory import get_graph_manager
+                with trace_span("memory.graph"):
+                    from app.services.memory.graph_memory import get_graph_manager
 
-                graph_manager = await get_graph_manager()
-                # 先搜索与查询相关的节点
-                graph = await graph_manager.search_nodes(query)
-                if not graph.entities:
-                    # 如果没有匹配，尝试获取用户相关的图谱
-                    graph = await graph_manager.get_user_graph(user_id)
+                    graph_manager = await get_graph_manager()
+                    # 先搜索与查询相关的节点
+                    graph = await graph_manager.search_nodes(query)
+                    if not graph.entities:
+                        # 如果没有匹配，尝试获取用户相关的图谱
+                        graph = await graph_manager.get_user_graph(user_id)
 
                 if graph.entities:
                     graph_str = self._format_graph(graph)
@@ -458,7 +451,8 @@ class MemoryOrchestrationMiddleware(AgentMiddleware):
         # 注入记忆上下文到 system prompt
         if user_id and user_query:
             try:
-                memory_context = await self._get_memory_context(user_id, user_query)
+                with trace_span("memory.context"):
+                    memory_context = await self._get_memory_context(user_id, user_query)
                 if memory_context:
                     # 在 system message 后追加记忆上下文
                     if request.system_message:
@@ -536,9 +530,19 @@ class MemoryOrchestrationMiddleware(AgentMiddleware):
         )
 
         # 定义带 SSE 通知的记忆写入包装器（使用信号量控制并发）
+        queued_at = time.perf_counter()
+        MEMORY_WRITE_PENDING.inc()
+
         async def _memory_write_with_sse() -> None:
+            try:
+                await _memory_write_locked()
+            finally:
+                MEMORY_WRITE_PENDING.dec()
+
+        async def _memory_write_locked() -> None:
             # 使用全局信号量，确保一次只处理一个记忆写入任务
             async with _memory_write_semaphore:
+                MEMORY_WRITE_LAG.observe(time.perf_counter() - queued_at)
                 start_time = time.time()
                 
                 logger.debug(
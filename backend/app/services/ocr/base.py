@@ -1,8 +1,12 @@
 """OCR 处理器基础接口和异常定义"""
 
 from abc import ABC, abstractmethod
+from collections.abc import Callable
 from typing import Any
 
+# 逐页进度回调：(已完成页号（从 1 开始）, 总页数, 该页文本)，按页序调用
+ProgressCallback = Callable[[int, int, str], None]
+
 
 class DocumentProcessorException(Exception):
     """文档处理异常基类"""
@@ -71,6 +75,30 @@ class BaseOCRProcessor(ABC):
         """
         pass
 
+    async def aprocess_file_with_progress(
+        self,
+        file_path: str,
+        params: dict[str, Any] | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> str:
+        """异步处理文件，并按页回调进度
+
+        默认实现不分页：处理完成后以单页回调一次。支持逐页识别的处理器应覆盖此方法。
+        回调可能在工作线程中执行，调用方需自行切回事件循环。
+
+        Args:
+            file_path: 文件路径
+            params: 处理参数
+            on_progress: 进度回调
+
+        Returns:
+            str: 提取的文本内容
+        """
+        text = await self.aprocess_file(file_path, params)
+        if on_progress is not None:
+            on_progress(1, 1, text)
+        return text
+
     @abstractmethod
     def check_health(self) -> dict[str, Any]:
         """检查服务健康状态
@@ -0,0 +1,133 @@
+"""OCR 结果缓存
+
+用户与客服会反复上传同一份图片 / PDF，OCR 单次耗时数秒到数十秒：
+- 按 (内容 sha256, 处理器类型, 处理参数) 缓存识别文本，重复文件直接返回
+- 进程内 LRU，按文本字节数限制总大小（OCR_CACHE_MAX_MB），超出时淘汰最久未使用的条目
+- 相同内容的并发请求合并为一次识别，其余请求等待同一结果
+- 只缓存成功结果，识别失败不缓存
+"""
+
+import asyncio
+import json
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from app.core.config import settings
+
+
+def cache_key(content_hash: str, processor_type: str, params: dict[str, Any] | None = None) -> str:
+    """生成缓存键（参数按键排序后序列化，顺序不同的同一组参数命中同一条目）"""
+    params_json = json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return f"{processor_type}:{content_hash}:{params_json}"
+
+
+class OcrResultCache:
+    """OCR 结果 LRU 缓存"""
+
+    def __init__(self, max_bytes: int | None = None):
+        """
+        Args:
+            max_bytes: 缓存文本总字节数上限，默认取 OCR_CACHE_MAX_MB，<= 0 时不缓存
+        """
+        self.max_bytes = settings.OCR_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._total_bytes = 0
+        self._inflight: dict[str, asyncio.Future[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> str | None:
+        """读取缓存，命中时移到最近使用位置"""
+        text = self._entries.get(key)
+        if text is not None:
+            self._entries.move_to_end(key)
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        """写入缓存，超出容量时按 LRU 淘汰；单条超过上限时不缓存"""
+        size = len(text.encode())
+        if size > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = text
+        self._sizes[key] = size
+        self._total_bytes += size
+        while self._total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def _discard(self, key: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            self._total_bytes -= self._sizes.pop(key)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> tuple[str, bool]:
+        """读取缓存，未命中时执行识别并缓存结果
+
+        Args:
+            key: 缓存键（见 cache_key）
+            compute: 执行识别的协程函数
+
+        Returns:
+            (识别文本, 是否来自缓存)；等待其他请求正在进行的同一识别也视为命中
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached, True
+
+        while (inflight := self._inflight.get(key)) is not None:
+            try:
+                # shield：当前请求取消时不影响发起识别的请求
+                text = await asyncio.shield(inflight)
+                self.hits += 1
+                return text, True
+            except asyncio.CancelledError:
+                # 发起识别的请求被取消（客户端断开）时由当前请求重新识别
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        self.misses += 1
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            text = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 标记异常已读取：无人等待时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(text)
+        if self.max_bytes > 0:
+            self.put(key, text)
+        return text, False
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+        self._sizes.clear()
+        self._total_bytes = 0
+
+    def get_stats(self) -> dict[str, int]:
+        """缓存统计"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# 全局单例
+ocr_result_cache = OcrResultCache()
@@ -7,7 +7,7 @@ from typing import Any
 
 from app.core.config import settings
 from app.core.logging import get_logger
-from app.services.ocr.base import BaseOCRProcessor
+from app.services.ocr.base import BaseOCRProcessor, ProgressCallback
 
 logger = get_logger("ocr.factory")
 
@@ -113,7 +113,11 @@ class OcrProcessorFactory:
 
     @classmethod
     async def aprocess_file(
-        cls, processor_type: str, file_path: str, params: dict | None = None
+        cls,
+        processor_type: str,
+        file_path: str,
+        params: dict | None = None,
+        on_progress: ProgressCallback | None = None,
     ) -> str:
         """异步使用指定处理器处理文件
 
@@ -121,6 +125,7 @@ class OcrProcessorFactory:
             processor_type: 处理器类型
             file_path: 文件路径
             params: 处理参数
+            on_progress: 逐页进度回调（可能在工作线程中执行）
 
         Returns:
             str: 提取的文本
@@ -129,7 +134,20 @@ class OcrProcessorFactory:
             DocumentProcessorException: 处理失败
         """
         processor = cls.get_processor(processor_type)
-        return await processor.aprocess_file(file_path, params)
+        if on_progress is None:
+            return await processor.aprocess_file(file_path, params)
+        return await processor.aprocess_file_with_progress(file_path, params, on_progress)
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """释放已创建处理器持有的资源（如 RapidOCR 的 PDF 进程池）"""
+        for processor in _PROCESSOR_CACHE.values():
+            close = getattr(processor, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    logger.warning(f"关闭 OCR 处理器失败: {e}")
 
     @classmethod
     def check_health(cls, processor_type: str) -> dict[str, Any]:
@@ -1,21 +1,104 @@
 """RapidOCR 处理器 - 本地 ONNX 模型推理
 
 使用 RapidOCR (PP-OCRv4) 进行文字识别，支持 PDF 和图像文件。
+
+多页 PDF 按页并行识别：
+- 页面提交到进程池（每个子进程各自加载模型、打开 PDF 渲染），只传页号与文本，
+  渲染出的位图不跨进程传输
+- 同时在途的页数有上限（进程数 × 2），内存占用与 PDF 页数无关
+- 结果按页序产出，并逐页回调进度
+- 渲染结果以 numpy 数组直接交给模型，不再写临时图片文件
 """
 
 import asyncio
+import multiprocessing
 import os
-import tempfile
+import threading
 import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Any
+from typing import Any, TypeVar
 
 from app.core.config import settings
 from app.core.logging import get_logger
-from app.services.ocr.base import BaseOCRProcessor, OCRException
+from app.services.ocr.base import BaseOCRProcessor, OCRException, ProgressCallback
 
 logger = get_logger("ocr.rapid_ocr")
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+# 子进程内的模型实例（由进程池 initializer 加载）
+_worker_ocr = None
+
+
+def _init_pdf_worker(det_box_thresh: float, det_model_path: str, rec_model_path: str) -> None:
+    """进程池 initializer：每个子进程加载一次模型"""
+    global _worker_ocr
+    from rapidocr_onnxruntime import RapidOCR
+
+    _worker_ocr = RapidOCR(
+        det_box_thresh=det_box_thresh,
+        det_model_path=det_model_path,
+        rec_model_path=rec_model_path,
+    )
+
+
+def _render_pdf_page(doc, page_num: int, zoom_x: float, zoom_y: float):
+    """渲染 PDF 页面为 BGR numpy 数组（与 cv2 读图的通道顺序一致）"""
+    import fitz
+    import numpy as np
+
+    pix = doc[page_num].get_pixmap(matrix=fitz.Matrix(zoom_x, zoom_y), alpha=False)
+    image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    return np.ascontiguousarray(image[:, :, ::-1])
+
+
+def _result_text(result) -> str:
+    """拼接 RapidOCR 识别结果"""
+    return "\n".join(line[1] for line in result) if result else ""
+
+
+def _ocr_pdf_page(pdf_path: str, page_num: int, zoom_x: float, zoom_y: float) -> str:
+    """子进程中识别单个 PDF 页面
+
+    每页单独打开文档：fitz.open 只解析交叉引用表，相对渲染与识别的开销可忽略，
+    且子进程不长期持有上传的临时文件。
+    """
+    import fitz
+
+    with fitz.open(pdf_path) as doc:
+        image = _render_pdf_page(doc, page_num, zoom_x, zoom_y)
+    result, _ = _worker_ocr(image)
+    return _result_text(result)
+
+
+def iter_ordered(submit: Callable[[T], Future[R]], items: Iterable[T], window: int) -> Iterator[R]:
+    """有界并行 map：按输入顺序产出结果，同时在途的任务不超过 window 个
+
+    Args:
+        submit: 提交单个任务，返回 Future
+        items: 任务参数
+        window: 最大在途任务数
+
+    Yields:
+        按输入顺序的任务结果（任一任务异常时抛出，并取消其余在途任务）
+    """
+    pending: deque[Future[R]] = deque()
+    try:
+        for item in items:
+            pending.append(submit(item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
 
 class RapidOCRProcessor(BaseOCRProcessor):
     """RapidOCR 处理器 - 使用本地 ONNX 模型进行文字识别
@@ -32,6 +115,8 @@ class RapidOCRProcessor(BaseOCRProcessor):
         self.ocr = None
         self.det_box_thresh = det_box_thresh
         self._model_loaded = False
+        self._pdf_executor: ProcessPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
 
     def get_service_name(self) -> str:
         return "rapid_ocr"
@@ -151,7 +236,7 @@ class RapidOCRProcessor(BaseOCRProcessor):
         """处理单张图像并提取文本
 
         Args:
-            image_input: 图像数据，支持文件路径、PIL.Image 或 numpy.ndarray
+            image_input: 图像数据，支持文件路径、PIL.Image 或 numpy.ndarray（直接交给模型，不落盘）
             params: 处理参数
 
         Returns:
@@ -160,35 +245,20 @@ class RapidOCRProcessor(BaseOCRProcessor):
         self._load_model()
 
         try:
-            cleanup_needed = False
-            image_path = image_input
-
-            # 如果不是字符串路径，需要创建临时文件
+            image = image_input
             if not isinstance(image_input, str):
-                image_path = self._create_temp_image_file(image_input)
-                cleanup_needed = True
+                image = self._to_array(image_input)
 
-            try:
-                start_time = time.time()
-                result, _ = self.ocr(image_path)
-                processing_time = time.time() - start_time
-
-                if result:
-                    text = "\n".join([line[1] for line in result])
-                    logger.debug(
-                        f"RapidOCR 识别完成: {len(text)} 字符 ({processing_time:.2f}s)"
-                    )
-                    return text
-                else:
-                    logger.warning("RapidOCR 未识别到文本")
-                    return ""
-
-            finally:
-                if cleanup_needed and os.path.exists(image_path):
-                    try:
-                        os.remove(image_path)
-                    except Exception as e:
-                        logger.warning(f"临时文件清理失败: {e}")
+            start_time = time.time()
+            result, _ = self.ocr(image)
+            processing_time = time.time() - start_time
+
+            text = _result_text(result)
+            if text:
+                logger.debug(f"RapidOCR 识别完成: {len(text)} 字符 ({processing_time:.2f}s)")
+            else:
+                logger.warning("RapidOCR 未识别到文本")
+            return text
 
         except OCRException:
             raise
@@ -197,29 +267,44 @@ class RapidOCRProcessor(BaseOCRProcessor):
             logger.error(error_msg)
             raise OCRException(error_msg, self.get_service_name(), "processing_failed")
 
-    def _create_temp_image_file(self, image) -> str:
-        """将图像数据保存为临时文件"""
-        try:
-            import numpy as np
-            from PIL import Image
-
-            with tempfile.NamedTemporaryFile(mode="wb", suffix=".png", delete=False) as tmp_file:
-                temp_path = tmp_file.name
-
-                if isinstance(image, Image.Image):
-                    image.save(temp_path)
-                elif isinstance(image, np.ndarray):
-                    Image.fromarray(image).save(temp_path)
-                else:
-                    raise ValueError("不支持的图像类型，必须是 PIL.Image 或 numpy.ndarray")
+    def _to_array(self, image):
+        """将 PIL.Image 转为 BGR numpy 数组（numpy 数组原样返回）"""
+        import numpy as np
+        from PIL import Image
+
+        if isinstance(image, np.ndarray):
+            return image
+        if isinstance(image, Image.Image):
+            return np.ascontiguousarray(np.asarray(image.convert("RGB"))[:, :, ::-1])
+        raise OCRException(
+            "不支持的图像类型，必须是文件路径、PIL.Image 或 numpy.ndarray",
+            self.get_service_name(),
+            "unsupported_image_type",
+        )
+
+    def _get_pdf_executor(self) -> ProcessPoolExecutor:
+        """获取 PDF 逐页识别进程池（首次使用时创建，子进程各自加载模型）"""
+        with self._executor_lock:
+            if self._pdf_executor is None:
+                det_model_path, rec_model_path = self._get_model_paths()
+                self._pdf_executor = ProcessPoolExecutor(
+                    max_workers=settings.OCR_PDF_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_pdf_worker,
+                    initargs=(self.det_box_thresh, det_model_path, rec_model_path),
+                )
+                logger.info(f"RapidOCR PDF 进程池已启动 (workers={settings.OCR_PDF_WORKERS})")
+            return self._pdf_executor
 
-                return temp_path
+    def close(self) -> None:
+        """关闭 PDF 进程池（应用退出时调用）"""
+        with self._executor_lock:
+            executor, self._pdf_executor = self._pdf_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-        except Exception as e:
-            raise OCRException(f"临时图像文件创建失败: {str(e)}", self.get_service_name(), "temp_file_error")
-
-    def _process_pdf(self, pdf_path: str, params: dict | None = None) -> str:
-        """处理 PDF 文件并提取文本
+    def iter_pdf_pages(self, pdf_path: str, params: dict | None = None) -> Iterator[tuple[int, int, str]]:
+        """逐页识别 PDF，按页序产出结果
 
         Args:
             pdf_path: PDF 文件路径
@@ -227,15 +312,14 @@ class RapidOCRProcessor(BaseOCRProcessor):
                 - zoom_x: 横向缩放 (默认 2)
                 - zoom_y: 纵向缩放 (默认 2)
 
-        Returns:
-            str: 提取的文本
+        Yields:
+            (页号（从 1 开始）, 总页数, 该页文本)
         """
         if not os.path.exists(pdf_path):
             raise OCRException(f"PDF 文件不存在: {pdf_path}", self.get_service_name(), "file_not_found")
 
         try:
             import fitz
-            from PIL import Image
         except ImportError as e:
             raise OCRException(f"缺少依赖: {str(e)}", self.get_service_name(), "missing_dependency")
 
@@ -243,26 +327,56 @@ class RapidOCRProcessor(BaseOCRProcessor):
         zoom_x = params.get("zoom_x", 2)
         zoom_y = params.get("zoom_y", 2)
 
-        try:
-            all_text = []
-            pdf_doc = fitz.open(pdf_path)
-            total_pages = pdf_doc.page_count
+        # 在当前进程校验模型可用（失败时抛出明确的 OCRException）
+        self._load_model()
 
+        with fitz.open(pdf_path) as pdf_doc:
+            total_pages = pdf_doc.page_count
             logger.info(f"开始处理 PDF: {os.path.basename(pdf_path)} ({total_pages} 页)")
 
-            for page_num in range(total_pages):
-                page = pdf_doc[page_num]
-                mat = fitz.Matrix(zoom_x, zoom_y)
-                pix = page.get_pixmap(matrix=mat, alpha=False)
-                img_pil = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-
-                text = self._process_image(img_pil)
-                all_text.append(text)
+            # 已产出的页数：进程池异常时从中断处在当前线程继续，已产出的页不重复
+            start_page = 0
+            workers = settings.OCR_PDF_WORKERS
+            if workers > 1 and total_pages > 1:
+                executor = self._get_pdf_executor()
+                pages = iter_ordered(
+                    lambda page_num: executor.submit(_ocr_pdf_page, pdf_path, page_num, zoom_x, zoom_y),
+                    range(total_pages),
+                    window=workers * 2,
+                )
+                try:
+                    for text in pages:
+                        start_page += 1
+                        yield start_page, total_pages, text
+                except BrokenProcessPool:
+                    logger.warning("RapidOCR PDF 进程池异常，改为在当前线程识别剩余页面")
+                    self.close()
+
+            for page_num in range(start_page, total_pages):
+                image = _render_pdf_page(pdf_doc, page_num, zoom_x, zoom_y)
+                yield page_num + 1, total_pages, self._process_image(image)
+
+    def _process_pdf(
+        self, pdf_path: str, params: dict | None = None, on_progress: ProgressCallback | None = None
+    ) -> str:
+        """处理 PDF 文件并提取文本
 
-                if (page_num + 1) % 10 == 0:
-                    logger.info(f"已处理 {page_num + 1}/{total_pages} 页")
+        Args:
+            pdf_path: PDF 文件路径
+            params: 处理参数（见 iter_pdf_pages）
+            on_progress: 逐页进度回调
 
-            pdf_doc.close()
+        Returns:
+            str: 提取的文本
+        """
+        try:
+            all_text = []
+            for page, total_pages, text in self.iter_pdf_pages(pdf_path, params):
+                all_text.append(text)
+                if on_progress is not None:
+                    on_progress(page, total_pages, text)
+                if page % 10 == 0:
+                    logger.info(f"已处理 {page}/{total_pages} 页")
 
             result_text = "\n\n".join(all_text)
             logger.info(f"PDF OCR 完成: {os.path.basename(pdf_path)} - {len(result_text)} 字符")
@@ -275,12 +389,18 @@ class RapidOCRProcessor(BaseOCRProcessor):
             logger.error(error_msg)
             raise OCRException(error_msg, self.get_service_name(), "pdf_processing_failed")
 
-    def process_file(self, file_path: str, params: dict[str, Any] | None = None) -> str:
+    def process_file(
+        self,
+        file_path: str,
+        params: dict[str, Any] | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> str:
         """处理文件 (PDF 或图像)
 
         Args:
             file_path: 文件路径
             params: 处理参数
+            on_progress: 逐页进度回调（图像按单页回调）
 
         Returns:
             str: 提取的文本
@@ -291,10 +411,22 @@ class RapidOCRProcessor(BaseOCRProcessor):
             raise OCRException(f"不支持的文件类型: {file_ext}", self.get_service_name(), "unsupported_file_type")
 
         if file_ext == ".pdf":
-            return self._process_pdf(file_path, params)
-        else:
-            return self._process_image(file_path, params)
+            return self._process_pdf(file_path, params, on_progress)
+
+        text = self._process_image(file_path, params)
+        if on_progress is not None:
+            on_progress(1, 1, text)
+        return text
 
     async def aprocess_file(self, file_path: str, params: dict[str, Any] | None = None) -> str:
         """异步处理文件"""
         return await asyncio.to_thread(self.process_file, file_path, params)
+
+    async def aprocess_file_with_progress(
+        self,
+        file_path: str,
+        params: dict[str, Any] | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> str:
+        """异步处理文件，逐页回调进度（回调在工作线程中执行）"""
+        return await asyncio.to_thread(self.process_file, file_path, params, on_progress)
@@ -1,32 +1,159 @@
-"""MinIO 对象存储服务"""
+"""MinIO 对象存储服务
+
+上传路径不阻塞事件循环：
+- 原图从上传的临时文件流式写入 MinIO（超过分片大小时自动分片上传），不整体读入内存
+- 图片解析（尺寸、EXIF 方向）与缩略图生成在独立线程池执行
+- 缩略图在原图写入后异步生成，上传接口不等待
+
+对象按内容寻址（{user_id}/{sha256}.{ext}，扩展名由 MIME 类型决定）：同一用户重复上传
+相同图片时直接复用已有原图与缩略图，不再写入 MinIO。每次上传另有独立 ID
+（{sha256}-{upload_id}），并在 _refs/{user_id}/{sha256}/{upload_id} 写入引用标记；
+删除一次上传只移除其引用，最后一个引用移除时才删除原图与缩略图，
+不影响其他消息中的同一图片 URL。删除前先将对象复制到 _trash/ 下，删除后若有并发上传
+登记了新引用（该上传可能已按去重跳过写入），从备份恢复。
+"""
 
 from __future__ import annotations
 
-import uuid
+import asyncio
+import hashlib
+import re
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from functools import partial
 from io import BytesIO
-from typing import TYPE_CHECKING
+from typing import BinaryIO, TypeVar
+from uuid import uuid4
 
 from minio import Minio
+from minio.commonconfig import CopySource
 from minio.error import S3Error
-from PIL import Image
+from PIL import ExifTags, Image, ImageOps
 
 from app.core.config import settings
 from app.core.logging import get_logger
 
-if TYPE_CHECKING:
-    pass
-
 logger = get_logger("services.storage.minio")
 
+T = TypeVar("T")
+
+# MinIO 分片大小下限
+_MIN_PART_SIZE = 5 * 1024 * 1024
+
+# 计算内容哈希的分块大小
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# EXIF 方向为 5~8 时图片需旋转 90°，宽高互换
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+# 上传引用标记的前缀（与用户目录分开）
+_REF_PREFIX = "_refs"
+
+# 删除期间对象备份的前缀
+_TRASH_PREFIX = "_trash"
+
+# MIME 类型对应的对象扩展名（image/jpeg 统一为 jpg，.jpg 与 .jpeg 上传复用同一对象）
+_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/jpg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+
+# 上传 ID：{sha256}-{upload_id}
+_IMAGE_ID_PATTERN = re.compile(r"([0-9a-f]{64})-([0-9a-f]{32})")
+
+# 引用计数之前的图片 ID：uuid4 或内容 sha256，对象为 {user_id}/{image_id}.{ext}
+_LEGACY_IMAGE_ID_PATTERN = re.compile(
+    r"[0-9a-f]{64}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+)
+_LEGACY_EXTENSIONS = ("jpg", "jpeg", "png", "webp", "gif")
+
+_image_executor: ThreadPoolExecutor | None = None
+
+
+async def run_image_task(fn: Callable[..., T], *args) -> T:
+    """在图片处理线程池中执行（PIL 解码与缩放释放 GIL）"""
+    global _image_executor
+    if _image_executor is None:
+        _image_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.IMAGE_PROCESS_WORKERS), thread_name_prefix="image"
+        )
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_image_executor, partial(fn, *args))
+
+
+def hash_fileobj(fileobj: BinaryIO) -> str:
+    """分块计算文件内容 sha256，读取后文件指针复位到开头"""
+    digest = hashlib.sha256()
+    try:
+        while chunk := fileobj.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        return digest.hexdigest()
+    finally:
+        fileobj.seek(0)
+
+
+def image_extension(content_type: str, filename: str) -> str:
+    """按 MIME 类型确定扩展名，未知类型时取文件名后缀"""
+    ext = _EXTENSIONS.get(content_type.lower())
+    if ext is None:
+        ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else "jpg"
+    return "jpg" if ext == "jpeg" else ext
+
+
+def probe_image(fileobj: BinaryIO) -> tuple[int, int]:
+    """读取图片尺寸（按 EXIF 方向校正后），只解析文件头，不解码像素
+
+    读取后文件指针复位到开头；无法识别时返回 (0, 0)。
+    """
+    try:
+        with Image.open(fileobj) as img:
+            width, height = img.size
+            if img.getexif().get(ExifTags.Base.Orientation, 1) in _TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+            return width, height
+    except Exception as e:
+        logger.warning("获取图片尺寸失败", error=str(e))
+        return 0, 0
+    finally:
+        fileobj.seek(0)
+
+
+def create_thumbnail(image_data: bytes, ext: str, max_size: int) -> bytes:
+    """创建缩略图（按 EXIF 方向校正，保持宽高比）"""
+    img = Image.open(BytesIO(image_data))
+    # JPEG 解码时直接按比例缩小（DCT 缩放），大图解码耗时与内存成倍下降；其他格式无效果
+    img.draft("RGB", (max_size, max_size))
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+    output = BytesIO()
+    # 根据扩展名选择格式
+    fmt = "JPEG" if ext.lower() in ("jpg", "jpeg") else ext.upper()
+
+    # PNG、GIF 和 WEBP 保持原格式，其他转 JPEG
+    if fmt not in ("PNG", "GIF", "WEBP"):
+        fmt = "JPEG"
+        if img.mode in ("RGBA", "P"):
+            img = img.convert("RGB")
+
+    img.save(output, format=fmt, quality=85)
+    return output.getvalue()
+
 
 class MinIOService:
     """MinIO 存储服务
     
-    提供图片上传、下载、删除等功能，支持自动生成缩略图。
+    提供图片上传、下载、删除等功能，支持自动生成缩略图（后台异步）。
     """
 
     def __init__(self) -> None:
+        self._thumbnail_tasks: set[asyncio.Task] = set()
+        # 正在生成的缩略图对象名，避免重复上传同一图片时重复生成
+        self._pending_thumbnails: set[str] = set()
         if not settings.MINIO_ENABLED:
             logger.warning("MinIO 未启用，存储服务不可用")
             self._client = None
@@ -57,19 +184,21 @@ class MinIOService:
         except S3Error as e:
             logger.error("MinIO bucket 检查失败", error=str(e))
 
-    def upload_image(
+    async def upload_image(
         self,
-        file_data: bytes,
+        fileobj: BinaryIO,
+        size: int,
         user_id: str,
         filename: str,
         content_type: str,
         *,
         generate_thumbnail: bool = True,
     ) -> dict:
-        """上传图片并生成缩略图
+        """流式上传图片（相同内容复用已有对象），缩略图异步生成
         
         Args:
-            file_data: 文件二进制数据
+            fileobj: 可 seek 的文件对象（如 UploadFile.file），上传过程中按分片读取
+            size: 文件大小（字节）
             user_id: 用户 ID（用于目录隔离）
             filename: 原始文件名
             content_type: MIME 类型
@@ -77,9 +206,9 @@ class MinIOService:
         
         Returns:
             {
-                "id": "图片唯一 ID",
+                "id": "上传 ID（{内容 sha256}-{upload_id}，删除时使用）",
                 "url": "完整图片 URL",
-                "thumbnail_url": "缩略图 URL",
+                "thumbnail_url": "缩略图 URL（后台生成，可能稍后才可访问；小图直接使用原图）",
                 "object_name": "对象名称",
                 "size": 文件大小,
                 "width": 图片宽度,
@@ -89,92 +218,134 @@ class MinIOService:
         if not self._client:
             raise RuntimeError("MinIO 服务未启用")
 
-        # 生成唯一 ID 和对象名
-        image_id = str(uuid.uuid4())
-        ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else "jpg"
-        object_name = f"{user_id}/{image_id}.{ext}"
-        
-        file_size = len(file_data)
-        
-        # 获取图片尺寸
-        width, height = 0, 0
-        try:
-            img = Image.open(BytesIO(file_data))
-            width, height = img.size
-        except Exception as e:
-            logger.warning("获取图片尺寸失败", error=str(e))
-        
-        # 上传原图
-        self._client.put_object(
-            self._bucket_name,
-            object_name,
-            BytesIO(file_data),
-            length=file_size,
-            content_type=content_type,
-        )
-        
+        # 按内容生成对象名，每次上传独立 ID
+        content_id = await run_image_task(hash_fileobj, fileobj)
+        upload_id = uuid4().hex
+        image_id = f"{content_id}-{upload_id}"
+        ext = image_extension(content_type, filename)
+        object_name = f"{user_id}/{content_id}.{ext}"
+
+        # 先登记引用再检查原图：与删除最后一个引用并发时，删除方能看到本次引用
+        ref_name = self._ref_name(user_id, content_id, upload_id)
+        await asyncio.to_thread(self._put_object, ref_name, BytesIO(b""), 0, "application/octet-stream")
+
+        # 获取图片尺寸（只解析文件头）
+        width, height = await run_image_task(probe_image, fileobj)
+
+        # 上传原图（阻塞 I/O，放到线程中）；相同内容已存在时跳过
+        deduplicated = await asyncio.to_thread(self._object_exists, object_name)
+        if not deduplicated:
+            await asyncio.to_thread(self._put_object, object_name, fileobj, size, content_type)
+
         url = self._get_public_url(object_name)
         result = {
             "id": image_id,
             "url": url,
             "thumbnail_url": url,
             "object_name": object_name,
-            "size": file_size,
+            "size": size,
             "width": width,
             "height": height,
             "filename": filename,
             "mime_type": content_type,
         }
-        
-        # 生成缩略图
-        if generate_thumbnail and width > 0:
-            try:
-                thumb_name = f"{user_id}/{image_id}_thumb.{ext}"
-                thumb_data = self._create_thumbnail(file_data, ext)
-                
-                self._client.put_object(
-                    self._bucket_name,
-                    thumb_name,
-                    BytesIO(thumb_data),
-                    length=len(thumb_data),
-                    content_type=content_type,
-                )
-                
-                result["thumbnail_url"] = self._get_public_url(thumb_name)
-            except Exception as e:
-                logger.warning("缩略图生成失败", error=str(e))
-        
+
+        # 原图已不超过缩略图尺寸时直接复用原图
+        max_size = settings.IMAGE_THUMBNAIL_SIZE
+        if generate_thumbnail and width > 0 and max(width, height) > max_size:
+            thumb_name = f"{user_id}/{content_id}_thumb.{ext}"
+            if thumb_name not in self._pending_thumbnails and not (
+                deduplicated and await asyncio.to_thread(self._object_exists, thumb_name)
+            ):
+                self._schedule_thumbnail(object_name, thumb_name, ext, content_type)
+            result["thumbnail_url"] = self._get_public_url(thumb_name)
+
         logger.info(
             "图片上传成功",
             image_id=image_id,
             object_name=object_name,
-            size=file_size,
+            size=size,
             dimensions=f"{width}x{height}",
+            deduplicated=deduplicated,
         )
         return result
 
-    def _create_thumbnail(self, image_data: bytes, ext: str) -> bytes:
-        """创建缩略图"""
-        img = Image.open(BytesIO(image_data))
-        
-        # 保持宽高比缩放
-        max_size = settings.IMAGE_THUMBNAIL_SIZE
-        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-        
-        output = BytesIO()
-        # 根据扩展名选择格式
-        fmt = "JPEG" if ext.lower() in ("jpg", "jpeg") else ext.upper()
-        if fmt == "JPG":
-            fmt = "JPEG"
-        
-        # PNG 和 GIF 保持原格式，其他转 JPEG
-        if fmt not in ("PNG", "GIF", "WEBP"):
-            fmt = "JPEG"
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-        
-        img.save(output, format=fmt, quality=85)
-        return output.getvalue()
+    def _put_object(self, object_name: str, data: BinaryIO, length: int, content_type: str) -> None:
+        """写入对象（同步），超过分片大小时 SDK 自动分片上传"""
+        self._client.put_object(
+            self._bucket_name,
+            object_name,
+            data,
+            length=length,
+            content_type=content_type,
+            part_size=max(_MIN_PART_SIZE, settings.MINIO_PART_SIZE_MB * 1024 * 1024),
+        )
+
+    def _object_exists(self, object_name: str) -> bool:
+        """对象是否已存在（同步）"""
+        try:
+            self._client.stat_object(self._bucket_name, object_name)
+            return True
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return False
+            raise
+
+    def _ref_name(self, user_id: str, content_id: str, upload_id: str) -> str:
+        return f"{self._ref_prefix(user_id, content_id)}{upload_id}"
+
+    def _ref_prefix(self, user_id: str, content_id: str) -> str:
+        return f"{_REF_PREFIX}/{user_id}/{content_id}/"
+
+    def _copy_object(self, source_name: str, object_name: str) -> bool:
+        """服务端复制对象（同步），源对象不存在时返回 False"""
+        try:
+            self._client.copy_object(
+                self._bucket_name, object_name, CopySource(self._bucket_name, source_name)
+            )
+            return True
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return False
+            raise
+
+    def _list_object_names(self, prefix: str) -> list[str]:
+        """列出前缀下的对象名（同步）"""
+        return [
+            obj.object_name
+            for obj in self._client.list_objects(self._bucket_name, prefix=prefix, recursive=True)
+        ]
+
+    def _get_object_bytes(self, object_name: str) -> bytes:
+        """读取对象内容（同步）"""
+        response = self._client.get_object(self._bucket_name, object_name)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def _schedule_thumbnail(self, object_name: str, thumb_name: str, ext: str, content_type: str) -> None:
+        """后台生成缩略图（不阻塞上传响应）"""
+        task = asyncio.create_task(self._generate_thumbnail(object_name, thumb_name, ext, content_type))
+        self._thumbnail_tasks.add(task)
+        self._pending_thumbnails.add(thumb_name)
+        task.add_done_callback(self._thumbnail_tasks.discard)
+        task.add_done_callback(lambda _: self._pending_thumbnails.discard(thumb_name))
+
+    async def _generate_thumbnail(self, object_name: str, thumb_name: str, ext: str, content_type: str) -> None:
+        """从已上传的原图生成缩略图并写入 MinIO"""
+        try:
+            image_data = await asyncio.to_thread(self._get_object_bytes, object_name)
+            thumb_data = await run_image_task(
+                create_thumbnail, image_data, ext, settings.IMAGE_THUMBNAIL_SIZE
+            )
+            await asyncio.to_thread(
+                self._put_object, thumb_name, BytesIO(thumb_data), len(thumb_data), content_type
+            )
+            logger.debug("缩略图生成完成", object_name=thumb_name, size=len(thumb_data))
+        except Exception as e:
+            logger.warning("缩略图生成失败", object_name=object_name, error=str(e))
 
     def _get_public_url(self, object_name: str) -> str:
         """获取公开访问 URL"""
@@ -213,6 +384,82 @@ class MinIOService:
             logger.error("图片删除失败", object_name=object_name, error=str(e))
             return False
 
+    async def release_image(self, user_id: str, image_id: str) -> bool:
+        """删除一次上传：移除其引用，最后一个引用移除时删除原图与缩略图
+
+        Args:
+            user_id: 用户 ID
+            image_id: upload_image 返回的上传 ID（兼容引用计数之前的旧 ID）
+
+        Returns:
+            该上传是否存在
+        """
+        if not self._client:
+            return False
+        match = _IMAGE_ID_PATTERN.fullmatch(image_id)
+        if match is None:
+            if _LEGACY_IMAGE_ID_PATTERN.fullmatch(image_id):
+                return await self._release_legacy_image(user_id, image_id)
+            return False
+        content_id, upload_id = match.groups()
+
+        ref_name = self._ref_name(user_id, content_id, upload_id)
+        if not await asyncio.to_thread(self._object_exists, ref_name):
+            return False
+        await asyncio.to_thread(self._client.remove_object, self._bucket_name, ref_name)
+
+        remaining = await asyncio.to_thread(self._list_object_names, self._ref_prefix(user_id, content_id))
+        if remaining:
+            logger.info("图片引用已移除", image_id=image_id, remaining_refs=len(remaining))
+            return True
+        # 原图与缩略图（{content_id}.{ext} / {content_id}_thumb.{ext}）
+        object_names = await asyncio.to_thread(self._list_object_names, f"{user_id}/{content_id}")
+        await self._remove_content(user_id, content_id, object_names)
+        return True
+
+    async def _release_legacy_image(self, user_id: str, image_id: str) -> bool:
+        """删除引用计数之前的上传（没有引用标记，按扩展名查找原图与缩略图）"""
+        for ext in _LEGACY_EXTENSIONS:
+            object_name = f"{user_id}/{image_id}.{ext}"
+            if await asyncio.to_thread(self._object_exists, object_name):
+                break
+        else:
+            return False
+
+        # 内容 sha256 形式的旧 ID 与新上传共用对象：仍有引用时保留
+        if await asyncio.to_thread(self._list_object_names, self._ref_prefix(user_id, image_id)):
+            logger.info("旧图片对象仍被引用，保留", image_id=image_id)
+            return True
+        await self._remove_content(
+            user_id, image_id, [object_name, f"{user_id}/{image_id}_thumb.{ext}"]
+        )
+        return True
+
+    async def _remove_content(self, user_id: str, content_id: str, object_names: list[str]) -> None:
+        """删除内容对象；删除期间有新上传登记引用时从备份恢复
+
+        上传先登记引用再检查原图是否存在：删除后重新检查引用，未看到的上传一定会发现
+        原图不存在并自行写入，看到的上传可能已按去重跳过写入，需恢复。
+        """
+        backups: dict[str, str] = {}
+        trash = f"{_TRASH_PREFIX}/{uuid4().hex}"
+        for object_name in object_names:
+            backup = f"{trash}/{object_name}"
+            if await asyncio.to_thread(self._copy_object, object_name, backup):
+                backups[object_name] = backup
+                self.delete_image(object_name)
+
+        restore = bool(
+            backups
+            and await asyncio.to_thread(self._list_object_names, self._ref_prefix(user_id, content_id))
+        )
+        for object_name, backup in backups.items():
+            if restore:
+                await asyncio.to_thread(self._copy_object, backup, object_name)
+            await asyncio.to_thread(self._client.remove_object, self._bucket_name, backup)
+        if restore:
+            logger.info("删除期间图片被重新上传，已恢复", content_id=content_id)
+
     def get_image_as_base64(self, object_name: str) -> str | None:
         """获取图片的 base64 编码（用于发送给大模型）
         
@@ -0,0 +1,192 @@
+"""可续传的聊天流
+
+移动端网络切换 / 断线时，SSE 连接中断不应终止生成（重新发送要完整再跑一次 LLM）：
+- 生成在后台任务中运行，与 HTTP 连接解耦，事件按 seq 写入每条消息的环形缓冲
+- 客户端凭 Last-Event-ID（即事件 seq）重新订阅，先回放缺失的事件，再跟随实时事件
+- 生成结束后缓冲保留 CHAT_STREAM_TTL_SECONDS 秒，过期后续传返回 404
+- 缓冲按事件数限制（CHAT_STREAM_BUFFER_SIZE），断线过久时最早的增量事件可能已被淘汰，
+  回放从最早保留的事件开始（assistant.final 携带完整内容，前端以其为准）
+
+SSE 帧带 id 行（id: <seq>），浏览器 EventSource 重连时会自动携带 Last-Event-ID。
+"""
+
+import asyncio
+import json
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator
+from itertools import islice
+from typing import Any
+
+from langgraph_agent_kit import StreamEvent, make_event
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import CHAT_STREAM_EVENTS
+
+logger = get_logger("streaming.resumable")
+
+
+def encode_frame(event: StreamEvent) -> str:
+    """编码为带 id 行的 SSE 帧"""
+    data = json.dumps(event.model_dump(), ensure_ascii=False)
+    return f"id: {event.seq}\ndata: {data}\n\n"
+
+
+class StreamBuffer:
+    """单条消息的事件环形缓冲"""
+
+    def __init__(self, message_id: str, conversation_id: str, capacity: int | None = None):
+        self.message_id = message_id
+        self.conversation_id = conversation_id
+        capacity = settings.CHAT_STREAM_BUFFER_SIZE if capacity is None else capacity
+        self._frames: deque[tuple[int, str]] = deque(maxlen=max(capacity, 1))
+        self._changed = asyncio.Event()
+        self.last_seq = 0
+        self.done = False
+        self.subscribers = 0
+
+    def append(self, event: StreamEvent) -> None:
+        """写入事件并唤醒订阅者"""
+        self._frames.append((event.seq, encode_frame(event)))
+        self.last_seq = event.seq
+        self._wake()
+
+    def close(self) -> None:
+        """标记生成结束"""
+        self.done = True
+        self._wake()
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self, last_event_id: int = 0) -> AsyncGenerator[str, None]:
+        """回放 seq > last_event_id 的事件，然后跟随实时事件直到生成结束
+
+        Yields:
+            SSE 帧
+        """
+        cursor = last_event_id
+        self.subscribers += 1
+        try:
+            while True:
+                # 先取等待事件再扫描：扫描（含 yield）期间写入的事件会唤醒下一轮
+                changed = self._changed
+                if self._frames:
+                    first_seq = self._frames[0][0]
+                    # 先复制：yield 期间缓冲可能被写入
+                    pending = list(islice(self._frames, max(cursor - first_seq + 1, 0), None))
+                    for seq, frame in pending:
+                        if seq > cursor:
+                            cursor = seq
+                            yield frame
+                if self.done and cursor >= self.last_seq:
+                    return
+                if not changed.is_set():
+                    await changed.wait()
+        finally:
+            self.subscribers -= 1
+
+
+class StreamRegistry:
+    """后台生成任务与事件缓冲登记表（全局单例见 stream_registry）"""
+
+    def __init__(self, ttl_seconds: float | None = None):
+        self.ttl_seconds = settings.CHAT_STREAM_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._buffers: dict[str, StreamBuffer] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def start(
+        self,
+        message_id: str,
+        conversation_id: str,
+        events: AsyncIterator[StreamEvent],
+    ) -> StreamBuffer:
+        """在后台消费事件流并写入缓冲
+
+        Args:
+            message_id: 助手消息 ID（续传凭据）
+            conversation_id: 会话 ID
+            events: 编排器产生的事件流
+
+        Raises:
+            ValueError: 该消息已有缓冲
+        """
+        if message_id in self._buffers:
+            raise ValueError(f"消息流已存在: {message_id}")
+        buffer = StreamBuffer(message_id, conversation_id)
+        self._buffers[message_id] = buffer
+        task = asyncio.create_task(self._run(buffer, events))
+        task.add_done_callback(lambda _: self._finish(buffer))
+        self._tasks[message_id] = task
+        return buffer
+
+    def get(self, message_id: str) -> StreamBuffer | None:
+        """获取消息的事件缓冲（不存在或已过期时返回 None）"""
+        return self._buffers.get(message_id)
+
+    def cancel(self, message_id: str) -> bool:
+        """中止生成（用户主动停止）
+
+        Returns:
+            是否有正在运行的生成被中止
+        """
+        task = self._tasks.get(message_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    async def _run(self, buffer: StreamBuffer, events: AsyncIterator[StreamEvent]) -> None:
+        try:
+            async for event in events:
+                buffer.append(event)
+                CHAT_STREAM_EVENTS.labels(event.type).inc()
+        except asyncio.CancelledError:
+            logger.info(
+                "生成已中止（不保存消息）",
+                conversation_id=buffer.conversation_id,
+                assistant_message_id=buffer.message_id,
+            )
+            raise
+        except Exception as e:
+            logger.error("生成过程出错", error=str(e), exc_info=True)
+            buffer.append(
+                make_event(
+                    seq=buffer.last_seq + 1,
+                    conversation_id=buffer.conversation_id,
+                    message_id=buffer.message_id,
+                    type="error",
+                    payload={"message": str(e)},
+                )
+            )
+
+    def _finish(self, buffer: StreamBuffer) -> None:
+        """生成结束（含启动前被取消）：通知订阅者，TTL 后清理缓冲"""
+        buffer.close()
+        self._tasks.pop(buffer.message_id, None)
+        asyncio.get_running_loop().call_later(self.ttl_seconds, self._expire, buffer)
+
+    def _expire(self, buffer: StreamBuffer) -> None:
+        if self._buffers.get(buffer.message_id) is buffer:
+            del self._buffers[buffer.message_id]
+
+    async def close(self) -> None:
+        """中止所有生成（应用关闭时调用）"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._buffers.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        """缓冲统计"""
+        return {
+            "buffers": len(self._buffers),
+            "running": len(self._tasks),
+            "subscribers": sum(buffer.subscribers for buffer in self._buffers.values()),
+        }
+
+
+# 全局单例
+stream_registry = StreamRegistry()
@@ -1,29 +1,30 @@
 """会话热度评分服务
 
-基于现有数据库字段计算会话热度得分，用于客服工作台排序。
+基于会话表上的字段计算会话热度得分，用于客服工作台排序。
 
-热度算法（基于现有字段）：
+热度算法：
 - 状态权重：pending=50, human=30, ai=0
 - 等待时长：每分钟+1分，上限30分
 - 未读消息：每条+5分，上限25分
 - 用户在线：+10分
 - 时间衰减：超30分钟无活动，每10分钟-2分
+
+未读数来自 Conversation.unread_user_count（由消息写入/已读路径维护），
+热度得分由 heat_score_expr 在 SQL 中计算，排序与分页在数据库完成，
+不再受内存窗口限制。calculate_heat_score 为等价的 Python 实现。
 """
 
 import time
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import Any
 
-from sqlalchemy import func, select
+from sqlalchemy import ColumnElement, Float, Integer, case, cast, func, literal, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logging import get_logger
 from app.models.conversation import Conversation, HandoffState
 from app.models.message import Message
 
-if TYPE_CHECKING:
-    pass
-
 logger = get_logger("support.heat_score")
 
 # 状态权重配置
@@ -90,85 +91,160 @@ def calculate_heat_score(
     return score
 
 
+HIGH_HEAT_THRESHOLD = 60  # 高热会话阈值
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_seconds(column: Any, dialect: str) -> ColumnElement:
+    """将 naive datetime 列转换为秒（与 Python 端 naive 时间相减语义一致）"""
+    if dialect == "sqlite":
+        return (func.julianday(column) - 2440587.5) * 86400.0
+    return cast(func.extract("epoch", column), Float)
+
+
+def _trunc(expr: ColumnElement, dialect: str) -> ColumnElement:
+    """向零取整（对应 Python int()）"""
+    if dialect == "sqlite":
+        return cast(expr, Integer)
+    return cast(func.trunc(expr), Integer)
+
+
+def heat_score_expr(now: datetime, dialect: str) -> ColumnElement:
+    """构建热度得分的 SQL 表达式（与 calculate_heat_score 等价）
+
+    Args:
+        now: 当前时间（naive，与库中时间同一时区语义）
+        dialect: 数据库方言名（sqlite / postgresql）
+    """
+    now_seconds = literal((now - _EPOCH).total_seconds())
+    pending = Conversation.handoff_state == HandoffState.PENDING.value
+    is_ai = Conversation.handoff_state == HandoffState.AI.value
+
+    state_score = case(
+        *[(Conversation.handoff_state == state, weight) for state, weight in STATE_WEIGHTS.items()],
+        else_=0,
+    )
+
+    wait_base = case(
+        (pending & Conversation.handoff_at.is_not(None), Conversation.handoff_at),
+        else_=Conversation.updated_at,
+    )
+    wait_minutes = _trunc((now_seconds - _epoch_seconds(wait_base, dialect)) / 60.0, dialect)
+    wait_score = case((wait_minutes > MAX_WAIT_SCORE, MAX_WAIT_SCORE), else_=wait_minutes)
+
+    unread_score = case(
+        (Conversation.unread_user_count * 5 > MAX_UNREAD_SCORE, MAX_UNREAD_SCORE),
+        else_=Conversation.unread_user_count * 5,
+    )
+    online_score = case((Conversation.user_online.is_(True), USER_ONLINE_BONUS), else_=0)
+
+    raw = state_score + wait_score + unread_score + online_score
+
+    inactive_minutes = (now_seconds - _epoch_seconds(Conversation.updated_at, dialect)) / 60.0
+    decay = _trunc((inactive_minutes - DECAY_THRESHOLD_MIN) / 10.0, dialect) * DECAY_PER_10MIN
+    decayed = case((raw - decay < 0, 0), else_=raw - decay)
+
+    return case(
+        (is_ai & (inactive_minutes > DECAY_THRESHOLD_MIN), decayed),
+        else_=raw,
+    )
+
+
+def _dialect_name(session: AsyncSession) -> str:
+    return session.get_bind().dialect.name
+
+
 class HeatScoreService:
     """热度评分服务"""
-    
+
     def __init__(self, session: AsyncSession):
         self.session = session
-    
+
     async def get_unread_count(self, conversation_id: str) -> int:
-        """获取会话的未读用户消息数"""
-        stmt = (
-            select(func.count())
-            .select_from(Message)
-            .where(
-                Message.conversation_id == conversation_id,
-                Message.role == "user",
-                Message.read_at.is_(None),
-            )
-        )
+        """获取会话的未读用户消息数（读取反范式计数）"""
+        stmt = select(Conversation.unread_user_count).where(Conversation.id == conversation_id)
         result = await self.session.execute(stmt)
         return result.scalar() or 0
-    
+
     async def get_unread_counts_batch(self, conversation_ids: list[str]) -> dict[str, int]:
-        """批量获取多个会话的未读消息数"""
+        """批量获取多个会话的未读消息数（读取反范式计数）"""
         if not conversation_ids:
             return {}
-        
-        start = time.perf_counter()
-        logger.debug(f"get_unread_counts_batch: 开始查询 {len(conversation_ids)} 个会话的未读数")
-            
-        stmt = (
-            select(Message.conversation_id, func.count().label("count"))
-            .where(
-                Message.conversation_id.in_(conversation_ids),
-                Message.role == "user",
-                Message.read_at.is_(None),
-            )
-            .group_by(Message.conversation_id)
+
+        stmt = select(Conversation.id, Conversation.unread_user_count).where(
+            Conversation.id.in_(conversation_ids),
+            Conversation.unread_user_count > 0,
         )
         result = await self.session.execute(stmt)
-        data = {row.conversation_id: row.count for row in result.all()}
-        
-        elapsed = (time.perf_counter() - start) * 1000
-        logger.debug(f"get_unread_counts_batch: 完成，耗时 {elapsed:.2f}ms，返回 {len(data)} 条记录")
-        return data
-    
+        return {row.id: row.unread_user_count for row in result.all()}
+
     async def calculate_for_conversation(self, conversation: Conversation) -> int:
         """计算单个会话的热度得分"""
-        unread_count = await self.get_unread_count(conversation.id)
         return calculate_heat_score(
             handoff_state=conversation.handoff_state,
             updated_at=conversation.updated_at,
-            unread_count=unread_count,
+            unread_count=conversation.unread_user_count or 0,
             user_online=conversation.user_online,
             handoff_at=conversation.handoff_at,
         )
-    
+
     async def calculate_for_conversations_batch(
         self,
         conversations: list[Conversation],
     ) -> dict[str, int]:
         """批量计算多个会话的热度得分"""
-        if not conversations:
-            return {}
-        
-        # 批量获取未读数
-        conversation_ids = [c.id for c in conversations]
-        unread_counts = await self.get_unread_counts_batch(conversation_ids)
-        
-        # 计算得分
-        scores = {}
-        for conv in conversations:
-            scores[conv.id] = calculate_heat_score(
-                handoff_state=conv.handoff_state,
-                updated_at=conv.updated_at,
-                unread_count=unread_counts.get(conv.id, 0),
-                user_online=conv.user_online,
-                handoff_at=conv.handoff_at,
+        return {conv.id: await self.calculate_for_conversation(conv) for conv in conversations}
+
+    async def rebuild_unread_counters(self, conversation_ids: list[str] | None = None) -> None:
+        """根据消息表重算反范式计数（用于历史数据回填或校正）
+
+        Args:
+            conversation_ids: 仅重算指定会话，为空时重算全部
+        """
+        unread_subq = (
+            select(func.count())
+            .select_from(Message)
+            .where(
+                Message.conversation_id == Conversation.id,
+                Message.role == "user",
+                Message.read_at.is_(None),
             )
-        
-        return scores
+            .scalar_subquery()
+        )
+        last_subq = (
+            select(func.max(Message.created_at))
+            .where(Message.conversation_id == Conversation.id, Message.role == "user")
+            .scalar_subquery()
+        )
+        stmt = update(Conversation).values(
+            unread_user_count=unread_subq,
+            last_user_message_at=last_subq,
+            updated_at=Conversation.updated_at,
+        )
+        if conversation_ids is not None:
+            stmt = stmt.where(Conversation.id.in_(conversation_ids))
+        await self.session.execute(stmt.execution_options(synchronize_session=False))
+
+    async def backfill_unread_counters(self, batch_size: int = 500) -> int:
+        """回填从未维护过的反范式计数（启动时调用）
+
+        计数列加入前的历史会话有用户消息但 last_user_message_at 为空，只重算这些会话；
+        计数已维护的数据库上是一次空查询。
+
+        Returns:
+            回填的会话数
+        """
+        stmt = (
+            select(Message.conversation_id)
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(Message.role == "user", Conversation.last_user_message_at.is_(None))
+            .distinct()
+        )
+        conversation_ids = list((await self.session.scalars(stmt)).all())
+        for start in range(0, len(conversation_ids), batch_size):
+            await self.rebuild_unread_counters(conversation_ids[start : start + batch_size])
+        return len(conversation_ids)
 
 
 async def get_conversations_with_heat(
@@ -180,88 +256,80 @@ async def get_conversations_with_heat(
     offset: int = 0,
 ) -> tuple[list[dict], int]:
     """获取带热度得分的会话列表
-    
+
+    热度在 SQL 中计算并排序，分页覆盖全部会话。
+
     Args:
         session: 数据库会话
         state: 筛选状态（可选）
         sort_by: 排序方式 - heat(热度优先) 或 time(时间优先)
         limit: 分页大小
         offset: 分页偏移
-        
+
     Returns:
         (会话列表, 总数)
     """
     total_start = time.perf_counter()
     logger.debug(f"get_conversations_with_heat: 开始 state={state}, sort_by={sort_by}, limit={limit}, offset={offset}")
-    
-    # 构建查询
-    stmt = select(Conversation)
+
+    heat = heat_score_expr(datetime.now(), _dialect_name(session)).label("heat_score")
+    stmt = select(
+        Conversation.id,
+        Conversation.user_id,
+        Conversation.title,
+        Conversation.handoff_state,
+        Conversation.handoff_operator,
+        Conversation.user_online,
+        Conversation.created_at,
+        Conversation.updated_at,
+        Conversation.unread_user_count,
+        heat,
+    )
     count_stmt = select(func.count()).select_from(Conversation)
-    
+
     if state:
         stmt = stmt.where(Conversation.handoff_state == state)
         count_stmt = count_stmt.where(Conversation.handoff_state == state)
-    
-    # 按时间倒序获取（热度在内存计算后重排）
-    stmt = stmt.order_by(Conversation.updated_at.desc())
-    
-    # 获取总数
+
+    if sort_by == "heat":
+        stmt = stmt.order_by(heat.desc(), Conversation.updated_at.desc())
+    else:
+        stmt = stmt.order_by(Conversation.updated_at.desc())
+    stmt = stmt.offset(offset).limit(limit)
+
     step_start = time.perf_counter()
     total_result = await session.execute(count_stmt)
     total = total_result.scalar() or 0
-    logger.debug(f"get_conversations_with_heat: [1/4] count查询完成，total={total}，耗时 {(time.perf_counter() - step_start) * 1000:.2f}ms")
-    
-    # 如果按热度排序，需要获取更多数据来计算
-    if sort_by == "heat":
-        # 获取最近的会话（热度排序需要在内存中处理）
-        fetch_limit = min(limit + offset + 100, 500)  # 防止内存溢出
-        stmt = stmt.limit(fetch_limit)
-    else:
-        stmt = stmt.offset(offset).limit(limit)
-    
+    logger.debug(f"get_conversations_with_heat: [1/2] count查询完成，total={total}，耗时 {(time.perf_counter() - step_start) * 1000:.2f}ms")
+
     step_start = time.perf_counter()
     result = await session.execute(stmt)
-    conversations = list(result.scalars().all())
-    logger.debug(f"get_conversations_with_heat: [2/4] 会话列表查询完成，获取 {len(conversations)} 条，耗时 {(time.perf_counter() - step_start) * 1000:.2f}ms")
-    
-    # 计算热度和未读数
-    heat_service = HeatScoreService(session)
-    step_start = time.perf_counter()
-    heat_scores = await heat_service.calculate_for_conversations_batch(conversations)
-    logger.debug(f"get_conversations_with_heat: [3/4] 热度计算完成，耗时 {(time.perf_counter() - step_start) * 1000:.2f}ms")
-    
-    step_start = time.perf_counter()
-    unread_counts = await heat_service.get_unread_counts_batch([c.id for c in conversations])
-    logger.debug(f"get_conversations_with_heat: [4/4] 未读数查询完成，耗时 {(time.perf_counter() - step_start) * 1000:.2f}ms")
-    
-    # 构建响应数据
-    items = []
-    for conv in conversations:
-        items.append({
-            "id": conv.id,
-            "user_id": conv.user_id,
-            "title": conv.title,
-            "handoff_state": conv.handoff_state,
-            "handoff_operator": conv.handoff_operator,
-            "user_online": conv.user_online,
-            "created_at": conv.created_at,
-            "updated_at": conv.updated_at,
-            "heat_score": heat_scores.get(conv.id, 0),
-            "unread_count": unread_counts.get(conv.id, 0),
-        })
-    
-    # 按热度排序
-    if sort_by == "heat":
-        items.sort(key=lambda x: (-x["heat_score"], -x["updated_at"].timestamp()))
-        items = items[offset:offset + limit]
-    
+    items = [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "title": row.title,
+            "handoff_state": row.handoff_state,
+            "handoff_operator": row.handoff_operator,
+            "user_online": row.user_online,
+            "created_at": row.created_at,
+            "updated_at": row.updated_at,
+            "heat_score": int(row.heat_score or 0),
+            "unread_count": row.unread_user_count or 0,
+        }
+        for row in result.all()
+    ]
+    logger.debug(f"get_conversations_with_heat: [2/2] 会话列表查询完成，获取 {len(items)} 条，耗时 {(time.perf_counter() - step_start) * 1000:.2f}ms")
+
     logger.debug(f"get_conversations_with_heat: 全部完成，返回 {len(items)} 条，总耗时 {(time.perf_counter() - total_start) * 1000:.2f}ms")
     return items, total
 
 
 async def get_support_stats(session: AsyncSession) -> dict:
     """获取客服统计数据（用于红点提醒）
-    
+
+    单条分组查询完成状态计数、未读汇总与高热会话计数。
+
     Returns:
         {
             "pending_count": 等待接入数,
@@ -272,47 +340,29 @@ async def get_support_stats(session: AsyncSession) -> dict:
     """
     total_start = time.perf_counter()
     logger.debug("get_support_stats: 开始")
-    
-    # 状态统计
-    step_start = time.perf_counter()
-    state_stmt = (
-        select(Conversation.handoff_state, func.count().label("count"))
-        .group_by(Conversation.handoff_state)
-    )
-    state_result = await session.execute(state_stmt)
-    state_counts = {row.handoff_state: row.count for row in state_result.all()}
-    logger.debug(f"get_support_stats: [1/3] 状态统计完成，耗时 {(time.perf_counter() - step_start) * 1000:.2f}ms")
-    
-    # 未读消息总数（pending 和 human 状态的会话）
-    step_start = time.perf_counter()
-    unread_stmt = (
-        select(func.count())
-        .select_from(Message)
-        .join(Conversation, Message.conversation_id == Conversation.id)
-        .where(
-            Conversation.handoff_state.in_([HandoffState.PENDING.value, HandoffState.HUMAN.value]),
-            Message.role == "user",
-            Message.read_at.is_(None),
-        )
-    )
-    unread_result = await session.execute(unread_stmt)
-    total_unread = unread_result.scalar() or 0
-    logger.debug(f"get_support_stats: [2/3] 未读消息统计完成，total_unread={total_unread}，耗时 {(time.perf_counter() - step_start) * 1000:.2f}ms")
-    
-    # 计算高热会话数（需要获取会话详情）
-    step_start = time.perf_counter()
-    hot_conversations, _ = await get_conversations_with_heat(
-        session,
-        sort_by="heat",
-        limit=100,
-    )
-    high_heat_count = sum(1 for c in hot_conversations if c["heat_score"] > 60)
-    logger.debug(f"get_support_stats: [3/3] 高热会话统计完成，high_heat_count={high_heat_count}，耗时 {(time.perf_counter() - step_start) * 1000:.2f}ms")
-    
-    logger.debug(f"get_support_stats: 全部完成，总耗时 {(time.perf_counter() - total_start) * 1000:.2f}ms")
-    return {
-        "pending_count": state_counts.get(HandoffState.PENDING.value, 0),
-        "human_count": state_counts.get(HandoffState.HUMAN.value, 0),
-        "total_unread": total_unread,
-        "high_heat_count": high_heat_count,
+
+    heat = heat_score_expr(datetime.now(), _dialect_name(session))
+    stmt = select(
+        Conversation.handoff_state,
+        func.count().label("count"),
+        func.coalesce(func.sum(Conversation.unread_user_count), 0).label("unread"),
+        func.coalesce(func.sum(case((heat > HIGH_HEAT_THRESHOLD, 1), else_=0)), 0).label("hot"),
+    ).group_by(Conversation.handoff_state)
+    result = await session.execute(stmt)
+    rows = {row.handoff_state: row for row in result.all()}
+
+    def _get(state: str, field: str) -> int:
+        row = rows.get(state)
+        return int(getattr(row, field)) if row is not None else 0
+
+    active_states = [HandoffState.PENDING.value, HandoffState.HUMAN.value]
+    stats = {
+        "pending_count": _get(HandoffState.PENDING.value, "count"),
+        "human_count": _get(HandoffState.HUMAN.value, "count"),
+        # 未读消息总数（pending 和 human 状态的会话）
+        "total_unread": sum(_get(s, "unread") for s in active_states),
+        "high_heat_count": sum(int(row.hot) for row in rows.values()),
     }
+
+    logger.debug(f"get_support_stats: 全部完成，总耗时 {(time.perf_counter() - total_start) * 1000:.2f}ms")
+    return stats
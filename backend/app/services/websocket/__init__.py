@@ -4,8 +4,11 @@
 
 目录结构：
 - manager.py: 连接管理器
+- bus.py: 跨进程广播总线（memory / postgres / broker）
 - router.py: 消息路由器
-- heartbeat.py: 心跳管理
+- heartbeat.py: 心跳管理（时间轮超时检测）
+- presence.py: 在线状态（内存为准，批量持久化）
+- event_log.py: 会话事件日志（人工模式消息的补发与送达游标，WebSocket / SSE 共用）
 - handlers/: 消息处理器
 
 使用方式：
@@ -16,16 +19,24 @@
     app.include_router(ws.router)
 """
 
+from app.services.websocket.bus import BroadcastBus, create_bus
+from app.services.websocket.event_log import EventLogService
 from app.services.websocket.heartbeat import HeartbeatManager, heartbeat_manager
 from app.services.websocket.manager import ConnectionManager, WSConnection, ws_manager
+from app.services.websocket.presence import PresenceService, presence_service
 from app.services.websocket.router import MessageRouter, ws_router
 
 __all__ = [
     "ws_manager",
     "ws_router",
     "heartbeat_manager",
+    "presence_service",
     "ConnectionManager",
+    "BroadcastBus",
+    "create_bus",
     "WSConnection",
     "MessageRouter",
     "HeartbeatManager",
+    "PresenceService",
+    "EventLogService",
 ]
@@ -0,0 +1,419 @@
+"""WebSocket 跨进程广播总线
+
+ConnectionManager 只持有本进程的连接；多 worker / 多实例部署时，
+发往会话的消息经由总线转发到持有该会话连接的其他节点：
+- 主题即会话 ID：节点只订阅本地持有连接的会话，只接收这些会话的流量
+- 消息体为 JSON 可序列化的 dict（envelope），由 ConnectionManager 定义与解析
+
+后端（WS_BUS_BACKEND）：
+- memory: 进程内（默认），单进程部署；同一 InProcessHub 上的多个总线互相可见（测试模拟多节点）
+- postgres: PostgreSQL LISTEN/NOTIFY，复用主库连接配置（单条通知负载上限约 8KB）
+- broker: 本地 TCP / Unix socket 中转（LocalBroker），用于测试与无 PostgreSQL 的多 worker 开发环境
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from typing import Any
+from urllib.parse import urlparse
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("websocket.bus")
+
+# 收到消息的回调：(topic, envelope)
+BusHandler = Callable[[str, dict[str, Any]], Awaitable[None]]
+
+# PostgreSQL NOTIFY 负载上限为 8000 字节（含结尾）
+_PG_NOTIFY_MAX_BYTES = 7999
+
+# 断线重连间隔（秒）
+_RECONNECT_DELAY = 1.0
+
+
+class BroadcastBus(ABC):
+    """广播总线接口"""
+
+    def __init__(self) -> None:
+        self._handler: BusHandler | None = None
+        self._topics: set[str] = set()
+        self._dispatch_tasks: set[asyncio.Task] = set()
+
+    async def start(self, handler: BusHandler) -> None:
+        """启动总线，之后收到的消息交给 handler 处理"""
+        self._handler = handler
+        await self._start()
+
+    async def stop(self) -> None:
+        """停止总线"""
+        await self._stop()
+        self._topics.clear()
+        self._handler = None
+
+    async def subscribe(self, topic: str) -> None:
+        """订阅主题（会话 ID）"""
+        if topic not in self._topics:
+            self._topics.add(topic)
+            await self._subscribe(topic)
+
+    async def unsubscribe(self, topic: str) -> None:
+        """取消订阅"""
+        if topic in self._topics:
+            self._topics.discard(topic)
+            await self._unsubscribe(topic)
+
+    @abstractmethod
+    async def publish(self, topic: str, envelope: dict[str, Any]) -> None:
+        """发布消息（发布方自身不会收到）"""
+
+    async def _start(self) -> None:
+        pass
+
+    async def _stop(self) -> None:
+        pass
+
+    async def _subscribe(self, topic: str) -> None:
+        pass
+
+    async def _unsubscribe(self, topic: str) -> None:
+        pass
+
+    def _dispatch(self, topic: str, envelope: dict[str, Any]) -> None:
+        """在后台执行回调，不阻塞接收循环"""
+        if self._handler is None or topic not in self._topics:
+            return
+        task = asyncio.create_task(self._handler(topic, envelope))
+        self._dispatch_tasks.add(task)
+        task.add_done_callback(self._dispatch_tasks.discard)
+
+
+class InProcessHub:
+    """进程内中转：同一 hub 上的总线互相转发"""
+
+    def __init__(self) -> None:
+        self._subscribers: defaultdict[str, set["InProcessBus"]] = defaultdict(set)
+
+    def subscribe(self, topic: str, bus: "InProcessBus") -> None:
+        self._subscribers[topic].add(bus)
+
+    def unsubscribe(self, topic: str, bus: "InProcessBus") -> None:
+        subscribers = self._subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.discard(bus)
+            if not subscribers:
+                del self._subscribers[topic]
+
+    def publish(self, topic: str, envelope: dict[str, Any], sender: "InProcessBus") -> None:
+        for bus in list(self._subscribers.get(topic, ())):
+            if bus is not sender:
+                bus._dispatch(topic, envelope)
+
+
+class InProcessBus(BroadcastBus):
+    """进程内总线（默认）
+
+    未指定 hub 时独享一个 hub，发布即为空操作（单进程部署无其他节点）。
+    """
+
+    def __init__(self, hub: InProcessHub | None = None) -> None:
+        super().__init__()
+        self._hub = hub or InProcessHub()
+
+    async def _subscribe(self, topic: str) -> None:
+        self._hub.subscribe(topic, self)
+
+    async def _unsubscribe(self, topic: str) -> None:
+        self._hub.unsubscribe(topic, self)
+
+    async def _stop(self) -> None:
+        for topic in list(self._topics):
+            self._hub.unsubscribe(topic, self)
+
+    async def publish(self, topic: str, envelope: dict[str, Any]) -> None:
+        self._hub.publish(topic, envelope, self)
+
+
+def pg_channel(topic: str) -> str:
+    """主题对应的 PostgreSQL 通道名（标识符上限 63 字节，会话 ID 取哈希）"""
+    return "ws_" + hashlib.sha1(topic.encode()).hexdigest()
+
+
+class PostgresBus(BroadcastBus):
+    """基于 PostgreSQL LISTEN/NOTIFY 的总线
+
+    - 每个订阅的会话对应一个通道；监听使用一条专用连接，发布使用独立连接池
+    - 监听连接断开后自动重连并重新 LISTEN（断线期间的通知会丢失）
+    - 负载超过 NOTIFY 上限的消息不转发，只记录警告
+    """
+
+    def __init__(self, dsn: str) -> None:
+        super().__init__()
+        self._dsn = dsn
+        self._listen_conn = None
+        self._pool = None
+        self._channels: dict[str, str] = {}  # channel -> topic
+        self._reconnect_task: asyncio.Task | None = None
+        self._closing = False
+
+    async def _start(self) -> None:
+        import asyncpg
+
+        self._closing = False
+        self._pool = await asyncpg.create_pool(self._dsn, min_size=1, max_size=2)
+        await self._connect_listener()
+        logger.info("WebSocket 总线已连接 PostgreSQL")
+
+    async def _connect_listener(self) -> None:
+        import asyncpg
+
+        conn = await asyncpg.connect(self._dsn)
+        conn.add_termination_listener(self._on_terminated)
+        for channel in self._channels:
+            await conn.add_listener(channel, self._on_notify)
+        self._listen_conn = conn
+
+    def _on_terminated(self, _conn) -> None:
+        if self._closing:
+            return
+        logger.warning("WebSocket 总线监听连接断开，准备重连")
+        self._listen_conn = None
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while not self._closing and self._listen_conn is None:
+            try:
+                await self._connect_listener()
+                logger.info("WebSocket 总线监听连接已恢复", channels=len(self._channels))
+            except Exception as e:
+                logger.warning("WebSocket 总线重连失败", error=str(e))
+                await asyncio.sleep(_RECONNECT_DELAY)
+
+    def _on_notify(self, _conn, _pid: int, channel: str, payload: str) -> None:
+        topic = self._channels.get(channel)
+        if topic is None:
+            return
+        try:
+            envelope = json.loads(payload)
+        except ValueError:
+            logger.warning("WebSocket 总线收到无效消息", channel=channel)
+            return
+        self._dispatch(topic, envelope)
+
+    async def _subscribe(self, topic: str) -> None:
+        channel = pg_channel(topic)
+        self._channels[channel] = topic
+        if self._listen_conn is not None:
+            await self._listen_conn.add_listener(channel, self._on_notify)
+
+    async def _unsubscribe(self, topic: str) -> None:
+        channel = pg_channel(topic)
+        self._channels.pop(channel, None)
+        if self._listen_conn is not None:
+            with contextlib.suppress(Exception):
+                await self._listen_conn.remove_listener(channel, self._on_notify)
+
+    async def publish(self, topic: str, envelope: dict[str, Any]) -> None:
+        if self._pool is None:
+            return
+        payload = json.dumps(envelope, ensure_ascii=False, default=str)
+        if len(payload.encode()) > _PG_NOTIFY_MAX_BYTES:
+            logger.warning(
+                "消息超过 NOTIFY 负载上限，未跨节点转发", topic=topic, size=len(payload.encode())
+            )
+            return
+        try:
+            await self._pool.execute("SELECT pg_notify($1, $2)", pg_channel(topic), payload)
+        except Exception as e:
+            logger.warning("WebSocket 总线发布失败", topic=topic, error=str(e))
+
+    async def _stop(self) -> None:
+        self._closing = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._listen_conn is not None:
+            with contextlib.suppress(Exception):
+                await self._listen_conn.close()
+            self._listen_conn = None
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        self._channels.clear()
+
+
+def _parse_broker_url(url: str) -> tuple[str | None, int | None, str | None]:
+    """解析 broker 地址：tcp://host:port 或 unix:///path/to.sock
+
+    Returns:
+        (host, port, unix_path)
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return None, None, parsed.path
+    if parsed.scheme == "tcp":
+        return parsed.hostname or "127.0.0.1", parsed.port or 8765, None
+    raise ValueError(f"不支持的 broker 地址: {url}")
+
+
+async def _open_broker_connection(url: str) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    host, port, path = _parse_broker_url(url)
+    if path is not None:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection(host, port)
+
+
+class LocalBroker:
+    """本地消息中转服务（TCP / Unix socket，每行一个 JSON）
+
+    客户端发送 {"op": "sub" | "unsub" | "pub", "topic": ..., "data": ...}，
+    broker 把 pub 转发给订阅了该主题的其他客户端：{"topic": ..., "data": ...}。
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self._server: asyncio.AbstractServer | None = None
+        self._subscribers: defaultdict[str, set[asyncio.StreamWriter]] = defaultdict(set)
+        self._clients: set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        host, port, path = _parse_broker_url(self.url)
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._serve, path)
+        else:
+            self._server = await asyncio.start_server(self._serve, host, port)
+        logger.info("WebSocket 本地 broker 已启动", url=self.url)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._subscribers.clear()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._clients.add(writer)
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    continue
+                op, topic = request.get("op"), request.get("topic")
+                if op == "sub":
+                    self._subscribers[topic].add(writer)
+                elif op == "unsub":
+                    self._remove(topic, writer)
+                elif op == "pub":
+                    frame = json.dumps({"topic": topic, "data": request.get("data")}).encode() + b"\n"
+                    for subscriber in list(self._subscribers.get(topic, ())):
+                        if subscriber is not writer:
+                            subscriber.write(frame)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            for topic in list(self._subscribers):
+                self._remove(topic, writer)
+            writer.close()
+
+    def _remove(self, topic: str, writer: asyncio.StreamWriter) -> None:
+        subscribers = self._subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.discard(writer)
+            if not subscribers:
+                del self._subscribers[topic]
+
+
+class BrokerBus(BroadcastBus):
+    """连接 LocalBroker 的总线客户端（断线后自动重连并重新订阅）"""
+
+    def __init__(self, url: str) -> None:
+        super().__init__()
+        self._url = url
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._write_lock = asyncio.Lock()
+        self._closing = False
+
+    async def _start(self) -> None:
+        self._closing = False
+        await self._connect()
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await _open_broker_connection(self._url)
+        for topic in self._topics:
+            await self._send({"op": "sub", "topic": topic})
+
+    async def _read_loop(self) -> None:
+        while not self._closing:
+            try:
+                while line := await self._reader.readline():
+                    frame = json.loads(line)
+                    self._dispatch(frame["topic"], frame["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("WebSocket broker 连接异常", error=str(e))
+
+            self._writer = None
+            while not self._closing and self._writer is None:
+                await asyncio.sleep(_RECONNECT_DELAY)
+                try:
+                    await self._connect()
+                    logger.info("WebSocket broker 连接已恢复", topics=len(self._topics))
+                except OSError as e:
+                    logger.warning("WebSocket broker 重连失败", error=str(e))
+
+    async def _send(self, request: dict[str, Any]) -> None:
+        writer = self._writer
+        if writer is None:
+            return
+        async with self._write_lock:
+            try:
+                writer.write(json.dumps(request, ensure_ascii=False, default=str).encode() + b"\n")
+                await writer.drain()
+            except ConnectionError as e:
+                logger.warning("WebSocket broker 写入失败", error=str(e))
+
+    async def _subscribe(self, topic: str) -> None:
+        await self._send({"op": "sub", "topic": topic})
+
+    async def _unsubscribe(self, topic: str) -> None:
+        await self._send({"op": "unsub", "topic": topic})
+
+    async def publish(self, topic: str, envelope: dict[str, Any]) -> None:
+        await self._send({"op": "pub", "topic": topic, "data": envelope})
+
+    async def _stop(self) -> None:
+        self._closing = True
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader_task
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def create_bus() -> BroadcastBus:
+    """按 WS_BUS_BACKEND 创建总线"""
+    backend = settings.WS_BUS_BACKEND
+    if backend == "memory":
+        return InProcessBus()
+    if backend == "postgres":
+        if settings.DATABASE_BACKEND != "postgres":
+            raise ValueError("WS_BUS_BACKEND=postgres 需要 DATABASE_BACKEND=postgres")
+        return PostgresBus(settings.checkpoint_connection_string)
+    if backend == "broker":
+        return BrokerBus(settings.WS_BUS_BROKER_URL)
+    raise ValueError(f"不支持的 WebSocket 总线后端: {backend}")
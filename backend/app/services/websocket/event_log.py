@@ -0,0 +1,267 @@
+"""会话事件日志
+
+人工模式下用户与客服之间的消息统一经事件日志投递：
+- 事件先追加到 conversation_events（按 seq 只追加），再推送给在线的接收方连接
+- WebSocket 与 SSE 订阅是同一类消费者：SSE 订阅也注册为 ConnectionManager 的连接
+  （SSESocket 适配 send_json），跨节点转发、按角色投递与 WebSocket 完全一致
+- 送达确认只推进每个会话、每个接收方角色的送达游标（一条 upsert），
+  不再逐条更新消息的 is_delivered；重连时补发游标之后的事件
+- 游标只在消息真正写入连接后推进（连接写任务的送达回调），入队不算送达：
+  队列溢出、发送超时或连接已断开而未写出的消息在重连时补发
+- 送达回调只在内存记录最大 seq（DeliveryCursorBuffer），按 EVENT_CURSOR_FLUSH_INTERVAL
+  合并后在一个事务内批量写库；连接写任务中不做数据库操作
+- SSE 帧带 id 行（id: <seq>），客户端凭 Last-Event-ID 续订
+"""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_db_context
+from app.core.logging import get_logger
+from app.models.conversation_event import ConversationEvent
+from app.repositories.conversation_event import ConversationEventRepository
+from app.schemas.websocket import WSAction, WSRole
+from app.services.websocket.handlers.base import build_server_message
+from app.services.websocket.manager import WSConnection, ws_manager
+
+logger = get_logger("websocket.event_log")
+
+# SSE 空闲时发送注释行的间隔（秒），避免代理断开空闲连接
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+def event_message(event: ConversationEvent) -> dict[str, Any]:
+    """事件转为推送消息（payload 中带 seq）"""
+    payload = {
+        **event.payload,
+        "seq": event.seq,
+        "is_delivered": True,
+        "delivered_at": datetime.now().isoformat(),
+    }
+    return build_server_message(action=event.action, payload=payload, conversation_id=event.conversation_id)
+
+
+def encode_sse(message: dict[str, Any]) -> str:
+    """编码为 SSE 帧（事件日志中的消息带 id 行）"""
+    data = json.dumps(message, ensure_ascii=False, default=str)
+    seq = message.get("payload", {}).get("seq")
+    return f"id: {seq}\ndata: {data}\n\n" if seq is not None else f"data: {data}\n\n"
+
+
+class SSESocket:
+    """SSE 订阅的写入端
+
+    实现 WSConnection 用到的 send_json / close，ConnectionManager 投递的消息
+    由 SSE 响应逐条取出。队列只容纳一条，send_json 等到该帧交给响应写出后才返回
+    （送达回调据此推进游标）；响应写不动时由 WSConnection 的发送超时与有界队列处理慢客户端。
+    """
+
+    def __init__(self) -> None:
+        self._messages: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(maxsize=1)
+        self._closed = False
+
+    async def send_json(self, message: dict[str, Any]) -> None:
+        await self._messages.put(message)
+        await self._messages.join()
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        self._closed = True
+        if self._messages.empty():
+            self._messages.put_nowait(None)
+
+    async def messages(self, keepalive: float = SSE_KEEPALIVE_SECONDS) -> AsyncIterator[dict[str, Any] | None]:
+        """逐条取出待发送的消息，连接关闭后结束
+
+        空闲超过 keepalive 秒时产出 None（由调用方写 SSE 注释行保活）。
+        """
+        while not self._closed or not self._messages.empty():
+            try:
+                message = await asyncio.wait_for(self._messages.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if message is None:
+                return
+            yield message
+            # 调用方取下一条时上一帧已写出
+            self._messages.task_done()
+
+
+class DeliveryCursorBuffer:
+    """送达游标的内存缓冲（全局单例见 delivery_cursors）
+
+    与 PresenceService 相同的批量持久化方式：记录只更新内存中每个会话、每个接收方角色
+    已写出的最大 seq，后台任务合并一个窗口内的变化后在一个事务内写库。
+    已写库的游标从内存移除，读取时取内存与数据库中的较大值。
+    """
+
+    def __init__(self, flush_interval: float | None = None) -> None:
+        self.flush_interval = settings.EVENT_CURSOR_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._delivered: dict[tuple[str, str], int] = {}
+        self._dirty: set[tuple[str, str]] = set()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.flushed_cursors = 0
+
+    async def start(self) -> None:
+        """启动后台持久化任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """停止后台任务并写入剩余游标"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def record(self, conversation_id: str, audience: str, seq: int) -> None:
+        """记录已写出的 seq（只前进不后退，不访问数据库）"""
+        key = (conversation_id, audience)
+        if seq > self._delivered.get(key, 0):
+            self._delivered[key] = seq
+            self._dirty.add(key)
+            self._wakeup.set()
+
+    def delivered(self, conversation_id: str, audience: str) -> int:
+        """内存中尚未写库的送达 seq（没有时为 0）"""
+        return self._delivered.get((conversation_id, audience), 0)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            # 等待一个窗口，合并窗口内的所有推进
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("送达游标持久化失败", error=str(e))
+
+    async def flush(self) -> int:
+        """写入待持久化的游标
+
+        Returns:
+            写入的游标数
+        """
+        self._wakeup.clear()
+        keys, self._dirty = self._dirty, set()
+        cursors = {key: self._delivered[key] for key in keys if key in self._delivered}
+        if not cursors:
+            return 0
+        try:
+            await self._persist(cursors)
+        except Exception:
+            # 写入失败：放回待写集合，下个窗口重试
+            self._dirty |= keys
+            self._wakeup.set()
+            raise
+        # 窗口期间没有再推进的游标已以数据库为准
+        for key, seq in cursors.items():
+            if key not in self._dirty and self._delivered.get(key) == seq:
+                del self._delivered[key]
+        self.flushed_cursors += len(cursors)
+        logger.debug("送达游标已持久化", cursors=len(cursors))
+        return len(cursors)
+
+    async def _persist(self, cursors: dict[tuple[str, str], int]) -> None:
+        async with get_db_context() as session:
+            repo = ConversationEventRepository(session)
+            for (conversation_id, audience), seq in cursors.items():
+                await repo.advance_cursor(conversation_id, audience, seq)
+
+
+# 全局单例
+delivery_cursors = DeliveryCursorBuffer()
+
+
+class EventLogService:
+    """会话事件日志服务"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.repo = ConversationEventRepository(session)
+
+    async def publish(
+        self,
+        conversation_id: str,
+        audience: WSRole,
+        action: WSAction,
+        payload: dict[str, Any],
+    ) -> int:
+        """写入事件并推送给接收方的在线连接（WebSocket 与 SSE 订阅）
+
+        送达游标由连接写出消息后推进（见 advance_on_delivery），
+        未写出的事件在接收方重连时从游标处补发。
+
+        Returns:
+            消息入队的连接数（含其他节点），不代表已送达
+        """
+        event = await self.repo.append(conversation_id, audience.value, action.value, payload)
+        sent_count = await ws_manager.send_to_role(conversation_id, audience, event_message(event))
+        logger.debug(
+            "会话事件已发布",
+            conversation_id=conversation_id,
+            audience=audience.value,
+            seq=event.seq,
+            sent_count=sent_count,
+        )
+        return sent_count
+
+    async def pending(
+        self,
+        conversation_id: str,
+        audience: WSRole,
+        after_seq: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """待补发的推送消息
+
+        Args:
+            after_seq: 客户端已收到的最大 seq（Last-Event-ID）；为空时使用送达游标
+        """
+        if after_seq is None:
+            after_seq = max(
+                await self.repo.get_cursor(conversation_id, audience.value),
+                delivery_cursors.delivered(conversation_id, audience.value),
+            )
+        events = await self.repo.list_after(conversation_id, audience.value, after_seq)
+        return [event_message(event) for event in events]
+
+    async def ack(self, conversation_id: str, audience: WSRole, seq: int) -> None:
+        """确认送达到 seq（游标只前进不后退）"""
+        await self.repo.advance_cursor(conversation_id, audience.value, seq)
+
+    async def replay(self, conn: WSConnection) -> int:
+        """向新连接补发送达游标之后的事件（写出后由送达回调推进游标）
+
+        Returns:
+            补发的事件数
+        """
+        messages = await self.pending(conn.conversation_id, WSRole(conn.role))
+        for message in messages:
+            conn.enqueue(message)
+        return len(messages)
+
+
+def advance_on_delivery(conn: WSConnection, message: dict[str, Any]) -> None:
+    """连接写出事件日志消息后推进送达游标（ConnectionManager 的送达回调，只更新内存）
+
+    连接丢弃过消息（drop_oldest）后不再推进，避免游标越过被丢弃的事件；
+    重连时从游标处补发，客户端按 message_id 去重。
+    """
+    seq = message.get("payload", {}).get("seq")
+    if seq is None or conn.dropped_count:
+        return
+    delivery_cursors.record(conn.conversation_id, WSRole(conn.role).value, seq)
+
+
+ws_manager.set_delivery_listener(advance_on_delivery)
@@ -19,8 +19,6 @@ async def handle_agent_send_message(
     payload: dict[str, Any],
 ) -> None:
     """处理客服发送消息（支持图片）"""
-    from datetime import datetime
-
     content = payload.get("content", "")
     images = payload.get("images")  # 图片列表
 
@@ -43,29 +41,22 @@ async def handle_agent_send_message(
         )
 
         if message:
-            # 通过 WebSocket 发送给用户
-            ws_payload: dict[str, Any] = {
+            # 写入事件日志并推送给用户（WebSocket / SSE 订阅）
+            event_payload: dict[str, Any] = {
                 "message_id": message.id,
                 "role": "human_agent",
                 "content": content,
                 "created_at": message.created_at.isoformat(),
                 "operator": conn.identity,
-                "is_delivered": True,
-                "delivered_at": datetime.now().isoformat(),
             }
             if images:
-                ws_payload["images"] = images
+                event_payload["images"] = images
 
-            server_msg = build_server_message(
-                action=WSAction.SERVER_MESSAGE,
-                payload=ws_payload,
-                conversation_id=conn.conversation_id,
+            ws_sent = await services.event_log.publish(
+                conn.conversation_id, WSRole.USER, WSAction.SERVER_MESSAGE, event_payload
             )
-            ws_sent = await ws_manager.send_to_role(conn.conversation_id, WSRole.USER, server_msg)
 
-            # 如果成功送达，更新消息状态
             if ws_sent > 0:
-                await services.message_repo.mark_as_delivered([message.id])
                 logger.info(
                     "客服消息已送达用户",
                     conn_id=conn.id,
@@ -75,7 +66,7 @@ async def handle_agent_send_message(
                     has_images=bool(images),
                 )
             else:
-                # 消息未送达（用户离线），等用户上线时推送
+                # 消息未送达（用户离线），等用户上线时从事件日志补发
                 logger.info(
                     "客服消息已保存（用户离线，等待送达）",
                     conn_id=conn.id,
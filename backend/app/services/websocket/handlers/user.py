@@ -20,16 +20,12 @@ async def handle_user_send_message(
     payload: dict[str, Any],
 ) -> None:
     """处理用户发送消息"""
-    from datetime import datetime
-
     content = payload["content"]
     client_message_id = payload.get("message_id")
 
     async with get_services() as services:
-        # 检查 handoff 状态和客服在线状态
+        # 检查 handoff 状态
         handoff_state = await services.handoff.get_handoff_state(conn.conversation_id)
-        online_status = await services.conversation_repo.get_online_status(conn.conversation_id)
-        agent_online = online_status.get("agent_online", False)
 
         if handoff_state == HandoffState.HUMAN.value:
             # 人工模式：保存消息并转发给客服
@@ -40,26 +36,18 @@ async def handle_user_send_message(
                 message_id=client_message_id,
             )
 
-            # 检查客服是否在线，尝试推送
-            sent_count = 0
-            if agent_online:
-                server_msg = build_server_message(
-                    action=WSAction.SERVER_MESSAGE,
-                    payload={
-                        "message_id": message.id,
-                        "role": "user",
-                        "content": content,
-                        "created_at": message.created_at.isoformat(),
-                        "is_delivered": True,
-                        "delivered_at": datetime.now().isoformat(),
-                    },
-                    conversation_id=conn.conversation_id,
-                )
-                sent_count = await ws_manager.send_to_role(conn.conversation_id, WSRole.AGENT, server_msg)
+            # 写入事件日志；客服在线时推送（离线时等客服上线从事件日志补发）
+            event_payload = {
+                "message_id": message.id,
+                "role": "user",
+                "content": content,
+                "created_at": message.created_at.isoformat(),
+            }
+            sent_count = await services.event_log.publish(
+                conn.conversation_id, WSRole.AGENT, WSAction.SERVER_MESSAGE, event_payload
+            )
 
-            # 如果成功送达，更新消息状态
             if sent_count > 0:
-                await services.message_repo.mark_as_delivered([message.id])
                 logger.info(
                     "用户消息已送达客服",
                     conn_id=conn.id,
@@ -67,7 +55,6 @@ async def handle_user_send_message(
                     message_id=message.id,
                 )
             else:
-                # 消息未送达（客服离线），等客服上线时推送
                 logger.info(
                     "用户消息已保存（客服离线，等待送达）",
                     conn_id=conn.id,
@@ -1,17 +1,69 @@
 """WebSocket 心跳管理
 
 职责：
-- 定期检测连接活性
+- 检测连接活性
 - 清理超时连接
+
+超时检测使用时间轮：连接按到期时间放入槽位，每个 tick 只检查当前槽位的连接，
+不再每轮扫描全部连接。心跳只更新 last_ping_at，不移动槽位；槽位到期时发现
+连接期间有心跳，再按新的到期时间放回时间轮（惰性续期）。
 """
 
 import asyncio
+import math
 import time
+from typing import Generic, TypeVar
 
 from app.core.logging import get_logger
 
 logger = get_logger("websocket.heartbeat")
 
+T = TypeVar("T")
+
+
+class TimingWheel(Generic[T]):
+    """哈希时间轮
+
+    槽位按 tick 划分，到期时间超过一圈的条目在经过其槽位时保留到下一圈。
+    """
+
+    def __init__(self, tick: float, slots: int, now: float | None = None):
+        self.tick = tick
+        self._slots: list[list[tuple[float, T]]] = [[] for _ in range(slots)]
+        self._last_tick = self._tick_of(time.time() if now is None else now)
+        self._size = 0
+
+    def _tick_of(self, ts: float) -> int:
+        return math.floor(ts / self.tick)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def schedule(self, item: T, deadline: float) -> None:
+        """放入时间轮，deadline 后由 advance 返回"""
+        # 放到 deadline 之后的第一个刻度；当前 tick 已处理过时放到下一个槽位
+        tick = max(math.ceil(deadline / self.tick), self._last_tick + 1)
+        self._slots[tick % len(self._slots)].append((deadline, item))
+        self._size += 1
+
+    def advance(self, now: float) -> list[T]:
+        """推进到 now，返回已到期的条目"""
+        now_tick = self._tick_of(now)
+        expired: list[T] = []
+        steps = min(now_tick - self._last_tick, len(self._slots))
+        for offset in range(1, steps + 1):
+            slot = self._slots[(self._last_tick + offset) % len(self._slots)]
+            keep = []
+            for deadline, item in slot:
+                if deadline <= now:
+                    expired.append(item)
+                else:
+                    keep.append((deadline, item))
+            slot[:] = keep
+        self._last_tick = max(now_tick, self._last_tick)
+        self._size -= len(expired)
+        return expired
+
 
 class HeartbeatManager:
     """心跳管理器（单例）"""
@@ -20,15 +72,20 @@ class HeartbeatManager:
     _task: asyncio.Task | None = None
 
     # 配置
-    CHECK_INTERVAL = 30  # 检查间隔（秒）
+    TICK = 5  # 时间轮刻度（秒）
     TIMEOUT = 90  # 超时时间（秒）
 
     def __new__(cls) -> "HeartbeatManager":
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance._task = None
+            cls._instance._wheel = TimingWheel(cls.TICK, math.ceil(cls.TIMEOUT / cls.TICK) + 1)
         return cls._instance
 
+    def track(self, conn) -> None:
+        """登记连接的超时检测（连接注册后调用）"""
+        self._wheel.schedule(conn, conn.last_ping_at + self.TIMEOUT)
+
     async def start(self) -> None:
         """启动心跳检测"""
         if self._task is None or self._task.done():
@@ -49,23 +106,25 @@ class HeartbeatManager:
         """心跳检测循环"""
         while True:
             try:
-                await asyncio.sleep(self.CHECK_INTERVAL)
-                await self._check_connections()
+                await asyncio.sleep(self.TICK)
+                await self._check_connections(time.time())
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.exception("心跳检测出错", error=str(e))
 
-    async def _check_connections(self) -> None:
-        """检测所有连接"""
+    async def _check_connections(self, now: float) -> None:
+        """检测当前槽位到期的连接"""
         from app.services.websocket.manager import ws_manager
 
-        now = time.time()
         dead_conns = []
-
-        all_conns = ws_manager.get_all_connections()
-        for conn_id, conn in all_conns.items():
-            if now - conn.last_ping_at > self.TIMEOUT:
+        for conn in self._wheel.advance(now):
+            if ws_manager.get_connection(conn.id) is not conn:
+                continue  # 已注销
+            deadline = conn.last_ping_at + self.TIMEOUT
+            if deadline > now:
+                self._wheel.schedule(conn, deadline)
+            else:
                 dead_conns.append(conn)
 
         for conn in dead_conns:
@@ -3,12 +3,15 @@
 职责：
 - 管理所有 WebSocket 连接的生命周期
 - 按会话/角色组织连接
-- 提供广播和定向发送能力
+- 提供广播和定向发送能力（经广播总线转发到其他 worker / 实例上的连接）
+- 每个连接独立的有界发送队列与写任务，慢客户端不阻塞广播
 - 连接状态统计
 """
 
 import asyncio
+import time
 from collections import defaultdict
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any
@@ -16,15 +19,30 @@ from uuid import uuid4
 
 from fastapi import WebSocket
 
+from app.core.config import settings
 from app.core.logging import get_logger
 from app.schemas.websocket import WSRole
+from app.services.websocket.bus import BroadcastBus, InProcessBus
 
 logger = get_logger("websocket.manager")
 
+# 送达回调：写任务把消息成功写入连接后调用（见 ConnectionManager.set_delivery_listener），
+# 在写任务中同步执行，不应做 I/O
+DeliveryListener = Callable[["WSConnection", dict[str, Any]], None]
+
+# 其他节点的连接数超过若干个通报间隔未刷新即视为该节点已下线
+_MEMBERS_TTL_INTERVALS = 3
+
 
 @dataclass
 class WSConnection:
-    """WebSocket 连接实例"""
+    """WebSocket 连接实例
+
+    发送经有界队列由独立写任务完成：调用方只入队不等待写入，
+    单个慢客户端不会拖慢同会话的其他连接和调用方。
+    队列满时按 WS_SEND_OVERFLOW_POLICY 关闭连接或丢弃最旧消息。
+    写入成功后调用 on_sent（送达回调）；入队不代表送达。
+    """
 
     id: str
     websocket: WebSocket
@@ -36,50 +54,175 @@ class WSConnection:
     last_ping_at: float = field(default_factory=lambda: datetime.now().timestamp())
     metadata: dict[str, Any] = field(default_factory=dict)
     is_alive: bool = True
+    dropped_count: int = 0  # 因队列满丢弃的消息数
+    on_sent: DeliveryListener | None = field(default=None, repr=False)
 
-    async def send(self, message: dict[str, Any]) -> bool:
-        """发送消息到此连接"""
+    _queue: asyncio.Queue[dict[str, Any]] = field(init=False, repr=False)
+    _writer: asyncio.Task | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._queue = asyncio.Queue(maxsize=max(settings.WS_SEND_QUEUE_SIZE, 1))
+
+    @property
+    def queue_depth(self) -> int:
+        """待发送消息数"""
+        return self._queue.qsize()
+
+    def enqueue(self, message: dict[str, Any]) -> bool:
+        """消息入队（不等待写入）
+
+        Returns:
+            是否已入队；连接已失效或因队列满被关闭时返回 False
+        """
         if not self.is_alive:
             return False
-        try:
-            await self.websocket.send_json(message)
-            return True
-        except Exception as e:
-            logger.warning("发送消息失败", conn_id=self.id, error=str(e))
-            self.is_alive = False
-            return False
+        if self._queue.full():
+            if settings.WS_SEND_OVERFLOW_POLICY == "drop_oldest":
+                self._queue.get_nowait()
+                self.dropped_count += 1
+                if self.dropped_count == 1 or self.dropped_count % 100 == 0:
+                    logger.warning("发送队列已满，丢弃最旧消息", conn_id=self.id, dropped=self.dropped_count)
+            else:
+                logger.warning("发送队列已满，关闭慢连接", conn_id=self.id, queue_size=self._queue.maxsize)
+                self._abort(1013, "发送队列已满")
+                return False
+        self._queue.put_nowait(message)
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+        return True
 
-    async def close(self, code: int = 1000, reason: str = "") -> None:
-        """关闭连接"""
+    async def send(self, message: dict[str, Any]) -> bool:
+        """发送消息到此连接（入队，与 enqueue 相同，保持与广播消息的顺序）"""
+        return self.enqueue(message)
+
+    async def _write_loop(self) -> None:
+        while self.is_alive:
+            message = await self._queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_json(message), timeout=settings.WS_SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning("发送消息超时，关闭慢连接", conn_id=self.id, queue_depth=self.queue_depth)
+                self._abort(1013, "发送超时")
+                return
+            except Exception as e:
+                logger.warning("发送消息失败", conn_id=self.id, error=str(e))
+                self.is_alive = False
+                return
+            if self.on_sent is not None:
+                try:
+                    self.on_sent(self, message)
+                except Exception as e:
+                    logger.warning("送达回调失败", conn_id=self.id, error=str(e))
+
+    def _abort(self, code: int, reason: str) -> None:
+        """丢弃待发消息并在后台关闭连接（不在调用方中等待）"""
+        self.stop()
+        _spawn(self._close_socket(code, reason))
+
+    def _drain(self) -> None:
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    def stop(self) -> None:
+        """停止写任务并丢弃待发消息（连接注销时调用）"""
         self.is_alive = False
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        self._drain()
+
+    async def _close_socket(self, code: int, reason: str) -> None:
         try:
             await self.websocket.close(code=code, reason=reason)
         except Exception:
             pass
 
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        """关闭连接"""
+        self.stop()
+        await self._close_socket(code, reason)
+
+
+# 后台关闭任务（持有引用，避免任务被回收）
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
 
 class ConnectionManager:
-    """WebSocket 连接管理器（单例）
+    """WebSocket 连接管理器（全局单例见 ws_manager）
     
     数据结构：
     - _connections_by_id: { conn_id -> WSConnection }
     - _connections_by_conversation: { conversation_id -> { conn_id -> WSConnection } }
     - _connections_by_identity: { identity -> { conn_id -> WSConnection } }
-    """
+    - _remote_members: { conversation_id -> { node_id -> ({ role -> 连接数 }, 最后收到的时间) } }
 
-    _instance: "ConnectionManager | None" = None
+    跨节点：本节点持有某会话的连接时订阅该会话主题；发往会话的消息先投递本地连接，
+    再经总线发布，其他节点收到后投递各自的连接。节点间同时同步各自的连接数，
+    发送结果（送达连接数）包含其他节点上的连接。节点每隔 announce_interval 重发连接数，
+    崩溃或失联节点的连接数在 _MEMBERS_TTL_INTERVALS 个间隔后过期。
 
-    def __new__(cls) -> "ConnectionManager":
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._init_storage()
-        return cls._instance
+    总线消息（envelope）：
+    - {"origin", "kind": "message", "message", "role", "exclude_role", "exclude_conn_id"}
+    - {"origin", "kind": "members", "counts": {role: n}}：节点在该会话的连接数
+    - {"origin", "kind": "sync"}：新订阅的节点请求其他节点通报连接数
+    """
 
-    def _init_storage(self) -> None:
+    def __init__(
+        self,
+        bus: BroadcastBus | None = None,
+        node_id: str | None = None,
+        announce_interval: float | None = None,
+    ) -> None:
+        self.bus = bus or InProcessBus()
+        self.node_id = node_id or uuid4().hex
+        self.announce_interval = (
+            settings.WS_MEMBERS_ANNOUNCE_INTERVAL if announce_interval is None else announce_interval
+        )
+        self._announce_task: asyncio.Task | None = None
         self._lock = asyncio.Lock()
         self._connections_by_id: dict[str, WSConnection] = {}
         self._connections_by_conversation: dict[str, dict[str, WSConnection]] = defaultdict(dict)
         self._connections_by_identity: dict[str, dict[str, WSConnection]] = defaultdict(dict)
+        self._remote_members: dict[str, dict[str, tuple[dict[str, int], float]]] = {}
+        self._delivery_listener: DeliveryListener | None = None
+
+    def set_delivery_listener(self, listener: DeliveryListener | None) -> None:
+        """设置送达回调（消息写入本节点连接后调用，跨节点转发的消息由接收节点回调）"""
+        self._delivery_listener = listener
+
+    def _on_sent(self, conn: WSConnection, message: dict[str, Any]) -> None:
+        if self._delivery_listener is not None:
+            self._delivery_listener(conn, message)
+
+    async def start(self, bus: BroadcastBus | None = None) -> None:
+        """启动广播总线
+
+        Args:
+            bus: 替换默认的进程内总线（见 bus.create_bus）
+        """
+        if bus is not None:
+            self.bus = bus
+        await self.bus.start(self._on_bus_message)
+        if self._announce_task is None:
+            self._announce_task = asyncio.create_task(self._announce_loop())
+        logger.info("WebSocket 广播总线已启动", bus=type(self.bus).__name__, node_id=self.node_id)
+
+    async def stop(self) -> None:
+        """停止广播总线"""
+        if self._announce_task is not None:
+            self._announce_task.cancel()
+            try:
+                await self._announce_task
+            except asyncio.CancelledError:
+                pass
+            self._announce_task = None
+        await self.bus.stop()
+        self._remote_members.clear()
 
     async def connect(
         self,
@@ -99,6 +242,7 @@ class ConnectionManager:
             role=role,
             identity=identity,
             metadata=metadata or {},
+            on_sent=self._on_sent,
         )
 
         async with self._lock:
@@ -106,6 +250,8 @@ class ConnectionManager:
             self._connections_by_conversation[conversation_id][conn_id] = conn
             self._connections_by_identity[identity][conn_id] = conn
 
+        await self._sync_membership(conversation_id)
+
         logger.info(
             "WebSocket 连接已注册",
             conn_id=conn_id,
@@ -131,6 +277,9 @@ class ConnectionManager:
                     del self._connections_by_identity[conn.identity]
 
                 logger.info("WebSocket 连接已注销", conn_id=conn_id)
+        if conn:
+            conn.stop()
+            await self._sync_membership(conn.conversation_id)
         return conn
 
     def get_connection(self, conn_id: str) -> WSConnection | None:
@@ -160,7 +309,7 @@ class ConnectionManager:
         """发送消息到指定连接"""
         conn = self.get_connection(conn_id)
         if conn:
-            return await conn.send(message)
+            return conn.enqueue(message)
         return False
 
     async def broadcast_to_conversation(
@@ -171,64 +320,197 @@ class ConnectionManager:
         exclude_role: WSRole | None = None,
         exclude_conn_id: str | None = None,
     ) -> int:
-        """广播消息到会话的所有连接"""
-        conns = self.get_connections_by_conversation(conversation_id)
+        """广播消息到会话的所有连接（含其他节点）"""
+        sent_count = self._deliver_local(
+            conversation_id, message, exclude_role=exclude_role, exclude_conn_id=exclude_conn_id
+        )
+        await self._publish_message(
+            conversation_id, message, exclude_role=exclude_role, exclude_conn_id=exclude_conn_id
+        )
+        remote = self.get_remote_counts(conversation_id)
+        return sent_count + sum(n for role, n in remote.items() if role != _role_key(exclude_role))
+
+    async def send_to_role(
+        self,
+        conversation_id: str,
+        role: WSRole,
+        message: dict[str, Any],
+    ) -> int:
+        """发送消息到会话中指定角色的所有连接（含其他节点）"""
+        sent_count = self._deliver_local(conversation_id, message, role=role)
+        await self._publish_message(conversation_id, message, role=role)
+        return sent_count + self.get_remote_counts(conversation_id).get(_role_key(role), 0)
 
+    def _deliver_local(
+        self,
+        conversation_id: str,
+        message: dict[str, Any],
+        *,
+        role: WSRole | str | None = None,
+        exclude_role: WSRole | str | None = None,
+        exclude_conn_id: str | None = None,
+    ) -> int:
+        """投递到本节点的连接（只入各连接的发送队列，不等待写入）"""
         sent_count = 0
-        for conn in conns:
-            if exclude_role and conn.role == exclude_role:
+        for conn in self.get_connections_by_conversation(conversation_id):
+            if role is not None and _role_key(conn.role) != _role_key(role):
+                continue
+            if exclude_role and _role_key(conn.role) == _role_key(exclude_role):
                 continue
             if exclude_conn_id and conn.id == exclude_conn_id:
                 continue
-
-            if await conn.send(message):
+            if conn.enqueue(message):
                 sent_count += 1
 
+        logger.debug(
+            "WS 消息已入队",
+            conversation_id=conversation_id,
+            role=_role_key(role),
+            sent_count=sent_count,
+            message_type=message.get("action"),
+        )
         return sent_count
 
-    async def send_to_role(
+    # ========== 跨节点 ==========
+
+    async def _publish_message(
         self,
         conversation_id: str,
-        role: WSRole,
         message: dict[str, Any],
-    ) -> int:
-        """发送消息到会话中指定角色的所有连接"""
-        conns = self.get_connections_by_conversation(conversation_id, role=role)
-        logger.info(
-            "WS 广播准备发送",
-            conversation_id=conversation_id,
-            role=role.value if isinstance(role, WSRole) else role,
-            target_count=len(conns),
-            message_type=message.get("action"),
+        *,
+        role: WSRole | None = None,
+        exclude_role: WSRole | None = None,
+        exclude_conn_id: str | None = None,
+    ) -> None:
+        await self.bus.publish(
+            conversation_id,
+            {
+                "origin": self.node_id,
+                "kind": "message",
+                "message": message,
+                "role": _role_key(role),
+                "exclude_role": _role_key(exclude_role),
+                "exclude_conn_id": exclude_conn_id,
+            },
         )
 
-        sent_count = 0
-        for conn in conns:
-            success = await conn.send(message)
-            logger.info(
-                "WS 广播发送结果",
-                conversation_id=conversation_id,
-                role=role.value if isinstance(role, WSRole) else role,
-                conn_id=conn.id,
-                success=success,
-            )
-            if success:
-                sent_count += 1
+    async def _sync_membership(self, conversation_id: str) -> None:
+        """按本地连接情况订阅/退订会话主题，并向其他节点通报本节点连接数"""
+        if (
+            self._connections_by_conversation.get(conversation_id)
+            and conversation_id not in self._remote_members
+        ):
+            self._remote_members[conversation_id] = {}
+            await self.bus.subscribe(conversation_id)
+            await self.bus.publish(conversation_id, {"origin": self.node_id, "kind": "sync"})
+
+        await self._announce(conversation_id)
+
+        # 等待期间可能有新连接加入，按最新状态判断是否退订
+        if (
+            not self._connections_by_conversation.get(conversation_id)
+            and conversation_id in self._remote_members
+        ):
+            del self._remote_members[conversation_id]
+            await self.bus.unsubscribe(conversation_id)
+
+    async def _announce(self, conversation_id: str) -> None:
+        counts: dict[str, int] = defaultdict(int)
+        for conn in self._connections_by_conversation.get(conversation_id, {}).values():
+            counts[_role_key(conn.role)] += 1
+        await self.bus.publish(
+            conversation_id, {"origin": self.node_id, "kind": "members", "counts": dict(counts)}
+        )
 
-        return sent_count
+    async def _announce_loop(self) -> None:
+        """定期重发本节点持有的各会话连接数，刷新其他节点上的过期时间"""
+        while True:
+            await asyncio.sleep(self.announce_interval)
+            for conversation_id in list(self._remote_members):
+                try:
+                    await self._announce(conversation_id)
+                except Exception as e:
+                    logger.warning("连接数通报失败", conversation_id=conversation_id, error=str(e))
+
+    async def _on_bus_message(self, conversation_id: str, envelope: dict[str, Any]) -> None:
+        """处理其他节点经总线发来的消息"""
+        origin = envelope.get("origin")
+        if origin == self.node_id:
+            return
+
+        kind = envelope.get("kind")
+        if kind == "message":
+            self._deliver_local(
+                conversation_id,
+                envelope["message"],
+                role=envelope.get("role"),
+                exclude_role=envelope.get("exclude_role"),
+                exclude_conn_id=envelope.get("exclude_conn_id"),
+            )
+        elif kind == "members":
+            members = self._remote_members.get(conversation_id)
+            if members is None:
+                return
+            counts = {role: n for role, n in envelope.get("counts", {}).items() if n > 0}
+            if counts:
+                members[origin] = (counts, time.monotonic())
+            else:
+                members.pop(origin, None)
+        elif kind == "sync":
+            await self._announce(conversation_id)
+
+    def get_remote_counts(self, conversation_id: str) -> dict[str, int]:
+        """其他节点上该会话的连接数（按角色，不含已过期的节点）"""
+        totals: dict[str, int] = defaultdict(int)
+        members = self._remote_members.get(conversation_id, {})
+        expired_before = time.monotonic() - self.announce_interval * _MEMBERS_TTL_INTERVALS
+        for origin, (counts, seen_at) in list(members.items()):
+            if seen_at < expired_before:
+                del members[origin]
+                logger.info("节点连接数已过期", conversation_id=conversation_id, node_id=origin)
+                continue
+            for role, n in counts.items():
+                totals[role] += n
+        return dict(totals)
+
+    def get_connection_counts(self, conversation_id: str) -> dict[str, int]:
+        """会话在所有节点上的连接数（按角色，含 total）
+
+        本节点未持有该会话连接时不订阅其主题，只统计本地。
+        """
+        counts: dict[str, int] = {"user": 0, "agent": 0}
+        for conn in self.get_connections_by_conversation(conversation_id):
+            counts[_role_key(conn.role)] = counts.get(_role_key(conn.role), 0) + 1
+        for role, n in self.get_remote_counts(conversation_id).items():
+            counts[role] = counts.get(role, 0) + n
+        counts["total"] = sum(counts.values())
+        return counts
 
     def get_stats(self) -> dict[str, Any]:
         """获取连接统计"""
         total = len(self._connections_by_id)
         by_role: dict[str, int] = {"user": 0, "agent": 0}
+        by_transport: dict[str, int] = {"websocket": 0, "sse": 0}
+        queued = 0
+        max_queue_depth = 0
+        dropped = 0
         for conn in self._connections_by_id.values():
             role_key = conn.role.value if isinstance(conn.role, WSRole) else str(conn.role)
             by_role[role_key] = by_role.get(role_key, 0) + 1
+            transport = conn.metadata.get("transport", "websocket")
+            by_transport[transport] = by_transport.get(transport, 0) + 1
+            queued += conn.queue_depth
+            max_queue_depth = max(max_queue_depth, conn.queue_depth)
+            dropped += conn.dropped_count
 
         return {
             "total_connections": total,
             "by_role": by_role,
+            "by_transport": by_transport,
             "active_conversations": len(self._connections_by_conversation),
+            "queued_messages": queued,
+            "max_queue_depth": max_queue_depth,
+            "dropped_messages": dropped,
         }
 
     def get_all_connections(self) -> dict[str, WSConnection]:
@@ -236,5 +518,12 @@ class ConnectionManager:
         return self._connections_by_id.copy()
 
 
+def _role_key(role: WSRole | str | None) -> str | None:
+    """角色统一为字符串（总线消息中以字符串传输）"""
+    if role is None:
+        return None
+    return role.value if isinstance(role, WSRole) else str(role)
+
+
 # 全局单例
 ws_manager = ConnectionManager()
@@ -0,0 +1,243 @@
+"""在线状态服务
+
+在线状态以内存为准，数据库只做批量持久化：
+- WebSocket 连接/断开只更新内存（按会话、角色计数，同一用户多标签页不会互相覆盖）
+- 变更合并后每 PRESENCE_FLUSH_INTERVAL 秒在一个事务内批量写入 Conversation 在线字段；
+  窗口内断开又重连（移动端网络抖动）与已持久化状态相同时不写库
+- 读取时内存中有该会话的状态则以内存为准，否则回退到数据库中的持久化值
+  （其他节点上的连接、或本进程启动前的最后在线时间）
+
+持久化后已离线的条目从内存移除，内存只保留在线会话和待写入的变更。
+
+多 worker / 多实例：每个进程只统计本地连接。本地最后一个连接断开时，
+按 ConnectionManager 的跨节点连接数判断该角色在其他节点是否仍在线，
+仍在线则不写离线（由持有连接的节点维护数据库中的在线状态）。
+"""
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+if TYPE_CHECKING:
+    from app.services.websocket.manager import ConnectionManager
+
+logger = get_logger("websocket.presence")
+
+ROLES = ("user", "agent")
+
+
+@dataclass
+class _RolePresence:
+    connections: int = 0
+    last_online_at: datetime | None = None
+    agent_id: str | None = None
+    persisted: bool | None = None  # 数据库中的在线状态（未知为 None）
+    remote_connections: int = 0  # 其他节点上的连接数（本地断开时记录）
+
+    @property
+    def online(self) -> bool:
+        return self.connections > 0
+
+
+class PresenceService:
+    """在线状态服务（全局单例见 presence_service）"""
+
+    def __init__(
+        self,
+        flush_interval: float | None = None,
+        connections: "ConnectionManager | None" = None,
+    ) -> None:
+        """
+        Args:
+            flush_interval: 合并写入的窗口（秒）
+            connections: 查询跨节点连接数的连接管理器，默认 ws_manager
+        """
+        self.flush_interval = settings.PRESENCE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._connections = connections
+        self._state: dict[tuple[str, str], _RolePresence] = {}
+        self._dirty: set[tuple[str, str]] = set()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.flushed_changes = 0
+        self.skipped_changes = 0
+
+    async def start(self) -> None:
+        """启动后台持久化任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """停止后台任务并写入剩余变更"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    # ========== 状态变更 ==========
+
+    def connected(self, conversation_id: str, role: str, agent_id: str | None = None) -> None:
+        """登记连接"""
+        entry = self._state.setdefault((conversation_id, role), _RolePresence())
+        entry.connections += 1
+        if role == "agent":
+            entry.agent_id = agent_id
+        if entry.connections == 1:
+            entry.last_online_at = datetime.now()
+            self._mark_dirty(conversation_id, role)
+
+    def disconnected(self, conversation_id: str, role: str) -> None:
+        """登记断开（该角色最后一个连接断开时才变为离线）"""
+        entry = self._state.get((conversation_id, role))
+        if entry is None or entry.connections == 0:
+            return
+        entry.connections -= 1
+        if entry.connections == 0:
+            entry.last_online_at = datetime.now()
+            # 在注销连接前调用，本节点仍订阅该会话，可读到其他节点的连接数
+            entry.remote_connections = self._remote_connections(conversation_id, role)
+            self._mark_dirty(conversation_id, role)
+
+    def _manager(self) -> "ConnectionManager":
+        if self._connections is None:
+            from app.services.websocket.manager import ws_manager
+
+            self._connections = ws_manager
+        return self._connections
+
+    def _remote_connections(self, conversation_id: str, role: str) -> int:
+        return self._manager().get_remote_counts(conversation_id).get(role, 0)
+
+    def _online_elsewhere(self, key: tuple[str, str], entry: _RolePresence) -> bool:
+        """该角色是否仍在其他节点在线
+
+        本节点仍持有该会话的连接时订阅着会话主题，读取最新的跨节点连接数；
+        否则已退订，使用本地断开时记录的值。
+        """
+        conversation_id, role = key
+        if self._manager().get_connections_by_conversation(conversation_id):
+            entry.remote_connections = self._remote_connections(conversation_id, role)
+        return entry.remote_connections > 0
+
+    def _mark_dirty(self, conversation_id: str, role: str) -> None:
+        self._dirty.add((conversation_id, role))
+        self._wakeup.set()
+
+    # ========== 读取 ==========
+
+    def is_online(self, conversation_id: str, role: str, default: bool | None = False) -> bool | None:
+        """是否在线（内存中没有该会话状态时返回 default）"""
+        entry = self._state.get((conversation_id, role))
+        return entry.online if entry is not None else default
+
+    def get_status(self, conversation_id: str, persisted: dict[str, Any] | None = None) -> dict[str, Any]:
+        """会话在线状态，结构同 ConversationRepository.get_online_status
+
+        Args:
+            conversation_id: 会话 ID
+            persisted: 数据库中的在线状态，内存中没有对应角色时使用
+        """
+        status: dict[str, Any] = {
+            "user_online": False,
+            "user_last_online_at": None,
+            "agent_online": False,
+            "agent_last_online_at": None,
+            "current_agent_id": None,
+            **(persisted or {}),
+        }
+        for role in ROLES:
+            entry = self._state.get((conversation_id, role))
+            if entry is None:
+                continue
+            status[f"{role}_online"] = entry.online
+            status[f"{role}_last_online_at"] = entry.last_online_at
+            if role == "agent":
+                status["current_agent_id"] = entry.agent_id if entry.online else None
+        return status
+
+    # ========== 持久化 ==========
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            # 等待一个窗口，合并窗口内的所有变更
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("在线状态持久化失败", error=str(e))
+
+    async def flush(self) -> int:
+        """写入待持久化的变更
+
+        Returns:
+            写入的变更数
+        """
+        self._wakeup.clear()
+        keys, self._dirty = self._dirty, set()
+        changes: list[dict[str, Any]] = []
+        for key in keys:
+            entry = self._state.get(key)
+            if entry is None:
+                continue
+            if entry.online == entry.persisted or (not entry.online and self._online_elsewhere(key, entry)):
+                self.skipped_changes += 1
+                continue
+            changes.append(
+                {
+                    "conversation_id": key[0],
+                    "role": key[1],
+                    "online": entry.online,
+                    "last_online_at": entry.last_online_at,
+                    "agent_id": entry.agent_id,
+                }
+            )
+
+        if changes:
+            try:
+                await self._persist(changes)
+            except Exception:
+                # 写入失败：放回待写集合，下个窗口重试
+                self._dirty |= keys
+                self._wakeup.set()
+                raise
+            for change in changes:
+                entry = self._state.get((change["conversation_id"], change["role"]))
+                if entry is not None:
+                    entry.persisted = change["online"]
+            self.flushed_changes += len(changes)
+            logger.debug("在线状态已持久化", changes=len(changes))
+
+        # 已离线且无待写变更的条目回退到数据库读取
+        for key in keys:
+            entry = self._state.get(key)
+            if entry is not None and not entry.online and key not in self._dirty:
+                del self._state[key]
+        return len(changes)
+
+    async def _persist(self, changes: list[dict[str, Any]]) -> None:
+        from app.core.database import get_db_context
+        from app.repositories.conversation import ConversationRepository
+
+        async with get_db_context() as db:
+            await ConversationRepository(db).apply_presence_changes(changes)
+
+    def get_stats(self) -> dict[str, int]:
+        """统计"""
+        return {
+            "online": sum(1 for entry in self._state.values() if entry.online),
+            "pending": len(self._dirty),
+            "flushed": self.flushed_changes,
+            "skipped": self.skipped_changes,
+        }
+
+
+# 全局单例
+presence_service = PresenceService()
@@ -11,6 +11,9 @@
 - 路由层通过 `db=session` 传入数据库会话
 - 工具可通过 `runtime.context.db` 获取会话（避免在工具内部创建新会话）
 - 如果 db 为 None，工具应使用数据库上下文管理器创建临时会话
+
+耗时追踪：
+- 业务层可通过 `trace=...` 传入回合级追踪对象，中间件/工具经 `runtime.context.trace` 记录 span
 """
 
 from __future__ import annotations
@@ -46,6 +49,9 @@ class ChatContext(BaseModel):
     数据库会话：
     - db: 可选的数据库会话，由路由层注入
     - 工具优先使用 context.db，若为 None 则创建临时会话
+
+    耗时追踪：
+    - trace: 可选的回合级追踪对象（类型由业务层决定），为 None 时不记录
     """
 
     conversation_id: str
@@ -53,6 +59,7 @@ class ChatContext(BaseModel):
     assistant_message_id: str
     emitter: Any = Field(exclude=True, repr=False)
     db: Any = Field(default=None, exclude=True, repr=False)
+    trace: Any = Field(default=None, exclude=True, repr=False)
     response_latency_ms: int | None = None
 
     model_config = ConfigDict(
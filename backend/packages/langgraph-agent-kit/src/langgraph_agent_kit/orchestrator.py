@@ -240,6 +240,12 @@ class Orchestrator:
         self._agent_runner = agent_runner
         self._hooks = hooks or OrchestratorHooks()
         self._event_queue_size = event_queue_size
+        self._domain_queue: asyncio.Queue[dict[str, Any]] | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        """当前领域事件队列中待消费的事件数（未运行时为 0）"""
+        return self._domain_queue.qsize() if self._domain_queue is not None else 0
 
     async def run(
         self,
@@ -250,6 +256,7 @@ class Orchestrator:
         assistant_message_id: str | None = None,
         user_message_id: str | None = None,
         db: Any = None,
+        trace: Any = None,
         **runner_kwargs: Any,
     ) -> AsyncGenerator[StreamEvent, None]:
         """运行编排流程
@@ -261,6 +268,7 @@ class Orchestrator:
             assistant_message_id: 助手消息 ID（可选，自动生成）
             user_message_id: 用户消息 ID（可选，自动生成）
             db: 数据库会话（可选，传入 ChatContext）
+            trace: 回合级追踪对象（可选，传入 ChatContext）
             **runner_kwargs: 传递给 agent_runner.run() 的额外参数
 
         Yields:
@@ -308,6 +316,7 @@ class Orchestrator:
             domain_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(
                 maxsize=self._event_queue_size
             )
+            self._domain_queue = domain_queue
             emitter = QueueDomainEmitter(queue=domain_queue, loop=loop)
 
             context = ChatContext(
@@ -316,6 +325,7 @@ class Orchestrator:
                 assistant_message_id=assistant_message_id,
                 emitter=emitter,
                 db=db,
+                trace=trace,
             )
 
             # 启动 Agent 任务
@@ -0,0 +1,88 @@
+"""日志调用开销基准
+
+1. DEBUG 关闭（LOG_LEVEL=INFO）时 logger.debug(..., payload=...) 的单次开销：
+   旧路径（先清洗全部 extra，再由 loguru 判断级别）与当前路径（先判断级别）对比
+2. INFO 日志写文件时调用方的耗时：loguru 同步文件 sink（serialize=True）与 BackgroundFileSink 对比
+
+用法: python scripts/bench_logging.py [调用次数]
+"""
+
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger as loguru_logger
+
+from app.core import logging as logging_module
+from app.core.logging import BackgroundFileSink, Logger, _safe_for_logging, lazy
+
+PAYLOAD = {
+    "messages": [{"role": "user", "content": "我想买一台适合打游戏的笔记本" * 5} for _ in range(20)],
+    "tools": [{"name": f"tool_{i}", "args": {"query": "笔记本", "limit": 10}} for i in range(10)],
+}
+
+
+def _legacy_debug(message: str, **extra) -> None:
+    """旧实现：无论级别是否启用都先清洗 extra"""
+    context = {"module": "bench"}
+    for k, v in extra.items():
+        context[str(k)] = _safe_for_logging(v)
+    loguru_logger.bind(**context).opt(depth=1).debug(message)
+
+
+def bench_debug_off(number: int) -> None:
+    log = Logger()
+    log._configured = True
+    log._level_no = logging_module._LEVEL_NO["info"]
+    bound = log.bind(conversation_id="c1")
+
+    cases = {
+        "旧路径 debug(payload=...)": lambda: _legacy_debug("llm 请求", payload=PAYLOAD),
+        "logger.debug(payload=...)": lambda: log.debug("llm 请求", module="bench", payload=PAYLOAD),
+        "bound.debug(payload=...)": lambda: bound.debug("llm 请求", payload=PAYLOAD),
+        "bound.debug(lazy(...))": lambda: bound.debug("llm 请求", payload=lazy(lambda: PAYLOAD)),
+    }
+    print(f"[bench] DEBUG 关闭，每种调用 {number} 次：")
+    for name, func in cases.items():
+        seconds = timeit.timeit(func, number=number)
+        print(f"  {name:<28} {seconds / number * 1e6:10.2f} µs/次")
+
+
+def bench_file_sink(number: int) -> None:
+    print(f"[bench] INFO 写文件，{number} 条，调用方耗时：")
+    with tempfile.TemporaryDirectory() as tmp:
+        handler_id = loguru_logger.add(Path(tmp) / "sync.log", serialize=True, enqueue=False, level="INFO")
+        start = time.perf_counter()
+        for i in range(number):
+            loguru_logger.bind(module="bench", index=i).info("写入测试")
+        elapsed = time.perf_counter() - start
+        loguru_logger.remove(handler_id)
+        print(f"  {'loguru 同步 sink':<28} {elapsed / number * 1e6:10.2f} µs/条")
+
+        sink = BackgroundFileSink(Path(tmp) / "background.log", queue_size=number)
+        handler_id = loguru_logger.add(sink, format="{message}", level="INFO")
+        start = time.perf_counter()
+        for i in range(number):
+            loguru_logger.bind(module="bench", index=i).info("写入测试")
+        elapsed = time.perf_counter() - start
+        loguru_logger.remove(handler_id)
+        print(f"  {'BackgroundFileSink':<28} {elapsed / number * 1e6:10.2f} µs/条  {sink.get_stats()}")
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    # 只保留 INFO 级别的空 sink，模拟生产环境关闭 DEBUG
+    loguru_logger.remove()
+    loguru_logger.add(lambda _: None, level="INFO")
+    bench_debug_off(number)
+    loguru_logger.remove()
+    bench_file_sink(number)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,7 @@ case "$1" in
     ;;
   agent:*)
     AGENT="${1#agent:}"
-    jq 'select(.extra.agent_id == "'"$AGENT"'")' "$LOG_FILE"
+    jq 'select(.agent_id == "'"$AGENT"'")' "$LOG_FILE"
     ;;
   "exception")
     jq 'select(has("exception"))' "$LOG_FILE"
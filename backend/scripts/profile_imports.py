@@ -0,0 +1,93 @@
+"""导入耗时报告
+
+以 python -X importtime 导入应用入口，汇总：
+1. 累计耗时最高的模块（含其导入的子模块）
+2. 自身耗时最高的模块
+3. 按顶层包汇总的自身耗时
+4. 应延迟加载的模块（爬虫引擎、Playwright、OCR 处理器、Qdrant 客户端）是否在启动时被导入
+
+用法: python scripts/profile_imports.py [模块名，默认 app.main] [--top N]
+"""
+
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# 启动时不应导入的模块（见 app.services.crawler、ocr.factory、agent.retrieval.product）
+LAZY_MODULES = (
+    "playwright",
+    "app.services.crawler.crawler_service",
+    "app.services.crawler.page_parser",
+    "app.services.ocr.rapid_ocr",
+    "app.services.ocr.mineru",
+    "app.services.ocr.paddlex",
+    "fitz",
+    "qdrant_client",
+    "langchain_qdrant",
+)
+
+
+def run_importtime(module: str) -> list[tuple[str, int, int]]:
+    """导入模块并解析 importtime 输出：[(模块名, 自身 µs, 累计 µs)]"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:], file=sys.stderr)
+        raise SystemExit(f"导入 {module} 失败")
+
+    # 同一模块可能出现多行（包在子模块导入过程中被再次引用），按模块名合并
+    merged: dict[str, tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line.removeprefix("import time:").split("|")
+        self_us, cumulative_us, name = (field.strip() for field in fields)
+        prev_self, prev_cumulative = merged.get(name, (0, 0))
+        merged[name] = (prev_self + int(self_us), max(prev_cumulative, int(cumulative_us)))
+    return [(name, self_us, cumulative_us) for name, (self_us, cumulative_us) in merged.items()]
+
+
+def report(module: str, top: int) -> None:
+    entries = run_importtime(module)
+    total_us = max(cumulative for _, _, cumulative in entries)
+    print(f"[import] {module} 导入耗时 {total_us / 1000:.0f} ms，共 {len(entries)} 个模块\n")
+
+    print(f"累计耗时 Top {top}：")
+    for name, _, cumulative in sorted(entries, key=lambda e: e[2], reverse=True)[:top]:
+        print(f"  {cumulative / 1000:9.1f} ms  {name}")
+
+    print(f"\n自身耗时 Top {top}：")
+    for name, self_us, _ in sorted(entries, key=lambda e: e[1], reverse=True)[:top]:
+        print(f"  {self_us / 1000:9.1f} ms  {name}")
+
+    by_package: dict[str, int] = defaultdict(int)
+    for name, self_us, _ in entries:
+        by_package[name.split(".")[0]] += self_us
+    print(f"\n按顶层包汇总 Top {top}：")
+    for package, self_us in sorted(by_package.items(), key=lambda e: e[1], reverse=True)[:top]:
+        print(f"  {self_us / 1000:9.1f} ms  {package}")
+
+    imported = {name for name, _, _ in entries}
+    eager = [name for name in LAZY_MODULES if name in imported]
+    print("\n延迟加载检查：", "通过" if not eager else f"以下模块在启动时被导入 {eager}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="应用导入耗时报告")
+    parser.add_argument("module", nargs="?", default="app.main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    report(args.module, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""数据库初始化测试"""
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.core.database import add_column_ddl, add_missing_columns
+from app.models.base import Base
+from app.models.conversation import Conversation
+
+
+class TestAddColumnDdl:
+    def test_postgres(self):
+        table = Conversation.__table__
+        assert add_column_ddl(table.c.unread_user_count, postgresql.dialect()) == (
+            "ALTER TABLE conversations ADD COLUMN unread_user_count INTEGER DEFAULT 0 NOT NULL"
+        )
+        assert add_column_ddl(table.c.last_user_message_at, postgresql.dialect()) == (
+            "ALTER TABLE conversations ADD COLUMN last_user_message_at TIMESTAMP WITHOUT TIME ZONE"
+        )
+
+    def test_sqlite(self):
+        ddl = add_column_ddl(Conversation.__table__.c.last_user_message_at, sqlite.dialect())
+        assert ddl == "ALTER TABLE conversations ADD COLUMN last_user_message_at DATETIME"
+
+
+@pytest.mark.anyio
+class TestAddMissingColumns:
+    async def test_adds_counter_columns_to_existing_table(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(Conversation.__table__.insert().values(id="c1", user_id="u1", title="c1"))
+            # 模拟计数列加入前创建的数据库
+            await conn.execute(text("DROP INDEX ix_conversations_last_user_message_at"))
+            await conn.execute(text("ALTER TABLE conversations DROP COLUMN last_user_message_at"))
+            await conn.execute(text("ALTER TABLE conversations DROP COLUMN unread_user_count"))
+
+            added = await conn.run_sync(add_missing_columns, Base.metadata)
+            assert added == ["conversations.unread_user_count", "conversations.last_user_message_at"]
+            assert await conn.run_sync(add_missing_columns, Base.metadata) == []
+
+            indexes = await conn.run_sync(lambda c: inspect(c).get_indexes("conversations"))
+            assert "ix_conversations_last_user_message_at" in {index["name"] for index in indexes}
+            count = await conn.scalar(text("SELECT unread_user_count FROM conversations WHERE id = 'c1'"))
+            assert count == 0
+        await engine.dispose()
@@ -0,0 +1,125 @@
+"""日志模块测试"""
+
+import gzip
+import json
+
+import pytest
+from loguru import logger as loguru_logger
+
+from app.core import logging as logging_module
+from app.core.logging import BackgroundFileSink, Logger, _parse_duration, _parse_size, lazy
+
+
+@pytest.fixture
+def info_logger(monkeypatch):
+    """级别为 INFO 的 Logger，记录交给 loguru 的 extra"""
+    log = Logger()
+    log._configured = True
+    log._level_no = logging_module._LEVEL_NO["info"]
+
+    sanitized: list = []
+    original = logging_module._safe_for_logging
+
+    def tracking(value, **kwargs):
+        sanitized.append(value)
+        return original(value, **kwargs)
+
+    monkeypatch.setattr(logging_module, "_safe_for_logging", tracking)
+    return log, sanitized
+
+
+def _add_sink(sink: BackgroundFileSink) -> int:
+    return loguru_logger.add(sink, format="{message}", level="DEBUG")
+
+
+class TestLevelGating:
+    def test_disabled_level_skips_extra_processing(self, info_logger):
+        log, sanitized = info_logger
+        calls = []
+
+        log.debug("调试", payload={"big": "x" * 1000}, state=lazy(lambda: calls.append(1)))
+
+        assert sanitized == []
+        assert calls == []
+
+    def test_bound_logger_checks_level_before_merging(self, info_logger):
+        log, sanitized = info_logger
+        bound = log.bind(conversation_id="c1")
+
+        bound.debug("调试", payload={"k": "v"})
+        bound.verbose("工具执行", payload={"k": "v"})
+
+        assert sanitized == []
+
+    def test_lazy_value_is_evaluated_when_enabled(self, info_logger):
+        log, sanitized = info_logger
+
+        log.info("状态", state=lazy(lambda: {"count": 3}))
+
+        assert {"count": 3} in sanitized
+
+    def test_is_enabled_for(self, info_logger):
+        log, _ = info_logger
+        assert log.is_enabled_for("warning")
+        assert log.is_enabled_for("INFO")
+        assert not log.is_enabled_for("debug")
+
+
+class TestBackgroundFileSink:
+    def test_writes_json_lines(self, tmp_path):
+        sink = BackgroundFileSink(tmp_path / "app.log")
+        handler_id = _add_sink(sink)
+        loguru_logger.bind(module="test", user_id="u1").info("你好")
+        loguru_logger.remove(handler_id)  # remove 时写完队列并停止写线程
+
+        entry = json.loads((tmp_path / "app.log").read_text(encoding="utf-8"))
+        assert entry["message"] == "你好"
+        assert entry["module"] == "test"
+        assert entry["user_id"] == "u1"
+        assert sink.get_stats()["written"] == 1
+
+    def test_full_queue_drops_and_reports(self, tmp_path):
+        sink = BackgroundFileSink(tmp_path / "app.log", queue_size=1)
+        sink.stop()  # 停掉写线程，让队列保持满
+        sink._queue.put_nowait({"level": None})
+
+        class Message(str):
+            record: dict = {}
+
+        sink.write(Message("x"))
+        sink.write(Message("y"))
+        assert sink.dropped == 2
+
+        sink._write('{"message": "next"}\n')
+        sink._file.close()
+        lines = (tmp_path / "app.log").read_text(encoding="utf-8").splitlines()
+        assert "丢弃 2 条" in json.loads(lines[0])["message"]
+        assert json.loads(lines[1])["message"] == "next"
+
+    def test_rotation_compresses_old_file(self, tmp_path):
+        sink = BackgroundFileSink(tmp_path / "app.log", rotation="1 KB")
+        handler_id = _add_sink(sink)
+        for i in range(20):
+            loguru_logger.bind(module="test").info("x" * 100 + str(i))
+        loguru_logger.remove(handler_id)
+
+        archives = sorted(tmp_path.glob("app.*.log.gz"))
+        assert archives
+        with gzip.open(archives[0], "rt", encoding="utf-8") as f:
+            assert json.loads(f.readline())["message"].endswith("0")
+
+
+class TestParseHelpers:
+    def test_parse_size(self):
+        assert _parse_size("10 MB") == 10 * 1024 * 1024
+        assert _parse_size("512kb") == 512 * 1024
+
+    def test_parse_duration(self):
+        assert _parse_duration("7 days") == 7 * 86400
+        assert _parse_duration("1 hour") == 3600
+
+    def test_invalid_values(self):
+        with pytest.raises(ValueError):
+            _parse_size("big")
+        with pytest.raises(ValueError):
+            _parse_duration("forever")
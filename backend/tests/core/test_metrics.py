@@ -0,0 +1,106 @@
+"""运行时指标测试"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.metrics import MetricsRegistry, QueueDepthTracker
+
+
+def _lines(registry: MetricsRegistry) -> list[str]:
+    return registry.render().splitlines()
+
+
+class TestMetricsRegistry:
+    def test_counter_with_labels(self):
+        registry = MetricsRegistry()
+        events = registry.counter("events_total", "事件数", ["type"])
+        events.labels("text").inc()
+        events.labels("text").inc(2)
+        events.labels("done").inc()
+
+        lines = _lines(registry)
+        assert lines[:2] == ["# HELP events_total 事件数", "# TYPE events_total counter"]
+        assert 'events_total{type="text"} 3' in lines
+        assert 'events_total{type="done"} 1' in lines
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("latency_seconds", "耗时", buckets=(0.1, 1.0))
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+
+        lines = _lines(registry)
+        assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{le="1"} 2' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+        assert "latency_seconds_sum 5.55" in lines
+        assert "latency_seconds_count 3" in lines
+
+    def test_histogram_time_records_on_error(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("tool_seconds", "耗时", ["tool"])
+        with pytest.raises(RuntimeError):
+            with latency.labels("search").time():
+                raise RuntimeError("boom")
+
+        assert latency.labels("search").count == 1
+
+    def test_wrong_label_count(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("dep_seconds", "耗时", ["dependency", "operation"])
+        with pytest.raises(ValueError):
+            latency.labels("qdrant")
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter("c_total", "c", ["model"]).labels('a"b').inc()
+        assert 'c_total{model="a\\"b"} 1' in _lines(registry)
+
+    def test_collector_runs_at_scrape_time(self):
+        registry = MetricsRegistry()
+        state = {"depth": 1}
+
+        def collect():
+            return [("queue_depth", "gauge", "队列深度", [("", {}, state["depth"])])]
+
+        registry.register_collector(collect)
+        registry.register_collector(collect)
+        state["depth"] = 7
+
+        lines = _lines(registry)
+        assert lines.count("queue_depth 7") == 1
+
+
+class TestQueueDepthTracker:
+    def test_snapshot_and_weak_references(self):
+        class Owner:
+            def __init__(self, depth):
+                self.queue_depth = depth
+
+        tracker = QueueDepthTracker()
+        a, b = Owner(2), Owner(5)
+        tracker.track(a)
+        tracker.track(b)
+        assert tracker.snapshot() == (2, 7, 5)
+
+        del b
+        assert tracker.snapshot() == (1, 2, 2)
+
+
+class TestMetricsEndpoint:
+    def test_exposes_prometheus_text(self):
+        from app.routers import metrics
+
+        app = FastAPI()
+        app.include_router(metrics.router)
+        response = TestClient(app).get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert "# TYPE llm_ttft_seconds histogram" in body
+        assert "chat_stream_subscribers 0" in body
+        assert 'ws_connections{role="user"} 0' in body
+        assert 'agent_cache_events_total{event="hits"}' in body
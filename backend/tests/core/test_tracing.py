@@ -0,0 +1,178 @@
+"""回合耗时追踪测试"""
+
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from app.core.tracing import FileSpanExporter, TurnTrace, current_trace, trace_span
+
+
+def _names(trace: TurnTrace) -> dict[str, str | None]:
+    """span 名称 -> 父 span 名称"""
+    by_id = {span.span_id: span.name for span in trace.spans}
+    return {span.name: by_id.get(span.parent_id) for span in trace.spans}
+
+
+@pytest.mark.anyio
+class TestTurnTrace:
+    async def test_spans_nest_through_contextvar(self):
+        async def run_turn(trace: TurnTrace) -> None:
+            trace.activate()
+            with trace.span("agent.run"):
+                with trace_span("memory.context"):
+                    with trace_span("memory.facts"):
+                        pass
+                with trace_span("tool.search_products"):
+                    with trace_span("retrieval.rerank"):
+                        pass
+
+        trace = TurnTrace("c1")
+        await asyncio.create_task(run_turn(trace))
+
+        assert _names(trace) == {
+            "chat.turn": None,
+            "agent.run": "chat.turn",
+            "memory.context": "agent.run",
+            "memory.facts": "memory.context",
+            "tool.search_products": "agent.run",
+            "retrieval.rerank": "tool.search_products",
+        }
+
+    async def test_concurrent_tools_keep_their_own_parent(self):
+        trace = TurnTrace("c1")
+
+        async def tool(name: str) -> None:
+            with trace.span(f"tool.{name}"):
+                await asyncio.sleep(0.01)
+                with trace_span("retrieval.vector_search", tool=name):
+                    await asyncio.sleep(0.01)
+
+        async def run_turn() -> None:
+            trace.activate()
+            await asyncio.gather(tool("a"), tool("b"))
+
+        await asyncio.create_task(run_turn())
+
+        by_id = {span.span_id: span for span in trace.spans}
+        searches = [span for span in trace.spans if span.name == "retrieval.vector_search"]
+        assert {by_id[s.parent_id].name for s in searches} == {"tool.a", "tool.b"}
+        for search in searches:
+            assert by_id[search.parent_id].name == f"tool.{search.attributes['tool']}"
+
+    async def test_llm_call_records_ttft_and_rate(self):
+        trace = TurnTrace("c1")
+        with trace.llm_call(model="m1") as span:
+            await asyncio.sleep(0.02)
+            trace.mark_first_token()
+            await asyncio.sleep(0.02)
+            trace.mark_first_token()  # 只记录第一个 token
+            span.set(output_tokens=40)
+
+        assert span.attributes["ttft_ms"] >= 15
+        assert span.attributes["ttft_ms"] < span.elapsed_ms
+        assert span.attributes["tokens_per_s"] > 0
+
+    async def test_overlapping_llm_calls_record_own_ttft(self):
+        trace = TurnTrace("c1")
+        first_started, second_done = asyncio.Event(), asyncio.Event()
+
+        async def first_call():
+            with trace.llm_call(stream_key="tools:a|model:1") as span:
+                first_started.set()
+                await second_done.wait()
+                await asyncio.sleep(0.03)
+                trace.mark_first_token("tools:a|model:1")
+            return span
+
+        async def second_call():
+            await first_started.wait()
+            with trace.llm_call(stream_key="tools:b|model:2") as span:
+                trace.mark_first_token("tools:b|model:2")
+            second_done.set()
+            return span
+
+        first, second = await asyncio.gather(first_call(), second_call())
+
+        assert second.attributes["ttft_ms"] < 10
+        assert first.attributes["ttft_ms"] >= 25
+        assert trace._llm_spans == {}
+
+    async def test_ambiguous_token_not_recorded(self):
+        trace = TurnTrace("c1")
+        with trace.llm_call(stream_key="a") as first, trace.llm_call(stream_key="b") as second:
+            trace.mark_first_token("unknown")
+
+        assert "ttft_ms" not in first.attributes
+        assert "ttft_ms" not in second.attributes
+
+    async def test_error_is_recorded(self):
+        trace = TurnTrace("c1")
+        with pytest.raises(ValueError):
+            with trace.span("tool.broken"):
+                raise ValueError("boom")
+
+        assert trace.summary()["spans"][1]["error"] == "ValueError"
+
+    def test_summary_depth_and_attributes(self):
+        trace = TurnTrace("c1", "m1")
+        with trace.span("agent.run"):
+            with trace.span("tool.search", tool_call_id="t1"):
+                pass
+        trace.root.end()
+
+        summary = trace.summary()
+        assert [(s["name"], s["depth"]) for s in summary["spans"]] == [
+            ("chat.turn", 0),
+            ("agent.run", 1),
+            ("tool.search", 2),
+        ]
+        assert summary["spans"][2]["tool_call_id"] == "t1"
+        assert summary["total_ms"] >= summary["spans"][1]["duration_ms"]
+
+    def test_trace_span_without_active_trace(self):
+        assert current_trace() is None
+        with trace_span("retrieval.rerank") as span:
+            assert span is None
+
+
+class TestFileSpanExporter:
+    def test_writes_otlp_json(self, tmp_path):
+        trace = TurnTrace("c1", "m1")
+        with trace.span("db.save_user_message"):
+            pass
+        trace.root.end()
+
+        exporter = FileSpanExporter(tmp_path / "traces.jsonl")
+        exporter.export(trace)
+        exporter.export(trace)
+        exporter.stop()  # 写完队列后停止写线程
+
+        lines = (tmp_path / "traces.jsonl").read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 2
+        spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        root, child = spans
+        assert root["traceId"] == child["traceId"] == trace.trace_id
+        assert child["parentSpanId"] == root["spanId"]
+        assert "parentSpanId" not in root
+        assert {"key": "conversation_id", "value": {"stringValue": "c1"}} in root["attributes"]
+        assert int(child["endTimeUnixNano"]) >= int(child["startTimeUnixNano"])
+
+    def test_rotates_and_compresses(self, tmp_path):
+        trace = TurnTrace("c1", "m1")
+        trace.root.end()
+
+        exporter = FileSpanExporter(tmp_path / "traces.jsonl", rotation="1 KB")
+        for _ in range(20):
+            exporter.export(trace)
+        exporter.stop()
+
+        archives = sorted(tmp_path.glob("traces.*.jsonl.gz"))
+        assert archives
+        current = tmp_path / "traces.jsonl"
+        lines = current.read_text(encoding="utf-8").splitlines() if current.exists() else []
+        for archive in archives:
+            with gzip.open(archive, "rt", encoding="utf-8") as f:
+                lines += f.read().splitlines()
+        assert len(lines) == 20
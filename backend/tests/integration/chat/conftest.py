@@ -101,7 +101,7 @@ async def ensure_db_initialized():
 
     # 每次测试前都重置 checkpointer（避免事件循环绑定问题）
     agent_service._checkpointer = None
-    agent_service._agents = {}  # 清除缓存的 agent 实例
+    agent_service.invalidate_all()  # 清除缓存的 agent 实例
     
     # 重置 checkpointer 单例（完全重置，避免事件循环绑定问题）
     try:
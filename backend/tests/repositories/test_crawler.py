@@ -0,0 +1,25 @@
+"""爬虫 Repository 测试"""
+
+import pytest
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models.crawler import CrawlPageBlob
+from app.repositories.crawler import _blob_insert
+
+
+def _blob() -> CrawlPageBlob:
+    return CrawlPageBlob(
+        site_id="s1", content_hash="h" * 64, codec="zstd", dict_id=None, data=b"abc", raw_size=10
+    )
+
+
+class TestBlobInsert:
+    @pytest.mark.parametrize(
+        ("dialect_name", "dialect"),
+        [("postgresql", postgresql.dialect()), ("sqlite", sqlite.dialect())],
+    )
+    def test_compiles_on_conflict_do_nothing(self, dialect_name, dialect):
+        sql = str(_blob_insert(_blob(), dialect_name).compile(dialect=dialect))
+
+        assert sql.startswith("INSERT INTO crawl_page_blobs")
+        assert "ON CONFLICT (site_id, content_hash) DO NOTHING" in sql
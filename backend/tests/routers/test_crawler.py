@@ -0,0 +1,50 @@
+"""爬虫路由测试"""
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.crawler import (
+    CrawlerBase,
+    CrawlHtmlDictionary,
+    CrawlPage,
+    CrawlPageBlob,
+    CrawlSite,
+)
+from app.routers.crawler import delete_site
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _enable_foreign_keys(dbapi_conn, connection_record):
+        dbapi_conn.execute("PRAGMA foreign_keys=ON")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(CrawlerBase.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.anyio
+class TestDeleteSite:
+    async def test_removes_page_content_and_dictionaries(self, session):
+        session.add(CrawlSite(id="s1", name="示例", start_url="https://a.test/", domain="a.test"))
+        await session.flush()
+        dictionary = CrawlHtmlDictionary(site_id="s1", data=b"dict", sample_count=1)
+        session.add(dictionary)
+        await session.flush()
+        session.add(
+            CrawlPageBlob(site_id="s1", content_hash="h1", codec="zstd", dict_id=dictionary.id, data=b"x")
+        )
+        session.add(CrawlPage(site_id="s1", url="https://a.test/", url_hash="u1", blob_hash="h1"))
+        await session.flush()
+
+        await delete_site("s1", session)
+
+        for model in (CrawlSite, CrawlPage, CrawlPageBlob, CrawlHtmlDictionary):
+            count = await session.scalar(select(func.count()).select_from(model))
+            assert count == 0, model.__tablename__
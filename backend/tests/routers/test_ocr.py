@@ -0,0 +1,101 @@
+"""OCR Router 测试"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import ocr
+from app.services.ocr.cache import OcrResultCache
+from app.services.ocr.factory import OcrProcessorFactory
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def fake_aprocess_file(processor_type, file_path, params=None, on_progress=None):
+        def work():
+            pages = ["第一页", "第二页", "第三页"]
+            for page, text in enumerate(pages, start=1):
+                if on_progress is not None:
+                    on_progress(page, len(pages), text)
+            return "\n\n".join(pages)
+
+        # 与真实处理器一致：回调在工作线程中执行
+        return await asyncio.to_thread(work)
+
+    monkeypatch.setattr(ocr.settings, "OCR_ENABLED", True)
+    monkeypatch.setattr(ocr, "ocr_result_cache", OcrResultCache(max_bytes=1024 * 1024))
+    monkeypatch.setattr(OcrProcessorFactory, "aprocess_file", staticmethod(fake_aprocess_file))
+    app = FastAPI()
+    app.include_router(ocr.router)
+    return TestClient(app)
+
+
+def _sse_events(body: str) -> list[dict]:
+    return [
+        json.loads(line.removeprefix("data:").strip())
+        for line in body.splitlines()
+        if line.startswith("data:")
+    ]
+
+
+class TestProcessEndpoint:
+    def test_returns_json_by_default(self, client):
+        response = client.post(
+            "/api/v1/admin/ocr/process",
+            params={"processor_type": "rapid_ocr"},
+            files={"file": ("catalog.pdf", b"%PDF-1.4", "application/pdf")},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["text"] == "第一页\n\n第二页\n\n第三页"
+
+    def test_streams_page_progress_then_result(self, client):
+        response = client.post(
+            "/api/v1/admin/ocr/process",
+            params={"processor_type": "rapid_ocr", "stream": True},
+            files={"file": ("catalog.pdf", b"%PDF-1.4", "application/pdf")},
+        )
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _sse_events(response.text)
+        progress = [e["payload"] for e in events if e["type"] == "ocr.progress"]
+        assert [(p["page"], p["total_pages"]) for p in progress] == [(1, 3), (2, 3), (3, 3)]
+        assert events[-1]["type"] == "ocr.result"
+        assert events[-1]["payload"]["success"] is True
+        assert events[-1]["payload"]["file_name"] == "catalog.pdf"
+
+    def test_identical_upload_hits_cache(self, client, monkeypatch):
+        calls = []
+        process = OcrProcessorFactory.aprocess_file
+
+        async def counting(*args, **kwargs):
+            calls.append(args)
+            return await process(*args, **kwargs)
+
+        monkeypatch.setattr(OcrProcessorFactory, "aprocess_file", staticmethod(counting))
+
+        def post(content: bytes, name: str = "catalog.pdf", **params):
+            return client.post(
+                "/api/v1/admin/ocr/process",
+                params={"processor_type": "rapid_ocr", **params},
+                files={"file": (name, content, "application/pdf")},
+            )
+
+        first = post(b"%PDF-1.4 cached").json()
+        second = post(b"%PDF-1.4 cached", name="renamed.pdf").json()
+        streamed = _sse_events(post(b"%PDF-1.4 cached", stream=True).text)
+        post(b"%PDF-1.4 other")
+
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["text"] == first["text"]
+        assert second["file_name"] == "renamed.pdf"
+        # 命中缓存时没有逐页进度，直接推送结果
+        assert [e["type"] for e in streamed] == ["ocr.result"]
+        assert streamed[0]["payload"]["cached"] is True
+        assert len(calls) == 2
@@ -0,0 +1,51 @@
+"""实时推送路由测试"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from app.routers import ws as ws_module
+from app.schemas.websocket import WSRole
+from app.services.websocket.manager import ConnectionManager
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = ConnectionManager()
+
+    async def authenticate(token, conversation_id):
+        return True, "u1", None
+
+    async def pending(conversation_id, role, after_seq=None):
+        return []
+
+    @asynccontextmanager
+    async def services():
+        yield SimpleNamespace(event_log=SimpleNamespace(pending=pending))
+
+    monkeypatch.setattr(ws_module, "ws_manager", manager)
+    monkeypatch.setattr(ws_module, "_authenticate_user", authenticate)
+    monkeypatch.setattr(ws_module, "get_services", services)
+    return manager
+
+
+@pytest.mark.anyio
+class TestSSEEvents:
+    async def test_connection_registered_only_while_streaming(self, manager):
+        response = await ws_module.sse_events_endpoint(WSRole.USER, "c1", token="t", last_event_id=None)
+
+        # 响应体未开始（客户端在首字节前断开）时不注册连接
+        assert manager.get_stats()["total_connections"] == 0
+
+        body = response.body_iterator
+        first = asyncio.create_task(anext(body))
+        await asyncio.sleep(0.01)
+        assert manager.get_stats()["by_transport"]["sse"] == 1
+
+        await manager.send_to_role("c1", WSRole.USER, {"action": "server.typing", "payload": {}})
+        assert "server.typing" in await asyncio.wait_for(first, timeout=1)
+
+        await body.aclose()
+        assert manager.get_stats()["total_connections"] == 0
@@ -0,0 +1,233 @@
+"""AgentService 测试
+
+- chat_emit 从流中直接获取 todos，不再在结束时回读 checkpoint
+- Agent 缓存：单飞构建、LRU 淘汰、版本变化后台重建
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from app.schemas.events import StreamEventType
+from app.services.agent.core.service import AgentService
+
+
+class FakeEmitter:
+    """记录所有事件的 emitter"""
+
+    def __init__(self) -> None:
+        self.events: list[tuple[str, Any]] = []
+
+    async def aemit(self, type: str, payload: Any) -> None:
+        self.events.append((type, payload))
+
+
+class FakeContext:
+    def __init__(self) -> None:
+        self.emitter = FakeEmitter()
+
+
+class FakeAgent:
+    """按 (mode, data) 元组产出预定义流的 Agent"""
+
+    def __init__(self, items: list[tuple[str, Any]]) -> None:
+        self._items = items
+        self.stream_mode: Any = None
+
+    async def astream(self, agent_input, *, config, context, stream_mode):
+        self.stream_mode = stream_mode
+        for item in self._items:
+            yield item
+
+    async def aget_state(self, config):
+        raise AssertionError("chat_emit 不应再回读最终 state")
+
+
+async def _run_chat_emit(agent: FakeAgent) -> FakeEmitter:
+    service = AgentService()
+    context = FakeContext()
+
+    async def _get_agent(agent_id=None):
+        return agent
+
+    with (
+        patch.object(service, "get_agent", _get_agent),
+        patch("app.services.agent.core.service.get_chat_model", return_value=None),
+    ):
+        await service.chat_emit(
+            message="你好",
+            conversation_id="conv-1",
+            user_id="user-1",
+            context=context,
+        )
+    return context.emitter
+
+
+@pytest.mark.anyio
+class TestChatEmitTodos:
+    """测试 todos 从 values 流中获取"""
+
+    async def test_todos_taken_from_last_values(self):
+        todos_v1 = [{"content": "步骤1", "status": "in_progress"}]
+        todos_v2 = [{"content": "步骤1", "status": "completed"}]
+        agent = FakeAgent(
+            [
+                ("values", {"messages": [], "todos": todos_v1}),
+                ("messages", (AIMessageChunk(content="好"), {})),
+                ("values", {"messages": [], "todos": todos_v2}),
+            ]
+        )
+
+        emitter = await _run_chat_emit(agent)
+
+        assert agent.stream_mode == ["messages", "values"]
+        todo_events = [p for t, p in emitter.events if t == StreamEventType.ASSISTANT_TODOS.value]
+        assert todo_events == [{"todos": todos_v2}]
+        assert emitter.events[-1] == ("__end__", None)
+
+    async def test_no_todos_event_without_todos(self):
+        agent = FakeAgent(
+            [
+                ("values", {"messages": []}),
+                ("messages", (AIMessageChunk(content="好"), {})),
+            ]
+        )
+
+        emitter = await _run_chat_emit(agent)
+
+        types = [t for t, _ in emitter.events]
+        assert StreamEventType.ASSISTANT_TODOS.value not in types
+        assert StreamEventType.ERROR.value not in types
+
+
+class FakeBuilder:
+    """记录构建次数的 build_agent 替身，可通过 gate 控制构建完成时机"""
+
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def __call__(self, *, config, checkpointer, use_structured_output, session):
+        self.calls.append(config.agent_id)
+        await self.gate.wait()
+        return SimpleNamespace(agent_id=config.agent_id, version=config.config_version)
+
+
+@asynccontextmanager
+async def _fake_db_context():
+    yield None
+
+
+@pytest.fixture
+def cache_env(monkeypatch):
+    """全新的 AgentService 实例 + 可控的配置版本与构建器"""
+    monkeypatch.setattr(AgentService, "_instance", None)
+    service = AgentService()
+    builder = FakeBuilder()
+    versions: dict[str, str] = {}
+
+    async def _get_agent_config(agent_id=None):
+        return SimpleNamespace(agent_id=agent_id, type="product", config_version=versions.get(agent_id, "v1"))
+
+    async def _get_config_version(agent_id):
+        return versions.get(agent_id, "v1")
+
+    async def _get_checkpointer():
+        return None
+
+    monkeypatch.setattr(service, "get_agent_config", _get_agent_config)
+    monkeypatch.setattr(service, "_get_config_version", _get_config_version)
+    monkeypatch.setattr(service, "_get_checkpointer", _get_checkpointer)
+    monkeypatch.setattr("app.services.agent.core.service.build_agent", builder)
+    monkeypatch.setattr("app.services.agent.core.service.get_db_context", _fake_db_context)
+    return SimpleNamespace(service=service, builder=builder, versions=versions)
+
+
+@pytest.mark.anyio
+class TestAgentCache:
+    """测试 Agent 实例缓存"""
+
+    async def test_concurrent_misses_build_once(self, cache_env):
+        service, builder = cache_env.service, cache_env.builder
+        builder.gate.clear()
+
+        tasks = [asyncio.create_task(service.get_agent("a1")) for _ in range(10)]
+        await asyncio.sleep(0)
+        builder.gate.set()
+        agents = await asyncio.gather(*tasks)
+
+        assert builder.calls == ["a1"]
+        assert all(agent is agents[0] for agent in agents)
+        stats = service.get_cache_stats()
+        assert stats["builds"] == 1
+        assert stats["coalesced"] == 9
+        assert stats["building"] == 0
+
+    async def test_cancelled_caller_does_not_abort_shared_build(self, cache_env):
+        service, builder = cache_env.service, cache_env.builder
+        builder.gate.clear()
+
+        first = asyncio.create_task(service.get_agent("a1"))
+        second = asyncio.create_task(service.get_agent("a1"))
+        await asyncio.sleep(0)
+        first.cancel()
+        builder.gate.set()
+
+        agent = await second
+        assert agent.agent_id == "a1"
+        assert await service.get_agent("a1") is agent
+        assert builder.calls == ["a1"]
+
+    async def test_lru_eviction(self, cache_env, monkeypatch):
+        service = cache_env.service
+        monkeypatch.setattr("app.services.agent.core.service.settings.AGENT_CACHE_MAX_SIZE", 2)
+
+        await service.get_agent("a1")
+        await service.get_agent("a2")
+        await service.get_agent("a1")  # a1 变为最近使用
+        await service.get_agent("a3")  # 淘汰 a2
+
+        assert list(service._agents) == ["a1", "a3"]
+        assert service.get_cache_stats()["evictions"] == 1
+
+    async def test_version_change_rebuilds_in_background(self, cache_env, monkeypatch):
+        service, builder, versions = cache_env.service, cache_env.builder, cache_env.versions
+        monkeypatch.setattr("app.services.agent.core.service.settings.AGENT_CACHE_TTL_SECONDS", 0.01)
+
+        old_agent = await service.get_agent("a1")
+        versions["a1"] = "v2"
+        await asyncio.sleep(0.02)
+
+        # TTL 过期后命中：立即返回旧实例，后台重建
+        builder.gate.clear()
+        assert await service.get_agent("a1") is old_agent
+        await asyncio.sleep(0)
+        assert await service.get_agent("a1") is old_agent
+
+        builder.gate.set()
+        await asyncio.gather(*service._refreshing)
+
+        new_agent = await service.get_agent("a1")
+        assert new_agent is not old_agent
+        assert new_agent.version == "v2"
+        assert service.get_cache_stats()["rebuilds"] == 1
+
+    async def test_invalidate_during_build_does_not_cache_stale_agent(self, cache_env):
+        service, builder = cache_env.service, cache_env.builder
+        builder.gate.clear()
+
+        task = asyncio.create_task(service.get_agent("a1"))
+        await asyncio.sleep(0)
+        service.invalidate_agent("a1")
+        builder.gate.set()
+        await task
+
+        assert "a1" not in service._agents
@@ -0,0 +1 @@
+"""爬虫服务模块测试"""
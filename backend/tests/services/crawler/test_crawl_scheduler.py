@@ -0,0 +1,176 @@
+"""多站点爬取调度测试"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.crawler.crawl_scheduler import CrawlCoordinator, FairLimiter, SharedBrowsers
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+async def _hold(limiter: FairLimiter, site_id: str, order: list[str], release: asyncio.Event):
+    async with limiter.acquire(site_id):
+        order.append(site_id)
+        await release.wait()
+
+
+@pytest.mark.anyio
+class TestFairLimiter:
+    async def test_freed_slot_goes_to_site_with_smallest_share(self):
+        limiter = FairLimiter("pages", 2)
+        order: list[str] = []
+        release = asyncio.Event()
+
+        # a 先占满名额并继续排队，b 随后到达
+        tasks = [asyncio.create_task(_hold(limiter, "a", order, release)) for _ in range(4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(_hold(limiter, "b", order, release)))
+        await asyncio.sleep(0)
+        assert order == ["a", "a"]
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        # 第一个释放的名额分给尚未占用的 b，而不是排在前面的 a
+        assert order[2] == "b"
+        assert limiter.get_stats()["in_use"] == 0
+
+    async def test_weight_gives_overdue_site_larger_share(self):
+        limiter = FairLimiter("pages", 3)
+        limiter.set_weight("overdue", 2.0)
+        holders: list[asyncio.Task] = []
+        order: list[str] = []
+        release = asyncio.Event()
+
+        # x 先占满名额；normal 先于 overdue 排队
+        blocker = asyncio.Event()
+        gates = [asyncio.create_task(_hold(limiter, "x", [], blocker)) for _ in range(3)]
+        await asyncio.sleep(0)
+        for _ in range(3):
+            holders.append(asyncio.create_task(_hold(limiter, "normal", order, release)))
+            holders.append(asyncio.create_task(_hold(limiter, "overdue", order, release)))
+        await asyncio.sleep(0)
+
+        blocker.set()
+        await asyncio.gather(*gates)
+        await asyncio.sleep(0)
+
+        # 3 个名额按 1:2 分配
+        assert sorted(order) == ["normal", "overdue", "overdue"]
+        release.set()
+        await asyncio.gather(*holders)
+
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        limiter = FairLimiter("llm", 1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(limiter, "a", [], release))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_hold(limiter, "b", [], release))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        release.set()
+        await asyncio.gather(holder, waiter, return_exceptions=True)
+
+        assert limiter.get_stats() == {"capacity": 1, "in_use": 0, "waiting": 0, "by_site": {}}
+
+    async def test_unlimited_when_capacity_zero(self):
+        limiter = FairLimiter("pages", 0)
+        async with limiter.acquire("a"), limiter.acquire("a"):
+            assert limiter.get_stats()["in_use"] == 0
+
+
+@pytest.mark.anyio
+class TestSharedBrowsers:
+    async def test_sites_share_browsers_up_to_limit(self, monkeypatch):
+        launched: list[FakeBrowser] = []
+
+        async def launch(self):
+            launched.append(FakeBrowser())
+            return launched[-1]
+
+        monkeypatch.setattr(SharedBrowsers, "_launch", launch)
+        browsers = SharedBrowsers(max_browsers=2)
+
+        a = await browsers.acquire("a")
+        b = await browsers.acquire("b")
+        c = await browsers.acquire("c")
+        assert a is not b
+        assert c in (a, b)
+        assert await browsers.acquire("a") is a
+        assert len(launched) == 2
+
+        shared = c
+        await browsers.release("c")
+        assert not shared.closed  # 仍有站点使用
+        await browsers.release("a")
+        await browsers.release("b")
+        assert all(browser.closed for browser in launched)
+        assert browsers.browser_count == 0
+
+
+@pytest.mark.anyio
+class TestCrawlCoordinator:
+    async def test_runs_sites_in_parallel_and_prioritises_overdue(self):
+        coordinator = CrawlCoordinator(max_sites=2, max_pages=4, max_llm_calls=2)
+        now = datetime.now()
+        started: list[str] = []
+        release = asyncio.Event()
+
+        def crawl(site_id: str):
+            async def run():
+                started.append(site_id)
+                await release.wait()
+
+            return run
+
+        coordinator.submit("first", None, crawl("first"))
+        coordinator.submit("second", None, crawl("second"))
+        coordinator.submit("scheduled", now + timedelta(hours=1), crawl("scheduled"))
+        coordinator.submit("late", now - timedelta(minutes=5), crawl("late"))
+        coordinator.submit("later", now - timedelta(hours=1), crawl("later"))
+        await asyncio.sleep(0)
+
+        assert started == ["first", "second"]
+        assert coordinator.get_stats()["queued_sites"] == ["later", "late", "scheduled"]
+        assert coordinator.is_scheduled("late")
+        with pytest.raises(ValueError):
+            coordinator.submit("late", None, crawl("late"))
+
+        release.set()
+        await asyncio.gather(*coordinator._tasks)
+
+        assert started == ["first", "second", "later", "late", "scheduled"]
+        assert not coordinator.is_scheduled("late")
+
+    async def test_close_cancels_queued_and_running_sites(self):
+        coordinator = CrawlCoordinator(max_sites=1)
+        cancelled: list[str] = []
+
+        async def run():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append("running")
+                raise
+
+        coordinator.submit("a", None, run)
+        coordinator.submit("b", None, run)
+        await asyncio.sleep(0)
+
+        await coordinator.close()
+
+        assert cancelled == ["running"]
+        assert not coordinator.is_scheduled("a")
+        assert not coordinator.is_scheduled("b")
@@ -0,0 +1,389 @@
+"""CrawlerService 并发爬取引擎测试
+
+使用临时文件 SQLite 作为 crawler.db（与生产一致，每个会话独立连接），替换浏览器抓取与商品解析，
+验证并发 worker、页数上限、frontier 持久化与断点续爬。
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.models.crawler import (
+    CrawlerBase,
+    CrawlFrontierEntry,
+    CrawlPage,
+    CrawlPageBlob,
+    CrawlSite,
+    CrawlTask,
+    CrawlTaskStatus,
+)
+from app.repositories.crawler import CrawlFrontierRepository, CrawlPageRepository
+from app.services.crawler import crawler_service as crawler_module
+from app.services.crawler.crawler_service import CrawlerService
+from app.services.crawler.fetcher import HttpResponse
+from app.services.crawler.html_store import load_html
+
+BASE = "https://shop.example.com"
+
+# 站点链接图：path -> 出链
+LINKS = {
+    "/": ["/a", "/b", "/c"],
+    "/a": ["/a1", "/a2"],
+    "/b": ["/b1"],
+    "/c": [],
+    "/a1": [],
+    "/a2": [],
+    "/b1": ["/"],
+}
+
+
+class FakeContext:
+    async def new_page(self):
+        raise AssertionError("测试中不应打开真实页面")
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    async def new_context(self, user_agent=None):
+        return FakeContext()
+
+
+@pytest.fixture
+async def crawler_env(monkeypatch, tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'crawler.db'}",
+        poolclass=NullPool,
+        connect_args={"timeout": 30},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(CrawlerBase.metadata.create_all)
+    maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def _crawler_db():
+        async with maker() as session:
+            yield session
+            await session.commit()
+
+    async with maker() as session:
+        session.add(
+            CrawlSite(
+                id="s1",
+                name="shop",
+                start_url=f"{BASE}/",
+                domain="shop.example.com",
+                max_depth=5,
+                max_pages=100,
+                crawl_delay=0,
+            )
+        )
+        session.add(CrawlTask(id=1, site_id="s1"))
+        await session.commit()
+
+    fetched: list[str] = []
+    active = {"now": 0, "max": 0}
+
+    async def _fetch_page(self, context, url, **kwargs):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+        fetched.append(url)
+        path = url.removeprefix(BASE) or "/"
+        anchors = "".join(f'<a href="{link}">x</a>' for link in LINKS[path])
+        return f"<html><body><h1>{path}</h1>{anchors}</body></html>"
+
+    async def _parse_and_save_product(self, **kwargs):
+        return None
+
+    async def _get_browser(self):
+        return FakeBrowser()
+
+    monkeypatch.setattr(crawler_module, "get_crawler_db", _crawler_db)
+    monkeypatch.setattr(CrawlerService, "_fetch_page", _fetch_page)
+    monkeypatch.setattr(CrawlerService, "_parse_and_save_product", _parse_and_save_product)
+    monkeypatch.setattr(CrawlerService, "_get_browser", _get_browser)
+    monkeypatch.setattr(crawler_module.settings, "CRAWLER_CONCURRENCY", 3)
+    monkeypatch.setattr(crawler_module.settings, "CRAWLER_HTTP_FIRST", False)
+    monkeypatch.setattr(crawler_module.settings, "CRAWLER_SITEMAP_ENABLED", False)
+    monkeypatch.setattr(crawler_module.settings, "CRAWLER_PARSE_WORKERS", 0)
+
+    async def _run(task_id: int = 1) -> None:
+        async with maker() as session:
+            if await session.get(CrawlTask, task_id) is None:
+                session.add(CrawlTask(id=task_id, site_id="s1"))
+                await session.commit()
+            await CrawlerService(session)._execute_crawl("s1", task_id)
+            await session.commit()
+
+    yield maker, _run, fetched, active
+    await engine.dispose()
+
+
+@pytest.mark.anyio
+class TestConcurrentCrawl:
+    async def test_crawls_each_page_once_concurrently(self, crawler_env):
+        maker, run, fetched, active = crawler_env
+
+        await run()
+
+        assert sorted(fetched) == sorted(f"{BASE}{path}" for path in LINKS)
+        assert active["max"] > 1
+        async with maker() as session:
+            task = await session.get(CrawlTask, 1)
+            assert task.status == CrawlTaskStatus.COMPLETED.value
+            assert task.pages_crawled == len(LINKS)
+            # 完成后清空持久化的 frontier
+            assert (await session.execute(select(CrawlFrontierEntry))).first() is None
+
+    async def test_respects_max_pages(self, crawler_env):
+        maker, run, fetched, _ = crawler_env
+        async with maker() as session:
+            (await session.get(CrawlSite, "s1")).max_pages = 3
+            await session.commit()
+
+        await run()
+
+        assert len(fetched) == 3
+        async with maker() as session:
+            pages = (await session.execute(select(CrawlPage))).scalars().all()
+            assert len(pages) == 3
+
+    async def test_resumes_from_persisted_frontier(self, crawler_env):
+        maker, run, fetched, _ = crawler_env
+        # 模拟中断：首页及 /a 已处理，/b、/c 仍在队列
+        async with maker() as session:
+            await CrawlFrontierRepository(session).save_changes(
+                "s1",
+                1,
+                [(f"{BASE}/", 0, 0.0), (f"{BASE}/a", 1, 1.0), (f"{BASE}/b", 1, 1.0), (f"{BASE}/c", 1, 1.0)],
+                [f"{BASE}/", f"{BASE}/a"],
+            )
+            await session.commit()
+
+        await run()
+
+        assert f"{BASE}/" not in fetched
+        assert f"{BASE}/a" not in fetched
+        assert sorted(fetched) == sorted([f"{BASE}/b", f"{BASE}/c", f"{BASE}/b1"])
+
+    async def test_http_tier_records_fetch_stats(self, crawler_env, monkeypatch):
+        maker, run, fetched, _ = crawler_env
+
+        class FakeHttpFetcher:
+            """/a 子树可直接 HTTP 取回，其余返回客户端渲染外壳"""
+
+            def __init__(self, concurrency=4):
+                pass
+
+            async def fetch(self, url, etag=None, last_modified=None):
+                path = url.removeprefix(BASE) or "/"
+                if not path.startswith("/a"):
+                    return HttpResponse(200, html='<html><body><div id="root"></div></body></html>')
+                anchors = "".join(f'<a href="{link}">x</a>' for link in LINKS[path])
+                return HttpResponse(200, html=f"<html><body><p>{'商品详情' * 100}</p>{anchors}</body></html>")
+
+            async def close(self):
+                pass
+
+        monkeypatch.setattr(crawler_module.settings, "CRAWLER_HTTP_FIRST", True)
+        monkeypatch.setattr(crawler_module, "HttpFetcher", FakeHttpFetcher)
+        async with maker() as session:
+            (await session.get(CrawlSite, "s1")).is_spa = False
+            await session.commit()
+
+        await run()
+
+        # 仅无法直接取回的页面走浏览器
+        assert sorted(fetched) == sorted(f"{BASE}{p}" for p in ("/", "/b", "/c", "/b1"))
+        async with maker() as session:
+            task = await session.get(CrawlTask, 1)
+            assert task.http_fetch_count == len(LINKS)
+            assert task.browser_fetch_count == 4
+            assert task.fetch_escalations == 4
+
+
+class FakeConditionalHttp:
+    """支持条件请求的 HTTP 层：内容服务端渲染，ETag 按 changed 中的路径变化"""
+
+    requests: list[tuple[str, str | None]] = []
+    changed: set[str] = set()
+    sitemap: bytes | None = None
+
+    def __init__(self, concurrency=4):
+        pass
+
+    async def fetch(self, url, etag=None, last_modified=None):
+        path = url.removeprefix(BASE) or "/"
+        FakeConditionalHttp.requests.append((path, etag))
+        current = f'"{path}-v2"' if path in self.changed else f'"{path}-v1"'
+        if etag == current:
+            return HttpResponse(304)
+        anchors = "".join(f'<a href="{link}">x</a>' for link in LINKS[path])
+        html = f"<html><body><p>{path} {current} {'商品详情' * 100}</p>{anchors}</body></html>"
+        return HttpResponse(200, html=html, etag=current)
+
+    async def fetch_bytes(self, url):
+        if url.endswith("/sitemap.xml"):
+            return self.sitemap
+        return None
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.anyio
+class TestIncrementalRecrawl:
+    @pytest.fixture
+    def http(self, crawler_env, monkeypatch):
+        FakeConditionalHttp.requests = []
+        FakeConditionalHttp.changed = set()
+        FakeConditionalHttp.sitemap = None
+        monkeypatch.setattr(crawler_module.settings, "CRAWLER_HTTP_FIRST", True)
+        monkeypatch.setattr(crawler_module, "HttpFetcher", FakeConditionalHttp)
+        return FakeConditionalHttp
+
+    async def test_not_modified_pages_skip_parsing_but_expand_links(self, crawler_env, http, monkeypatch):
+        maker, run, fetched, _ = crawler_env
+        async with maker() as session:
+            (await session.get(CrawlSite, "s1")).is_spa = False
+            await session.commit()
+
+        await run(1)
+        assert all(etag is None for _, etag in http.requests)
+
+        http.requests = []
+        http.changed = {"/b1"}
+        parsed: list[str] = []
+
+        async def _parse_and_save_product(self, **kwargs):
+            parsed.append(kwargs["url"])
+
+        monkeypatch.setattr(CrawlerService, "_parse_and_save_product", _parse_and_save_product)
+        await run(2)
+
+        # 所有页面都发送了条件请求，链接从已存储的 HTML 继续扩展
+        assert sorted(path for path, _ in http.requests) == sorted(LINKS)
+        assert all(etag is not None for _, etag in http.requests)
+        assert parsed == [f"{BASE}/b1"]
+        assert fetched == []
+        async with maker() as session:
+            task = await session.get(CrawlTask, 2)
+            assert task.pages_crawled == len(LINKS)
+            assert task.pages_not_modified == len(LINKS) - 1
+            page = (
+                await session.execute(select(CrawlPage).where(CrawlPage.url == f"{BASE}/b1"))
+            ).scalar_one()
+            assert page.etag == '"/b1-v2"'
+            assert page.version == 2
+
+    async def test_sitemap_lastmod_skips_fetch_and_seeds_changes(self, crawler_env, http, monkeypatch):
+        maker, run, fetched, _ = crawler_env
+        monkeypatch.setattr(crawler_module.settings, "CRAWLER_SITEMAP_ENABLED", True)
+        async with maker() as session:
+            site = await session.get(CrawlSite, "s1")
+            site.is_spa = False
+            site.max_depth = 1  # 链接只扩展一层，/b1 只能经由 sitemap 发现
+            await session.commit()
+
+        await run(1)
+        assert "/b1" not in [path for path, _ in http.requests]
+
+        urls = "".join(
+            f"<url><loc>{BASE}{path}</loc><lastmod>{lastmod}</lastmod></url>"
+            for path, lastmod in (("/", "2000-01-01"), ("/a", "2000-01-01"), ("/b1", "2000-01-01"), ("/c", "2999-01-01"))
+        )
+        http.sitemap = f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'.encode()
+        http.requests = []
+        await run(2)
+
+        # 首页与 /a 按 lastmod 判定未变化不发请求；/c 已变化、/b1 为新页面
+        requested = [path for path, _ in http.requests]
+        assert "/" not in requested and "/a" not in requested
+        assert "/c" in requested and "/b1" in requested
+        assert fetched == []
+        async with maker() as session:
+            task = await session.get(CrawlTask, 2)
+            assert task.pages_not_modified >= 2
+
+
+@pytest.mark.anyio
+class TestPageStorage:
+    async def test_pages_stored_compressed_and_deduplicated(self, crawler_env, monkeypatch):
+        maker, run, _, _ = crawler_env
+
+        async def _fetch_page(self, context, url, **kwargs):
+            path = url.removeprefix(BASE) or "/"
+            if not LINKS[path]:
+                # 叶子页面内容完全相同
+                return "<html><body><h1>售罄</h1></body></html>"
+            anchors = "".join(f'<a href="{link}">x</a>' for link in LINKS[path])
+            return f"<html><body><h1>{path}</h1>{anchors}</body></html>"
+
+        monkeypatch.setattr(CrawlerService, "_fetch_page", _fetch_page)
+        await run()
+
+        leaves = [path for path, links in LINKS.items() if not links]
+        async with maker() as session:
+            pages = (await session.execute(select(CrawlPage))).scalars().all()
+            blobs = (await session.execute(select(CrawlPageBlob))).scalars().all()
+            assert len(pages) == len(LINKS)
+            assert len(blobs) == len(LINKS) - len(leaves) + 1
+            assert all(page.blob_hash for page in pages)
+            # 列表查询不加载 HTML 列
+            with pytest.raises(InvalidRequestError):
+                _ = pages[0].html_content
+
+            repo = CrawlPageRepository(session)
+            home = next(page for page in pages if page.url == f"{BASE}/")
+            assert '<a href="/a">' in await load_html(repo, home)
+
+    async def test_orphan_blobs_removed_after_content_change(self, crawler_env, monkeypatch):
+        maker, run, _, _ = crawler_env
+        await run(1)
+
+        original = CrawlerService._fetch_page
+
+        async def _fetch_page(self, context, url, **kwargs):
+            html = await original(self, context, url, **kwargs)
+            return html.replace("<h1>", "<h1>v2 ") if url.endswith("/c") else html
+
+        monkeypatch.setattr(CrawlerService, "_fetch_page", _fetch_page)
+        await run(2)
+
+        async with maker() as session:
+            blobs = (await session.execute(select(CrawlPageBlob))).scalars().all()
+            assert len(blobs) == len(LINKS)
+            page = (
+                await session.execute(select(CrawlPage).where(CrawlPage.url == f"{BASE}/c"))
+            ).scalar_one()
+            assert page.version == 2
+            assert "v2" in await load_html(CrawlPageRepository(session), page)
+
+    async def test_store_cleaned_fragment_only(self, crawler_env, monkeypatch):
+        maker, run, _, _ = crawler_env
+        monkeypatch.setattr(crawler_module.settings, "CRAWLER_HTML_STORE_CLEANED", True)
+
+        original = CrawlerService._fetch_page
+
+        async def _fetch_page(self, context, url, **kwargs):
+            html = await original(self, context, url, **kwargs)
+            return html.replace("<body>", "<body><script>track()</script><nav>导航</nav>")
+
+        monkeypatch.setattr(CrawlerService, "_fetch_page", _fetch_page)
+        await run()
+
+        async with maker() as session:
+            page = (
+                await session.execute(select(CrawlPage).where(CrawlPage.url == f"{BASE}/a"))
+            ).scalar_one()
+            html = await load_html(CrawlPageRepository(session), page)
+            assert "<h1>/a</h1>" in html
+            assert "track()" not in html and "导航" not in html
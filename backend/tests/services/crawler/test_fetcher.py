@@ -0,0 +1,140 @@
+"""分层抓取测试"""
+
+import httpx
+import pytest
+
+from app.services.crawler.fetcher import (
+    SPA_HTTP_PROBE_PAGES,
+    HttpFetcher,
+    TieredFetcher,
+    looks_server_rendered,
+)
+
+SSR_HTML = "<html><body><main><h1>商品</h1><p>" + "详细描述 " * 100 + "</p></main></body></html>"
+SPA_SHELL = '<html><head><script src="/app.js"></script></head><body><div id="root"></div></body></html>'
+
+
+def _http_fetcher(routes: dict[str, tuple[int, str, str]]) -> HttpFetcher:
+    def handler(request: httpx.Request) -> httpx.Response:
+        status, content_type, body = routes.get(request.url.path, (404, "text/html", ""))
+        return httpx.Response(status, headers={"content-type": content_type}, text=body)
+
+    return HttpFetcher(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+class TestServerRenderedHeuristic:
+    def test_detects_ssr_and_spa_shell(self):
+        assert looks_server_rendered(SSR_HTML, min_text_length=200)
+        assert not looks_server_rendered(SPA_SHELL, min_text_length=200)
+
+    def test_script_content_not_counted(self):
+        html = "<html><body><script>" + "var x = 1;" * 500 + "</script></body></html>"
+        assert not looks_server_rendered(html, min_text_length=200)
+
+
+@pytest.mark.anyio
+class TestTieredFetcher:
+    async def test_non_spa_uses_http_and_escalates_when_needed(self):
+        browser_calls: list[str] = []
+
+        async def browser_fetch(url):
+            browser_calls.append(url)
+            return SSR_HTML
+
+        http = _http_fetcher(
+            {
+                "/ssr": (200, "text/html; charset=utf-8", SSR_HTML),
+                "/shell": (200, "text/html", SPA_SHELL),
+                "/json": (200, "application/json", "{}"),
+            }
+        )
+        fetcher = TieredFetcher(http, browser_fetch, is_spa=False)
+
+        assert (await fetcher.fetch("https://a.com/ssr")).html == SSR_HTML
+        await fetcher.fetch("https://a.com/shell")
+        await fetcher.fetch("https://a.com/json")
+        await fetcher.fetch("https://a.com/missing")
+        await fetcher.close()
+
+        assert browser_calls == ["https://a.com/shell", "https://a.com/json", "https://a.com/missing"]
+        assert fetcher.stats.http_fetch_count == 4
+        assert fetcher.stats.browser_fetch_count == 3
+        assert fetcher.stats.fetch_escalations == 3
+
+    async def test_spa_stops_probing_http_after_misses(self):
+        async def browser_fetch(url):
+            return SSR_HTML
+
+        http = _http_fetcher({"/": (200, "text/html", SPA_SHELL)})
+        fetcher = TieredFetcher(http, browser_fetch, is_spa=True)
+
+        for _ in range(SPA_HTTP_PROBE_PAGES + 3):
+            await fetcher.fetch("https://a.com/")
+        await fetcher.close()
+
+        assert fetcher.stats.http_fetch_count == SPA_HTTP_PROBE_PAGES
+        assert fetcher.stats.browser_fetch_count == SPA_HTTP_PROBE_PAGES + 3
+
+    async def test_wait_for_selector_must_be_present(self):
+        async def browser_fetch(url):
+            return "rendered"
+
+        http = _http_fetcher({"/": (200, "text/html", SSR_HTML)})
+        fetcher = TieredFetcher(http, browser_fetch, is_spa=False, wait_for_selector=".price")
+
+        assert (await fetcher.fetch("https://a.com/")).html == "rendered"
+        await fetcher.close()
+
+    async def test_conditional_request_not_modified(self):
+        seen_headers: list[httpx.Headers] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen_headers.append(request.headers)
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/html", "etag": '"v1"', "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT"},
+                text=SSR_HTML,
+            )
+
+        async def browser_fetch(url):
+            raise AssertionError("304 不应升级到浏览器")
+
+        http = HttpFetcher(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        fetcher = TieredFetcher(http, browser_fetch, is_spa=False)
+
+        first = await fetcher.fetch("https://a.com/p")
+        assert first.html == SSR_HTML
+        assert first.etag == '"v1"'
+        assert first.last_modified == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+        second = await fetcher.fetch("https://a.com/p", etag=first.etag, last_modified=first.last_modified)
+        await fetcher.close()
+
+        assert second.not_modified
+        assert second.html is None
+        assert seen_headers[1]["if-modified-since"] == first.last_modified
+
+    async def test_browser_content_has_no_validators(self):
+        """http_first 关闭时仍发送条件请求，但浏览器渲染的内容不记录校验器"""
+        browser_calls: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, headers={"content-type": "text/html", "etag": '"v2"'}, text=SPA_SHELL)
+
+        async def browser_fetch(url):
+            browser_calls.append(url)
+            return "rendered"
+
+        http = HttpFetcher(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        fetcher = TieredFetcher(http, browser_fetch, is_spa=True, http_first=False)
+
+        fresh = await fetcher.fetch("https://a.com/new")
+        changed = await fetcher.fetch("https://a.com/old", etag='"v1"')
+        await fetcher.close()
+
+        assert (fresh.html, fresh.etag) == ("rendered", None)
+        assert (changed.html, changed.etag) == ("rendered", None)
+        assert browser_calls == ["https://a.com/new", "https://a.com/old"]
+        assert fetcher.stats.http_fetch_count == 1
@@ -0,0 +1,78 @@
+"""爬取 Frontier 与礼貌限速测试"""
+
+import time
+
+import pytest
+
+from app.services.crawler.frontier import CrawlFrontier
+from app.services.crawler.politeness import HostPoliteness
+
+
+class TestCrawlFrontier:
+    def test_pops_by_priority_then_fifo(self):
+        frontier = CrawlFrontier()
+        frontier.push("https://a.com/2", 2)
+        frontier.push("https://a.com/1a", 1)
+        frontier.push("https://a.com/1b", 1)
+        frontier.push("https://a.com/0", 0, priority=-1)
+
+        order = [frontier.pop()[0] for _ in range(4)]
+        assert order == ["https://a.com/0", "https://a.com/1a", "https://a.com/1b", "https://a.com/2"]
+        assert frontier.pop() is None
+
+    def test_dedup_across_queued_and_done(self):
+        frontier = CrawlFrontier()
+        assert frontier.push("https://a.com/", 0)
+        assert not frontier.push("https://a.com/", 1)
+
+        url, _ = frontier.pop()
+        frontier.mark_done(url)
+        assert not frontier.push(url, 2)
+        assert len(frontier) == 0
+
+    def test_drain_changes_and_restore(self):
+        frontier = CrawlFrontier()
+        frontier.push("https://a.com/", 0)
+        frontier.push("https://a.com/x", 1)
+        url, _ = frontier.pop()
+        frontier.mark_done(url)
+
+        queued, done = frontier.drain_changes()
+        assert {q[0] for q in queued} == {"https://a.com/", "https://a.com/x"}
+        assert done == ["https://a.com/"]
+        assert frontier.drain_changes() == ([], [])
+
+        resumed = CrawlFrontier()
+        resumed.restore([("https://a.com/x", 1, 1.0)], ["https://a.com/"])
+        assert resumed.done_count == 1
+        assert resumed.pop() == ("https://a.com/x", 1)
+        assert not resumed.push("https://a.com/", 0)
+        # 恢复的条目不会被当作新变更再次写入
+        assert resumed.drain_changes() == ([], [])
+
+
+@pytest.mark.anyio
+class TestHostPoliteness:
+    async def test_rate_limited_per_host(self):
+        politeness = HostPoliteness(delay=0.05)
+
+        started = time.monotonic()
+        for _ in range(3):
+            await politeness.wait("https://a.com/page")
+        elapsed = time.monotonic() - started
+
+        # 首个请求消耗初始令牌，其后每个等待约 delay
+        assert elapsed >= 0.09
+
+    async def test_hosts_are_independent(self):
+        politeness = HostPoliteness(delay=10)
+
+        started = time.monotonic()
+        await politeness.wait("https://a.com/")
+        await politeness.wait("https://b.com/")
+        assert time.monotonic() - started < 1
+
+    async def test_zero_delay_disables_limit(self):
+        politeness = HostPoliteness(delay=0)
+        for _ in range(100):
+            await politeness.wait("https://a.com/")
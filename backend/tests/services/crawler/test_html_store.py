@@ -0,0 +1,86 @@
+"""页面 HTML 压缩存储测试"""
+
+import pytest
+
+from app.services.crawler import html_store
+from app.services.crawler.html_store import (
+    CODEC_ZLIB,
+    CODEC_ZSTD,
+    HtmlStore,
+    compress_html,
+    decompress_html,
+)
+
+
+def page(i: int) -> str:
+    return (
+        '<html><head><title>商品详情</title><link rel="stylesheet" href="/static/main.css"></head>'
+        '<body><div class="header"><a href="/">首页</a><a href="/cart">购物车</a></div>'
+        f'<div class="detail"><h1 class="title">商品 {i}</h1><span class="price">¥{i * 13}.00</span>'
+        f'<p class="desc">{"描述" * (i % 7 + 3)}</p></div>'
+        '<div class="footer">版权所有 © 示例商城</div></body></html>'
+    )
+
+
+class TestCodec:
+    def test_zstd_round_trip(self):
+        html = page(1)
+        stored = compress_html(html)
+
+        assert stored.codec == CODEC_ZSTD
+        assert stored.raw_size == len(html.encode())
+        assert len(stored.data) < stored.raw_size
+        assert decompress_html(stored.codec, stored.data) == html
+
+    def test_zlib_fallback_without_zstandard(self, monkeypatch):
+        monkeypatch.setattr(html_store, "_ZSTD_AVAILABLE", False)
+        stored = compress_html(page(2))
+
+        assert stored.codec == CODEC_ZLIB
+        assert stored.dict_id is None
+        assert decompress_html(stored.codec, stored.data) == page(2)
+
+    def test_same_content_same_hash(self):
+        assert compress_html(page(3)).content_hash == compress_html(page(3)).content_hash
+        assert compress_html(page(3)).content_hash != compress_html(page(4)).content_hash
+
+    def test_unknown_dictionary_rejected(self):
+        stored = compress_html(page(5))
+        with pytest.raises(ValueError):
+            decompress_html(stored.codec, stored.data, dict_id=-1)
+
+
+@pytest.mark.anyio
+class TestHtmlStore:
+    async def test_trains_dictionary_after_samples(self):
+        saved: list[tuple[bytes, int]] = []
+
+        async def save_dictionary(data: bytes, sample_count: int) -> int:
+            saved.append((data, sample_count))
+            return 9001
+
+        store = HtmlStore(
+            "s1", save_dictionary=save_dictionary, cleaned_only=False, train_samples=30, dict_size=4096
+        )
+        for i in range(30):
+            stored = await store.encode(page(i))
+            assert stored.dict_id is None
+
+        assert store.dict_id == 9001
+        assert saved[0][1] == 30
+
+        with_dict = await store.encode(page(100))
+        without_dict = compress_html(page(100))
+        assert with_dict.dict_id == 9001
+        assert len(with_dict.data) < len(without_dict.data)
+        assert decompress_html(with_dict.codec, with_dict.data, with_dict.dict_id) == page(100)
+
+    async def test_existing_dictionary_reused_without_training(self):
+        async def save_dictionary(data: bytes, sample_count: int) -> int:
+            raise AssertionError("已有字典时不应训练")
+
+        trained = html_store.train_dictionary([page(i).encode() for i in range(30)], 4096)
+        store = HtmlStore("s1", (9002, trained), save_dictionary=save_dictionary, train_samples=1)
+
+        stored = await store.encode(page(1))
+        assert stored.dict_id == 9002
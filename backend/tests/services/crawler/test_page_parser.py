@@ -0,0 +1,110 @@
+"""页面解析器测试"""
+
+import pytest
+
+from app.schemas.crawler import ExtractionConfig, ExtractionMode, FieldExtractionConfig
+from app.services.crawler import page_parser as parser_module
+from app.services.crawler import parse_pool
+from app.services.crawler.page_parser import PageAnalysis, PageParser, analyze_html
+
+HTML = """
+<html><body>
+  <nav><a href="/home">首页</a></nav>
+  <main class="product">
+    <h1 class="title">降噪耳机</h1>
+    <span class="price">¥1,299.00</span>
+    <script>var x = 1;</script>
+    <a href="/product/2#reviews">相关</a>
+    <a href="https://other.com/product/3">外站</a>
+    <a href="javascript:void(0)">无效</a>
+  </main>
+</body></html>
+"""
+
+SELECTOR_CONFIG = ExtractionConfig(
+    mode=ExtractionMode.SELECTOR,
+    fields=FieldExtractionConfig(name=".title::text", price=".price"),
+)
+
+
+class TestAnalyzeHtml:
+    def test_links_and_selector_fields_from_one_parse(self):
+        result = analyze_html(
+            HTML, "https://shop.com/product/1", SELECTOR_CONFIG, link_pattern="/product/*"
+        )
+
+        assert result.links == ["https://shop.com/product/2"]
+        assert result.fields_extracted
+        assert result.is_product_page
+        assert result.product.name == "降噪耳机"
+        assert result.product.price == 1299.0
+        assert result.cleaned_html is None
+
+    def test_llm_mode_cleans_after_link_extraction(self):
+        result = analyze_html(HTML, "https://shop.com/product/1", None)
+
+        # nav 中的链接在清理前已提取
+        assert "https://shop.com/home" in result.links
+        assert "<nav" not in result.cleaned_html
+        assert "<script" not in result.cleaned_html
+        assert "降噪耳机" in result.cleaned_html
+
+    def test_skip_fields(self):
+        result = analyze_html(HTML, "https://shop.com/", SELECTOR_CONFIG, extract_fields=False)
+
+        assert not result.fields_extracted
+        assert result.product is None
+
+    def test_backend_resolution(self, monkeypatch):
+        monkeypatch.setattr(parser_module, "_LXML_AVAILABLE", False)
+        assert parser_module.resolve_html_backend("auto") == "html.parser"
+        assert parser_module.resolve_html_backend("lxml") == "html.parser"
+        monkeypatch.setattr(parser_module, "_LXML_AVAILABLE", True)
+        assert parser_module.resolve_html_backend("auto") == "lxml"
+
+
+@pytest.mark.anyio
+class TestPageParserAsync:
+    async def test_parse_reuses_analysis(self, monkeypatch):
+        parser = PageParser()
+
+        async def _fail(*args, **kwargs):
+            raise AssertionError("已有解析结果时不应重新解析")
+
+        monkeypatch.setattr(parser, "analyze", _fail)
+        analysis = analyze_html(HTML, "https://shop.com/product/1", SELECTOR_CONFIG)
+
+        is_product, product, error = await parser.parse(
+            HTML, "https://shop.com/product/1", SELECTOR_CONFIG, analysis=analysis
+        )
+        assert is_product and product.name == "降噪耳机" and error is None
+
+    async def test_parse_without_analysis_falls_back(self, monkeypatch):
+        parser = PageParser()
+        calls: list[bool] = []
+        original = parser.analyze
+
+        async def _analyze(*args, **kwargs):
+            calls.append(kwargs.get("extract_links", True))
+            return await original(*args, **kwargs)
+
+        monkeypatch.setattr(parser_module.settings, "CRAWLER_PARSE_WORKERS", 0)
+        monkeypatch.setattr(parser, "analyze", _analyze)
+
+        is_product, _, _ = await parser.parse(
+            HTML, "https://shop.com/product/1", SELECTOR_CONFIG, analysis=PageAnalysis()
+        )
+        assert is_product
+        assert calls == [False]
+
+    async def test_process_pool(self, monkeypatch):
+        monkeypatch.setattr(parse_pool.settings, "CRAWLER_PARSE_WORKERS", 1)
+        try:
+            analysis = await PageParser().analyze(
+                HTML, "https://shop.com/product/1", SELECTOR_CONFIG, link_pattern="/product/*"
+            )
+        finally:
+            parse_pool.shutdown_parse_pool()
+
+        assert analysis.links == ["https://shop.com/product/2"]
+        assert analysis.product.name == "降噪耳机"
@@ -0,0 +1,81 @@
+"""Sitemap 发现与解析测试"""
+
+import gzip
+from datetime import datetime
+
+import httpx
+import pytest
+
+from app.services.crawler.fetcher import HttpFetcher
+from app.services.crawler.sitemap import fetch_sitemap_entries, parse_lastmod, parse_sitemap
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+INDEX = f"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex {NS}>
+  <sitemap><loc>https://a.com/products.xml.gz</loc></sitemap>
+  <sitemap><loc>https://a.com/pages.xml</loc></sitemap>
+</sitemapindex>"""
+
+PRODUCTS = f"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset {NS}>
+  <url><loc>https://a.com/p/1</loc><lastmod>2024-03-01T08:00:00+00:00</lastmod></url>
+  <url><loc>https://a.com/p/2</loc></url>
+</urlset>"""
+
+PAGES = f"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset {NS}>
+  <url><loc> https://a.com/about </loc><lastmod>2024-01-15</lastmod></url>
+</urlset>"""
+
+
+class TestParseSitemap:
+    def test_lastmod_formats(self):
+        assert parse_lastmod("2024-01-15") == datetime(2024, 1, 16)
+        assert parse_lastmod("2024-01-15T10:30:00") == datetime(2024, 1, 15, 10, 30)
+        aware = parse_lastmod("2024-01-15T10:30:00Z")
+        assert aware is not None and aware.tzinfo is None
+        assert parse_lastmod("not a date") is None
+        assert parse_lastmod(None) is None
+
+    def test_urlset_and_index(self):
+        urls, children = parse_sitemap(PRODUCTS.encode())
+        assert children == []
+        assert set(urls) == {"https://a.com/p/1", "https://a.com/p/2"}
+        assert urls["https://a.com/p/2"] is None
+
+        urls, children = parse_sitemap(INDEX.encode())
+        assert urls == {}
+        assert children == ["https://a.com/products.xml.gz", "https://a.com/pages.xml"]
+
+    def test_gzip(self):
+        urls, _ = parse_sitemap(gzip.compress(PAGES.encode()))
+        assert list(urls) == ["https://a.com/about"]
+
+
+@pytest.mark.anyio
+class TestFetchSitemapEntries:
+    async def test_follows_robots_and_index(self):
+        routes = {
+            "/robots.txt": b"User-agent: *\nSitemap: https://a.com/index.xml\n",
+            "/index.xml": INDEX.encode(),
+            "/products.xml.gz": gzip.compress(PRODUCTS.encode()),
+            "/pages.xml": PAGES.encode(),
+        }
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            body = routes.get(request.url.path)
+            return httpx.Response(200, content=body) if body else httpx.Response(404)
+
+        http = HttpFetcher(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        entries = await fetch_sitemap_entries(http, "https://a.com/shop")
+        await http.close()
+
+        assert set(entries) == {"https://a.com/p/1", "https://a.com/p/2", "https://a.com/about"}
+
+    async def test_missing_sitemap_returns_empty(self):
+        http = HttpFetcher(
+            client=httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(404)))
+        )
+        assert await fetch_sitemap_entries(http, "https://a.com/") == {}
+        await http.close()
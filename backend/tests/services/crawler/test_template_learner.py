@@ -0,0 +1,211 @@
+"""页面模板学习测试"""
+
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.models.base import Base
+from app.models.crawler import CrawlTemplate, CrawlTemplateStatus
+from app.models.product import Product
+from app.schemas.crawler import ParsedProductData
+from app.services.crawler import crawler_service as crawler_module
+from app.services.crawler import parse_pool
+from app.services.crawler.crawler_service import CrawlerService
+from app.services.crawler.page_parser import PageParser
+from app.services.crawler.template_learner import TemplateLearner, infer_selectors, url_pattern
+
+PRODUCTS = {
+    "https://shop.com/product/1": ("降噪耳机 Pro", 1299.0, "声学"),
+    "https://shop.com/product/2": ("运动手环", 199.0, "智能穿戴"),
+    "https://shop.com/product/3": ("机械键盘", 459.5, "外设"),
+    "https://shop.com/product/4": ("无线鼠标", 89.0, "外设"),
+}
+
+
+def product_html(name: str, price: float, category: str) -> str:
+    return f"""
+    <html><body>
+      <div class="header"><span class="price">¥0</span><h1>商城</h1></div>
+      <div class="detail">
+        <h1 class="title">{name}</h1>
+        <div class="meta"><span class="price">¥{price:,.2f}</span><span>{category}</span></div>
+        <p class="desc">这是一段由 LLM 改写的描述</p>
+      </div>
+    </body></html>
+    """
+
+
+def sample(url: str) -> tuple[str, dict]:
+    name, price, category = PRODUCTS[url]
+    return product_html(name, price, category), {"name": name, "price": price, "category": category, "summary": "改写的卖点"}
+
+
+class FakeLLMParser(PageParser):
+    """LLM 解析替身：按 URL 返回预设商品"""
+
+    def __init__(self):
+        super().__init__(llm=object())
+        self.llm_calls: list[str] = []
+
+    async def parse_with_llm(self, html, url, prompt=None, *, cleaned_html=None):
+        self.llm_calls.append(url)
+        if url not in PRODUCTS:
+            return False, None, None
+        name, price, category = PRODUCTS[url]
+        return True, ParsedProductData(name=name, price=price, category=category, url=url), None
+
+
+class TestInference:
+    def test_url_pattern(self):
+        assert url_pattern("https://a.com/product/123?x=1") == "/product/*"
+        assert url_pattern("https://a.com/products/wireless-headphones") == "/products/*"
+        assert url_pattern("https://a.com/about") == "/about"
+        assert url_pattern("https://a.com/") == "/"
+
+    def test_infers_selectors_consistent_with_llm_output(self):
+        selectors = infer_selectors([sample(url) for url in list(PRODUCTS)[:3]])
+
+        assert selectors is not None
+        # 页头的 h1 / .price 排在前面，不能被选中
+        assert selectors["name"] in ("h1.title", "div.detail h1")
+        assert selectors["price"] != "span.price"
+        assert "category" in selectors
+        # LLM 改写过的字段学不到
+        assert "summary" not in selectors
+
+    def test_returns_none_without_name(self):
+        html, product = sample("https://shop.com/product/1")
+        product["name"] = "页面上不存在的名字"
+        assert infer_selectors([(html, product)]) is None
+
+
+@pytest.mark.anyio
+class TestTemplateLearner:
+    @pytest.fixture(autouse=True)
+    def _thread_parse(self, monkeypatch):
+        monkeypatch.setattr(parse_pool.settings, "CRAWLER_PARSE_WORKERS", 0)
+
+    async def test_learns_after_k_pages_then_skips_llm(self):
+        parser = FakeLLMParser()
+        learner = TemplateLearner("s1", None, min_samples=3)
+
+        for url in list(PRODUCTS)[:3]:
+            assert learner.config_for(url) is None
+            is_product, _, _ = await learner.parse(parser, sample(url)[0], url)
+            assert is_product
+
+        url = "https://shop.com/product/4"
+        assert learner.config_for(url).fields.name is not None
+        is_product, product, error = await learner.parse(parser, sample(url)[0], url)
+
+        assert is_product and error is None
+        assert (product.name, product.price, product.url) == ("无线鼠标", 89.0, url)
+        assert len(parser.llm_calls) == 3
+        assert learner.stats.llm_parse_count == 3
+        assert learner.stats.template_parse_count == 1
+
+        rows = {row["url_pattern"]: row for row in learner.drain_changes()}
+        assert rows["/product/*"]["status"] == CrawlTemplateStatus.ACTIVE.value
+        assert rows["/product/*"]["hit_count"] == 1
+        assert learner.drain_changes() == []
+
+    async def test_fallback_to_llm_and_relearn(self):
+        parser = FakeLLMParser()
+        learner = TemplateLearner("s1", None, min_samples=3)
+        for url in list(PRODUCTS)[:3]:
+            await learner.parse(parser, sample(url)[0], url)
+
+        # 页面改版：选择器不再命中，回退 LLM
+        redesigned = '<html><body><h2 class="new-title">无线鼠标</h2></body></html>'
+        url = "https://shop.com/product/4"
+        for _ in range(3):
+            is_product, product, _ = await learner.parse(parser, redesigned, url)
+            assert is_product and product.name == "无线鼠标"
+
+        assert learner.stats.template_fallbacks == 3
+        assert learner.config_for(url) is None  # 未命中过多，重新学习
+
+    async def test_restores_persisted_templates(self):
+        parser = FakeLLMParser()
+        learner = TemplateLearner("s1", None, min_samples=3)
+        for url in list(PRODUCTS)[:3]:
+            await learner.parse(parser, sample(url)[0], url)
+        row = next(r for r in learner.drain_changes() if r["url_pattern"] == "/product/*")
+
+        restored = TemplateLearner("s1", None, [CrawlTemplate(site_id="s1", **row)])
+        parser.llm_calls.clear()
+        url = "https://shop.com/product/4"
+        is_product, _, _ = await restored.parse(parser, sample(url)[0], url)
+
+        assert is_product
+        assert parser.llm_calls == []
+
+
+class FakeRewritingParser(FakeLLMParser):
+    """LLM 解析替身：额外返回页面上不存在的改写摘要与描述"""
+
+    async def parse_with_llm(self, html, url, prompt=None, *, cleaned_html=None):
+        is_product, product, error = await super().parse_with_llm(html, url, prompt)
+        if product is not None:
+            product.summary = "LLM 改写的卖点"
+            product.description = "LLM 生成的描述"
+        return is_product, product, error
+
+
+@pytest.mark.anyio
+class TestRecrawlAfterPromotion:
+    @pytest.fixture
+    async def app_db(self, monkeypatch):
+        monkeypatch.setattr(parse_pool.settings, "CRAWLER_PARSE_WORKERS", 0)
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        maker = async_sessionmaker(engine, expire_on_commit=False)
+
+        @asynccontextmanager
+        async def _db_context():
+            async with maker() as session:
+                yield session
+                await session.commit()
+
+        monkeypatch.setattr(crawler_module, "get_db_context", _db_context)
+        yield maker
+        await engine.dispose()
+
+    async def test_template_parse_keeps_llm_only_fields(self, app_db):
+        service = CrawlerService(MagicMock())
+        service.parser = FakeRewritingParser()
+        learner = TemplateLearner("s1", None, min_samples=3)
+
+        async def crawl(url: str, html: str) -> None:
+            await service._parse_and_save_product(
+                crawler_session=MagicMock(),
+                page_repo=AsyncMock(),
+                task_repo=AsyncMock(),
+                page_id=1,
+                html_content=html,
+                url=url,
+                site_id="s1",
+                task_id=1,
+                extraction_config=None,
+                templates=learner,
+            )
+
+        for url in list(PRODUCTS)[:3]:
+            await crawl(url, sample(url)[0])
+        url = "https://shop.com/product/1"
+        assert learner.uses_template(url)
+
+        # 模板启用后重爬：价格变化，摘要/描述不在选择器中
+        await crawl(url, product_html("降噪耳机 Pro", 999.0, "声学"))
+
+        async with app_db() as session:
+            products = {p.url: p for p in (await session.execute(Product.__table__.select())).all()}
+        product = products[url]
+        assert product.price == 999.0
+        assert product.summary == "LLM 改写的卖点"
+        assert product.description == "LLM 生成的描述"
+        assert len(service.parser.llm_calls) == 3
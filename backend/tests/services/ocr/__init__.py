@@ -0,0 +1 @@
+"""OCR 服务测试"""
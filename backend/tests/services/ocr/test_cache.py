@@ -0,0 +1,86 @@
+"""OCR 结果缓存测试"""
+
+import asyncio
+
+import pytest
+
+from app.services.ocr.cache import OcrResultCache, cache_key
+
+
+def test_cache_key_ignores_param_order():
+    assert cache_key("h", "rapid_ocr", {"a": 1, "b": 2}) == cache_key("h", "rapid_ocr", {"b": 2, "a": 1})
+    assert cache_key("h", "rapid_ocr") != cache_key("h", "mineru_ocr")
+    assert cache_key("h", "rapid_ocr") != cache_key("h", "rapid_ocr", {"a": 1})
+
+
+def test_evicts_least_recently_used_by_size():
+    cache = OcrResultCache(max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get("a") == "aaaa"  # a 变为最近使用
+
+    cache.put("c", "cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get_stats()["bytes"] == 8
+    assert cache.evictions == 1
+
+    cache.put("big", "x" * 11)  # 单条超过上限不缓存
+    assert cache.get("big") is None
+
+
+@pytest.mark.anyio
+class TestGetOrCompute:
+    async def test_concurrent_requests_share_one_computation(self):
+        cache = OcrResultCache(max_bytes=1024)
+        calls = 0
+        release = asyncio.Event()
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "识别结果"
+
+        tasks = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert calls == 1
+        assert sorted(cached for _, cached in results) == [False, True, True]
+        assert await cache.get_or_compute("k", compute) == ("识别结果", True)
+
+    async def test_failures_are_not_cached(self):
+        cache = OcrResultCache(max_bytes=1024)
+
+        async def fail():
+            raise ValueError("识别失败")
+
+        async def succeed():
+            return "ok"
+
+        with pytest.raises(ValueError):
+            await cache.get_or_compute("k", fail)
+        assert await cache.get_or_compute("k", succeed) == ("ok", False)
+
+    async def test_waiter_recomputes_when_owner_cancelled(self):
+        cache = OcrResultCache(max_bytes=1024)
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+            return "slow"
+
+        async def fast():
+            return "fast"
+
+        owner = asyncio.create_task(cache.get_or_compute("k", slow))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_compute("k", fast))
+        await asyncio.sleep(0)
+        owner.cancel()
+
+        assert await waiter == ("fast", False)
@@ -0,0 +1,69 @@
+"""RapidOCR PDF 逐页并行识别测试"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.ocr.rapid_ocr import iter_ordered
+
+
+class TestIterOrdered:
+    def test_yields_in_input_order(self):
+        def work(n: int) -> int:
+            # 前面的任务更慢，完成顺序与提交顺序相反
+            time.sleep(0.02 * (5 - n))
+            return n * n
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(iter_ordered(lambda n: executor.submit(work, n), range(5), window=4))
+
+        assert results == [0, 1, 4, 9, 16]
+
+    def test_bounds_in_flight_tasks(self):
+        lock = threading.Lock()
+        state = {"running": 0, "max": 0}
+
+        def work(n: int) -> int:
+            with lock:
+                state["running"] += 1
+                state["max"] = max(state["max"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            return n
+
+        submitted: list[int] = []
+
+        def submit(n: int):
+            submitted.append(n)
+            return executor.submit(work, n)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            pages = iter_ordered(submit, range(20), window=3)
+            assert next(pages) == 0
+            # 消费第一个结果时最多提交了 window 个任务
+            assert len(submitted) == 3
+            assert list(pages) == list(range(1, 20))
+
+        assert state["max"] <= 3
+
+    def test_error_cancels_pending(self):
+        def work(n: int) -> int:
+            if n == 1:
+                raise RuntimeError("page failed")
+            time.sleep(0.05)
+            return n
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            futures = []
+
+            def submit(n: int):
+                futures.append(executor.submit(work, n))
+                return futures[-1]
+
+            with pytest.raises(RuntimeError):
+                list(iter_ordered(submit, range(10), window=4))
+
+        assert any(future.cancelled() for future in futures)
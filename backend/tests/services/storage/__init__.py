@@ -0,0 +1 @@
+"""存储服务测试"""
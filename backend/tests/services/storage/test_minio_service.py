@@ -0,0 +1,212 @@
+"""MinIO 图片上传测试"""
+
+import asyncio
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+from minio.error import S3Error
+from PIL import Image
+
+from app.services.storage import minio_service as minio_module
+from app.services.storage.minio_service import MinIOService
+
+
+class FakeMinio:
+    """记录写入对象的 MinIO 客户端替身"""
+
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+        self.part_sizes: dict[str, int] = {}
+
+    def put_object(self, bucket, name, data, length, content_type, part_size=0):
+        self.objects[name] = data.read(length)
+        self.part_sizes[name] = part_size
+
+    def get_object(self, bucket, name):
+        return FakeResponse(self.objects[name])
+
+    def stat_object(self, bucket, name):
+        if name not in self.objects:
+            raise S3Error(None, "NoSuchKey", "Object does not exist", name, "", "")
+        return name
+
+    def list_objects(self, bucket, prefix="", recursive=False):
+        return [SimpleNamespace(object_name=name) for name in sorted(self.objects) if name.startswith(prefix)]
+
+    def remove_object(self, bucket, name):
+        self.objects.pop(name, None)
+
+    def copy_object(self, bucket, name, source):
+        self.stat_object(bucket, source.object_name)
+        self.objects[name] = self.objects[source.object_name]
+
+    def images(self) -> list[str]:
+        """原图与缩略图（不含引用标记）"""
+        return [name for name in self.objects if not name.startswith("_refs/")]
+
+
+class FakeResponse(BytesIO):
+    def release_conn(self):
+        pass
+
+
+def jpeg(width: int, height: int, orientation: int | None = None) -> BytesIO:
+    image = Image.new("RGB", (width, height), "red")
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    buf = BytesIO()
+    image.save(buf, format="JPEG", exif=exif.tobytes())
+    buf.seek(0)
+    return buf
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(minio_module.settings, "MINIO_ENABLED", False)
+    monkeypatch.setattr(minio_module.settings, "IMAGE_THUMBNAIL_SIZE", 100)
+    svc = MinIOService()
+    svc._client = FakeMinio()
+    svc._bucket_name = "test"
+    return svc
+
+
+@pytest.mark.anyio
+class TestUploadImage:
+    async def test_streams_original_and_generates_thumbnail_in_background(self, service):
+        data = jpeg(800, 400, orientation=6)
+        size = len(data.getvalue())
+
+        result = await service.upload_image(data, size, "u1", "photo.jpg", "image/jpeg")
+
+        # EXIF 方向 6：显示尺寸宽高互换
+        assert (result["width"], result["height"]) == (400, 800)
+        assert result["object_name"] in service._client.objects
+        assert len(service._client.objects[result["object_name"]]) == size
+        assert service._client.part_sizes[result["object_name"]] >= 5 * 1024 * 1024
+        assert result["thumbnail_url"].endswith("_thumb.jpg")
+
+        await asyncio.gather(*service._thumbnail_tasks)
+        thumb_name = result["object_name"].replace(".jpg", "_thumb.jpg")
+        thumb = Image.open(BytesIO(service._client.objects[thumb_name]))
+        assert max(thumb.size) <= 100
+        assert thumb.height > thumb.width
+
+    async def test_small_image_reuses_original(self, service):
+        data = jpeg(80, 60)
+
+        result = await service.upload_image(data, len(data.getvalue()), "u1", "small.jpg", "image/jpeg")
+
+        assert result["thumbnail_url"] == result["url"]
+        assert not service._thumbnail_tasks
+        assert service._client.images() == [result["object_name"]]
+
+    async def test_undecodable_file_still_uploaded(self, service):
+        data = BytesIO(b"not an image")
+
+        result = await service.upload_image(data, 12, "u1", "broken.png", "image/png")
+
+        assert (result["width"], result["height"]) == (0, 0)
+        assert service._client.objects[result["object_name"]] == b"not an image"
+
+    async def test_identical_upload_reuses_object_and_thumbnail(self, service):
+        scheduled = []
+        schedule = service._schedule_thumbnail
+        service._schedule_thumbnail = lambda *args: (scheduled.append(args[1]), schedule(*args))
+
+        data = jpeg(800, 400)
+        first = await service.upload_image(data, len(data.getvalue()), "u1", "a.jpg", "image/jpeg")
+        # 缩略图生成中再次上传，不重复调度
+        data = jpeg(800, 400)
+        second = await service.upload_image(data, len(data.getvalue()), "u1", "b.jpg", "image/jpeg")
+        await asyncio.gather(*service._thumbnail_tasks)
+        assert len(scheduled) == 1
+
+        data = jpeg(800, 400)
+        third = await service.upload_image(data, len(data.getvalue()), "u1", "c.jpg", "image/jpeg")
+
+        assert first["object_name"] == second["object_name"] == third["object_name"]
+        assert third["thumbnail_url"] == first["thumbnail_url"]
+        assert not service._thumbnail_tasks
+        assert len(service._client.images()) == 2  # 原图 + 缩略图
+        assert len({first["id"], second["id"], third["id"]}) == 3  # 每次上传独立 ID
+
+    async def test_different_users_do_not_share_objects(self, service):
+        data = jpeg(80, 60)
+        size = len(data.getvalue())
+        a = await service.upload_image(data, size, "u1", "a.jpg", "image/jpeg")
+        data.seek(0)
+        b = await service.upload_image(data, size, "u2", "a.jpg", "image/jpeg")
+
+        assert a["id"].split("-")[0] == b["id"].split("-")[0]
+        assert a["object_name"] != b["object_name"]
+
+    async def test_extension_follows_content_type(self, service):
+        data = jpeg(80, 60)
+        size = len(data.getvalue())
+        a = await service.upload_image(data, size, "u1", "a.jpg", "image/jpeg")
+        data.seek(0)
+        b = await service.upload_image(data, size, "u1", "b.JPEG", "image/jpeg")
+
+        assert a["object_name"] == b["object_name"]
+        assert a["object_name"].endswith(".jpg")
+        assert service._client.images() == [a["object_name"]]
+
+
+@pytest.mark.anyio
+class TestReleaseImage:
+    async def test_shared_content_kept_until_last_upload_deleted(self, service):
+        data = jpeg(800, 400)
+        first = await service.upload_image(data, len(data.getvalue()), "u1", "a.jpg", "image/jpeg")
+        await asyncio.gather(*service._thumbnail_tasks)
+        data = jpeg(800, 400)
+        second = await service.upload_image(data, len(data.getvalue()), "u1", "b.jpg", "image/jpeg")
+
+        # 删除第一次上传不影响第二次上传的 URL
+        assert await service.release_image("u1", first["id"])
+        assert len(service._client.images()) == 2
+        assert not await service.release_image("u1", first["id"])
+
+        assert await service.release_image("u1", second["id"])
+        assert service._client.objects == {}
+
+    async def test_rejects_foreign_or_malformed_ids(self, service):
+        data = jpeg(80, 60)
+        result = await service.upload_image(data, len(data.getvalue()), "u1", "a.jpg", "image/jpeg")
+
+        assert not await service.release_image("u2", result["id"])
+        assert not await service.release_image("u1", "../u2/" + result["id"])
+        assert not await service.release_image("u1", "")
+        # 内容哈希形式的旧 ID 与新上传共用对象，仍有引用时不删除
+        assert await service.release_image("u1", result["id"].split("-")[0])
+        assert service._client.images() == [result["object_name"]]
+
+    async def test_legacy_upload_deleted_with_thumbnail(self, service):
+        client = service._client
+        image_id = "0f8fad5b-d9cb-469f-a165-70867728950e"
+        client.objects[f"u1/{image_id}.png"] = b"png"
+        client.objects[f"u1/{image_id}_thumb.png"] = b"thumb"
+        client.objects[f"u1/{'a' * 64}.webp"] = b"webp"
+
+        assert await service.release_image("u1", image_id)
+        assert await service.release_image("u1", "a" * 64)
+        assert not await service.release_image("u1", image_id)
+        assert client.objects == {}
+
+    async def test_content_restored_when_uploaded_during_delete(self, service, monkeypatch):
+        data = jpeg(80, 60)
+        first = await service.upload_image(data, len(data.getvalue()), "u1", "a.jpg", "image/jpeg")
+        content_id = first["id"].split("-")[0]
+        delete_image = service.delete_image
+
+        def delete_during_upload(object_name):
+            # 删除方确认无引用之后，另一次上传登记引用并看到原图仍存在（按去重跳过写入）
+            service._client.objects[service._ref_name("u1", content_id, "b" * 32)] = b""
+            return delete_image(object_name)
+
+        monkeypatch.setattr(service, "delete_image", delete_during_upload)
+        assert await service.release_image("u1", first["id"])
+
+        assert service._client.images() == [first["object_name"]]
+        assert not [name for name in service._client.objects if name.startswith("_trash/")]
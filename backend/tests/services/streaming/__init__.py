@@ -0,0 +1 @@
+"""传输层测试"""
@@ -0,0 +1,136 @@
+"""可续传聊天流测试"""
+
+import asyncio
+import json
+
+import pytest
+from langgraph_agent_kit import make_event
+
+from app.services.streaming.resumable import StreamBuffer, StreamRegistry
+
+
+def _event(seq: int, type: str = "assistant.delta", payload: dict | None = None):
+    return make_event(
+        seq=seq,
+        conversation_id="c1",
+        message_id="m1",
+        type=type,
+        payload=payload if payload is not None else {"delta": str(seq)},
+    )
+
+
+def _parse(frames: list[str]) -> list[tuple[int, str]]:
+    result = []
+    for frame in frames:
+        id_line, data_line = frame.strip().split("\n")
+        data = json.loads(data_line.removeprefix("data: "))
+        assert int(id_line.removeprefix("id: ")) == data["seq"]
+        result.append((data["seq"], data["type"]))
+    return result
+
+
+async def _collect(stream) -> list[str]:
+    return [frame async for frame in stream]
+
+
+async def _produce(count: int, gate: asyncio.Event | None = None):
+    for seq in range(1, count + 1):
+        if gate is not None and seq == 3:
+            await gate.wait()
+        yield _event(seq)
+
+
+@pytest.mark.anyio
+class TestStreamBuffer:
+    async def test_replays_after_last_event_id(self):
+        buffer = StreamBuffer("m1", "c1")
+        for seq in range(1, 6):
+            buffer.append(_event(seq))
+        buffer.close()
+
+        frames = await _collect(buffer.subscribe(last_event_id=3))
+
+        assert [seq for seq, _ in _parse(frames)] == [4, 5]
+
+    async def test_ring_buffer_replays_from_oldest_retained(self):
+        buffer = StreamBuffer("m1", "c1", capacity=3)
+        for seq in range(1, 7):
+            buffer.append(_event(seq))
+        buffer.close()
+
+        frames = await _collect(buffer.subscribe(last_event_id=1))
+
+        assert [seq for seq, _ in _parse(frames)] == [4, 5, 6]
+
+    async def test_follows_live_events(self):
+        buffer = StreamBuffer("m1", "c1")
+        buffer.append(_event(1))
+        reader = asyncio.create_task(_collect(buffer.subscribe()))
+        await asyncio.sleep(0)
+
+        buffer.append(_event(2))
+        buffer.append(_event(3))
+        buffer.close()
+
+        assert [seq for seq, _ in _parse(await reader)] == [1, 2, 3]
+
+
+@pytest.mark.anyio
+class TestStreamRegistry:
+    async def test_generation_survives_disconnect_and_resumes(self):
+        registry = StreamRegistry(ttl_seconds=60)
+        gate = asyncio.Event()
+        buffer = registry.start("m1", "c1", _produce(5, gate))
+
+        # 首个订阅者收到两个事件后断开
+        first = buffer.subscribe()
+        received = [await anext(first), await anext(first)]
+        await first.aclose()
+
+        gate.set()
+        resumed = await _collect(registry.get("m1").subscribe(last_event_id=2))
+
+        assert [seq for seq, _ in _parse(received + resumed)] == [1, 2, 3, 4, 5]
+        assert registry.get_stats() == {"buffers": 1, "running": 0, "subscribers": 0}
+
+    async def test_failure_emits_error_event(self):
+        registry = StreamRegistry(ttl_seconds=60)
+
+        async def failing():
+            yield _event(1, "meta.start", {})
+            raise RuntimeError("LLM 调用失败")
+
+        buffer = registry.start("m1", "c1", failing())
+        frames = await _collect(buffer.subscribe())
+
+        assert _parse(frames) == [(1, "meta.start"), (2, "error")]
+
+    async def test_cancel_stops_generation(self):
+        registry = StreamRegistry(ttl_seconds=60)
+        gate = asyncio.Event()
+        buffer = registry.start("m1", "c1", _produce(5, gate))
+        await asyncio.sleep(0)
+
+        assert registry.cancel("m1") is True
+        frames = await _collect(buffer.subscribe())
+
+        assert [seq for seq, _ in _parse(frames)] == [1, 2]
+        assert registry.cancel("m1") is False
+
+    async def test_buffer_expires_after_ttl(self):
+        registry = StreamRegistry(ttl_seconds=0.01)
+        buffer = registry.start("m1", "c1", _produce(2))
+        await _collect(buffer.subscribe())
+        assert registry.get("m1") is buffer
+
+        await asyncio.sleep(0.05)
+
+        assert registry.get("m1") is None
+
+    async def test_duplicate_message_id_rejected(self):
+        registry = StreamRegistry(ttl_seconds=60)
+        registry.start("m1", "c1", _produce(1))
+
+        with pytest.raises(ValueError):
+            registry.start("m1", "c1", _produce(1))
+        await registry.close()
@@ -0,0 +1,186 @@
+"""会话热度评分测试
+
+使用内存 SQLite 验证：
+- 消息写入/已读/删除路径维护 Conversation 上的反范式计数
+- SQL 热度表达式与 calculate_heat_score 结果一致
+- 热度排序与分页在数据库完成，覆盖全部会话
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.models.base import Base
+from app.models.conversation import Conversation, HandoffState
+from app.models.message import Message
+from app.repositories.message import MessageRepository
+from app.services.support.heat_score import (
+    HeatScoreService,
+    calculate_heat_score,
+    get_conversations_with_heat,
+    get_support_stats,
+)
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as s:
+        yield s
+    await engine.dispose()
+
+
+def _conv(conv_id: str, **kwargs) -> Conversation:
+    return Conversation(id=conv_id, user_id="u1", title=conv_id, **kwargs)
+
+
+@pytest.mark.anyio
+class TestUnreadCounters:
+    """测试反范式未读计数维护"""
+
+    async def test_counters_follow_message_lifecycle(self, session):
+        session.add(_conv("c1"))
+        await session.flush()
+        repo = MessageRepository(session)
+
+        m1 = await repo.create_message("m1", "c1", "user", "hi")
+        await repo.create_message("m2", "c1", "user", "hello")
+        await repo.create_message("m3", "c1", "assistant", "reply")
+
+        conv = await session.get(Conversation, "c1")
+        await session.refresh(conv)
+        assert conv.unread_user_count == 2
+        assert conv.last_user_message_at is not None
+
+        await repo.mark_as_read(["m1", "m3"], "agent-1")
+        await session.refresh(conv)
+        assert conv.unread_user_count == 1
+
+        # 重复标记不应重复扣减
+        await repo.mark_as_read(["m1"], "agent-1")
+        await session.refresh(conv)
+        assert conv.unread_user_count == 1
+
+        await repo.delete_messages(["m2"])
+        await session.refresh(conv)
+        assert conv.unread_user_count == 0
+        assert m1.read_at is not None
+
+    async def test_rebuild_unread_counters(self, session):
+        session.add(_conv("c1"))
+        await session.flush()
+        repo = MessageRepository(session)
+        await repo.create_message("m1", "c1", "user", "hi")
+
+        conv = await session.get(Conversation, "c1")
+        conv.unread_user_count = 42
+        await session.flush()
+
+        await HeatScoreService(session).rebuild_unread_counters()
+        await session.refresh(conv)
+        assert conv.unread_user_count == 1
+
+    async def test_backfill_only_unpopulated_conversations(self, session):
+        # c1 为计数列加入前的历史数据：有用户消息但计数未维护
+        session.add_all([_conv("c1"), _conv("c2")])
+        session.add_all([
+            Message(id="m1", conversation_id="c1", role="user", content="hi"),
+            Message(id="m2", conversation_id="c1", role="user", content="hello"),
+        ])
+        await session.flush()
+        await MessageRepository(session).create_message("m3", "c2", "user", "hi")
+        c2 = await session.get(Conversation, "c2")
+        c2.unread_user_count = 5  # 已维护的计数不应被回填覆盖
+        await session.flush()
+
+        service = HeatScoreService(session)
+        assert await service.backfill_unread_counters() == 1
+
+        c1 = await session.get(Conversation, "c1")
+        await session.refresh(c1)
+        await session.refresh(c2)
+        assert c1.unread_user_count == 2
+        assert c1.last_user_message_at is not None
+        assert c2.unread_user_count == 5
+        assert await service.backfill_unread_counters() == 0
+
+
+@pytest.mark.anyio
+class TestSqlHeatScore:
+    """测试 SQL 热度计算与排序"""
+
+    async def test_sql_matches_python(self, session):
+        now = datetime.now()
+        cases = [
+            ("pending-old", HandoffState.PENDING.value, now - timedelta(minutes=5), now - timedelta(minutes=45), 3, True),
+            ("pending-new", HandoffState.PENDING.value, now - timedelta(minutes=2), None, 0, False),
+            ("human", HandoffState.HUMAN.value, now - timedelta(minutes=12), None, 8, True),
+            ("ai-fresh", HandoffState.AI.value, now - timedelta(minutes=7), None, 1, False),
+            ("ai-stale", HandoffState.AI.value, now - timedelta(minutes=95), None, 2, True),
+            ("ai-dead", HandoffState.AI.value, now - timedelta(days=3), None, 0, False),
+        ]
+        for conv_id, state, updated_at, handoff_at, unread, online in cases:
+            session.add(
+                _conv(
+                    conv_id,
+                    handoff_state=state,
+                    updated_at=updated_at,
+                    handoff_at=handoff_at,
+                    unread_user_count=unread,
+                    user_online=online,
+                )
+            )
+        await session.flush()
+
+        items, total = await get_conversations_with_heat(session, limit=100)
+        assert total == len(cases)
+
+        expected = {
+            conv_id: calculate_heat_score(state, updated_at, unread, online, handoff_at)
+            for conv_id, state, updated_at, handoff_at, unread, online in cases
+        }
+        assert {item["id"]: item["heat_score"] for item in items} == expected
+        scores = [item["heat_score"] for item in items]
+        assert scores == sorted(scores, reverse=True)
+
+    async def test_paging_covers_all_conversations(self, session):
+        now = datetime.now()
+        # 600 个较新的冷会话 + 1 个很久以前但正在等待接入的会话
+        for i in range(600):
+            session.add(_conv(f"cold-{i}", updated_at=now - timedelta(seconds=i)))
+        session.add(
+            _conv(
+                "hot-old",
+                handoff_state=HandoffState.PENDING.value,
+                updated_at=now - timedelta(days=2),
+                unread_user_count=4,
+            )
+        )
+        await session.flush()
+
+        items, total = await get_conversations_with_heat(session, limit=1)
+        assert total == 601
+        assert items[0]["id"] == "hot-old"
+        assert items[0]["unread_count"] == 4
+
+        page, _ = await get_conversations_with_heat(session, sort_by="time", limit=2, offset=1)
+        assert [item["id"] for item in page] == ["cold-1", "cold-2"]
+
+    async def test_support_stats(self, session):
+        now = datetime.now()
+        session.add(_conv("p1", handoff_state="pending", updated_at=now, unread_user_count=2, user_online=True))
+        session.add(_conv("h1", handoff_state="human", updated_at=now - timedelta(minutes=40), unread_user_count=3))
+        session.add(_conv("a1", handoff_state="ai", updated_at=now, unread_user_count=5))
+        await session.flush()
+
+        stats = await get_support_stats(session)
+        assert stats["pending_count"] == 1
+        assert stats["human_count"] == 1
+        assert stats["total_unread"] == 5
+        # p1: 50+0+10+10=70, h1: 30+30+15=75, a1: 0+0+25=25
+        assert stats["high_heat_count"] == 2
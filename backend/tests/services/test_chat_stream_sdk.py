@@ -60,6 +60,7 @@ class FakeConversationService:
 async def _run_orchestrator(
     events: list[tuple[str, dict[str, Any]]],
     message: str = "你好",
+    trace: Any = None,
 ) -> tuple[list[dict], FakeConversationService]:
     """辅助：运行编排器并收集所有 StreamEvent（带超时保护）"""
     from app.services.chat_stream_sdk import ChatStreamOrchestratorSDK
@@ -76,6 +77,7 @@ async def _run_orchestrator(
         user_message_id="umsg-1",
         assistant_message_id="amsg-1",
         db=None,
+        trace=trace,
     )
 
     collected: list[dict] = []
@@ -203,6 +205,19 @@ class TestChatStreamOrchestratorSDK:
         for i in range(1, len(seqs)):
             assert seqs[i] > seqs[i - 1], f"seq 不单调递增: {seqs}"
 
+    async def test_trace_summary_saved(self):
+        """回合追踪经 ChatContext 传给 Agent，摘要写入 extra_metadata"""
+        from app.core.tracing import TurnTrace
+
+        trace = TurnTrace("test-conv-1", "amsg-1")
+        events = [(StreamEventType.ASSISTANT_FINAL.value, {"content": "好的"})]
+        _, conv_service = await _run_orchestrator(events, trace=trace)
+
+        summary = conv_service.saved_messages[0]["extra_metadata"]["trace"]
+        assert summary["trace_id"] == trace.trace_id
+        assert summary["spans"][0]["name"] == "chat.turn"
+        assert [s.name for s in trace.spans][-1] == "db.save_assistant_message"
+
 
 class TestChatStreamOrchestratorSDKSync:
     """同步测试（构造函数、兼容性）"""
@@ -0,0 +1,169 @@
+"""会话列表键集分页与详情测试"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.models.base import Base
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.tool_call import ToolCall
+from app.services.conversation import ConversationService, decode_conversation_cursor
+
+BASE_TIME = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as s:
+        yield s
+    await engine.dispose()
+
+
+async def _add_conversations(session, count: int, same_time: bool = False) -> None:
+    for i in range(count):
+        ts = BASE_TIME if same_time else BASE_TIME + timedelta(minutes=i)
+        session.add(Conversation(id=f"c{i:02d}", user_id="u1", title=f"c{i}", created_at=ts, updated_at=ts))
+    session.add(Conversation(id="other", user_id="u2", title="other", created_at=BASE_TIME, updated_at=BASE_TIME))
+    await session.commit()
+
+
+async def _add_messages(session, conversation_id: str, count: int, same_time: bool = False) -> None:
+    for i in range(count):
+        ts = BASE_TIME if same_time else BASE_TIME + timedelta(seconds=i)
+        session.add(
+            Message(
+                id=f"{conversation_id}-m{i:02d}",
+                conversation_id=conversation_id,
+                role="user" if i % 2 == 0 else "assistant",
+                content=f"消息 {i} " + "x" * 200,
+                created_at=ts,
+            )
+        )
+    await session.commit()
+
+
+async def _collect_pages(service: ConversationService, limit: int) -> list[list[str]]:
+    pages, cursor = [], None
+    while True:
+        rows, cursor, has_more = await service.list_conversation_page("u1", limit, cursor)
+        pages.append([row["id"] for row in rows])
+        if not has_more:
+            assert cursor is None
+            return pages
+
+
+@pytest.mark.anyio
+class TestConversationPage:
+    async def test_pages_are_ordered_by_updated_at(self, session):
+        await _add_conversations(session, 5)
+        pages = await _collect_pages(ConversationService(session), limit=2)
+
+        assert pages == [["c04", "c03"], ["c02", "c01"], ["c00"]]
+
+    async def test_tied_timestamps_are_not_skipped(self, session):
+        await _add_conversations(session, 5, same_time=True)
+        pages = await _collect_pages(ConversationService(session), limit=2)
+
+        ids = [cid for page in pages for cid in page]
+        assert ids == ["c04", "c03", "c02", "c01", "c00"]
+
+    async def test_summary_projection(self, session):
+        await _add_conversations(session, 2)
+        await _add_messages(session, "c01", 3)
+        session.add(
+            Message(
+                id="c01-withdrawn",
+                conversation_id="c01",
+                role="human_agent",
+                content="已撤回",
+                is_withdrawn=True,
+                created_at=BASE_TIME + timedelta(hours=1),
+            )
+        )
+        await session.commit()
+
+        rows, _, _ = await ConversationService(session).list_conversation_page("u1", 10)
+        by_id = {row["id"]: row for row in rows}
+
+        assert by_id["c01"]["message_count"] == 4
+        assert by_id["c01"]["last_message_role"] == "human_agent"
+        assert by_id["c01"]["last_message_preview"] is None
+        assert by_id["c00"]["message_count"] == 0
+        assert by_id["c00"]["last_message_at"] is None
+
+    async def test_preview_is_truncated(self, session):
+        await _add_conversations(session, 1)
+        await _add_messages(session, "c00", 1)
+
+        rows, _, _ = await ConversationService(session).list_conversation_page("u1", 10)
+
+        assert len(rows[0]["last_message_preview"]) == 100
+        assert rows[0]["last_message_role"] == "user"
+
+    async def test_invalid_cursor(self, session):
+        with pytest.raises(ValueError):
+            await ConversationService(session).list_conversation_page("u1", 10, "not-a-cursor")
+        with pytest.raises(ValueError):
+            decode_conversation_cursor("%%%")
+
+
+@pytest.mark.anyio
+class TestConversationDetail:
+    async def test_returns_latest_messages_with_cursor(self, session):
+        await _add_conversations(session, 1)
+        await _add_messages(session, "c00", 5)
+        service = ConversationService(session)
+
+        detail = await service.get_conversation_detail("c00", message_limit=2)
+
+        assert [m["id"] for m in detail["messages"]] == ["c00-m03", "c00-m04"]
+        assert detail["has_more"] is True
+        assert detail["next_cursor"] == "c00-m03"
+
+        # 游标与消息分页接口通用
+        older, _, has_more = await service.message_repo.get_paginated("c00", limit=10, cursor=detail["next_cursor"])
+        assert [m.id for m in older] == ["c00-m00", "c00-m01", "c00-m02"]
+        assert has_more is False
+
+    async def test_tied_message_timestamps_page_without_gaps(self, session):
+        await _add_conversations(session, 1)
+        await _add_messages(session, "c00", 4, same_time=True)
+        service = ConversationService(session)
+
+        detail = await service.get_conversation_detail("c00", message_limit=2)
+        older, _, _ = await service.message_repo.get_paginated("c00", limit=10, cursor=detail["next_cursor"])
+
+        ids = [m.id for m in older] + [m["id"] for m in detail["messages"]]
+        assert sorted(ids) == [f"c00-m{i:02d}" for i in range(4)]
+        assert len(set(ids)) == 4
+
+    async def test_tool_calls_are_grouped_by_message(self, session):
+        await _add_conversations(session, 1)
+        await _add_messages(session, "c00", 2)
+        session.add(
+            ToolCall(
+                tool_call_id="call-1",
+                message_id="c00-m01",
+                tool_name="search_products",
+                tool_input={"q": "手机"},
+                status="success",
+            )
+        )
+        await session.commit()
+
+        detail = await ConversationService(session).get_conversation_detail(
+            "c00", message_limit=10, include_tool_calls=True
+        )
+
+        assert detail["messages"][0]["tool_calls"] == []
+        assert [tc["tool_name"] for tc in detail["messages"][1]["tool_calls"]] == ["search_products"]
+
+    async def test_missing_conversation(self, session):
+        assert await ConversationService(session).get_conversation_detail("missing", 10) is None
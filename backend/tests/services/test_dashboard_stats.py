@@ -0,0 +1,130 @@
+"""仪表盘统计服务测试
+
+使用内存 SQLite 验证每日汇总 + 实时增量的计数与原始 COUNT 一致。
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.models.base import Base
+from app.models.conversation import Conversation
+from app.models.crawler import CrawlerBase, CrawlSite, CrawlTask
+from app.models.daily_stats import DailyStats
+from app.models.message import Message
+from app.models.user import User
+from app.services.dashboard_stats import (
+    get_dashboard_stats,
+    get_rollup_watermark,
+    rollup_daily_stats,
+)
+
+
+async def _make_session(base):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(base.metadata.create_all)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)()
+
+
+@pytest.fixture
+async def sessions():
+    app_engine, app_session = await _make_session(Base)
+    crawler_engine, crawler_session = await _make_session(CrawlerBase)
+    yield app_session, crawler_session
+    await app_session.close()
+    await crawler_session.close()
+    await app_engine.dispose()
+    await crawler_engine.dispose()
+
+
+def _seed(session, now: datetime) -> None:
+    session.add(User(id="u1", created_at=now - timedelta(days=5)))
+    session.add(User(id="u2", created_at=now))
+    for day_offset in (5, 3, 0):
+        created = now - timedelta(days=day_offset)
+        conv_id = f"c{day_offset}"
+        session.add(Conversation(id=conv_id, user_id="u1", created_at=created, updated_at=created))
+        for i in range(day_offset + 2):
+            session.add(
+                Message(
+                    id=f"m{day_offset}-{i}",
+                    conversation_id=conv_id,
+                    role="user",
+                    content="hi",
+                    created_at=created,
+                )
+            )
+
+
+async def _raw_count(session, model) -> int:
+    return await session.scalar(select(func.count()).select_from(model))
+
+
+@pytest.mark.anyio
+class TestDashboardStats:
+    async def test_rollup_and_live_totals_match_raw_counts(self, sessions):
+        app_session, crawler_session = sessions
+        now = datetime.now()
+        _seed(app_session, now)
+        await app_session.flush()
+
+        # 尚未汇总：全部走实时计数
+        stats = await get_dashboard_stats(app_session, crawler_session, crawler_enabled=False)
+        assert stats.total_messages == await _raw_count(app_session, Message)
+
+        days = await rollup_daily_stats(app_session, full=True)
+        assert days >= 2
+        assert await get_rollup_watermark(app_session) == now.date() - timedelta(days=1)
+
+        stats = await get_dashboard_stats(app_session, crawler_session, crawler_enabled=False)
+        assert stats.total_messages == await _raw_count(app_session, Message)
+        assert stats.total_conversations == await _raw_count(app_session, Conversation)
+        assert stats.total_users == await _raw_count(app_session, User)
+        assert stats.today_messages == 2
+        assert stats.today_conversations == 1
+        assert stats.ai_conversations == 3
+        assert stats.total_crawl_tasks == 0
+
+        # 汇总只包含已结束的自然日
+        rolled = await app_session.scalar(select(func.sum(DailyStats.messages)))
+        assert rolled == 7 + 5
+
+    async def test_incremental_rollup_keeps_totals(self, sessions):
+        app_session, crawler_session = sessions
+        now = datetime.now()
+        _seed(app_session, now)
+        await app_session.flush()
+        await rollup_daily_stats(app_session, full=True)
+
+        # 水位线当天的晚到数据
+        yesterday = now - timedelta(days=1)
+        app_session.add(
+            Message(id="late", conversation_id="c3", role="user", content="x", created_at=yesterday)
+        )
+        await app_session.flush()
+        await rollup_daily_stats(app_session)
+
+        stats = await get_dashboard_stats(app_session, crawler_session, crawler_enabled=False)
+        assert stats.total_messages == await _raw_count(app_session, Message)
+
+    async def test_crawler_stats(self, sessions):
+        app_session, crawler_session = sessions
+        crawler_session.add(CrawlSite(id="s1", name="site", start_url="https://example.com", domain="example.com"))
+        crawler_session.add_all(
+            [
+                CrawlTask(site_id="s1", status="completed"),
+                CrawlTask(site_id="s1", status="completed"),
+                CrawlTask(site_id="s1", status="failed"),
+                CrawlTask(site_id="s1", status="running"),
+            ]
+        )
+        await crawler_session.flush()
+
+        stats = await get_dashboard_stats(app_session, crawler_session, crawler_enabled=True)
+        assert stats.total_crawl_sites == 1
+        assert stats.total_crawl_tasks == 4
+        assert stats.crawl_success_rate == pytest.approx(66.7)
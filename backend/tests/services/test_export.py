@@ -0,0 +1,117 @@
+"""流式导出服务测试
+
+使用内存 SQLite 验证 keyset 分批、工具调用挂载、增量与断点续传。
+"""
+
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  注册全部模型
+from app.models.base import Base
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.tool_call import ToolCall
+from app.services.export import stream_conversations, stream_messages
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    now = datetime.now()
+    async with maker() as session:
+        session.add(Conversation(id="c1", user_id="u1", updated_at=now - timedelta(days=2)))
+        session.add(Conversation(id="c2", user_id="u1", updated_at=now))
+        for i in range(25):
+            conv_id = "c1" if i < 20 else "c2"
+            created = now - timedelta(days=2) if i < 20 else now - timedelta(minutes=1)
+            session.add(
+                Message(
+                    id=f"m{i:03d}",
+                    conversation_id=conv_id,
+                    role="assistant",
+                    content=f"content {i}",
+                    created_at=created,
+                )
+            )
+        session.add(ToolCall(message_id="m003", tool_name="search_products", status="success"))
+        session.add(ToolCall(message_id="m003", tool_name="get_product", status="error"))
+        await session.commit()
+
+    @asynccontextmanager
+    async def factory():
+        async with maker() as session:
+            yield session
+
+    yield factory
+    await engine.dispose()
+
+
+async def _collect(gen) -> list[dict]:
+    return [json.loads(line) async for line in gen]
+
+
+@pytest.mark.anyio
+class TestStreamMessages:
+    async def test_exports_all_messages_in_batches(self, session_factory):
+        records = await _collect(stream_messages(batch_size=7, session_factory=session_factory))
+
+        messages = [r for r in records if r["type"] == "message"]
+        assert [m["id"] for m in messages] == [f"m{i:03d}" for i in range(25)]
+        assert [t["tool_name"] for t in messages[3]["tool_calls"]] == [
+            "search_products",
+            "get_product",
+        ]
+        assert messages[0]["tool_calls"] == []
+
+        end = records[-1]
+        assert end["type"] == "export_end"
+        assert end["count"] == 25
+        assert end["last_id"] == "m024"
+
+    async def test_incremental_since(self, session_factory):
+        since = datetime.now() - timedelta(hours=1)
+        records = await _collect(
+            stream_messages(since=since, include_tool_calls=False, session_factory=session_factory)
+        )
+        ids = [r["id"] for r in records if r["type"] == "message"]
+        assert ids == [f"m{i:03d}" for i in range(20, 25)]
+        assert "tool_calls" not in records[0]
+
+    async def test_resume_after_id(self, session_factory):
+        records = await _collect(
+            stream_messages(after_id="m021", batch_size=2, session_factory=session_factory)
+        )
+        ids = [r["id"] for r in records if r["type"] == "message"]
+        assert ids == ["m022", "m023", "m024"]
+
+    async def test_conversations_by_updated_at(self, session_factory):
+        since = datetime.now() - timedelta(hours=1)
+        records = await _collect(stream_conversations(since=since, session_factory=session_factory))
+        assert [r["id"] for r in records if r["type"] == "conversation"] == ["c2"]
+        assert records[-1]["count"] == 1
+
+    async def test_session_closed_before_yield(self, session_factory):
+        open_sessions = 0
+
+        @asynccontextmanager
+        async def tracking_factory():
+            nonlocal open_sessions
+            open_sessions += 1
+            try:
+                async with session_factory() as session:
+                    yield session
+            finally:
+                open_sessions -= 1
+
+        # 下游消费每一行时不持有数据库会话
+        async for _ in stream_messages(batch_size=7, session_factory=tracking_factory):
+            assert open_sessions == 0
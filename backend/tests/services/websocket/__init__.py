@@ -0,0 +1 @@
+"""WebSocket 服务测试"""
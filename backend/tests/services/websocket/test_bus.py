@@ -0,0 +1,150 @@
+"""WebSocket 跨节点广播测试
+
+用多个 ConnectionManager 模拟多个 worker / 实例：
+- 共享 InProcessHub 的进程内总线
+- 经 Unix socket 连接 LocalBroker 的 BrokerBus
+"""
+
+import asyncio
+
+import pytest
+
+from app.schemas.websocket import WSRole
+from app.services.websocket.bus import (
+    BrokerBus,
+    InProcessBus,
+    InProcessHub,
+    LocalBroker,
+    pg_channel,
+)
+from app.services.websocket.manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+async def settle(seconds: float = 0.05) -> None:
+    """等待总线消息在各节点间传递"""
+    await asyncio.sleep(seconds)
+
+
+async def _cross_node_delivery(node_a: ConnectionManager, node_b: ConnectionManager) -> None:
+    user_ws, agent_ws, other_ws = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await node_a.connect(user_ws, "c1", WSRole.USER, "u1")
+    agent = await node_b.connect(agent_ws, "c1", WSRole.AGENT, "a1")
+    await node_b.connect(other_ws, "c2", WSRole.AGENT, "a2")
+    await settle()
+
+    # 用户消息从节点 A 发出，送达节点 B 上的客服
+    sent = await node_a.send_to_role("c1", WSRole.AGENT, {"action": "server.message", "n": 1})
+    await settle()
+    assert sent == 1
+    assert agent_ws.sent == [{"action": "server.message", "n": 1}]
+    assert other_ws.sent == []  # 其他会话不受影响
+
+    # 客服回复从节点 B 发出，送达节点 A 上的用户
+    assert await node_b.send_to_role("c1", WSRole.USER, {"action": "server.message", "n": 2}) == 1
+    await settle()
+    assert user_ws.sent == [{"action": "server.message", "n": 2}]
+
+    assert node_a.get_connection_counts("c1") == {"user": 1, "agent": 1, "total": 2}
+
+    # 客服断开后，节点 A 不再计入远端连接
+    await node_b.disconnect(agent.id)
+    await settle()
+    assert await node_a.send_to_role("c1", WSRole.AGENT, {"action": "server.message"}) == 0
+    assert node_a.get_remote_counts("c1") == {}
+
+
+@pytest.mark.anyio
+class TestInProcessBus:
+    async def test_cross_node_delivery(self):
+        hub = InProcessHub()
+        node_a = ConnectionManager(InProcessBus(hub))
+        node_b = ConnectionManager(InProcessBus(hub))
+        await node_a.start()
+        await node_b.start()
+
+        await _cross_node_delivery(node_a, node_b)
+
+    async def test_subscribes_only_to_held_conversations(self):
+        node = ConnectionManager()
+        await node.start()
+
+        conn = await node.connect(FakeWebSocket(), "c1", WSRole.USER, "u1")
+        assert node.bus._topics == {"c1"}
+
+        await node.disconnect(conn.id)
+        assert node.bus._topics == set()
+
+    async def test_broadcast_excludes_sender_connection(self):
+        hub = InProcessHub()
+        node_a = ConnectionManager(InProcessBus(hub))
+        node_b = ConnectionManager(InProcessBus(hub))
+        await node_a.start()
+        await node_b.start()
+        sender_ws, peer_ws, remote_ws = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        sender = await node_a.connect(sender_ws, "c1", WSRole.AGENT, "a1")
+        await node_a.connect(peer_ws, "c1", WSRole.AGENT, "a2")
+        await node_b.connect(remote_ws, "c1", WSRole.USER, "u1")
+        await settle()
+
+        sent = await node_a.broadcast_to_conversation("c1", {"action": "x"}, exclude_conn_id=sender.id)
+        await settle()
+
+        assert sent == 2
+        assert sender_ws.sent == []
+        assert peer_ws.sent == remote_ws.sent == [{"action": "x"}]
+
+    async def test_counts_of_stopped_node_expire(self):
+        hub = InProcessHub()
+        node_a = ConnectionManager(InProcessBus(hub), announce_interval=0.02)
+        node_b = ConnectionManager(InProcessBus(hub), announce_interval=0.02)
+        node_c = ConnectionManager(InProcessBus(hub), announce_interval=0.02)
+        for node in (node_a, node_b, node_c):
+            await node.start()
+        await node_a.connect(FakeWebSocket(), "c1", WSRole.AGENT, "a1")
+        await node_b.connect(FakeWebSocket(), "c1", WSRole.USER, "u1")
+        await node_c.connect(FakeWebSocket(), "c1", WSRole.USER, "u2")
+        await settle()
+        assert node_a.get_remote_counts("c1") == {"user": 2}
+
+        # 节点 B 未注销连接即停止（模拟崩溃），节点 C 持续重发连接数
+        await node_b.stop()
+        await settle(0.1)
+
+        assert node_a.get_remote_counts("c1") == {"user": 1}
+        await node_a.stop()
+        await node_c.stop()
+
+
+@pytest.mark.anyio
+class TestBrokerBus:
+    async def test_cross_node_delivery_over_unix_socket(self, tmp_path):
+        url = f"unix://{tmp_path / 'ws-bus.sock'}"
+        broker = LocalBroker(url)
+        await broker.start()
+        node_a = ConnectionManager(BrokerBus(url))
+        node_b = ConnectionManager(BrokerBus(url))
+        await node_a.start()
+        await node_b.start()
+        try:
+            await _cross_node_delivery(node_a, node_b)
+        finally:
+            await node_a.stop()
+            await node_b.stop()
+            await broker.stop()
+
+
+def test_pg_channel_is_valid_identifier():
+    channel = pg_channel("conversation-" + "x" * 100)
+    assert len(channel) <= 63
+    assert channel.isidentifier()
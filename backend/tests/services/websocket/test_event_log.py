@@ -0,0 +1,265 @@
+"""会话事件日志测试"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.models.base import Base
+from app.models.conversation import Conversation
+from app.repositories.conversation_event import ConversationEventRepository
+from app.schemas.websocket import WSAction, WSRole
+from app.services.websocket import event_log as event_log_module
+from app.services.websocket import manager as manager_module
+from app.services.websocket.event_log import (
+    DeliveryCursorBuffer,
+    EventLogService,
+    SSESocket,
+    advance_on_delivery,
+    encode_sse,
+)
+from app.services.websocket.manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, blocked: asyncio.Event | None = None):
+        self.sent: list[dict] = []
+        self.blocked = blocked
+
+    async def send_json(self, message):
+        if self.blocked is not None:
+            await self.blocked.wait()
+        self.sent.append(message)
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+async def settle(seconds: float = 0.01) -> None:
+    await asyncio.sleep(seconds)
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as s:
+        s.add(Conversation(id="c1", user_id="u1", title="c1"))
+        await s.commit()
+        yield s
+    await engine.dispose()
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = ConnectionManager()
+    monkeypatch.setattr(event_log_module, "ws_manager", manager)
+    return manager
+
+
+@pytest.fixture
+def delivery(monkeypatch, session, manager):
+    """送达回调记录到独立的游标缓冲，flush 写入测试会话"""
+
+    @asynccontextmanager
+    async def db_context():
+        yield session
+
+    cursors = DeliveryCursorBuffer(flush_interval=0)
+    monkeypatch.setattr(event_log_module, "get_db_context", db_context)
+    monkeypatch.setattr(event_log_module, "delivery_cursors", cursors)
+    manager.set_delivery_listener(advance_on_delivery)
+    return cursors
+
+
+def _payload(i: int) -> dict:
+    return {"message_id": f"m{i}", "role": "human_agent", "content": f"消息 {i}", "created_at": "2026-01-01T00:00:00"}
+
+
+@pytest.mark.anyio
+class TestEventLogService:
+    async def test_offline_events_are_replayed_once(self, session, manager, delivery):
+        log = EventLogService(session)
+        for i in range(3):
+            assert await log.publish("c1", WSRole.USER, WSAction.SERVER_MESSAGE, _payload(i)) == 0
+        assert await log.repo.get_cursor("c1", "user") == 0
+
+        ws = FakeWebSocket()
+        conn = await manager.connect(ws, "c1", WSRole.USER, "u1")
+        assert await log.replay(conn) == 3
+        await settle()
+        await delivery.flush()
+
+        assert [m["payload"]["message_id"] for m in ws.sent] == ["m0", "m1", "m2"]
+        assert all(m["payload"]["is_delivered"] for m in ws.sent)
+        last_seq = ws.sent[-1]["payload"]["seq"]
+        assert await log.repo.get_cursor("c1", "user") == last_seq
+
+        # 游标已推进，重连不再重复补发
+        assert await log.replay(conn) == 0
+
+    async def test_online_delivery_advances_cursor(self, session, manager, delivery):
+        log = EventLogService(session)
+        ws = FakeWebSocket()
+        await manager.connect(ws, "c1", WSRole.AGENT, "a1")
+
+        sent = await log.publish("c1", WSRole.AGENT, WSAction.SERVER_MESSAGE, _payload(1))
+        await settle()
+        await delivery.flush()
+
+        assert sent == 1
+        seq = ws.sent[0]["payload"]["seq"]
+        assert await log.repo.get_cursor("c1", "agent") == seq
+        # 只投递给目标角色，另一角色的游标不受影响
+        assert await log.repo.get_cursor("c1", "user") == 0
+
+    async def test_enqueue_does_not_advance_cursor(self, session, manager, delivery):
+        log = EventLogService(session)
+        stuck = asyncio.Event()
+        await manager.connect(FakeWebSocket(blocked=stuck), "c1", WSRole.USER, "u1")
+
+        assert await log.publish("c1", WSRole.USER, WSAction.SERVER_MESSAGE, _payload(1)) == 1
+        await settle()
+        await delivery.flush()
+        assert await log.repo.get_cursor("c1", "user") == 0
+
+        stuck.set()
+        await settle()
+        await delivery.flush()
+        assert await log.repo.get_cursor("c1", "user") > 0
+
+    async def test_overflowed_messages_are_replayed(self, session, manager, delivery, monkeypatch):
+        monkeypatch.setattr(manager_module.settings, "WS_SEND_QUEUE_SIZE", 1)
+        log = EventLogService(session)
+        stuck = asyncio.Event()
+        slow_ws = FakeWebSocket(blocked=stuck)
+        slow = await manager.connect(slow_ws, "c1", WSRole.USER, "u1")
+
+        # 第一条被写任务取出并阻塞，第二条填满队列，第三条溢出关闭连接
+        for i in range(3):
+            await log.publish("c1", WSRole.USER, WSAction.SERVER_MESSAGE, _payload(i))
+            await settle(0)
+        assert not slow.is_alive
+        stuck.set()
+        await settle()
+        await delivery.flush()
+        await manager.disconnect(slow.id)
+        assert slow_ws.sent == []
+        assert await log.repo.get_cursor("c1", "user") == 0
+
+        # 重连后补发全部未写出的消息，写出后游标推进
+        monkeypatch.setattr(manager_module.settings, "WS_SEND_QUEUE_SIZE", 10)
+        ws = FakeWebSocket()
+        conn = await manager.connect(ws, "c1", WSRole.USER, "u1")
+        assert await log.replay(conn) == 3
+        await settle()
+        await delivery.flush()
+
+        assert [m["payload"]["message_id"] for m in ws.sent] == ["m0", "m1", "m2"]
+        assert await log.repo.get_cursor("c1", "user") == ws.sent[-1]["payload"]["seq"]
+
+    async def test_drop_oldest_stops_advancing_cursor(self, session, manager, delivery, monkeypatch):
+        monkeypatch.setattr(manager_module.settings, "WS_SEND_QUEUE_SIZE", 1)
+        monkeypatch.setattr(manager_module.settings, "WS_SEND_OVERFLOW_POLICY", "drop_oldest")
+        log = EventLogService(session)
+        stuck = asyncio.Event()
+        ws = FakeWebSocket(blocked=stuck)
+        await manager.connect(ws, "c1", WSRole.USER, "u1")
+
+        for i in range(3):
+            await log.publish("c1", WSRole.USER, WSAction.SERVER_MESSAGE, _payload(i))
+            await settle(0)
+        stuck.set()
+        await settle()
+        await delivery.flush()
+
+        # m1 被丢弃：连接丢弃过消息后游标不再推进，重连时从游标处补发
+        assert [m["payload"]["message_id"] for m in ws.sent] == ["m0", "m2"]
+        assert await log.repo.get_cursor("c1", "user") == 0
+        pending = await log.pending("c1", WSRole.USER)
+        assert [m["payload"]["message_id"] for m in pending] == ["m0", "m1", "m2"]
+
+    async def test_cursors_are_flushed_in_one_batch(self, session, manager, delivery):
+        log = EventLogService(session)
+        ws = FakeWebSocket()
+        await manager.connect(ws, "c1", WSRole.USER, "u1")
+        await manager.connect(FakeWebSocket(), "c1", WSRole.USER, "u1")
+        for i in range(3):
+            await log.publish("c1", WSRole.USER, WSAction.SERVER_MESSAGE, _payload(i))
+        await settle()
+
+        # 写出只更新内存，未写库前补发也从内存游标之后开始
+        assert await log.repo.get_cursor("c1", "user") == 0
+        assert await log.pending("c1", WSRole.USER) == []
+
+        writes = []
+        persist = delivery._persist
+
+        async def counting(cursors):
+            writes.append(cursors)
+            await persist(cursors)
+
+        delivery._persist = counting
+        assert await delivery.flush() == 1
+        assert writes == [{("c1", "user"): ws.sent[-1]["payload"]["seq"]}]
+        assert await log.repo.get_cursor("c1", "user") == ws.sent[-1]["payload"]["seq"]
+        assert delivery.delivered("c1", "user") == 0
+
+    async def test_pending_after_last_event_id(self, session, manager):
+        log = EventLogService(session)
+        for i in range(3):
+            await log.publish("c1", WSRole.USER, WSAction.SERVER_MESSAGE, _payload(i))
+        first = (await log.pending("c1", WSRole.USER))[0]["payload"]["seq"]
+
+        pending = await log.pending("c1", WSRole.USER, after_seq=first)
+
+        assert [m["payload"]["message_id"] for m in pending] == ["m1", "m2"]
+        assert await log.pending("c1", WSRole.AGENT) == []
+
+    async def test_cursor_never_moves_back(self, session):
+        repo = ConversationEventRepository(session)
+        await repo.advance_cursor("c1", "user", 5)
+        await repo.advance_cursor("c1", "user", 3)
+
+        assert await repo.get_cursor("c1", "user") == 5
+
+
+@pytest.mark.anyio
+class TestSSESocket:
+    async def test_connection_manager_delivers_to_sse(self, manager):
+        socket = SSESocket()
+        await manager.connect(socket, "c1", WSRole.USER, "u1")
+        await manager.send_to_role("c1", WSRole.USER, {"action": "server.typing", "payload": {}})
+
+        stream = socket.messages(keepalive=1)
+        assert (await anext(stream))["action"] == "server.typing"
+
+        await socket.close()
+        with pytest.raises(StopAsyncIteration):
+            await anext(stream)
+
+    async def test_send_returns_after_frame_is_taken(self):
+        socket = SSESocket()
+        send = asyncio.create_task(socket.send_json({"n": 1}))
+        stream = socket.messages(keepalive=1)
+        assert (await anext(stream)) == {"n": 1}
+        await settle()
+        assert not send.done()
+
+        # 调用方取下一帧时上一帧已写出
+        next_frame = asyncio.create_task(anext(stream))
+        await settle()
+        assert send.done()
+        next_frame.cancel()
+
+    async def test_idle_stream_yields_keepalive(self):
+        stream = SSESocket().messages(keepalive=0.01)
+        assert await anext(stream) is None
+
+    def test_encode_sse(self):
+        assert encode_sse({"payload": {"seq": 7}}).startswith("id: 7\ndata: ")
+        assert encode_sse({"payload": {}}).startswith("data: ")
@@ -0,0 +1,70 @@
+"""心跳超时检测测试"""
+
+import pytest
+
+from app.schemas.websocket import WSRole
+from app.services.websocket import manager as manager_module
+from app.services.websocket.heartbeat import HeartbeatManager, TimingWheel
+from app.services.websocket.manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.closed_with: tuple[int, str] | None = None
+
+    async def send_json(self, message):
+        pass
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = (code, reason)
+
+
+class TestTimingWheel:
+    def test_returns_items_when_due(self):
+        wheel = TimingWheel(tick=1, slots=4, now=100)
+        wheel.schedule("a", 102.5)
+        wheel.schedule("b", 101.2)
+
+        # 条目在到期后的第一个刻度返回
+        assert wheel.advance(101.5) == []
+        assert wheel.advance(102.0) == ["b"]
+        assert wheel.advance(103.0) == ["a"]
+        assert len(wheel) == 0
+
+    def test_deadline_beyond_one_round_waits(self):
+        wheel = TimingWheel(tick=1, slots=4, now=100)
+        wheel.schedule("far", 106)
+
+        # 第一圈经过同一槽位（102）时尚未到期
+        assert wheel.advance(104) == []
+        assert wheel.advance(106) == ["far"]
+
+    def test_past_deadline_fires_on_next_tick(self):
+        wheel = TimingWheel(tick=1, slots=4, now=100)
+        wheel.schedule("late", 99)
+
+        assert wheel.advance(101) == ["late"]
+
+
+@pytest.mark.anyio
+class TestHeartbeatManager:
+    async def test_expires_only_silent_connections(self, monkeypatch):
+        manager = ConnectionManager()
+        monkeypatch.setattr(manager_module, "ws_manager", manager)
+        heartbeat = HeartbeatManager()
+        heartbeat._wheel = TimingWheel(HeartbeatManager.TICK, 20, now=1000)
+
+        silent_ws, alive_ws = FakeWebSocket(), FakeWebSocket()
+        silent = await manager.connect(silent_ws, "c1", WSRole.USER, "u1")
+        alive = await manager.connect(alive_ws, "c1", WSRole.AGENT, "a1")
+        silent.last_ping_at = alive.last_ping_at = 1000
+        heartbeat.track(silent)
+        heartbeat.track(alive)
+
+        alive.last_ping_at = 1060  # 期间有心跳
+        await heartbeat._check_connections(1000 + HeartbeatManager.TIMEOUT + HeartbeatManager.TICK)
+
+        assert silent_ws.closed_with[0] == 4002
+        assert manager.get_connection(silent.id) is None
+        assert manager.get_connection(alive.id) is alive
+        assert len(heartbeat._wheel) == 1  # 活跃连接按新的到期时间放回
@@ -0,0 +1,135 @@
+"""WebSocket 连接发送队列测试"""
+
+import asyncio
+
+import pytest
+
+from app.schemas.websocket import WSRole
+from app.services.websocket import manager as manager_module
+from app.services.websocket.manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0, blocked: asyncio.Event | None = None):
+        self.sent: list[dict] = []
+        self.closed_with: tuple[int, str] | None = None
+        self.delay = delay
+        self.blocked = blocked
+
+    async def send_json(self, message):
+        if self.blocked is not None:
+            await self.blocked.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(message)
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = (code, reason)
+
+
+async def settle(seconds: float = 0.01) -> None:
+    await asyncio.sleep(seconds)
+
+
+@pytest.mark.anyio
+class TestSendQueue:
+    async def test_slow_client_does_not_block_others(self):
+        manager = ConnectionManager()
+        stuck = asyncio.Event()
+        slow_ws, fast_ws = FakeWebSocket(blocked=stuck), FakeWebSocket()
+        await manager.connect(slow_ws, "c1", WSRole.USER, "u1")
+        await manager.connect(fast_ws, "c1", WSRole.USER, "u2")
+
+        # 慢客户端阻塞写入时，广播立即返回且其他连接正常收到
+        sent = await asyncio.wait_for(
+            manager.send_to_role("c1", WSRole.USER, {"action": "server.message", "n": 1}), timeout=1
+        )
+        await settle()
+        assert sent == 2
+        assert fast_ws.sent == [{"action": "server.message", "n": 1}]
+        assert slow_ws.sent == []
+
+        stuck.set()
+        await settle()
+        assert slow_ws.sent == [{"action": "server.message", "n": 1}]
+
+    async def test_messages_keep_order(self):
+        manager = ConnectionManager()
+        ws = FakeWebSocket(delay=0.001)
+        conn = await manager.connect(ws, "c1", WSRole.AGENT, "a1")
+
+        await conn.send({"n": 0})
+        for n in range(1, 5):
+            await manager.broadcast_to_conversation("c1", {"n": n})
+        assert conn.queue_depth > 0
+        await settle(0.05)
+
+        assert [m["n"] for m in ws.sent] == [0, 1, 2, 3, 4]
+        assert conn.queue_depth == 0
+
+    async def test_overflow_closes_slow_connection(self, monkeypatch):
+        monkeypatch.setattr(manager_module.settings, "WS_SEND_QUEUE_SIZE", 2)
+        manager = ConnectionManager()
+        stuck = asyncio.Event()
+        ws = FakeWebSocket(blocked=stuck)
+        conn = await manager.connect(ws, "c1", WSRole.USER, "u1")
+
+        # 第一条被写任务取出并阻塞，随后两条填满队列，第四条触发关闭
+        results = []
+        for n in range(4):
+            results.append(await manager.send_to_role("c1", WSRole.USER, {"n": n}))
+            await settle(0)
+
+        assert results == [1, 1, 1, 0]
+        assert not conn.is_alive
+        assert conn.queue_depth == 0
+        await settle()
+        assert ws.closed_with[0] == 1013
+        assert await manager.send_to_role("c1", WSRole.USER, {"n": 4}) == 0
+
+    async def test_overflow_drops_oldest(self, monkeypatch):
+        monkeypatch.setattr(manager_module.settings, "WS_SEND_QUEUE_SIZE", 2)
+        monkeypatch.setattr(manager_module.settings, "WS_SEND_OVERFLOW_POLICY", "drop_oldest")
+        manager = ConnectionManager()
+        stuck = asyncio.Event()
+        ws = FakeWebSocket(blocked=stuck)
+        conn = await manager.connect(ws, "c1", WSRole.USER, "u1")
+
+        for n in range(5):
+            await manager.send_to_role("c1", WSRole.USER, {"n": n})
+            await settle(0)
+
+        assert conn.queue_depth == 2
+        assert conn.dropped_count == 2
+        assert manager.get_stats()["dropped_messages"] == 2
+
+        stuck.set()
+        await settle()
+        assert [m["n"] for m in ws.sent] == [0, 3, 4]
+        assert conn.is_alive
+
+    async def test_write_timeout_closes_connection(self, monkeypatch):
+        monkeypatch.setattr(manager_module.settings, "WS_SEND_TIMEOUT", 0.01)
+        manager = ConnectionManager()
+        ws = FakeWebSocket(blocked=asyncio.Event())
+        conn = await manager.connect(ws, "c1", WSRole.USER, "u1")
+
+        await manager.send_to_role("c1", WSRole.USER, {"n": 0})
+        await settle(0.05)
+
+        assert not conn.is_alive
+        assert ws.closed_with[0] == 1013
+
+    async def test_disconnect_stops_writer(self):
+        manager = ConnectionManager()
+        ws = FakeWebSocket(blocked=asyncio.Event())
+        conn = await manager.connect(ws, "c1", WSRole.USER, "u1")
+        await conn.send({"n": 0})
+        await conn.send({"n": 1})
+        await settle(0)
+
+        await manager.disconnect(conn.id)
+        await settle()
+
+        assert conn._writer.done()
+        assert conn.queue_depth == 0
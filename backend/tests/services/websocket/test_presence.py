@@ -0,0 +1,169 @@
+"""在线状态服务测试"""
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.models.base import Base
+from app.models.conversation import Conversation
+from app.repositories.conversation import ConversationRepository
+from app.schemas.websocket import WSRole
+from app.services.websocket.manager import ConnectionManager
+from app.services.websocket.presence import PresenceService
+
+
+class FakeWebSocket:
+    async def send_json(self, message):
+        pass
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as s:
+        s.add(Conversation(id="c1", user_id="u1", title="c1"))
+        s.add(Conversation(id="c2", user_id="u2", title="c2"))
+        await s.commit()
+        yield s
+    await engine.dispose()
+
+
+@pytest.fixture
+def presence(session):
+    service = PresenceService(flush_interval=0, connections=ConnectionManager())
+    service.batches: list[list[dict]] = []
+
+    async def persist(changes):
+        service.batches.append(changes)
+        await ConversationRepository(session).apply_presence_changes(changes)
+        await session.commit()
+
+    service._persist = persist
+    return service
+
+
+async def _row(session, conversation_id: str) -> Conversation:
+    conv = await session.get(Conversation, conversation_id)
+    await session.refresh(conv)
+    return conv
+
+
+@pytest.mark.anyio
+class TestPresenceService:
+    async def test_changes_are_batched_into_one_write(self, presence, session):
+        presence.connected("c1", "user")
+        presence.connected("c2", "user")
+        presence.connected("c2", "agent", "agent-1")
+
+        assert await presence.flush() == 3
+        assert len(presence.batches) == 1
+
+        c2 = await _row(session, "c2")
+        assert c2.user_online and c2.agent_online
+        assert c2.current_agent_id == "agent-1"
+        assert c2.agent_last_online_at is not None
+
+    async def test_reconnect_within_window_skips_write(self, presence):
+        presence.connected("c1", "user")
+        await presence.flush()
+
+        presence.disconnected("c1", "user")
+        presence.connected("c1", "user")
+
+        assert await presence.flush() == 0
+        assert len(presence.batches) == 1
+        assert presence.get_stats()["skipped"] == 1
+
+    async def test_offline_only_after_last_connection(self, presence, session):
+        presence.connected("c1", "user")
+        presence.connected("c1", "user")  # 第二个标签页
+        presence.disconnected("c1", "user")
+
+        assert presence.is_online("c1", "user")
+        await presence.flush()
+        assert (await _row(session, "c1")).user_online
+
+        presence.disconnected("c1", "user")
+        await presence.flush()
+        assert not (await _row(session, "c1")).user_online
+        # 已持久化的离线条目不再占用内存，读取回退到数据库
+        assert presence.is_online("c1", "user", default=None) is None
+
+    async def test_status_overlays_persisted_values(self, presence):
+        persisted = {
+            "user_online": False,
+            "user_last_online_at": None,
+            "agent_online": True,
+            "agent_last_online_at": None,
+            "current_agent_id": "agent-on-other-node",
+        }
+        presence.connected("c1", "user")
+
+        status = presence.get_status("c1", persisted)
+
+        assert status["user_online"] is True
+        assert status["user_last_online_at"] is not None
+        assert status["agent_online"] is True
+        assert status["current_agent_id"] == "agent-on-other-node"
+
+    async def test_failed_write_is_retried(self, presence, session):
+        presence.connected("c1", "user")
+        original = presence._persist
+
+        async def failing(changes):
+            raise RuntimeError("database is locked")
+
+        presence._persist = failing
+        with pytest.raises(RuntimeError):
+            await presence.flush()
+
+        presence._persist = original
+        assert await presence.flush() == 1
+        assert (await _row(session, "c1")).user_online
+
+
+def _members(node_id: str, **counts: int) -> dict:
+    return {"origin": node_id, "kind": "members", "counts": counts}
+
+
+@pytest.mark.anyio
+class TestClusterPresence:
+    async def test_offline_not_persisted_while_online_on_other_node(self, presence, session):
+        manager = presence._connections
+        conn = await manager.connect(FakeWebSocket(), "c1", WSRole.USER, "u1")
+        await manager._on_bus_message("c1", _members("node-b", user=1))
+        presence.connected("c1", "user")
+        await presence.flush()
+
+        # 本地最后一个连接断开并退订会话主题，另一节点仍有该用户的连接
+        presence.disconnected("c1", "user")
+        await manager.disconnect(conn.id)
+
+        assert await presence.flush() == 0
+        assert (await _row(session, "c1")).user_online
+        assert presence.is_online("c1", "user", default=None) is None
+
+    async def test_offline_persisted_after_other_node_disconnects(self, presence, session):
+        manager = presence._connections
+        # 本节点仍持有客服连接，保持订阅，能看到另一节点的用户连接变化
+        await manager.connect(FakeWebSocket(), "c1", WSRole.AGENT, "a1")
+        user_conn = await manager.connect(FakeWebSocket(), "c1", WSRole.USER, "u1")
+        await manager._on_bus_message("c1", _members("node-b", user=1))
+        presence.connected("c1", "user")
+        await presence.flush()
+
+        presence.disconnected("c1", "user")
+        await manager.disconnect(user_conn.id)
+        assert await presence.flush() == 0
+
+        await manager._on_bus_message("c1", _members("node-b"))
+        presence.connected("c1", "user")
+        presence.disconnected("c1", "user")
+        assert await presence.flush() == 1
+        assert not (await _row(session, "c1")).user_online
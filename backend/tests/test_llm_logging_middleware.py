@@ -87,3 +87,41 @@ async def test_llm_logging_middleware_emits_end_on_error() -> None:
         await middleware.awrap_model_call(request, handler)
 
     assert emitter.events == []
+
+
+@pytest.mark.anyio
+async def test_llm_logging_middleware_records_llm_span() -> None:
+    from app.core.tracing import TurnTrace
+
+    trace = TurnTrace("c1")
+    chat_context = ChatContext(
+        conversation_id="c1",
+        user_id="u1",
+        assistant_message_id="a1",
+        emitter=_DummyEmitter(),
+        trace=trace,
+    )
+    request = ModelRequest(
+        model=_DummyModel(),  # type: ignore[arg-type]
+        messages=[HumanMessage(content="hi")],
+        system_message=None,
+        tools=[],
+        runtime=Runtime(context=chat_context),  # type: ignore[arg-type]
+        state={"messages": [HumanMessage(content="hi")]},
+    )
+
+    async def handler(_: ModelRequest) -> ModelResponse:
+        trace.mark_first_token()
+        message = AIMessage(
+            content="ok",
+            usage_metadata={"input_tokens": 5, "output_tokens": 12, "total_tokens": 17},
+        )
+        return ModelResponse(result=[message], structured_response=None)
+
+    await LoggingMiddleware().awrap_model_call(request, handler)
+
+    span = trace.spans[-1]
+    assert span.name == "llm.call"
+    assert span.attributes["model"] == "dummy-model"
+    assert span.attributes["output_tokens"] == 12
+    assert "ttft_ms" in span.attributes
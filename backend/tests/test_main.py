@@ -0,0 +1,65 @@
+"""应用入口测试"""
+
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  注册全部模型
+from app.core import database
+from app.models.base import Base
+from app.models.conversation import Conversation
+from app.models.message import Message
+from scripts.profile_imports import LAZY_MODULES
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def test_optional_subsystems_are_not_imported_at_startup():
+    """导入应用入口时不加载爬取引擎、Playwright、OCR 处理器与 Qdrant 客户端"""
+    code = (
+        "import sys, app.main\n"
+        f"print('loaded:', [m for m in {LAZY_MODULES!r} if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert "loaded: []" in result.stdout.splitlines()
+
+
+@pytest.mark.anyio
+async def test_startup_backfills_unread_counters(monkeypatch):
+    """启动时回填计数列加入前的历史会话"""
+    from app.main import _backfill_unread_counters
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def db_context():
+        async with factory() as session:
+            yield session
+            await session.commit()
+
+    monkeypatch.setattr(database, "get_db_context", db_context)
+    async with factory() as session:
+        session.add(Conversation(id="c1", user_id="u1", title="c1"))
+        session.add(Message(id="m1", conversation_id="c1", role="user", content="hi"))
+        await session.commit()
+
+    await _backfill_unread_counters()
+
+    async with factory() as session:
+        conv = await session.get(Conversation, "c1")
+        assert conv.unread_user_count == 1
+    await engine.dispose()
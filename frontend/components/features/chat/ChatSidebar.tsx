@@ -1,6 +1,7 @@
 "use client";
 
-import { MessageSquare, Plus, Search, Trash2 } from "lucide-react";
+import { useEffect, useRef } from "react";
+import { Loader2, MessageSquare, Plus, Search, Trash2 } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import {
   Sidebar,
@@ -21,6 +22,24 @@ export function ChatSidebar() {
   const createNewConversation = useConversationStore((s) => s.createNewConversation);
   const selectConversation = useConversationStore((s) => s.selectConversation);
   const removeConversation = useConversationStore((s) => s.removeConversation);
+  const hasMore = useConversationStore((s) => s.hasMore);
+  const isLoadingMore = useConversationStore((s) => s.isLoadingMore);
+  const loadMoreConversations = useConversationStore((s) => s.loadMoreConversations);
+
+  // 滚动到列表底部时加载下一页（每页加载完重新观察，底部仍可见时继续加载）
+  const sentinelRef = useRef<HTMLDivElement>(null);
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel || !hasMore || isLoadingMore) return;
+
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0]?.isIntersecting) {
+        loadMoreConversations();
+      }
+    });
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [hasMore, isLoadingMore, loadMoreConversations]);
 
   // 按日期分组会话
   const groupedConversations = groupConversationsByDate(conversations);
@@ -83,6 +102,21 @@ export function ChatSidebar() {
             </SidebarMenu>
           </SidebarGroup>
         ))}
+
+        {hasMore && (
+          <div ref={sentinelRef} className="flex justify-center px-4 py-2">
+            <Button
+              variant="ghost"
+              size="sm"
+              className="text-zinc-500"
+              disabled={isLoadingMore}
+              onClick={loadMoreConversations}
+            >
+              {isLoadingMore && <Loader2 className="h-3 w-3 animate-spin" />}
+              <span>{isLoadingMore ? "加载中..." : "加载更多"}</span>
+            </Button>
+          </div>
+        )}
         
         {conversations.length === 0 && (
           <div className="px-4 py-8 text-center text-sm text-zinc-500">
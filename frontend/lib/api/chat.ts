@@ -1,7 +1,7 @@
 // 聊天 API
 
 import type { ChatEvent, ChatRequest } from "@/types/chat";
-import { getApiBaseUrl } from "./client";
+import { apiRequest, getApiBaseUrl } from "./client";
 
 export interface StreamChatController {
   abort: () => void;
@@ -79,3 +79,16 @@ export async function* streamChat(
     reader.releaseLock();
   }
 }
+
+/**
+ * 停止生成：关闭 SSE 连接不会中止后台生成（可断点续传），需显式取消
+ * @param assistantMessageId meta.start 返回的 assistant_message_id
+ */
+export async function cancelChatStream(
+  assistantMessageId: string
+): Promise<{ cancelled: boolean }> {
+  return apiRequest<{ cancelled: boolean }>(
+    `/api/v1/chat/${encodeURIComponent(assistantMessageId)}/cancel`,
+    { method: "POST" }
+  );
+}
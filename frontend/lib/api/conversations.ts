@@ -4,13 +4,21 @@ import type {
   Conversation,
   ConversationWithMessages,
   CreateConversationRequest,
+  PaginatedConversationsResponse,
   PaginatedMessagesResponse,
 } from "@/types/conversation";
 import { apiRequest } from "./client";
 
-export async function getConversations(userId: string): Promise<Conversation[]> {
-  return apiRequest<Conversation[]>(
-    `/api/v1/conversations?user_id=${encodeURIComponent(userId)}`
+export async function getConversations(
+  userId: string,
+  options?: { cursor?: string; limit?: number }
+): Promise<PaginatedConversationsResponse> {
+  const params = new URLSearchParams({ user_id: userId });
+  if (options?.cursor) params.set("cursor", options.cursor);
+  if (options?.limit) params.set("limit", String(options.limit));
+
+  return apiRequest<PaginatedConversationsResponse>(
+    `/api/v1/conversations?${params.toString()}`
   );
 }
 
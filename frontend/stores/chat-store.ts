@@ -7,6 +7,7 @@ import { subscribeWithSelector } from "zustand/middleware";
 import type { ChatEvent, ImageAttachment } from "@/types/chat";
 import { getConversationMessages } from "@/lib/api/conversations";
 import { getApiBaseUrl } from "@/lib/api/client";
+import { cancelChatStream } from "@/lib/api/chat";
 import {
   createChatStreamClient,
   createTimelineManager,
@@ -32,6 +33,8 @@ interface ChatState {
   error: string | null;
   isHumanMode: boolean;
   _streamClient: IChatStreamClient | null;
+  // 当前生成的服务端助手消息 ID（meta.start 后可用，停止生成时用于取消后台任务）
+  _assistantMessageId: string | null;
   isStreaming: boolean;
   // 分页状态
   nextCursor: string | null;
@@ -67,6 +70,7 @@ export const useChatStore = create<ChatState>()(
     error: null,
     isHumanMode: false,
     _streamClient: null,
+    _assistantMessageId: null,
     isStreaming: false,
     nextCursor: null,
     hasMore: false,
@@ -197,7 +201,7 @@ export const useChatStore = create<ChatState>()(
 
       // 使用 Adapter 创建 SSE 客户端
       const client = createChatStreamClient(getApiBaseUrl());
-      set({ _streamClient: client });
+      set({ _streamClient: client, _assistantMessageId: null });
 
       try {
         for await (const event of client.stream({
@@ -223,7 +227,7 @@ export const useChatStore = create<ChatState>()(
           set({ timelineState: globalTimelineManager.getState() });
         }
       } finally {
-        set({ _streamClient: null, isStreaming: false });
+        set({ _streamClient: null, _assistantMessageId: null, isStreaming: false });
       }
     },
 
@@ -239,12 +243,19 @@ export const useChatStore = create<ChatState>()(
       const client = get()._streamClient;
       if (client) {
         client.abort();
+        // 断开 SSE 不会停止后台生成，需显式取消（否则 LLM 继续运行并保存消息）
+        const assistantMessageId = get()._assistantMessageId;
+        if (assistantMessageId) {
+          cancelChatStream(assistantMessageId).catch((err) => {
+            console.error("[ChatStore] 取消生成失败:", err);
+          });
+        }
         const currentTurnId = get().timelineState.activeTurn.turnId;
         if (currentTurnId) {
           globalTimelineManager.clearTurn(currentTurnId);
           set({ timelineState: globalTimelineManager.getState() });
         }
-        set({ _streamClient: null, isStreaming: false });
+        set({ _streamClient: null, _assistantMessageId: null, isStreaming: false });
       }
     },
 
@@ -260,12 +271,16 @@ export const useChatStore = create<ChatState>()(
         let newHumanMode = state.isHumanMode;
         let newAgentId = state.currentAgentId;
         let newAgentName = state.currentAgentName;
+        let newAssistantMessageId = state._assistantMessageId;
 
         if (event.type === "meta.start") {
-          const payload = event.payload as { mode?: string };
+          const payload = event.payload as { mode?: string; assistant_message_id?: string };
           if (payload.mode === "human") {
             newHumanMode = true;
           }
+          if (payload.assistant_message_id) {
+            newAssistantMessageId = payload.assistant_message_id;
+          }
         }
 
         // Supervisor 事件处理
@@ -284,6 +299,7 @@ export const useChatStore = create<ChatState>()(
           isHumanMode: newHumanMode,
           currentAgentId: newAgentId,
           currentAgentName: newAgentName,
+          _assistantMessageId: newAssistantMessageId,
         };
       });
     },
@@ -301,6 +317,7 @@ export const useChatStore = create<ChatState>()(
         error: null,
         isHumanMode: false,
         _streamClient: null,
+        _assistantMessageId: null,
         isStreaming: false,
         nextCursor: null,
         hasMore: false,
@@ -17,8 +17,13 @@ interface ConversationState {
   currentConversationId: string | null;
   isLoading: boolean;
   error: string | null;
+  // 分页状态
+  nextCursor: string | null;
+  hasMore: boolean;
+  isLoadingMore: boolean;
 
   loadConversations: () => Promise<void>;
+  loadMoreConversations: () => Promise<void>;
   createNewConversation: () => Promise<Conversation | null>;
   removeConversation: (id: string) => Promise<void>;
   selectConversation: (id: string) => void;
@@ -33,6 +38,9 @@ export const useConversationStore = create<ConversationState>()(
     currentConversationId: null,
     isLoading: false,
     error: null,
+    nextCursor: null,
+    hasMore: false,
+    isLoadingMore: false,
 
     loadConversations: async () => {
       const userId = useUserStore.getState().userId;
@@ -40,15 +48,52 @@ export const useConversationStore = create<ConversationState>()(
 
       set({ isLoading: true, error: null });
       try {
-        const data = await getUserConversations(userId);
-        set({ conversations: data, isLoading: false });
-        console.log("[ConversationStore] 加载了", data.length, "个会话");
+        const { items, next_cursor, has_more } = await getUserConversations(userId);
+        set({
+          conversations: items,
+          nextCursor: next_cursor,
+          hasMore: has_more,
+          isLoading: false,
+        });
+        console.log("[ConversationStore] 加载了", items.length, "个会话");
       } catch (error) {
         console.error("[ConversationStore] 加载失败:", error);
         set({ error: "加载会话失败", isLoading: false });
       }
     },
 
+    loadMoreConversations: async () => {
+      const userId = useUserStore.getState().userId;
+      const { nextCursor, hasMore, isLoading, isLoadingMore } = get();
+      if (!userId || !hasMore || !nextCursor || isLoading || isLoadingMore) {
+        return;
+      }
+
+      set({ isLoadingMore: true });
+      try {
+        const { items, next_cursor, has_more } = await getUserConversations(userId, {
+          cursor: nextCursor,
+        });
+        // 本地新建的会话可能使分页边界移动，按 id 去重
+        set((state) => {
+          const loaded = new Set(state.conversations.map((c) => c.id));
+          return {
+            conversations: [
+              ...state.conversations,
+              ...items.filter((c) => !loaded.has(c.id)),
+            ],
+            nextCursor: next_cursor,
+            hasMore: has_more,
+            isLoadingMore: false,
+          };
+        });
+        console.log("[ConversationStore] 加载更多会话:", items.length);
+      } catch (error) {
+        console.error("[ConversationStore] 加载更多失败:", error);
+        set({ isLoadingMore: false });
+      }
+    },
+
     createNewConversation: async () => {
       const userId = useUserStore.getState().userId;
       if (!userId) return null;
@@ -104,6 +149,9 @@ export const useConversationStore = create<ConversationState>()(
         currentConversationId: null,
         isLoading: false,
         error: null,
+        nextCursor: null,
+        hasMore: false,
+        isLoadingMore: false,
       });
     },
   }))
@@ -7,6 +7,10 @@ export interface Conversation {
   created_at: string;
   updated_at: string;
   handoff_state?: "ai" | "pending" | "human";
+  message_count?: number;
+  last_message_role?: string | null;
+  last_message_preview?: string | null;
+  last_message_at?: string | null;
 }
 
 export interface Message {
@@ -19,12 +23,20 @@ export interface Message {
 
 export interface ConversationWithMessages extends Conversation {
   messages: Message[];
+  next_cursor?: string | null;
+  has_more?: boolean;
 }
 
 export interface CreateConversationRequest {
   user_id: string;
 }
 
+export interface PaginatedConversationsResponse {
+  items: Conversation[];
+  next_cursor: string | null;
+  has_more: boolean;
+}
+
 export interface PaginatedMessagesResponse {
   messages: Message[];
   next_cursor: string | null;
@@ -103,6 +103,7 @@ export interface ServerMessagePayload {
   delivered_at?: string;
   read_at?: string;
   read_by?: string;
+  seq?: number;
 }
 
 export interface TypingPayload {